@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Sharded and resumable evaluation.
+
+The episodes are split into :py:`num_shards` shards by a hash of their
+scene id and episode id, so every process evaluating a shard selects the
+same episodes whatever the order of the dataset or the split of its scenes
+between the envs. The stats of each evaluated episode are appended to the
+record file of the shard as soon as the episode ends:
+
+.. code-block:: text
+
+    {records_dir}/ckpt_{checkpoint_index}/shard_{i}_of_{num_shards}.jsonl
+
+An interrupted evaluation resumes by skipping the episodes already in its
+record file. Once a shard is complete, a final line marks it complete and
+the last shard to complete merges the records of all the shards into the
+aggregate metrics. The shards can also be merged from the command line:
+
+.. code-block:: bash
+
+    python -m habitat_baselines.common.eval_shards \
+        --records-dir data/eval_records --checkpoint-index 0 --num-shards 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import os.path as osp
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from habitat import VectorEnv, logger
+
+# (scene_id, episode_id) of an episode.
+EpisodeKey = Tuple[str, str]
+# The stats of the evaluations of the episodes, by episode and evaluation
+# index (starting at 1), as in `HabitatEvaluator.evaluate_agent`.
+EpisodeStats = Dict[Tuple[EpisodeKey, int], Dict[str, float]]
+
+
+def episode_shard(scene_id: str, episode_id: str, num_shards: int) -> int:
+    r"""Returns the shard of the episode :p:`episode_id` of the scene
+    :p:`scene_id`, identical in every process.
+    """
+    h = hashlib.blake2b(f"{scene_id}\0{episode_id}".encode(), digest_size=8)
+    return int.from_bytes(h.digest(), "little") % num_shards
+
+
+def get_records_path(
+    records_dir: str, checkpoint_index: int, shard_index: int, num_shards: int
+) -> str:
+    return osp.join(
+        records_dir,
+        f"ckpt_{checkpoint_index}",
+        f"shard_{shard_index}_of_{num_shards}.jsonl",
+    )
+
+
+def read_records(path: str) -> Tuple[EpisodeStats, bool, int]:
+    r"""Reads the record file at :p:`path`.
+
+    :return: The stats of the recorded episodes, whether the shard is
+        complete and the size in bytes of the valid records. A record cut
+        short by an interruption is ignored.
+    """
+    stats_episodes: EpisodeStats = {}
+    complete = False
+    valid_size = 0
+    if not osp.isfile(path):
+        return stats_episodes, complete, valid_size
+
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            valid_size += len(line)
+            if record.get("complete", False):
+                complete = True
+                continue
+            key = (record["scene_id"], record["episode_id"])
+            stats_episodes[(key, record["eval_index"])] = record["stats"]
+    return stats_episodes, complete, valid_size
+
+
+def aggregate_episode_stats(stats_episodes: EpisodeStats) -> Dict[str, float]:
+    r"""Returns the mean of each stat over the episodes that have it."""
+    all_ks = set()
+    for ep in stats_episodes.values():
+        all_ks.update(ep.keys())
+    return {
+        stat_key: float(
+            np.mean(
+                [v[stat_key] for v in stats_episodes.values() if stat_key in v]
+            )
+        )
+        for stat_key in all_ks
+    }
+
+
+def merge_shards(
+    records_dir: str, checkpoint_index: int, num_shards: int
+) -> Tuple[EpisodeStats, List[int]]:
+    r"""Merges the records of the :p:`num_shards` shards.
+
+    :return: The stats of the episodes of all the shards and the indices of
+        the shards that are not complete.
+    """
+    stats_episodes: EpisodeStats = {}
+    incomplete = []
+    for shard_index in range(num_shards):
+        shard_stats, complete, _ = read_records(
+            get_records_path(
+                records_dir, checkpoint_index, shard_index, num_shards
+            )
+        )
+        stats_episodes.update(shard_stats)
+        if not complete:
+            incomplete.append(shard_index)
+    return stats_episodes, incomplete
+
+
+class EvalShard:
+    r"""The episodes of the shard :p:`shard_index` of an evaluation and
+    their record file.
+
+    :param records_dir: The directory of the record files, shared by all the
+        shards.
+    :param checkpoint_index: The index of the evaluated checkpoint, each
+        checkpoint has its own records.
+    :param num_shards: The number of shards.
+    :param shard_index: The shard evaluated by this process.
+    """
+
+    def __init__(
+        self,
+        records_dir: str,
+        checkpoint_index: int,
+        num_shards: int = 1,
+        shard_index: int = 0,
+    ) -> None:
+        assert (
+            0 <= shard_index < num_shards
+        ), f"Shard index {shard_index} is out of range for {num_shards} shards"
+        self.records_dir = records_dir
+        self.checkpoint_index = checkpoint_index
+        self.num_shards = num_shards
+        self.shard_index = shard_index
+        self.path = get_records_path(
+            records_dir, checkpoint_index, shard_index, num_shards
+        )
+
+        self.stats_episodes, self.complete, valid_size = read_records(
+            self.path
+        )
+        os.makedirs(osp.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            # Drop a record cut short by an interruption, the new records
+            # would be appended to it otherwise.
+            f.truncate(valid_size)
+        if len(self.stats_episodes) > 0:
+            logger.info(
+                f"Resuming the evaluation of {self.path} with "
+                f"{len(self.stats_episodes)} recorded episodes"
+            )
+
+    def contains(self, scene_id: str, episode_id: str) -> bool:
+        return (
+            self.num_shards == 1
+            or episode_shard(scene_id, episode_id, self.num_shards)
+            == self.shard_index
+        )
+
+    def eval_counts(self) -> DefaultDict[EpisodeKey, int]:
+        r"""The number of recorded evaluations of each episode."""
+        counts: DefaultDict[EpisodeKey, int] = defaultdict(lambda: 0)
+        for key, eval_index in self.stats_episodes.keys():
+            counts[key] = max(counts[key], eval_index)
+        return counts
+
+    def select_episodes(
+        self, envs: VectorEnv, evals_per_ep: int
+    ) -> Tuple[List[int], int]:
+        r"""Restricts the episodes of each env of :p:`envs` to the episodes
+        of the shard that have fewer than :p:`evals_per_ep` recorded
+        evaluations.
+
+        :return: The indices of the envs left without episodes, which should
+            be paused, and the number of episodes of the shard, recorded or
+            not.
+        """
+        eval_counts = self.eval_counts()
+        shard_episodes = set()
+        envs_without_episodes = []
+        for env_index in range(envs.num_envs):
+            scene_ids = envs.call_at(env_index, "get_episode_scene_ids")
+            episode_ids = envs.call_at(env_index, "get_episode_ids")
+            selected = []
+            for episode_index, key in enumerate(zip(scene_ids, episode_ids)):
+                if not self.contains(*key):
+                    continue
+                shard_episodes.add(key)
+                if eval_counts[key] < evals_per_ep:
+                    selected.append(episode_index)
+
+            if len(selected) == 0:
+                envs_without_episodes.append(env_index)
+            else:
+                envs.call_at(
+                    env_index,
+                    "select_episodes_by_index",
+                    {"episode_indices": selected},
+                )
+        return envs_without_episodes, len(shard_episodes)
+
+    def add(
+        self, key: EpisodeKey, eval_index: int, stats: Dict[str, Any]
+    ) -> None:
+        r"""Records the :p:`stats` of the evaluation :p:`eval_index` of the
+        episode :p:`key`. The record is on disk when this returns.
+        """
+        stats = {k: float(v) for k, v in stats.items()}
+        self.stats_episodes[(key, eval_index)] = stats
+        self._write(
+            {
+                "scene_id": key[0],
+                "episode_id": key[1],
+                "eval_index": eval_index,
+                "stats": stats,
+            }
+        )
+
+    def mark_complete(self) -> None:
+        if not self.complete:
+            self._write({"complete": True})
+            self.complete = True
+
+    def merge(self) -> Optional[EpisodeStats]:
+        r"""Returns the stats of the episodes of all the shards if they are
+        all complete, :py:`None` otherwise.
+        """
+        if self.num_shards == 1:
+            return self.stats_episodes if self.complete else None
+        stats_episodes, incomplete = merge_shards(
+            self.records_dir, self.checkpoint_index, self.num_shards
+        )
+        if len(incomplete) > 0:
+            logger.info(
+                f"Shards {incomplete} of checkpoint {self.checkpoint_index} "
+                "are not complete yet, the last shard to complete merges "
+                "the metrics."
+            )
+            return None
+        return stats_episodes
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        # The file is only opened to append a record, once per episode, so
+        # nothing is left open if the evaluation is interrupted.
+        with open(self.path, "ab") as f:
+            f.write(json.dumps(record).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Merges the records of the shards of an evaluation."
+    )
+    parser.add_argument("--records-dir", type=str, required=True)
+    parser.add_argument("--checkpoint-index", type=int, required=True)
+    parser.add_argument("--num-shards", type=int, required=True)
+    args = parser.parse_args()
+
+    merged_stats, incomplete_shards = merge_shards(
+        args.records_dir, args.checkpoint_index, args.num_shards
+    )
+    if len(incomplete_shards) > 0:
+        print(f"Incomplete shards: {incomplete_shards}")
+    print(f"Episodes: {len(merged_stats)}")
+    for k, v in sorted(aggregate_episode_stats(merged_stats).items()):
+        print(f"Average episode {k}: {v:.4f}")
@@ -46,7 +46,12 @@ class HabitatVectorEnvFactory(VectorEnvFactory):
         random.shuffle(scenes)
 
         scene_splits: List[List[str]] = [[] for _ in range(num_environments)]
-        if len(scenes) < num_environments:
+        if config.habitat_baselines.scene_scheduler.enabled:
+            # The trainer chooses the episodes of each environment, so every
+            # environment needs the episodes of all the scenes.
+            for split in scene_splits:
+                split.extend(scenes)
+        elif len(scenes) < num_environments:
             msg = f"There are less scenes ({len(scenes)}) than environments ({num_environments}). "
             if enforce_scenes_greater_eq_environments:
                 logger.warn(
@@ -112,9 +117,13 @@ class HabitatVectorEnvFactory(VectorEnvFactory):
             make_env_fn=make_gym_from_config,
             env_fn_args=tuple((c,) for c in configs),
             workers_ignore_signals=workers_ignore_signals,
+            use_shared_memory_obs=config.habitat_baselines.vector_env_shared_memory_obs,
         )
 
         if config.habitat.simulator.renderer.enable_batch_renderer:
             envs.initialize_batch_renderer(config)
 
+        if config.habitat.task.batched_nav_sensors:
+            envs.initialize_batched_nav_sensors(config)
+
         return envs
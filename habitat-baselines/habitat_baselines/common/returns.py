@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Computation of the discounted returns and generalized advantage
+estimation (GAE) over the time axis of a rollout.
+
+Both are a reverse linear recurrence :py:`out[t] = x[t] + a[t] * out[t + 1]`
+over the first (time) dimension. It is computed with one of the methods:
+
+- :py:`"loop"`: a Python loop over the time steps.
+- :py:`"scan"`: a parallel scan that composes the recurrence over blocks of
+  doubling size, with :py:`log2(T)` vectorized steps instead of :py:`T`.
+  The terms are summed in a different order, so the results can differ
+  from the loop by rounding errors.
+- :py:`"jit"`: the loop compiled with TorchScript, which removes the Python
+  overhead per step while keeping the summation order of the loop.
+"""
+
+from typing import Callable, Dict, Optional
+
+import torch
+
+RETURNS_METHODS = ("loop", "scan", "jit")
+
+
+def _reverse_recurrence_loop(x: torch.Tensor, a: torch.Tensor) -> torch.Tensor:
+    out = torch.empty_like(x)
+    acc = torch.zeros_like(x[0])
+    for t in range(x.size(0) - 1, -1, -1):
+        acc = x[t] + a[t] * acc
+        out[t] = acc
+    return out
+
+
+def _reverse_recurrence_scan(x: torch.Tensor, a: torch.Tensor) -> torch.Tensor:
+    # After the step with stride k, element t holds the composition of the
+    # recurrence over the steps [t, t + 2k): out[t] = x[t] + a[t] * out[t + 2k].
+    num_steps = x.size(0)
+    x = x.clone()
+    a = a.clone()
+    stride = 1
+    while stride < num_steps:
+        # The right-hand sides are computed before the assignments, so they
+        # read the values of the previous step.
+        x[:-stride] = x[:-stride] + a[:-stride] * x[stride:]
+        if 2 * stride < num_steps:
+            a[:-stride] = a[:-stride] * a[stride:]
+        stride *= 2
+    return x
+
+
+_jit_recurrence: Optional[Callable] = None
+
+
+def _reverse_recurrence_jit(x: torch.Tensor, a: torch.Tensor) -> torch.Tensor:
+    global _jit_recurrence
+    if _jit_recurrence is None:
+        # Compiled on first use so that importing doesn't pay for it.
+        _jit_recurrence = torch.jit.script(_reverse_recurrence_loop)
+    return _jit_recurrence(x, a)
+
+
+_RECURRENCES: Dict[
+    str, Callable[[torch.Tensor, torch.Tensor], torch.Tensor]
+] = {
+    "loop": _reverse_recurrence_loop,
+    "scan": _reverse_recurrence_scan,
+    "jit": _reverse_recurrence_jit,
+}
+
+
+def reverse_discounted_cumsum(
+    x: torch.Tensor, discounts: torch.Tensor, method: str = "scan"
+) -> torch.Tensor:
+    r"""Returns :py:`out` with :py:`out[t] = x[t] + discounts[t] * out[t + 1]`
+    along the first dimension, and :py:`out[T] = 0`.
+
+    :param x: Tensor of shape :py:`[T, ...]`.
+    :param discounts: Tensor broadcastable to the shape of :p:`x`.
+    :param method: One of :py:`RETURNS_METHODS`.
+    """
+    if method not in _RECURRENCES:
+        raise ValueError(
+            f"Unknown returns method {method}, expected one of "
+            f"{RETURNS_METHODS}"
+        )
+    if x.size(0) == 0:
+        return x.clone()
+    discounts = torch.broadcast_to(discounts, x.shape).to(x.dtype)
+    return _RECURRENCES[method](x, discounts)
+
+
+def compute_gae_returns(
+    rewards: torch.Tensor,
+    value_preds: torch.Tensor,
+    masks: torch.Tensor,
+    gamma: float,
+    tau: float,
+    method: str = "scan",
+) -> torch.Tensor:
+    r"""Returns the GAE returns (advantages plus values) of the :py:`T` steps
+    of a rollout.
+
+    :param rewards: The rewards of the steps, :py:`[T, ...]`.
+    :param value_preds: The values of the steps followed by the value of the
+        step after the rollout, :py:`[T + 1, ...]`.
+    :param masks: False for the steps that start an episode, :py:`[T + 1, ...]`.
+    :param gamma: The discount factor.
+    :param tau: The GAE :math:`\lambda`.
+    :param method: One of :py:`RETURNS_METHODS`.
+    """
+    num_steps = rewards.size(0)
+    next_masks = masks[1 : num_steps + 1].to(rewards.dtype)
+    deltas = (
+        rewards
+        + gamma * value_preds[1 : num_steps + 1] * next_masks
+        - value_preds[:num_steps]
+    )
+    gae = reverse_discounted_cumsum(deltas, (gamma * tau) * next_masks, method)
+    return gae + value_preds[:num_steps]
+
+
+def compute_discounted_returns(
+    rewards: torch.Tensor,
+    next_value: torch.Tensor,
+    masks: torch.Tensor,
+    gamma: float,
+    method: str = "scan",
+) -> torch.Tensor:
+    r"""Returns the discounted returns of the :py:`T` steps of a rollout,
+    bootstrapped with the value of the step after the rollout.
+
+    :param rewards: The rewards of the steps, :py:`[T, ...]`.
+    :param next_value: The value of the step after the rollout.
+    :param masks: False for the steps that start an episode, :py:`[T + 1, ...]`.
+    :param gamma: The discount factor.
+    :param method: One of :py:`RETURNS_METHODS`.
+    """
+    num_steps = rewards.size(0)
+    discounts = gamma * masks[1 : num_steps + 1].to(rewards.dtype)
+    x = rewards.clone()
+    if num_steps > 0:
+        # Fold the bootstrap value in the last step.
+        x[-1] += discounts[-1] * next_value
+    return reverse_discounted_cumsum(x, discounts, method)
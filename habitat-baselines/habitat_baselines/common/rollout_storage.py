@@ -5,12 +5,16 @@
 # LICENSE file in the root directory of this source tree.
 
 import warnings
-from typing import Any, Dict, Iterator, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import torch
 
 from habitat_baselines.common.baseline_registry import baseline_registry
+from habitat_baselines.common.returns import (
+    compute_discounted_returns,
+    compute_gae_returns,
+)
 from habitat_baselines.common.storage import Storage
 from habitat_baselines.common.tensor_dict import DictTree, TensorDict
 from habitat_baselines.rl.models.rnn_state_encoder import (
@@ -33,6 +37,8 @@ class RolloutStorage(Storage):
         action_space,
         actor_critic,
         is_double_buffered: bool = False,
+        returns_method: str = "scan",
+        use_minibatch_views: bool = False,
     ):
         action_shape, discrete_actions = get_action_space_info(action_space)
 
@@ -93,6 +99,18 @@ class RolloutStorage(Storage):
 
         self.num_steps = numsteps
         self.current_rollout_step_idxs = [0 for _ in range(self._nbuffers)]
+        # The step of each env when the envs are stepped on their own, see
+        # `insert_at_envs`.
+        self.current_env_step_idxs = torch.zeros(num_envs, dtype=torch.long)
+        # How the returns are computed, see `habitat_baselines.common.returns`.
+        self.returns_method = returns_method
+        # If the mini batches are gathered once per update and then reused
+        # by every epoch, see `data_generator`.
+        self.use_minibatch_views = use_minibatch_views
+        self._minibatches: Optional[List[TensorDict]] = None
+        self._minibatches_key: Optional[Tuple] = None
+        # Bumped when the data of the update changes, see `_new_update`.
+        self._update_generation = 0
 
         # The default device to torch is the CPU, so everything is on the CPU.
         self.device = torch.device("cpu")
@@ -125,6 +143,45 @@ class RolloutStorage(Storage):
         if not self.is_double_buffered:
             assert buffer_index == 0
 
+        next_step, current_step = self._split_steps(
+            next_observations,
+            next_recurrent_hidden_states,
+            actions,
+            action_log_probs,
+            value_preds,
+            rewards,
+            next_masks,
+        )
+
+        env_slice = slice(
+            int(buffer_index * self._num_envs / self._nbuffers),
+            int((buffer_index + 1) * self._num_envs / self._nbuffers),
+        )
+
+        if len(next_step) > 0:
+            self.buffers.set(
+                (self.current_rollout_step_idxs[buffer_index] + 1, env_slice),
+                next_step,
+                strict=False,
+            )
+
+        if len(current_step) > 0:
+            self.buffers.set(
+                (self.current_rollout_step_idxs[buffer_index], env_slice),
+                current_step,
+                strict=False,
+            )
+
+    @staticmethod
+    def _split_steps(
+        next_observations,
+        next_recurrent_hidden_states,
+        actions,
+        action_log_probs,
+        value_preds,
+        rewards,
+        next_masks,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         next_step = dict(
             observations=next_observations,
             recurrent_hidden_states=next_recurrent_hidden_states,
@@ -141,68 +198,114 @@ class RolloutStorage(Storage):
 
         next_step = {k: v for k, v in next_step.items() if v is not None}
         current_step = {k: v for k, v in current_step.items() if v is not None}
+        return next_step, current_step
 
-        env_slice = slice(
-            int(buffer_index * self._num_envs / self._nbuffers),
-            int((buffer_index + 1) * self._num_envs / self._nbuffers),
+    def advance_rollout(self, buffer_index: int = 0):
+        self.current_rollout_step_idxs[buffer_index] += 1
+
+    def _env_steps_index(
+        self, env_indices: torch.Tensor, offset: int = 0
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        return (
+            (self.current_env_step_idxs[env_indices] + offset).to(self.device),
+            env_indices.to(self.device),
+        )
+
+    def get_current_env_steps(self, env_indices: torch.Tensor) -> TensorDict:
+        r"""Returns the current step of each env of :p:`env_indices`, when
+        the envs are stepped on their own, see :ref:`insert_at_envs`.
+        """
+        return self.buffers[self._env_steps_index(env_indices)]
+
+    @g_timer.avg_time("rollout_storage.insert", level=1)
+    def insert_at_envs(
+        self,
+        env_indices: torch.Tensor,
+        next_observations=None,
+        next_recurrent_hidden_states=None,
+        actions=None,
+        action_log_probs=None,
+        value_preds=None,
+        rewards=None,
+        next_masks=None,
+        **kwargs,
+    ):
+        r"""Same as :ref:`insert`, but for the rows of the envs of
+        :p:`env_indices` only, each at its own step. This lets the envs
+        that are done stepping go on without the others. Each env is
+        advanced with :ref:`advance_envs`, and :ref:`sync_env_steps` ends
+        the rollout once all the envs are at the same step.
+        """
+        assert not self.is_double_buffered
+
+        next_step, current_step = self._split_steps(
+            next_observations,
+            next_recurrent_hidden_states,
+            actions,
+            action_log_probs,
+            value_preds,
+            rewards,
+            next_masks,
         )
 
         if len(next_step) > 0:
             self.buffers.set(
-                (self.current_rollout_step_idxs[buffer_index] + 1, env_slice),
-                next_step,
-                strict=False,
+                self._env_steps_index(env_indices, 1), next_step, strict=False
             )
 
         if len(current_step) > 0:
             self.buffers.set(
-                (self.current_rollout_step_idxs[buffer_index], env_slice),
-                current_step,
-                strict=False,
+                self._env_steps_index(env_indices), current_step, strict=False
             )
 
-    def advance_rollout(self, buffer_index: int = 0):
-        self.current_rollout_step_idxs[buffer_index] += 1
+    def advance_envs(self, env_indices: torch.Tensor):
+        self.current_env_step_idxs[env_indices] += 1
+
+    def sync_env_steps(self):
+        r"""Ends a rollout where the envs were stepped on their own, see
+        :ref:`insert_at_envs`.
+        """
+        step = int(self.current_env_step_idxs[0])
+        assert bool(
+            (self.current_env_step_idxs == step).all()
+        ), "All the envs must be at the same step"
+        self.current_rollout_step_idxs = [
+            step for _ in self.current_rollout_step_idxs
+        ]
 
     def after_update(self):
+        self._new_update()
         self.buffers[0] = self.buffers[self.current_rollout_step_idx]
 
         self.current_rollout_step_idxs = [
             0 for _ in self.current_rollout_step_idxs
         ]
+        self.current_env_step_idxs.zero_()
 
     @g_timer.avg_time("rollout_storage.compute_returns", level=1)
     def compute_returns(self, next_value, use_gae, gamma, tau):
+        self._new_update()
+        num_steps = self.current_rollout_step_idx
         if use_gae:
             assert isinstance(self.buffers["value_preds"], torch.Tensor)
-            self.buffers["value_preds"][
-                self.current_rollout_step_idx
-            ] = next_value
-            gae = 0.0
-            for step in reversed(range(self.current_rollout_step_idx)):
-                delta = (
-                    self.buffers["rewards"][step]
-                    + gamma
-                    * self.buffers["value_preds"][step + 1]
-                    * self.buffers["masks"][step + 1]
-                    - self.buffers["value_preds"][step]
-                )
-                gae = (
-                    delta + gamma * tau * gae * self.buffers["masks"][step + 1]
-                )
-                self.buffers["returns"][step] = (  # type: ignore
-                    gae + self.buffers["value_preds"][step]  # type: ignore
-                )
-
+            self.buffers["value_preds"][num_steps] = next_value
+            self.buffers["returns"][:num_steps] = compute_gae_returns(
+                self.buffers["rewards"][:num_steps],
+                self.buffers["value_preds"][: num_steps + 1],
+                self.buffers["masks"][: num_steps + 1],
+                gamma,
+                tau,
+                self.returns_method,
+            )
         else:
-            self.buffers["returns"][self.current_rollout_step_idx] = next_value
-            for step in reversed(range(self.current_rollout_step_idx)):
-                self.buffers["returns"][step] = (
-                    gamma
-                    * self.buffers["returns"][step + 1]
-                    * self.buffers["masks"][step + 1]
-                    + self.buffers["rewards"][step]
-                )
+            self.buffers["returns"][num_steps] = next_value
+            self.buffers["returns"][:num_steps] = compute_discounted_returns(
+                self.buffers["rewards"][:num_steps],
+                next_value,
+                self.buffers["masks"][: num_steps + 1],
+                gamma,
+                self.returns_method,
+            )
 
     def data_generator(
         self,
@@ -227,34 +330,90 @@ class RolloutStorage(Storage):
                 )
             )
 
-        dones_cpu = (
+        if self.use_minibatch_views:
+            minibatches = self._get_minibatches(advantages, num_mini_batch)
+            # The environments of each mini batch are drawn once per update,
+            # only the order of the mini batches changes between epochs.
+            for i in torch.randperm(len(minibatches)).tolist():
+                yield minibatches[i].to_tree()
+            return
+
+        dones_cpu = self._get_dones_cpu()
+        for inds in torch.randperm(num_environments).chunk(num_mini_batch):
+            yield self._gather_minibatch(advantages, inds, dones_cpu).to_tree()
+
+    def _get_dones_cpu(self) -> np.ndarray:
+        return (
             torch.logical_not(self.buffers["masks"])
             .cpu()
             .view(-1, self._num_envs)
             .numpy()
         )
-        for inds in torch.randperm(num_environments).chunk(num_mini_batch):
-            curr_slice = (slice(0, self.current_rollout_step_idx), inds)
-
-            batch = self.buffers[curr_slice]
-            if advantages is not None:
-                batch["advantages"] = advantages[curr_slice]
-            batch["recurrent_hidden_states"] = batch[
-                "recurrent_hidden_states"
-            ][0:1]
-
-            batch.map_in_place(lambda v: v.flatten(0, 1))
-
-            batch["rnn_build_seq_info"] = build_rnn_build_seq_info(
-                device=self.device,
-                build_fn_result=build_pack_info_from_dones(
-                    dones_cpu[
-                        0 : self.current_rollout_step_idx, inds.numpy()
-                    ].reshape(-1, len(inds)),
-                ),
-            )
 
-            yield batch.to_tree()
+    def _gather_minibatch(
+        self,
+        advantages: Optional[torch.Tensor],
+        inds: torch.Tensor,
+        dones_cpu: np.ndarray,
+    ) -> TensorDict:
+        curr_slice = (slice(0, self.current_rollout_step_idx), inds)
+
+        batch = self.buffers[curr_slice]
+        if advantages is not None:
+            batch["advantages"] = advantages[curr_slice]
+        # Only the first hidden state is used. Indexing it again instead of
+        # slicing the batch lets the copy of the other steps be freed.
+        batch["recurrent_hidden_states"] = self.buffers[
+            "recurrent_hidden_states"
+        ][0:1, inds]
+
+        batch.map_in_place(lambda v: v.flatten(0, 1))
+
+        batch["rnn_build_seq_info"] = build_rnn_build_seq_info(
+            device=self.device,
+            build_fn_result=build_pack_info_from_dones(
+                dones_cpu[
+                    0 : self.current_rollout_step_idx, inds.numpy()
+                ].reshape(-1, len(inds)),
+            ),
+        )
+        return batch
+
+    def _get_minibatches(
+        self, advantages: Optional[torch.Tensor], num_mini_batch: int
+    ) -> List[TensorDict]:
+        r"""Returns the mini batches of the current update, gathered on the
+        first call. Indexing the buffers with the environments of a mini
+        batch copies them into contiguous tensors, so the flattened tensors
+        are views and the epochs after the first don't copy anything. The
+        packing of the sequences of each mini batch is also only built once.
+
+        :p:`advantages` must be the same for all the calls of an update,
+        which ends with :ref:`compute_returns` or :ref:`after_update`.
+        """
+        key = (
+            self._update_generation,
+            num_mini_batch,
+            self.current_rollout_step_idx,
+        )
+        if self._minibatches is None or self._minibatches_key != key:
+            dones_cpu = self._get_dones_cpu()
+            num_environments = self.buffers["returns"].size(1)
+            self._minibatches = [
+                self._gather_minibatch(advantages, inds, dones_cpu)
+                for inds in torch.randperm(num_environments).chunk(
+                    num_mini_batch
+                )
+            ]
+            self._minibatches_key = key
+
+        return self._minibatches
+
+    def _new_update(self) -> None:
+        # The mini batches of the previous update are stale.
+        self._update_generation += 1
+        self._minibatches = None
+        self._minibatches_key = None
 
     def __getstate__(self) -> Dict[str, Any]:
         return self.__dict__
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import random
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from habitat import VectorEnv
+
+# (scene_id, episode_id) of an episode.
+EpisodeKey = Tuple[str, str]
+
+
+class SceneAffinityScheduler:
+    r"""Chooses the next episode of each env of a :ref:`VectorEnv`, preferring
+    episodes of the scene the env already has loaded, since the simulators
+    only reload the scene when it changes.
+
+    Scene diversity is kept with two constraints:
+
+    - an env switches to another scene after
+      :p:`max_scene_repeat_episodes` consecutive episodes of the same scene,
+    - at most :p:`max_envs_per_scene` envs run episodes of the same scene at
+      the same time, so the envs run at least
+      :py:`num_envs / max_envs_per_scene` different scenes (if the dataset
+      has that many).
+
+    When an env switches scene, it takes the allowed scene from which the
+    fewest episodes were scheduled so far, so all the scenes are covered
+    evenly. The episodes of a scene are scheduled in a random order and the
+    order is reshuffled after each pass over the scene.
+
+    The episodes are identified by their scene id and episode id, since the
+    envs each have their own episodes, in their own order (the episode
+    iterator of each env shuffles them). An env only runs scenes it has
+    episodes of.
+
+    :param env_episodes: The :py:`(scene_id, episode_id)` of each episode of
+        each env, in the order of the episodes of the env.
+    :param max_scene_repeat_episodes: Number of consecutive episodes of the
+        same scene an env runs before switching scene.
+    :param max_envs_per_scene: Maximum number of envs running the same scene
+        at the same time. Ignored when there are not enough scenes to
+        satisfy it.
+    :param seed: Seed of the episode order and of the scene ties.
+    """
+
+    def __init__(
+        self,
+        env_episodes: Sequence[Sequence[EpisodeKey]],
+        max_scene_repeat_episodes: int = 50,
+        max_envs_per_scene: int = 1,
+        seed: Optional[int] = None,
+    ) -> None:
+        assert all(
+            len(episodes) > 0 for episodes in env_episodes
+        ), "No episodes to schedule"
+        assert max_scene_repeat_episodes >= 1
+        assert max_envs_per_scene >= 1
+
+        self._rng = random.Random(seed)
+        self._max_scene_repeat_episodes = max_scene_repeat_episodes
+        self._max_envs_per_scene = max_envs_per_scene
+
+        # Index of each episode in the episodes of each env.
+        self._env_episode_indices: List[Dict[EpisodeKey, int]] = [
+            {key: i for i, key in enumerate(episodes)}
+            for episodes in env_episodes
+        ]
+        self._env_available_scenes = [
+            {scene_id for scene_id, _ in episodes} for episodes in env_episodes
+        ]
+        self._scene_episodes: Dict[str, List[EpisodeKey]] = defaultdict(list)
+        all_episodes = {ep for episodes in env_episodes for ep in episodes}
+        for key in sorted(all_episodes):
+            self._scene_episodes[key[0]].append(key)
+        self._scenes = sorted(self._scene_episodes.keys())
+        # Episodes of each scene left to schedule in the current pass.
+        self._remaining: Dict[str, List[EpisodeKey]] = {
+            scene_id: [] for scene_id in self._scenes
+        }
+        self._num_scheduled = dict.fromkeys(self._scenes, 0)
+
+        num_envs = len(env_episodes)
+        self._env_scenes: List[Optional[str]] = [None] * num_envs
+        self._env_repeats = [0] * num_envs
+        self._scene_num_envs: Dict[str, int] = defaultdict(int)
+
+        self.num_scene_switches = 0
+
+    @property
+    def num_envs(self) -> int:
+        return len(self._env_scenes)
+
+    def set_loaded_scene(self, env_index: int, scene_id: str) -> None:
+        r"""Tells the scheduler which scene env :p:`env_index` has loaded,
+        for example after it was created.
+        """
+        self._set_env_scene(env_index, scene_id)
+        self._env_repeats[env_index] = 0
+
+    def _set_env_scene(self, env_index: int, scene_id: Optional[str]) -> None:
+        prev_scene_id = self._env_scenes[env_index]
+        if prev_scene_id is not None:
+            self._scene_num_envs[prev_scene_id] -= 1
+        if scene_id is not None:
+            self._scene_num_envs[scene_id] += 1
+        self._env_scenes[env_index] = scene_id
+
+    def _choose_scene(self, env_index: int) -> str:
+        current_scene = self._env_scenes[env_index]
+        scenes = [
+            scene_id
+            for scene_id in self._scenes
+            if scene_id in self._env_available_scenes[env_index]
+        ]
+
+        def num_other_envs(scene_id: str) -> int:
+            return self._scene_num_envs[scene_id] - int(
+                scene_id == current_scene
+            )
+
+        if (
+            current_scene in self._env_available_scenes[env_index]
+            and self._env_repeats[env_index] < self._max_scene_repeat_episodes
+            and num_other_envs(current_scene) < self._max_envs_per_scene
+        ):
+            return current_scene
+
+        candidates = [
+            scene_id
+            for scene_id in scenes
+            if scene_id != current_scene
+            and num_other_envs(scene_id) < self._max_envs_per_scene
+        ]
+        if len(candidates) == 0:
+            # Not enough scenes for the constraint, use the least shared
+            # scene.
+            min_envs = min(num_other_envs(s) for s in scenes)
+            candidates = [s for s in scenes if num_other_envs(s) == min_envs]
+
+        min_scheduled = min(self._num_scheduled[s] for s in candidates)
+        return self._rng.choice(
+            [s for s in candidates if self._num_scheduled[s] == min_scheduled]
+        )
+
+    def next_episode(self, env_index: int) -> int:
+        r"""Returns the index of the next episode of env :p:`env_index` in
+        the episodes of that env and records that the env now runs the scene
+        of that episode.
+        """
+        scene_id = self._choose_scene(env_index)
+        if scene_id == self._env_scenes[env_index]:
+            self._env_repeats[env_index] += 1
+        else:
+            if self._env_scenes[env_index] is not None:
+                self.num_scene_switches += 1
+            self._set_env_scene(env_index, scene_id)
+            self._env_repeats[env_index] = 1
+
+        self._num_scheduled[scene_id] += 1
+        episode_indices = self._env_episode_indices[env_index]
+        remaining = self._remaining[scene_id]
+        if len(remaining) == 0:
+            remaining.extend(self._scene_episodes[scene_id])
+            self._rng.shuffle(remaining)
+        # The last remaining episode the env has, the envs sharing a scene
+        # may only have some of its episodes.
+        for i in range(len(remaining) - 1, -1, -1):
+            if remaining[i] in episode_indices:
+                return episode_indices[remaining.pop(i)]
+        return episode_indices[
+            self._rng.choice(
+                [
+                    key
+                    for key in self._scene_episodes[scene_id]
+                    if key in episode_indices
+                ]
+            )
+        ]
+
+    def schedule(self, envs: VectorEnv, env_indices: Sequence[int]) -> None:
+        r"""Sets the episode of the next reset of each env in
+        :p:`env_indices`.
+        """
+        for env_index in env_indices:
+            envs.call_at(
+                env_index,
+                "set_next_episode_by_index",
+                {"episode_index": self.next_episode(env_index)},
+            )
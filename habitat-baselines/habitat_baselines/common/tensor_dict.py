@@ -16,6 +16,7 @@ from typing import (
     List,
     Optional,
     Protocol,
+    Sequence,
     Tuple,
     Type,
     TypeVar,
@@ -54,14 +55,178 @@ _MapFuncType = Callable[[T], T]
 _ApplyFuncType = Callable[[T], None]
 
 
+class TreeSpec:
+    r"""The structure (the nested keys) of a DictTree, computed once per
+    structure so that flattening and unflattening a tree are a single loop
+    over its leaves instead of a recursive walk.
+
+    :property keys: The key of each leaf, in the order of
+        :py:ref:`_DictTreeBase.flatten`.
+    """
+
+    __slots__ = (
+        "keys",
+        "_root_keys",
+        "_ops",
+        "_node_specs",
+        "_descendant_specs",
+        "_leaf_index",
+    )
+
+    def __init__(
+        self,
+        keys: Tuple[Tuple[str, ...], ...],
+        ops: Tuple[Tuple[int, str, int], ...],
+        node_specs: List[Optional["TreeSpec"]],
+    ) -> None:
+        self.keys = keys
+        # Each op adds key op[1] to node op[0]. The value is a leaf if
+        # op[2] < 0, otherwise the new node op[2]. Nodes are numbered in
+        # depth-first order, the root is node 0.
+        self._ops = ops
+        self._root_keys: Optional[Tuple[str, ...]] = (
+            tuple(k[0] for k in keys) if len(node_specs) == 1 else None
+        )
+        node_specs[0] = self
+        self._node_specs = tuple(node_specs)
+        self._descendant_specs = self._node_specs[1:]
+        self._leaf_index: Optional[Dict[Tuple[str, ...], int]] = None
+
+    @classmethod
+    def from_tree(
+        cls, tree: Dict[str, Any], node_type: Optional[Type[dict]] = None
+    ) -> "TreeSpec":
+        r"""The structure of :p:`tree`, whose subtrees are the values of
+        type :p:`node_type` (:ref:`_DictTreeBase` by default).
+        """
+        if node_type is None:
+            node_type = _DictTreeBase
+        keys: List[Tuple[str, ...]] = []
+        ops: List[Tuple[int, str, int]] = []
+        node_specs: List[Optional[TreeSpec]] = [None]
+        for k, v in dict.items(tree):
+            if isinstance(v, node_type):
+                child = cls.from_tree(v, node_type)
+                offset = len(node_specs)
+                ops.append((0, k, offset))
+                ops.extend(
+                    (p + offset, child_k, c + offset if c >= 0 else -1)
+                    for p, child_k, c in child._ops
+                )
+                keys.extend((k, *child_keys) for child_keys in child.keys)
+                node_specs.extend(child._node_specs)
+            else:
+                ops.append((0, k, -1))
+                keys.append((k,))
+
+        return cls(tuple(keys), tuple(ops), node_specs)
+
+    @property
+    def leaf_index(self) -> Dict[Tuple[str, ...], int]:
+        r"""The index of each leaf key in :ref:`keys`."""
+        if self._leaf_index is None:
+            self._leaf_index = {k: i for i, k in enumerate(self.keys)}
+        return self._leaf_index
+
+    def _nodes(self, tree: Dict[str, Any]) -> List[Dict[str, Any]]:
+        nodes = [tree]
+        for p, k, c in self._ops:
+            if c >= 0:
+                nodes.append(dict.__getitem__(nodes[p], k))
+        return nodes
+
+    def flatten(self, tree: Dict[str, Any]) -> List[Any]:
+        r"""The leaves of :p:`tree`, which must have this structure."""
+        if self._root_keys is not None:
+            return list(dict.values(tree))
+
+        nodes = [tree]
+        leaves = []
+        for p, k, c in self._ops:
+            v = dict.__getitem__(nodes[p], k)
+            if c < 0:
+                leaves.append(v)
+            else:
+                nodes.append(v)
+        return leaves
+
+    def unflatten(
+        self, cls: Type[_DictTreeInst], leaves: Iterable[Any]
+    ) -> _DictTreeInst:
+        r"""Builds a tree of type :p:`cls` with this structure from its
+        :p:`leaves`.
+        """
+        to_instance = cls._to_instance
+        if self._root_keys is not None:
+            res = cls(zip(self._root_keys, map(to_instance, leaves)))
+            self._attach_nodes([res])
+            return res
+
+        leaves_it = iter(leaves)
+        nodes = [cls()]
+        for p, k, c in self._ops:
+            if c < 0:
+                dict.__setitem__(nodes[p], k, to_instance(next(leaves_it)))
+            else:
+                node = cls()
+                dict.__setitem__(nodes[p], k, node)
+                nodes.append(node)
+        self._attach_nodes(nodes)
+        return nodes[0]
+
+    def assign(self, tree: _DictTreeBase, leaves: Iterable[Any]) -> None:
+        r"""Replaces the leaves of :p:`tree`, which must have this structure,
+        with :p:`leaves`.
+        """
+        to_instance = tree._to_instance
+        if self._root_keys is not None:
+            dict.update(tree, zip(self._root_keys, map(to_instance, leaves)))
+            return
+
+        leaves_it = iter(leaves)
+        nodes: List[Dict[str, Any]] = [tree]
+        for p, k, c in self._ops:
+            if c < 0:
+                dict.__setitem__(nodes[p], k, to_instance(next(leaves_it)))
+            else:
+                nodes.append(dict.__getitem__(nodes[p], k))
+
+    def _attach_nodes(self, nodes: List[Any]) -> None:
+        # Caches the specs in the nodes of a tree with this structure, see
+        # `_DictTreeBase.treespec`.
+        for i, (node, node_spec) in enumerate(zip(nodes, self._node_specs)):
+            node._treespec = node_spec
+            node._treespec_nodes = tuple(
+                nodes[i + 1 : i + len(node_spec._node_specs)]
+            )
+
+
+# Specs of the structures given to `from_flattened`, with the order of the
+# leaves in the flattened tree.
+_FROM_FLATTENED_CACHE: Dict[
+    Tuple[Tuple[str, ...], ...], Tuple[TreeSpec, Optional[List[int]]]
+] = {}
+_FROM_FLATTENED_CACHE_SIZE = 256
+
+
 class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
     r"""Base class that represents a dictionary tree (DictTree).
 
     In a DictTree, all elements of the dict are either a leaf (of type T) or
     a subtree. This is setup for T's that are indexable, like a torch.Tensor
     or np.ndarray
+
+    The structure of a tree is cached in a :ref:`TreeSpec` (see
+    :ref:`treespec`), so the operations on all the leaves (:ref:`flatten`,
+    :ref:`map`, indexing, ...) don't need to walk the tree recursively as
+    long as the structure doesn't change.
     """
 
+    # Cached structure of the tree and the subtrees it was computed for. The
+    # cache is valid as long as these subtrees still have the same spec.
+    _treespec: Optional[TreeSpec] = None
+    _treespec_nodes: Tuple["_DictTreeBase", ...] = ()
+
     @classmethod
     def _to_instance(cls, v: Any) -> T:
         raise NotImplementedError()
@@ -89,6 +254,61 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
 
         return res
 
+    def treespec(self) -> TreeSpec:
+        r"""Returns the structure of the tree. It is only computed again when
+        the structure of the tree changed since the last call.
+        """
+        spec = self._treespec
+        if spec is not None:
+            for node, node_spec in zip(
+                self._treespec_nodes, spec._descendant_specs
+            ):
+                if node._treespec is not node_spec:
+                    break
+            else:
+                return spec
+
+        spec = TreeSpec.from_tree(self)
+        spec._attach_nodes(spec._nodes(self))
+        return spec
+
+    def _invalidate_treespec(self) -> None:
+        self._treespec = None
+
+    def __delitem__(self, key: str) -> None:
+        self._invalidate_treespec()
+        super().__delitem__(key)
+
+    def pop(self, *args: Any) -> Any:
+        self._invalidate_treespec()
+        return super().pop(*args)
+
+    def popitem(self) -> Tuple[str, Any]:
+        self._invalidate_treespec()
+        return super().popitem()
+
+    def clear(self) -> None:
+        self._invalidate_treespec()
+        super().clear()
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._invalidate_treespec()
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        self._invalidate_treespec()
+        return super().setdefault(key, default)
+
+    def __or__(self: _DictTreeInst, other: Any) -> _DictTreeInst:
+        res = type(self)(self)
+        res.update(other)
+        return res
+
+    def __ior__(self: _DictTreeInst, other: Any) -> _DictTreeInst:
+        # dict.__ior__ doesn't go through `update`.
+        self.update(other)
+        return self
+
     @classmethod
     def _from_flattened_helper(
         cls: Type[_DictTreeInst],
@@ -134,11 +354,17 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
         :param leaves: The leaves.
         """
         assert len(spec) == len(leaves)
-        sort_ordering = sorted(range(len(spec)), key=lambda i: spec[i])
-        spec = [spec[i] for i in sort_ordering]
-        leaves = [leaves[i] for i in sort_ordering]
-
-        return cls._from_flattened_helper(spec, leaves)
+        spec_key = tuple(spec)
+        cached = _FROM_FLATTENED_CACHE.get(spec_key)
+        if cached is None:
+            cached = _FROM_FLATTENED_CACHE[
+                spec_key
+            ] = _treespec_from_flattened(spec)
+
+        treespec, leaf_order = cached
+        if leaf_order is not None:
+            leaves = [leaves[i] for i in leaf_order]
+        return treespec.unflatten(cls, leaves)
 
     def flatten(self) -> Tuple[List[Tuple[str, ...]], List[T]]:
         r"""Returns a flattened representation of the tree.
@@ -152,11 +378,16 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
         :return: A tuple of lists where the first list is the key for each leaf and the second
         list is all the leaves.
         """
+        treespec = self.treespec()
+        return list(treespec.keys), treespec.flatten(self)
+
+    def _flatten_recursive(self) -> Tuple[List[Tuple[str, ...]], List[T]]:
+        r"""Same as :ref:`flatten`, without the cached :ref:`TreeSpec`."""
         spec = []
         tensors = []
         for k, v in self.items():
             if isinstance(v, _DictTreeBase):
-                for subk, subv in zip(*v.flatten()):
+                for subk, subv in zip(*v._flatten_recursive()):
                     spec.append((k, *subk))
                     tensors.append(subv)
             else:
@@ -183,7 +414,10 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
         if isinstance(index, str):
             return cast(Union[_DictTreeInst, T], super().__getitem__(index))
         else:
-            return type(self)((k, v[index]) for k, v in self.items())
+            treespec = self.treespec()
+            return treespec.unflatten(
+                type(self), [v[index] for v in treespec.flatten(self)]
+            )
 
     @overload
     def set(
@@ -212,33 +446,80 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
         if isinstance(index, str):
             if not isinstance(value, _DictTreeBase):
                 value = self._to_instance(value)
+                # The structure changes if the key is new (the default of
+                # get is then a tree) or if it replaces a subtree.
+                if self._treespec is not None and isinstance(
+                    dict.get(self, index, self), _DictTreeBase
+                ):
+                    self._invalidate_treespec()
+            else:
+                self._invalidate_treespec()
 
             super().__setitem__(index, value)
+        elif isinstance(value, _DictTreeBase):
+            # Fast path: match the leaves through the specs of the trees.
+            treespec = self.treespec()
+            value_treespec = value.treespec()
+            dst_leaves = treespec.flatten(self)
+            if value_treespec.keys == treespec.keys:
+                pairs = zip(dst_leaves, value_treespec.flatten(value))
+            elif strict:
+                self._set_recursive(index, value, strict)
+                return
+            else:
+                leaf_index = treespec.leaf_index
+                positions = [
+                    leaf_index[k]
+                    for k in value_treespec.keys
+                    if k in leaf_index
+                ]
+                if len(positions) != len(value_treespec.keys):
+                    self._set_recursive(index, value, strict)
+                    return
+                pairs = zip(
+                    [dst_leaves[i] for i in positions],
+                    value_treespec.flatten(value),
+                )
+
+            for dst, v in pairs:
+                dst[index] = self._to_instance(v)
         else:
             assert isinstance(value, dict)
-            if strict and (self.keys() != value.keys()):
-                raise KeyError(
-                    "Keys don't match: Dest={} Source={}".format(
-                        self.keys(), value.keys()
-                    )
+            self._set_recursive(index, value, strict)
+
+    def _set_recursive(
+        self,
+        index: TensorIndexType,
+        value: Union[_DictTreeBase[T], DictTree],
+        strict: bool = True,
+    ) -> None:
+        r"""Same as :ref:`set` with a tensor index, without the cached
+        :ref:`TreeSpec`.
+        """
+        assert isinstance(value, dict)
+        if strict and (self.keys() != value.keys()):
+            raise KeyError(
+                "Keys don't match: Dest={} Source={}".format(
+                    self.keys(), value.keys()
                 )
+            )
 
-            for k in self.keys():
-                if k not in value:
-                    if strict:
-                        raise KeyError(f"Key {k} not in new value dictionary")
-                    else:
-                        continue
+        for k in self.keys():
+            if k not in value:
+                if strict:
+                    raise KeyError(f"Key {k} not in new value dictionary")
+                else:
+                    continue
 
-                v = value[k]
-                dst = self[k]
+            v = value[k]
+            dst = self[k]
 
-                if isinstance(v, dict):
-                    assert isinstance(dst, _DictTreeBase)
-                    dst.set(index, v, strict=strict)
-                else:
-                    assert not isinstance(dst, _DictTreeBase)
-                    dst[index] = self._to_instance(v)
+            if isinstance(v, dict):
+                assert isinstance(dst, _DictTreeBase)
+                dst._set_recursive(index, v, strict=strict)
+            else:
+                assert not isinstance(dst, _DictTreeBase)
+                dst[index] = self._to_instance(v)
 
     def __setitem__(
         self,
@@ -288,6 +569,15 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
         src: Union[_DictTreeBase[T], DictTree],
         dst: Optional[_DictTreeInst] = None,
     ) -> _DictTreeInst:
+        if isinstance(src, _DictTreeBase) and (dst is None or dst is src):
+            treespec = src.treespec()
+            leaves = [func(v) for v in treespec.flatten(src)]
+            if dst is None:
+                return treespec.unflatten(cls, leaves)
+
+            treespec.assign(dst, leaves)
+            return dst
+
         return cls._map_apply_func(func, src, dst, needs_return=True)
 
     def map(self: _DictTreeInst, func: _MapFuncType) -> _DictTreeInst:
@@ -305,7 +595,8 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
         r"""Applies a function to all leaves where the function doesn't
         return a new value
         """
-        self._map_apply_func(func, self, dst_in=None, needs_return=False)
+        for v in self.treespec().flatten(self):
+            func(v)
 
     def slice_keys(
         self: _DictTreeInst, *keys: Union[str, Iterable[str]]
@@ -319,7 +610,8 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
         for _k in keys:
             for k in (_k,) if isinstance(_k, str) else _k:
                 assert k in self, f"Key {k} not in self"
-                res[k] = self[k]
+                # The values are already leaves or trees of this type.
+                dict.__setitem__(res, k, dict.__getitem__(self, k))
 
         return res
 
@@ -327,6 +619,48 @@ class _DictTreeBase(Dict[str, Union["_DictTreeBase[T]", T]]):
         return self.from_tree(copy.deepcopy(self.to_tree(), memo=_memo))
 
 
+def _leaf_index_tree(spec: Sequence[Tuple[str, ...]]) -> Dict[str, Any]:
+    r"""Returns the nested dicts with the structure of the tree
+    :py:ref:`_DictTreeBase.from_flattened` builds from :p:`spec` (the keys
+    in sorted order), with the index in :p:`spec` of each leaf as the
+    leaves.
+    """
+    tree: Dict[str, Any] = {}
+    for i in sorted(range(len(spec)), key=lambda i: spec[i]):
+        *node_keys, leaf_key = spec[i]
+        node = tree
+        for k in node_keys:
+            node = node.setdefault(k, {})
+            if not isinstance(node, dict):
+                raise RuntimeError(
+                    f"Key '{k}' already in the tree. Invalid spec."
+                )
+        if leaf_key in node:
+            raise RuntimeError(
+                f"Key '{leaf_key}' already in the tree. Invalid spec."
+            )
+        node[leaf_key] = i
+    return tree
+
+
+def _treespec_from_flattened(
+    spec: List[Tuple[str, ...]]
+) -> Tuple[TreeSpec, Optional[List[int]]]:
+    r"""Returns the structure of the tree built by
+    :py:ref:`_DictTreeBase.from_flattened` from :p:`spec` and the index in
+    :p:`spec` of each of its leaves (:py:`None` if they are in order).
+    """
+    if len(_FROM_FLATTENED_CACHE) >= _FROM_FLATTENED_CACHE_SIZE:
+        _FROM_FLATTENED_CACHE.clear()
+
+    index_tree = _leaf_index_tree(spec)
+    treespec = TreeSpec.from_tree(index_tree, node_type=dict)
+    leaf_order = treespec.flatten(index_tree)
+    if leaf_order == list(range(len(spec))):
+        return treespec, None
+    return treespec, leaf_order
+
+
 class TensorDict(_DictTreeBase[torch.Tensor]):
     r"""A dictionary of tensors that can be indexed like a tensor or like a dictionary.
 
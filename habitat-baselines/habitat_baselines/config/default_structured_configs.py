@@ -48,6 +48,19 @@ class EvalConfig(HabitatBaselinesBaseConfig):
         # available options are "disk" and "tensorboard"
         default_factory=list
     )
+    # Maximum number of frames waiting to be composed and encoded by the
+    # background video writer before the evaluation waits for it.
+    video_queue_size: int = 64
+    # The episodes are split into `num_shards` shards by a hash of their
+    # scene and episode ids, and this process evaluates the shard
+    # `shard_index` (see `habitat_baselines.common.eval_shards`).
+    num_shards: int = 1
+    shard_index: int = 0
+    # If not empty, the stats of each evaluated episode are appended to a
+    # record file of the shard in this directory. An interrupted evaluation
+    # resumes from its records and the last shard to complete merges the
+    # records of all the shards. Required with several shards.
+    records_dir: str = ""
     extra_sim_sensors: Dict[str, SimulatorSensorConfig] = field(
         default_factory=dict
     )
@@ -311,6 +324,23 @@ class PPOConfig(HabitatBaselinesBaseConfig):
     # policy inference time during rollout generation
     # Not that this does not change the memory requirements
     use_double_buffered_sampler: bool = False
+    # Step each environment again as soon as it is done stepping instead of
+    # waiting for the slowest environment at every rollout step. The
+    # actions of the environments that are done at the same time are
+    # computed together. Can't be used with use_double_buffered_sampler or
+    # the batch renderer.
+    use_partial_env_batches: bool = False
+    # Number of sets of buffers the observations are batched into in turn.
+    # With 2 or more, the observations of the next step are stacked while
+    # the previous batch is uploaded to the GPU and used by the policy.
+    obs_batching_slots: int = 2
+    # How the returns are computed over the time steps of the rollout:
+    # "scan" (vectorized parallel scan), "loop" (Python loop) or "jit"
+    # (TorchScript compiled loop), see habitat_baselines.common.returns.
+    returns_method: str = "scan"
+    # Gather the mini batches once per update instead of once per epoch.
+    # The environments of each mini batch are then the same in every epoch.
+    use_minibatch_views: bool = False
 
 
 @dataclass
@@ -406,6 +436,25 @@ class ProfilingConfig(HabitatBaselinesBaseConfig):
     num_steps_to_capture: int = -1
 
 
+@dataclass
+class SceneSchedulerConfig(HabitatBaselinesBaseConfig):
+    """
+    Central scheduler of the training episodes (see
+    `habitat_baselines.common.scene_scheduler.SceneAffinityScheduler`).
+    When enabled, every environment gets the episodes of all the scenes and
+    the trainer chooses the next episode of each environment, preferring the
+    scene it already has loaded to avoid reloading scenes.
+    `max_scene_repeat_episodes` is the number of consecutive episodes of a
+    scene an environment runs before switching scene and
+    `max_envs_per_scene` the number of environments that can run the same
+    scene at the same time.
+    """
+
+    enabled: bool = False
+    max_scene_repeat_episodes: int = 50
+    max_envs_per_scene: int = 1
+
+
 @dataclass
 class VectorEnvFactoryConfig(HabitatBaselinesBaseConfig):
     """
@@ -470,6 +519,12 @@ class HabitatBaselinesConfig(HabitatBaselinesBaseConfig):
     verbose: bool = True
     # Creates the vectorized environment.
     vector_env_factory: VectorEnvFactoryConfig = VectorEnvFactoryConfig()
+    # Whether the vectorized environment workers write observations into a
+    # shared memory slab instead of pickling them through a pipe.
+    vector_env_shared_memory_obs: bool = False
+    # Whether the trainer chooses the episodes of the environments to reduce
+    # scene reloads. Not used in evaluation.
+    scene_scheduler: SceneSchedulerConfig = SceneSchedulerConfig()
     evaluator: EvaluatorConfig = EvaluatorConfig()
     eval_keys_to_include_in_name: List[str] = field(default_factory=list)
     # For our use case, the CPU side things are mainly memory copies
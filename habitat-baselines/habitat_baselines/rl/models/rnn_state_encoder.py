@@ -4,7 +4,8 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
 
 import numpy as np
 import torch
@@ -30,8 +31,87 @@ def _np_invert_permutation(permutation: np.ndarray) -> np.ndarray:
     return np.argsort(permutation.ravel()).reshape(permutation.shape)
 
 
-# This is some pretty wild code. I recommend you just trust
-# the unit test on it and leave it be.
+class _PackInfoCache:
+    r"""Least recently used memo of the packing plans built by
+    :ref:`build_pack_info_from_dones` and
+    :ref:`build_pack_info_from_episode_ids`, keyed on the layout of the
+    arrays they are built from. The same layouts come back for many mini
+    batches and PPO epochs, and always when no episode ends within the
+    rollout. The tensors :ref:`build_rnn_build_seq_info` creates from a
+    cached plan are also cached, by device.
+
+    The cached plans and tensors are shared by all the callers and must not
+    be modified.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self._max_size = max_size
+        self._plans: "OrderedDict[Tuple, Dict[str, np.ndarray]]" = (
+            OrderedDict()
+        )
+        self._seq_infos: Dict[Tuple, Dict[str, TensorDict]] = {}
+        # The key of each cached plan, by id of the plan.
+        self._keys: Dict[int, Tuple] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def get_plan(
+        self, key: Tuple, build_fn: Callable[[], Dict[str, np.ndarray]]
+    ) -> Dict[str, np.ndarray]:
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+        self.misses += 1
+        plan = build_fn()
+        self._plans[key] = plan
+        self._seq_infos[key] = {}
+        self._keys[id(plan)] = key
+        while len(self._plans) > self._max_size:
+            evicted_key, evicted_plan = self._plans.popitem(last=False)
+            del self._seq_infos[evicted_key]
+            del self._keys[id(evicted_plan)]
+        return plan
+
+    def _key_of(self, plan: Dict[str, np.ndarray]) -> Optional[Tuple]:
+        key = self._keys.get(id(plan))
+        if key is None or self._plans.get(key) is not plan:
+            return None
+        return key
+
+    def get_seq_info(
+        self, plan: Dict[str, np.ndarray], device: torch.device
+    ) -> Optional[TensorDict]:
+        key = self._key_of(plan)
+        if key is None:
+            return None
+        return self._seq_infos[key].get(str(device))
+
+    def put_seq_info(
+        self,
+        plan: Dict[str, np.ndarray],
+        device: torch.device,
+        seq_info: TensorDict,
+    ) -> None:
+        key = self._key_of(plan)
+        if key is not None:
+            self._seq_infos[key][str(device)] = seq_info
+
+    def clear(self) -> None:
+        self._plans.clear()
+        self._seq_infos.clear()
+        self._keys.clear()
+
+
+_pack_info_cache = _PackInfoCache()
+
+
 def build_pack_info_from_episode_ids(
     episode_ids: np.ndarray,
     environment_ids: np.ndarray,
@@ -52,7 +132,33 @@ def build_pack_info_from_episode_ids(
     This method will generate the new index ordering such that you can
     construct the data for a PackedSequence from a (T*N, ...) tensor
     via x.index_select(0, select_inds)
+
+    The result is memoized and must not be modified.
     """
+    key = (
+        "episode_ids",
+        episode_ids.dtype.str,
+        episode_ids.tobytes(),
+        environment_ids.dtype.str,
+        environment_ids.tobytes(),
+        step_ids.dtype.str,
+        step_ids.tobytes(),
+    )
+    return _pack_info_cache.get_plan(
+        key,
+        lambda: _build_pack_info_from_episode_ids(
+            episode_ids, environment_ids, step_ids
+        ),
+    )
+
+
+# This is some pretty wild code. I recommend you just trust
+# the unit test on it and leave it be.
+def _build_pack_info_from_episode_ids(
+    episode_ids: np.ndarray,
+    environment_ids: np.ndarray,
+    step_ids: np.ndarray,
+) -> Dict[str, np.ndarray]:
     # make episode_ids globally unique. This will make things easier
     episode_ids = episode_ids * (environment_ids.max() + 1) + environment_ids
     unsorted_episode_ids = episode_ids
@@ -153,6 +259,22 @@ def build_pack_info_from_episode_ids(
 
 
 def build_pack_info_from_dones(dones: np.ndarray) -> Dict[str, np.ndarray]:
+    r"""Create the indexing info needed to make the PackedSequence from the
+    (T, N) dones of a rollout, see :ref:`build_pack_info_from_episode_ids`.
+
+    The result is memoized on the layout of the dones and must not be
+    modified. It also has a :py:`no_episode_boundaries` flag, set when no
+    episode starts after the first step. :ref:`RNNStateEncoder` then runs the
+    RNN on the (T, N) input directly instead of packing it.
+    """
+    dones = np.asarray(dones, dtype=bool)
+    key = ("dones", dones.shape, np.packbits(dones).tobytes())
+    return _pack_info_cache.get_plan(
+        key, lambda: _build_pack_info_from_dones(dones)
+    )
+
+
+def _build_pack_info_from_dones(dones: np.ndarray) -> Dict[str, np.ndarray]:
     T, N = dones.shape
     episode_ids = np.cumsum(dones, 0)
     environment_ids = np.arange(N).reshape(1, N).repeat(T, 0)
@@ -161,17 +283,25 @@ def build_pack_info_from_dones(dones: np.ndarray) -> Dict[str, np.ndarray]:
     # so we don't do it.
     step_ids = np.arange(T).reshape(T, 1).repeat(N, 1)
 
-    return build_pack_info_from_episode_ids(
+    pack_info = _build_pack_info_from_episode_ids(
         episode_ids.reshape(-1),
         environment_ids.reshape(-1),
         step_ids.reshape(-1),
     )
+    pack_info["no_episode_boundaries"] = np.array(not dones[1:].any())
+    return pack_info
 
 
 def build_rnn_build_seq_info(
     device: torch.device, build_fn_result: Dict[str, np.ndarray]
 ) -> TensorDict:
-    r"""Creates the dict with the build pack seq results."""
+    r"""Creates the dict with the build pack seq results. The dict is
+    memoized with the results and must not be modified.
+    """
+    rnn_build_seq_info = _pack_info_cache.get_seq_info(build_fn_result, device)
+    if rnn_build_seq_info is not None:
+        return rnn_build_seq_info
+
     rnn_build_seq_info = TensorDict()
     for k, v_n in build_fn_result.items():
         v = torch.from_numpy(v_n)
@@ -181,6 +311,7 @@ def build_rnn_build_seq_info(
         rnn_build_seq_info[f"cpu_{k}"] = v
         rnn_build_seq_info[k] = v.to(device=device)
 
+    _pack_info_cache.put_seq_info(build_fn_result, device, rnn_build_seq_info)
     return rnn_build_seq_info
 
 
@@ -331,6 +462,12 @@ class RNNStateEncoder(nn.Module):
                 A (T, N) tensor flatten to (T * N)
         """
 
+        no_episode_boundaries = rnn_build_seq_info.get(
+            "cpu_no_episode_boundaries", None
+        )
+        if no_episode_boundaries is not None and bool(no_episode_boundaries):
+            return self._unpacked_seq_forward(x, hidden_states, masks)
+
         (
             x_seq,
             hidden_states,
@@ -349,6 +486,26 @@ class RNNStateEncoder(nn.Module):
 
         return x, hidden_states
 
+    def _unpacked_seq_forward(
+        self, x, hidden_states, masks
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        r"""Forward for a sequence of length T in which no episode starts
+        after the first step. Each environment is a single sequence, so the
+        (T, N) input is passed to the RNN as is.
+        """
+        N = hidden_states.size(1)
+        x = x.view(-1, N, x.size(-1))
+        hidden_states = torch.where(
+            masks.view(-1, N, 1)[0:1],
+            hidden_states,
+            hidden_states.new_zeros(()),
+        )
+
+        x, hidden_states = self.rnn(x, self.unpack_hidden(hidden_states))
+        hidden_states = self.pack_hidden(hidden_states)
+
+        return x.flatten(0, 1), hidden_states
+
     def forward(
         self,
         x,
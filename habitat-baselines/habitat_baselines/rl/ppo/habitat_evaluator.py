@@ -1,6 +1,5 @@
-import os
 from collections import defaultdict
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import torch
@@ -9,9 +8,10 @@ import tqdm
 from habitat import logger
 from habitat.tasks.rearrange.rearrange_sensors import GfxReplayMeasure
 from habitat.tasks.rearrange.utils import write_gfx_replay
-from habitat.utils.visualizations.utils import (
-    observations_to_image,
-    overlay_frame,
+from habitat_baselines.common.eval_shards import (
+    EpisodeStats,
+    EvalShard,
+    aggregate_episode_stats,
 )
 from habitat_baselines.common.obs_transformers import (
     apply_obs_transforms_batch,
@@ -19,12 +19,12 @@ from habitat_baselines.common.obs_transformers import (
 from habitat_baselines.rl.ppo.evaluator import Evaluator, pause_envs
 from habitat_baselines.utils.common import (
     batch_obs,
-    generate_video,
     get_action_space_info,
     inference_mode,
     is_continuous_action_space,
 )
 from habitat_baselines.utils.info_dict import extract_scalars_from_info
+from habitat_baselines.utils.video_writer import VideoStream, VideoStreamPool
 
 
 class HabitatEvaluator(Evaluator):
@@ -45,6 +45,42 @@ class HabitatEvaluator(Evaluator):
         env_spec,
         rank0_keys,
     ):
+        eval_config = config.habitat_baselines.eval
+        evals_per_ep = eval_config.evals_per_ep
+        stats_episodes: Dict[
+            Any, Any
+        ] = {}  # dict of dicts that stores stats per episode
+        ep_eval_count: Dict[Any, int] = defaultdict(lambda: 0)
+
+        shard: Optional[EvalShard] = None
+        if eval_config.num_shards > 1 or eval_config.records_dir != "":
+            if eval_config.records_dir == "":
+                raise ValueError(
+                    "habitat_baselines.eval.records_dir is required to "
+                    "evaluate a shard of the episodes."
+                )
+            shard = EvalShard(
+                eval_config.records_dir,
+                checkpoint_index,
+                num_shards=eval_config.num_shards,
+                shard_index=eval_config.shard_index,
+            )
+            # Resume from the recorded episodes and only run the others.
+            stats_episodes.update(shard.stats_episodes)
+            ep_eval_count.update(shard.eval_counts())
+            envs_to_pause, num_shard_episodes = shard.select_episodes(
+                envs, evals_per_ep
+            )
+            if len(envs_to_pause) == envs.num_envs:
+                logger.info(f"All the episodes of {shard.path} are recorded.")
+                shard.mark_complete()
+                self._log_metrics(stats_episodes, shard, writer, step_id)
+                return
+            for env_idx in reversed(envs_to_pause):
+                envs.pause_at(env_idx)
+            if len(envs_to_pause) > 0:
+                agent.actor_critic.on_envs_pause(envs_to_pause)
+
         observations = envs.reset()
         observations = envs.post_step(observations)
         batch = batch_obs(observations, device=device)
@@ -58,7 +94,7 @@ class HabitatEvaluator(Evaluator):
 
         test_recurrent_hidden_states = torch.zeros(
             (
-                config.habitat_baselines.num_environments,
+                envs.num_envs,
                 *agent.actor_critic.hidden_state_shape,
             ),
             device=device,
@@ -68,44 +104,49 @@ class HabitatEvaluator(Evaluator):
         action_space_lens = agent.actor_critic.policy_action_space_shape_lens
 
         prev_actions = torch.zeros(
-            config.habitat_baselines.num_environments,
+            envs.num_envs,
             *action_shape,
             device=device,
             dtype=torch.long if discrete_actions else torch.float,
         )
         not_done_masks = torch.zeros(
-            config.habitat_baselines.num_environments,
+            envs.num_envs,
             *agent.masks_shape,
             device=device,
             dtype=torch.bool,
         )
-        stats_episodes: Dict[
-            Any, Any
-        ] = {}  # dict of dicts that stores stats per episode
-        ep_eval_count: Dict[Any, int] = defaultdict(lambda: 0)
-
+        video_pool: Optional[VideoStreamPool] = None
+        video_streams: Optional[List[VideoStream]] = None
         if len(config.habitat_baselines.eval.video_option) > 0:
-            # Add the first frame of the episode to the video.
-            rgb_frames: List[List[np.ndarray]] = [
-                [
-                    observations_to_image(
-                        {k: v[env_idx] for k, v in batch.items()}, {}
-                    )
-                ]
-                for env_idx in range(config.habitat_baselines.num_environments)
+            video_pool = VideoStreamPool(
+                video_option=config.habitat_baselines.eval.video_option,
+                video_dir=config.habitat_baselines.video_dir,
+                tb_writer=writer,
+                checkpoint_idx=checkpoint_index,
+                fps=config.habitat_baselines.video_fps,
+                keys_to_include_in_name=config.habitat_baselines.eval_keys_to_include_in_name,
+                max_queue_size=config.habitat_baselines.eval.video_queue_size,
+            )
+            video_streams = [
+                video_pool.new_stream() for _ in range(envs.num_envs)
             ]
-        else:
-            rgb_frames = None
-
-        if len(config.habitat_baselines.eval.video_option) > 0:
-            os.makedirs(config.habitat_baselines.video_dir, exist_ok=True)
+            # Add the first frame of the episode to the video.
+            for env_idx, video_stream in enumerate(video_streams):
+                video_stream.add_frame(
+                    {k: v[env_idx] for k, v in batch.items()},
+                    {},
+                    overlay=False,
+                )
 
         number_of_eval_episodes = config.habitat_baselines.test_episode_count
-        evals_per_ep = config.habitat_baselines.eval.evals_per_ep
-        if number_of_eval_episodes == -1:
-            number_of_eval_episodes = sum(envs.number_of_episodes)
+        if shard is not None:
+            # `envs.number_of_episodes` counts the episodes of all the shards.
+            total_num_eps = num_shard_episodes
         else:
             total_num_eps = sum(envs.number_of_episodes)
+        if number_of_eval_episodes == -1:
+            number_of_eval_episodes = total_num_eps
+        else:
             # if total_num_eps is negative, it means the number of evaluation episodes is unknown
             if total_num_eps < number_of_eval_episodes and total_num_eps > 1:
                 logger.warn(
@@ -120,7 +161,10 @@ class HabitatEvaluator(Evaluator):
             number_of_eval_episodes > 0
         ), "You must specify a number of evaluation episodes with test_episode_count"
 
-        pbar = tqdm.tqdm(total=number_of_eval_episodes * evals_per_ep)
+        pbar = tqdm.tqdm(
+            total=number_of_eval_episodes * evals_per_ep,
+            initial=len(stats_episodes),
+        )
         agent.eval()
         while (
             len(stats_episodes) < (number_of_eval_episodes * evals_per_ep)
@@ -221,25 +265,15 @@ class HabitatEvaluator(Evaluator):
                     k: v for k, v in infos[i].items() if k not in rank0_keys
                 }
 
-                if len(config.habitat_baselines.eval.video_option) > 0:
+                if video_streams is not None:
                     # TODO move normalization / channel changing out of the policy and undo it here
-                    frame = observations_to_image(
-                        {k: v[i] for k, v in batch.items()}, disp_info
+                    # The last frame corresponds to the first frame of the next episode
+                    # but the info is correct. So we use a black frame
+                    video_streams[i].add_frame(
+                        {k: v[i] for k, v in batch.items()},
+                        disp_info,
+                        blank=not not_done_masks[i].any().item(),
                     )
-                    if not not_done_masks[i].any().item():
-                        # The last frame corresponds to the first frame of the next episode
-                        # but the info is correct. So we use a black frame
-                        final_frame = observations_to_image(
-                            {k: v[i] * 0.0 for k, v in batch.items()},
-                            disp_info,
-                        )
-                        final_frame = overlay_frame(final_frame, disp_info)
-                        rgb_frames[i].append(final_frame)
-                        # The starting frame of the next episode will be the final element..
-                        rgb_frames[i].append(frame)
-                    else:
-                        frame = overlay_frame(frame, disp_info)
-                        rgb_frames[i].append(frame)
 
                 # episode ended
                 if not not_done_masks[i].any().item():
@@ -256,23 +290,20 @@ class HabitatEvaluator(Evaluator):
                     ep_eval_count[k] += 1
                     # use scene_id + episode_id as unique id for storing stats
                     stats_episodes[(k, ep_eval_count[k])] = episode_stats
+                    if shard is not None:
+                        shard.add(k, ep_eval_count[k], episode_stats)
 
-                    if len(config.habitat_baselines.eval.video_option) > 0:
-                        generate_video(
-                            video_option=config.habitat_baselines.eval.video_option,
-                            video_dir=config.habitat_baselines.video_dir,
-                            # Since the final frame is the start frame of the next episode.
-                            images=rgb_frames[i][:-1],
+                    if video_streams is not None:
+                        video_streams[i].finish(
                             episode_id=f"{current_episodes_info[i].episode_id}_{ep_eval_count[k]}",
-                            checkpoint_idx=checkpoint_index,
                             metrics=extract_scalars_from_info(disp_info),
-                            fps=config.habitat_baselines.video_fps,
-                            tb_writer=writer,
-                            keys_to_include_in_name=config.habitat_baselines.eval_keys_to_include_in_name,
                         )
-
-                        # Since the starting frame of the next episode is the final frame.
-                        rgb_frames[i] = rgb_frames[i][-1:]
+                        # The observations are the first frame of the next episode.
+                        video_streams[i].add_frame(
+                            {k: v[i] for k, v in batch.items()},
+                            disp_info,
+                            overlay=False,
+                        )
 
                     gfx_str = infos[i].get(GfxReplayMeasure.cls_uuid, "")
                     if gfx_str != "":
@@ -290,7 +321,7 @@ class HabitatEvaluator(Evaluator):
                 current_episode_reward,
                 prev_actions,
                 batch,
-                rgb_frames,
+                video_streams,
             ) = pause_envs(
                 envs_to_pause,
                 envs,
@@ -299,7 +330,7 @@ class HabitatEvaluator(Evaluator):
                 current_episode_reward,
                 prev_actions,
                 batch,
-                rgb_frames,
+                video_streams,
             )
 
             # We pause the statefull parameters in the policy.
@@ -310,22 +341,37 @@ class HabitatEvaluator(Evaluator):
                 agent.actor_critic.on_envs_pause(envs_to_pause)
 
         pbar.close()
+        if video_pool is not None:
+            video_pool.close()
         assert (
             len(ep_eval_count) >= number_of_eval_episodes
         ), f"Expected {number_of_eval_episodes} episodes, got {len(ep_eval_count)}."
 
-        aggregated_stats = {}
-        all_ks = set()
-        for ep in stats_episodes.values():
-            all_ks.update(ep.keys())
-        for stat_key in all_ks:
-            aggregated_stats[stat_key] = np.mean(
-                [v[stat_key] for v in stats_episodes.values() if stat_key in v]
-            )
+        if shard is not None:
+            shard.mark_complete()
+        self._log_metrics(stats_episodes, shard, writer, step_id)
 
+    def _log_metrics(
+        self,
+        stats_episodes: EpisodeStats,
+        shard: Optional[EvalShard],
+        writer,
+        step_id: int,
+    ) -> None:
+        aggregated_stats = aggregate_episode_stats(stats_episodes)
         for k, v in aggregated_stats.items():
             logger.info(f"Average episode {k}: {v:.4f}")
 
+        if shard is not None:
+            # Only the metrics of all the shards are written.
+            merged_stats = shard.merge()
+            if merged_stats is None:
+                return
+            if shard.num_shards > 1:
+                aggregated_stats = aggregate_episode_stats(merged_stats)
+                for k, v in aggregated_stats.items():
+                    logger.info(f"Average episode {k} of all shards: {v:.4f}")
+
         writer.add_scalar(
             "eval_reward/average_reward", aggregated_stats["reward"], step_id
         )
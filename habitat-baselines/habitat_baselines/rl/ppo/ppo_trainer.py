@@ -9,7 +9,16 @@ import os
 import random
 import time
 from collections import defaultdict, deque
-from typing import TYPE_CHECKING, Dict, List, Optional, Set
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import hydra
 import numpy as np
@@ -30,6 +39,8 @@ from habitat_baselines.common.obs_transformers import (
     apply_obs_transforms_obs_space,
     get_active_obs_transforms,
 )
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.common.scene_scheduler import SceneAffinityScheduler
 from habitat_baselines.common.tensorboard_utils import (
     TensorboardWriter,
     get_writer,
@@ -56,16 +67,25 @@ from habitat_baselines.rl.ppo.single_agent_access_mgr import (  # noqa: F401.
     SingleAgentAccessMgr,
 )
 from habitat_baselines.utils.common import (
-    batch_obs,
+    ObservationBatcher,
     inference_mode,
     is_continuous_action_space,
 )
 from habitat_baselines.utils.info_dict import (
     NON_SCALAR_METRICS,
+    ScalarInfoSchema,
     extract_scalars_from_infos,
 )
 from habitat_baselines.utils.timing import g_timer
 
+# Prefix of the keys of `PPOTrainer.running_episode_stats` that count the
+# episodes that had each info metric.
+_INFO_COUNT_PREFIX = "count/"
+
+
+def _info_count_key(k: str) -> str:
+    return _INFO_COUNT_PREFIX + k
+
 
 @baseline_registry.register_trainer(name="ddppo")
 @baseline_registry.register_trainer(name="ppo")
@@ -89,6 +109,7 @@ class PPOTrainer(BaseRLTrainer):
         self._is_static_encoder = False
         self._encoder = None
         self._env_spec = None
+        self._scene_scheduler: Optional[SceneAffinityScheduler] = None
 
         # Distributed if the world size would be
         # greater than 1
@@ -168,6 +189,38 @@ class PPOTrainer(BaseRLTrainer):
         # to be only reported on rank0. This is seperately logged from
         # `self.window_episode_stats`.
         self._single_proc_infos: Dict[str, List[float]] = {}
+        # The layout of the scalar metrics of the infos, negotiated on the
+        # first step. The running stats of the metrics are the columns of
+        # `self._running_info_stats`, and the number of episodes that had
+        # each metric the columns of `self._running_info_counts`.
+        self._info_schema: Optional[ScalarInfoSchema] = None
+        self._running_info_stats: Optional[torch.Tensor] = None
+        self._running_info_counts: Optional[torch.Tensor] = None
+
+    def _init_scene_scheduler(self):
+        r"""Creates the scheduler of the training episodes and chooses the
+        first episode of every env.
+        """
+        scheduler_cfg = self.config.habitat_baselines.scene_scheduler
+        # Each env has its own episodes, in its own order.
+        env_episodes = [
+            list(
+                zip(
+                    self.envs.call_at(env_index, "get_episode_scene_ids"),
+                    self.envs.call_at(env_index, "get_episode_ids"),
+                )
+            )
+            for env_index in range(self.envs.num_envs)
+        ]
+        self._scene_scheduler = SceneAffinityScheduler(
+            env_episodes,
+            max_scene_repeat_episodes=scheduler_cfg.max_scene_repeat_episodes,
+            max_envs_per_scene=scheduler_cfg.max_envs_per_scene,
+            seed=self.config.habitat.seed,
+        )
+        for env_index, episode in enumerate(self.envs.current_episodes()):
+            self._scene_scheduler.set_loaded_scene(env_index, episode.scene_id)
+        self._scene_scheduler.schedule(self.envs, range(self.envs.num_envs))
 
     def _init_train(self, resume_state=None):
         if resume_state is None:
@@ -263,9 +316,29 @@ class PPOTrainer(BaseRLTrainer):
         )
         self._ppo_cfg = self.config.habitat_baselines.rl.ppo
 
+        self._use_partial_env_batches = self._ppo_cfg.use_partial_env_batches
+        if self._use_partial_env_batches and (
+            self.config.habitat.simulator.renderer.enable_batch_renderer
+            or self._agent.nbuffers != 1
+            or type(self._agent.rollouts) is not RolloutStorage
+        ):
+            logger.warning(
+                "use_partial_env_batches needs the default rollout storage "
+                "without double buffering, and can't be used with the batch "
+                "renderer, which needs the observations of all envs."
+            )
+            self._use_partial_env_batches = False
+
+        if self.config.habitat_baselines.scene_scheduler.enabled:
+            self._init_scene_scheduler()
+
+        self._obs_batcher = ObservationBatcher(
+            self._ppo_cfg.obs_batching_slots, device=self.device
+        )
+
         observations = self.envs.reset()
         observations = self.envs.post_step(observations)
-        batch = batch_obs(observations, device=self.device)
+        batch = self._obs_batcher.batch_obs(observations)
         batch = apply_obs_transforms_batch(batch, self.obs_transforms)  # type: ignore
 
         if self._is_static_encoder:
@@ -285,6 +358,7 @@ class PPOTrainer(BaseRLTrainer):
             count=torch.zeros(self.envs.num_envs, 1),
             reward=torch.zeros(self.envs.num_envs, 1),
         )
+        self._info_schema = None
         self.window_episode_stats = defaultdict(
             lambda: deque(maxlen=self._ppo_cfg.reward_window_size)
         )
@@ -340,18 +414,35 @@ class PPOTrainer(BaseRLTrainer):
         """
         return torch.load(checkpoint_path, *args, **kwargs)
 
-    def _compute_actions_and_step_envs(self, buffer_index: int = 0):
-        num_envs = self.envs.num_envs
-        env_slice = slice(
-            int(buffer_index * num_envs / self._agent.nbuffers),
-            int((buffer_index + 1) * num_envs / self._agent.nbuffers),
-        )
+    def _compute_actions_and_step_envs(
+        self, buffer_index: int = 0, env_indices: Optional[List[int]] = None
+    ):
+        r"""Computes the actions of the envs of :p:`buffer_index` and steps
+        them. With :p:`env_indices`, only these envs are stepped, each from
+        its own step of the rollouts, see
+        :ref:`_collect_rollout_partial_env_batches`.
+        """
+        env_index_t: Optional[torch.Tensor] = None
+        if env_indices is None:
+            num_envs = self.envs.num_envs
+            env_slice = slice(
+                int(buffer_index * num_envs / self._agent.nbuffers),
+                int((buffer_index + 1) * num_envs / self._agent.nbuffers),
+            )
+            env_indices = list(range(env_slice.start, env_slice.stop))
+        else:
+            env_index_t = torch.tensor(env_indices)
 
         with g_timer.avg_time("trainer.sample_action"), inference_mode():
             # Sample actions
-            step_batch = self._agent.rollouts.get_current_step(
-                env_slice, buffer_index
-            )
+            if env_index_t is None:
+                step_batch = self._agent.rollouts.get_current_step(
+                    env_slice, buffer_index
+                )
+            else:
+                step_batch = self._agent.rollouts.get_current_env_steps(
+                    env_index_t
+                )
 
             profiling_wrapper.range_push("compute actions")
 
@@ -373,7 +464,7 @@ class PPOTrainer(BaseRLTrainer):
 
         with g_timer.avg_time("trainer.obs_insert"):
             for index_env, act in zip(
-                range(env_slice.start, env_slice.stop),
+                env_indices,
                 action_data.env_actions.cpu().unbind(0),
             ):
                 if is_continuous_action_space(self._env_spec.action_space):
@@ -388,36 +479,130 @@ class PPOTrainer(BaseRLTrainer):
                 self.envs.async_step_at(index_env, act)
 
         with g_timer.avg_time("trainer.obs_insert"):
-            self._agent.rollouts.insert(
-                next_recurrent_hidden_states=action_data.rnn_hidden_states,
-                actions=action_data.actions,
-                action_log_probs=action_data.action_log_probs,
-                value_preds=action_data.values,
-                buffer_index=buffer_index,
-                should_inserts=action_data.should_inserts,
-                action_data=action_data,
-            )
+            if env_index_t is None:
+                self._agent.rollouts.insert(
+                    next_recurrent_hidden_states=action_data.rnn_hidden_states,
+                    actions=action_data.actions,
+                    action_log_probs=action_data.action_log_probs,
+                    value_preds=action_data.values,
+                    buffer_index=buffer_index,
+                    should_inserts=action_data.should_inserts,
+                    action_data=action_data,
+                )
+            else:
+                self._agent.rollouts.insert_at_envs(
+                    env_index_t,
+                    next_recurrent_hidden_states=action_data.rnn_hidden_states,
+                    actions=action_data.actions,
+                    action_log_probs=action_data.action_log_probs,
+                    value_preds=action_data.values,
+                )
 
-    def _collect_environment_result(self, buffer_index: int = 0):
-        num_envs = self.envs.num_envs
-        env_slice = slice(
-            int(buffer_index * num_envs / self._agent.nbuffers),
-            int((buffer_index + 1) * num_envs / self._agent.nbuffers),
+    def _set_info_schema(self, schema: ScalarInfoSchema) -> None:
+        r"""Moves the running stats of the metrics of the infos and their
+        counts to the columns of two tensors laid out by :p:`schema`. The
+        entries of `self.running_episode_stats` become views of these
+        columns, the count of metric :py:`k` is :py:`count/{k}`.
+        """
+        num_envs = self.running_episode_stats["count"].size(0)
+        running_info_stats = torch.zeros(num_envs, len(schema))
+        running_info_counts = torch.zeros(num_envs, len(schema))
+        for i, k in enumerate(schema.keys):
+            count_k = _info_count_key(k)
+            if k in self.running_episode_stats:
+                running_info_stats[:, i] = self.running_episode_stats[k][:, 0]
+                # Stats restored from before the metrics had their own count
+                # were counted in every episode.
+                running_info_counts[:, i] = self.running_episode_stats.get(
+                    count_k, self.running_episode_stats["count"]
+                )[:, 0]
+            self.running_episode_stats[k] = running_info_stats[:, i : i + 1]
+            self.running_episode_stats[count_k] = running_info_counts[
+                :, i : i + 1
+            ]
+
+        self._info_schema = schema
+        self._running_info_stats = running_info_stats
+        self._running_info_counts = running_info_counts
+
+    def _accumulate_info_stats(
+        self,
+        infos: List[Dict[str, Any]],
+        done_masks: torch.Tensor,
+        env_indices: List[int],
+    ) -> None:
+        if self._info_schema is None or not self._info_schema.matches(infos):
+            self._set_info_schema(
+                ScalarInfoSchema.from_infos(
+                    infos,
+                    ignore_keys=self._rank0_keys,
+                    prev_schema=self._info_schema,
+                    prev_keys=[
+                        k
+                        for k in self.running_episode_stats
+                        if k not in ("count", "reward")
+                        and not k.startswith(_INFO_COUNT_PREFIX)
+                    ],
+                )
+            )
+        assert self._running_info_stats is not None
+        assert self._running_info_counts is not None
+
+        # Only the metrics of the episodes that ended are accumulated.
+        done_envs = [
+            i for i, done in enumerate(done_masks.view(-1).tolist()) if done
+        ]
+        if len(done_envs) == 0:
+            return
+        values, present = self._info_schema.extract(
+            [infos[i] for i in done_envs]
+        )
+        done_env_indices = torch.tensor([env_indices[i] for i in done_envs])
+        # The missing metrics are 0 and don't count in the average.
+        self._running_info_stats.index_add_(
+            0, done_env_indices, torch.from_numpy(values)
+        )
+        self._running_info_counts.index_add_(
+            0, done_env_indices, torch.from_numpy(present).float()
         )
 
-        with g_timer.avg_time("trainer.step_env"):
-            outputs = [
-                self.envs.wait_step_at(index_env)
-                for index_env in range(env_slice.start, env_slice.stop)
-            ]
+    def _collect_environment_result(
+        self,
+        buffer_index: int = 0,
+        ready_envs: Optional[List[Tuple[int, Any]]] = None,
+    ):
+        r"""Waits for the envs of :p:`buffer_index` and inserts their step
+        results in the rollouts. With :p:`ready_envs`, the
+        :py:`(index_env, step output)` of envs that are done stepping (see
+        :ref:`VectorEnv.wait_step_any`), the results of these envs only are
+        inserted, each at its own step of the rollouts.
+        """
+        env_index: Union[slice, torch.Tensor]
+        if ready_envs is None:
+            num_envs = self.envs.num_envs
+            env_index = slice(
+                int(buffer_index * num_envs / self._agent.nbuffers),
+                int((buffer_index + 1) * num_envs / self._agent.nbuffers),
+            )
+            env_indices = list(range(env_index.start, env_index.stop))
 
-            observations, rewards_l, dones, infos = [
-                list(x) for x in zip(*outputs)
-            ]
+            with g_timer.avg_time("trainer.step_env"):
+                outputs = [
+                    self.envs.wait_step_at(index_env)
+                    for index_env in env_indices
+                ]
+        else:
+            env_indices = [index_env for index_env, _ in ready_envs]
+            env_index = torch.tensor(env_indices)
+            outputs = [output for _, output in ready_envs]
+
+        observations, rewards_l, dones, infos = [
+            list(x) for x in zip(*outputs)
+        ]
 
         with g_timer.avg_time("trainer.update_stats"):
             observations = self.envs.post_step(observations)
-            batch = batch_obs(observations, device=self.device)
+            batch = self._obs_batcher.batch_obs(observations)
             batch = apply_obs_transforms_batch(batch, self.obs_transforms)  # type: ignore
 
             rewards = torch.tensor(
@@ -434,10 +619,10 @@ class PPOTrainer(BaseRLTrainer):
             )
             done_masks = torch.logical_not(not_done_masks)
 
-            self.current_episode_reward[env_slice] += rewards
-            current_ep_reward = self.current_episode_reward[env_slice]
-            self.running_episode_stats["reward"][env_slice] += current_ep_reward.where(done_masks, current_ep_reward.new_zeros(()))  # type: ignore
-            self.running_episode_stats["count"][env_slice] += done_masks.float()  # type: ignore
+            self.current_episode_reward[env_index] += rewards
+            current_ep_reward = self.current_episode_reward[env_index]
+            self.running_episode_stats["reward"][env_index] += current_ep_reward.where(done_masks, current_ep_reward.new_zeros(()))  # type: ignore
+            self.running_episode_stats["count"][env_index] += done_masks.float()  # type: ignore
 
             self._single_proc_infos = extract_scalars_from_infos(
                 infos,
@@ -445,23 +630,18 @@ class PPOTrainer(BaseRLTrainer):
                     k for k in infos[0].keys() if k not in self._rank0_keys
                 ),
             )
-            extracted_infos = extract_scalars_from_infos(
-                infos, ignore_keys=self._rank0_keys
-            )
-            for k, v_k in extracted_infos.items():
-                v = torch.tensor(
-                    v_k,
-                    dtype=torch.float,
-                    device=self.current_episode_reward.device,
-                ).unsqueeze(1)
-                if k not in self.running_episode_stats:
-                    self.running_episode_stats[k] = torch.zeros_like(
-                        self.running_episode_stats["count"]
-                    )
-                self.running_episode_stats[k][env_slice] += v.where(done_masks, v.new_zeros(()))  # type: ignore
-
-            self.current_episode_reward[env_slice].masked_fill_(
-                done_masks, 0.0
+            self._accumulate_info_stats(infos, done_masks, env_indices)
+
+            self.current_episode_reward[
+                env_index
+            ] = current_ep_reward.masked_fill(done_masks, 0.0)
+
+        if self._scene_scheduler is not None:
+            # The envs that are done already started the episode chosen for
+            # them, choose the one after.
+            self._scene_scheduler.schedule(
+                self.envs,
+                [env_indices[i] for i, done in enumerate(dones) if done],
             )
 
         if self._is_static_encoder:
@@ -470,16 +650,76 @@ class PPOTrainer(BaseRLTrainer):
                     PointNavResNetNet.PRETRAINED_VISUAL_FEATURES_KEY
                 ] = self._encoder(batch)
 
-        self._agent.rollouts.insert(
-            next_observations=batch,
-            rewards=rewards,
-            next_masks=not_done_masks,
-            buffer_index=buffer_index,
-        )
+        if ready_envs is None:
+            self._agent.rollouts.insert(
+                next_observations=batch,
+                rewards=rewards,
+                next_masks=not_done_masks,
+                buffer_index=buffer_index,
+            )
+
+            self._agent.rollouts.advance_rollout(buffer_index)
+        else:
+            self._agent.rollouts.insert_at_envs(
+                env_index,
+                next_observations=batch,
+                rewards=rewards,
+                next_masks=not_done_masks,
+            )
 
-        self._agent.rollouts.advance_rollout(buffer_index)
+            self._agent.rollouts.advance_envs(env_index)
 
-        return env_slice.stop - env_slice.start
+        return len(env_indices)
+
+    def _collect_rollout_partial_env_batches(self) -> int:
+        r"""Collects a rollout where each env is stepped again as soon as it
+        is done stepping, instead of waiting for the slowest env at every
+        step. The envs that are done at the same time form a partial batch:
+        their results are inserted in their rows of the rollouts and their
+        next actions are computed together. The envs can be at different
+        steps during the rollout, they all end it at the same step.
+
+        :return: the number of env steps taken.
+        """
+        num_envs = self.envs.num_envs
+        env_steps = [0] * num_envs
+        last_step = self._ppo_cfg.num_steps
+        count_steps_delta = 0
+
+        self._compute_actions_and_step_envs(env_indices=list(range(num_envs)))
+        stepping = set(range(num_envs))
+        while len(stepping) > 0:
+            with g_timer.avg_time("trainer.step_env"):
+                ready_envs = self.envs.wait_step_any(sorted(stepping))
+
+            count_steps_delta += self._collect_environment_result(
+                ready_envs=ready_envs
+            )
+            for index_env, _ in ready_envs:
+                env_steps[index_env] += 1
+                stepping.remove(index_env)
+
+            if last_step == self._ppo_cfg.num_steps and self.should_end_early(
+                min(env_steps)
+            ):
+                # End the rollout at the step the furthest env will be at.
+                last_step = max(
+                    s + int(index_env in stepping)
+                    for index_env, s in enumerate(env_steps)
+                )
+
+            next_envs = [
+                index_env
+                for index_env, _ in ready_envs
+                if env_steps[index_env] < last_step
+            ]
+            if len(next_envs) > 0:
+                self._compute_actions_and_step_envs(env_indices=next_envs)
+                stepping.update(next_envs)
+
+        self._agent.rollouts.sync_env_steps()
+
+        return count_steps_delta
 
     @profiling_wrapper.RangeContext("_collect_rollout_step")
     def _collect_rollout_step(self):
@@ -579,9 +819,10 @@ class PPOTrainer(BaseRLTrainer):
         # Check to see if there are any metrics
         # that haven't been logged yet
         metrics = {
-            k: v / deltas["count"]
+            k: v / max(deltas.get(_info_count_key(k), deltas["count"]), 1.0)
             for k, v in deltas.items()
             if k not in {"reward", "count"}
+            and not k.startswith(_INFO_COUNT_PREFIX)
         }
 
         for k, v in metrics.items():
@@ -624,9 +865,11 @@ class PPOTrainer(BaseRLTrainer):
                 "Average window size: {}  {}".format(
                     len(self.window_episode_stats["count"]),
                     "  ".join(
-                        "{}: {:.3f}".format(k, v / deltas["count"])
-                        for k, v in deltas.items()
-                        if k != "count"
+                        "{}: {:.3f}".format(k, v)
+                        for k, v in dict(
+                            reward=deltas["reward"] / deltas["count"],
+                            **metrics,
+                        ).items()
                     ),
                 )
             )
@@ -683,6 +926,8 @@ class PPOTrainer(BaseRLTrainer):
             prev_time = requeue_stats["prev_time"]
 
             self.running_episode_stats = requeue_stats["running_episode_stats"]
+            # Laid out again from the restored stats on the next step.
+            self._info_schema = None
             self.window_episode_stats.update(
                 requeue_stats["window_episode_stats"]
             )
@@ -740,35 +985,45 @@ class PPOTrainer(BaseRLTrainer):
 
                 profiling_wrapper.range_push("_collect_rollout_step")
                 with g_timer.avg_time("trainer.rollout_collect"):
-                    for buffer_index in range(self._agent.nbuffers):
-                        self._compute_actions_and_step_envs(buffer_index)
-
-                    for step in range(self._ppo_cfg.num_steps):
-                        is_last_step = (
-                            self.should_end_early(step + 1)
-                            or (step + 1) == self._ppo_cfg.num_steps
+                    if self._use_partial_env_batches:
+                        count_steps_delta += (
+                            self._collect_rollout_partial_env_batches()
                         )
-
+                        profiling_wrapper.range_pop()  # _collect_rollout_step
+                    else:
                         for buffer_index in range(self._agent.nbuffers):
-                            count_steps_delta += (
-                                self._collect_environment_result(buffer_index)
+                            self._compute_actions_and_step_envs(buffer_index)
+
+                        for step in range(self._ppo_cfg.num_steps):
+                            is_last_step = (
+                                self.should_end_early(step + 1)
+                                or (step + 1) == self._ppo_cfg.num_steps
                             )
 
-                            if (buffer_index + 1) == self._agent.nbuffers:
-                                profiling_wrapper.range_pop()  # _collect_rollout_step
+                            for buffer_index in range(self._agent.nbuffers):
+                                count_steps_delta += (
+                                    self._collect_environment_result(
+                                        buffer_index
+                                    )
+                                )
 
-                            if not is_last_step:
                                 if (buffer_index + 1) == self._agent.nbuffers:
-                                    profiling_wrapper.range_push(
-                                        "_collect_rollout_step"
+                                    profiling_wrapper.range_pop()  # _collect_rollout_step
+
+                                if not is_last_step:
+                                    if (
+                                        buffer_index + 1
+                                    ) == self._agent.nbuffers:
+                                        profiling_wrapper.range_push(
+                                            "_collect_rollout_step"
+                                        )
+
+                                    self._compute_actions_and_step_envs(
+                                        buffer_index
                                     )
 
-                                self._compute_actions_and_step_envs(
-                                    buffer_index
-                                )
-
-                        if is_last_step:
-                            break
+                            if is_last_step:
+                                break
 
                 profiling_wrapper.range_pop()  # rollouts loop
 
@@ -839,6 +1094,7 @@ class PPOTrainer(BaseRLTrainer):
         )
         with read_write(config):
             config.habitat.dataset.split = config.habitat_baselines.eval.split
+            config.habitat_baselines.scene_scheduler.enabled = False
 
         if len(self.config.habitat_baselines.eval.video_option) > 0:
             n_agents = len(config.habitat.simulator.agents)
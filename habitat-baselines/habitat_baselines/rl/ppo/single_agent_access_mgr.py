@@ -136,6 +136,8 @@ class SingleAgentAccessMgr(AgentAccessMgr):
             action_space=policy_action_space,
             actor_critic=actor_critic,
             is_double_buffered=ppo_cfg.use_double_buffered_sampler,
+            returns_method=ppo_cfg.returns_method,
+            use_minibatch_views=ppo_cfg.use_minibatch_views,
         )
         rollouts.to(device)
         return rollouts
@@ -9,6 +9,7 @@ from typing import Any, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 import torch
 
+from habitat_baselines.common.returns import reverse_discounted_cumsum
 from habitat_baselines.common.rollout_storage import RolloutStorage
 from habitat_baselines.common.tensor_dict import DictTree, TensorDict
 from habitat_baselines.rl.models.rnn_state_encoder import (
@@ -144,6 +145,7 @@ class VERRolloutStorage(RolloutStorage):
         actor_critic,
         variable_experience: bool,
         is_double_buffered: bool = False,
+        returns_method: str = "scan",
     ):
         super().__init__(
             numsteps,
@@ -152,6 +154,7 @@ class VERRolloutStorage(RolloutStorage):
             action_space,
             actor_critic,
             is_double_buffered,
+            returns_method,
         )
         self.use_is_coeffs = variable_experience
 
@@ -504,45 +507,52 @@ class VERRolloutStorage(RolloutStorage):
         returns = returns_t.view(-1, 1).numpy()
         returns[:] = returns[self.select_inds]
 
-        gae = np.zeros((self.num_seqs_at_step[0], 1))
-        last_values = gae.copy()
-        ptr = returns.size
-        for len_minus_1, n_seqs in reversed(
-            list(enumerate(self.num_seqs_at_step))
-        ):
-            curr_slice = slice(ptr - n_seqs, ptr)
-            q_est = rewards[curr_slice] + gamma * last_values[:n_seqs]
-            delta = q_est - values[curr_slice]
-            gae[:n_seqs] = delta + (tau * gamma) * gae[:n_seqs]
-
-            is_last_step = self.sequence_lengths == (len_minus_1 + 1)
-            is_last_step_for_env = (
-                is_last_step & self.last_sequence_in_batch_mask
-            )
+        # Lay the steps out as [step in sequence, sequence]. In the packed
+        # order, the steps are sorted by step then sequence and the sequences
+        # by decreasing length, so the steps of each sequence are contiguous
+        # along the first axis.
+        num_seqs_at_step = np.asarray(self.num_seqs_at_step)
+        is_valid = (
+            np.arange(num_seqs_at_step[0])[np.newaxis]
+            < num_seqs_at_step[:, np.newaxis]
+        )
 
-            # For the last step from each worker, we do an extra loop
-            # to fill last_values with the bootstrap.  So we re-zero
-            # the GAE value here
-            gae[is_last_step_for_env] = 0.0
+        def to_dense(packed: np.ndarray) -> torch.Tensor:
+            dense = np.zeros(is_valid.shape, dtype=np.float64)
+            dense[is_valid] = packed[:, 0]
+            return torch.from_numpy(dense)
 
-            # If the step isn't stale or we don't have a return
-            # calculate, use the newly calculated return value,
-            # otherwise keep the current one
-            use_new_value = is_not_stale[curr_slice] | np.logical_not(
-                np.isfinite(returns[curr_slice])
-            )
-            returns[curr_slice][use_new_value] = (
-                gae[:n_seqs] + values[curr_slice]
-            )[use_new_value]
+        rewards_d, values_d = to_dense(rewards), to_dense(values)
 
-            # We also mark these with a nan
-            returns[curr_slice][is_last_step_for_env[:n_seqs]] = float("nan")
+        # The last step of the last sequence of each environment only
+        # bootstraps the value of the previous step.
+        is_last_step_for_env = (
+            np.arange(len(num_seqs_at_step))[:, np.newaxis]
+            == (np.asarray(self.sequence_lengths) - 1)[np.newaxis]
+        ) & np.asarray(self.last_sequence_in_batch_mask)[np.newaxis]
 
-            last_values[:n_seqs] = values[curr_slice]
+        # Steps past the end of a sequence are zero, so the value after the
+        # last step of a sequence is zero.
+        next_values_d = torch.cat(
+            [values_d[1:], torch.zeros_like(values_d[:1])]
+        )
+        deltas = rewards_d + gamma * next_values_d - values_d
+        deltas[torch.from_numpy(is_last_step_for_env)] = 0.0
+        gae = reverse_discounted_cumsum(
+            deltas,
+            torch.full_like(deltas, tau * gamma),
+            self.returns_method,
+        )
+        new_returns = (gae + values_d).numpy()[is_valid][:, np.newaxis]
 
-            ptr -= n_seqs
+        # If the step isn't stale or we don't have a return
+        # calculate, use the newly calculated return value,
+        # otherwise keep the current one
+        use_new_value = is_not_stale | np.logical_not(np.isfinite(returns))
+        returns[use_new_value] = new_returns[use_new_value]
 
-        assert ptr == 0
+        # We also mark these with a nan
+        returns[is_last_step_for_env[is_valid]] = float("nan")
 
         returns[:] = returns[_np_invert_permutation(self.select_inds)]
 
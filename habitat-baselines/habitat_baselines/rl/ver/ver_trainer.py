@@ -84,6 +84,11 @@ class VERTrainer(PPOTrainer):
         assert (
             not self.config.habitat.simulator.renderer.enable_batch_renderer
         ), "VER trainer does not support batch rendering."
+        # The VER environment workers don't call VectorEnv.post_step, which
+        # computes the batched navigation sensors.
+        assert (
+            not self.config.habitat.task.batched_nav_sensors
+        ), "VER trainer does not support batched_nav_sensors."
 
         if self._is_distributed:
             local_rank, world_rank, _ = get_distrib_size()
@@ -244,6 +249,7 @@ class VERTrainer(PPOTrainer):
             "action_space": self._env_spec.action_space,
             "actor_critic": self._agent.actor_critic,
             "observation_space": rollouts_obs_space,
+            "returns_method": ppo_cfg.returns_method,
         }
 
         def create_ver_rollouts_fn(
@@ -33,6 +33,7 @@ from torch import nn as nn
 
 from habitat import logger
 from habitat.core.dataset import Episode
+from habitat.core.shared_obs_buffer import shared_batch_view
 from habitat.core.spaces import EmptySpace
 from habitat.core.utils import Singleton, try_cv2_import
 from habitat.utils import profiling_wrapper
@@ -191,11 +192,11 @@ def linear_decay(epoch: int, total_num_updates: int) -> float:
 
 
 @attr.s(auto_attribs=True, slots=True)
-class _ObservationBatchingCache(metaclass=Singleton):
+class _ObservationBatchingPool:
     r"""Helper for batching observations that maintains a cpu-side tensor
     that is the right size and is pinned to cuda memory
     """
-    _pool: Dict[Any, Union[torch.Tensor, np.ndarray]] = {}
+    _pool: Dict[Any, Union[torch.Tensor, np.ndarray]] = attr.Factory(dict)
 
     def get(
         self,
@@ -247,7 +248,13 @@ class _ObservationBatchingCache(metaclass=Singleton):
         self,
         observations: List[DictTree],
         device: Optional[torch.device] = None,
+        copy_shared: bool = False,
     ) -> TensorDict:
+        r"""See :ref:`batch_obs`. With :p:`copy_shared`, the sensors read
+        from a VectorEnv shared memory slab are copied into the buffers of
+        the pool (in one copy per sensor) instead of being returned as views
+        of the slab.
+        """
         observations = [
             TensorOrNDArrayDict.from_tree(o).map(
                 lambda t: t.numpy()
@@ -268,8 +275,24 @@ class _ObservationBatchingCache(metaclass=Singleton):
             reverse=True,
         )
 
+        # Sensors that were read from a VectorEnv shared memory slab
+        # are already stacked, so use a view of the slab instead of copying
+        # them row by row.
+        shared_views = [
+            shared_batch_view(
+                [all_obs[idx] for all_obs in observation_tensors]
+            )
+            for idx in range(len(observation_keys))
+        ]
+
         batched_tensors = []
-        for sensor_name, obs in zip(observation_keys, observation_tensors[0]):
+        for sensor_name, obs, shared_view in zip(
+            observation_keys, observation_tensors[0], shared_views
+        ):
+            if shared_view is not None and not copy_shared:
+                batched_tensors.append(shared_view)
+                continue
+
             batched_tensors.append(
                 self.get(
                     len(observations),
@@ -280,6 +303,14 @@ class _ObservationBatchingCache(metaclass=Singleton):
             )
 
         for idx in upload_ordering:
+            if shared_views[idx] is not None:
+                if copy_shared:
+                    batched_tensors[idx][:] = shared_views[idx]  # type: ignore
+                batched_tensors[idx] = torch.from_numpy(
+                    batched_tensors[idx]  # type: ignore
+                ).to(device, non_blocking=True)
+                continue
+
             for i, all_obs in enumerate(observation_tensors):
                 obs = all_obs[idx]
                 # Use isinstance(sensor, np.ndarray) here instead of
@@ -312,6 +343,88 @@ class _ObservationBatchingCache(metaclass=Singleton):
         return TensorDict.from_flattened(observation_keys, batched_tensors)
 
 
+class _ObservationBatchingCache(_ObservationBatchingPool, metaclass=Singleton):
+    r"""The batching buffers used by :ref:`batch_obs`."""
+
+
+class ObservationBatcher:
+    r"""Batches observations like :ref:`batch_obs`, but into a ring of
+    :p:`num_slots` sets of buffers, so a batch stays valid for
+    :p:`num_slots` calls instead of one.
+
+    On CUDA, each batch is uploaded on a dedicated copy stream and the
+    current stream waits for the copy, so the host can stack the next batch
+    into the next slot while the policy runs on the previous batch. Before a
+    slot is refilled, the host only waits for the upload issued from that
+    slot :p:`num_slots` calls ago, which is usually already done. On the CPU,
+    the slots are plain buffers. Unlike with :ref:`batch_obs`, the sensors
+    read from a VectorEnv shared memory slab are copied into the slots too,
+    so they also stay valid when the envs are stepped again.
+
+    :param num_slots: Number of slots, 2 for double buffering, 3 for triple
+        buffering.
+    :param device: The torch.device to put the batches on. Will not move the
+        tensors if None.
+    """
+
+    def __init__(
+        self, num_slots: int = 2, device: Optional[torch.device] = None
+    ) -> None:
+        assert num_slots >= 1, "Need at least one slot"
+        self._device = device
+        self._slots = [_ObservationBatchingPool() for _ in range(num_slots)]
+        self._next_slot = 0
+
+        self._copy_stream: Optional[torch.cuda.Stream] = None
+        self._slot_events: List[Optional[torch.cuda.Event]] = [
+            None
+        ] * num_slots
+        if device is not None and device.type == "cuda":
+            self._copy_stream = torch.cuda.Stream(device=device)
+
+    @property
+    def num_slots(self) -> int:
+        return len(self._slots)
+
+    @inference_mode()
+    @profiling_wrapper.RangeContext("ObservationBatcher.batch_obs")
+    def batch_obs(self, observations: List[DictTree]) -> TensorDict:
+        r"""Transpose a batch of observation dicts to a dict of batched
+        observations, see :ref:`batch_obs`.
+        """
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % len(self._slots)
+
+        if self._copy_stream is None:
+            return self._slots[slot].batch_obs(
+                observations, self._device, copy_shared=True
+            )
+
+        # Don't overwrite the pinned buffers of the slot while they are
+        # still being uploaded.
+        event = self._slot_events[slot]
+        if event is not None:
+            event.synchronize()
+
+        with torch.cuda.stream(self._copy_stream):
+            batch = self._slots[slot].batch_obs(
+                observations, self._device, copy_shared=True
+            )
+            event = torch.cuda.Event()
+            event.record(self._copy_stream)
+        self._slot_events[slot] = event
+
+        current_stream = torch.cuda.current_stream(self._device)
+        current_stream.wait_stream(self._copy_stream)
+        # The batch was allocated on the copy stream but is used on the
+        # current one.
+        for t in batch.flatten()[1]:
+            if t.device.type == "cuda":
+                t.record_stream(current_stream)
+
+        return batch
+
+
 @inference_mode()
 @profiling_wrapper.RangeContext("batch_obs")
 def batch_obs(
@@ -326,7 +439,9 @@ def batch_obs(
         device: The torch.device to put the resulting tensors on.
             Will not move the tensors if None
     Returns:
-        transposed dict of torch.Tensor of observations.
+        transposed dict of torch.Tensor of observations. Sensors that come
+        from a shared memory VectorEnv are not copied when device is None or
+        the cpu, so they are only valid until the envs are stepped again.
     """
 
     return _ObservationBatchingCache().batch_obs(observations, device)
@@ -379,6 +494,38 @@ def poll_checkpoint_folder(
     return None
 
 
+def get_video_name(
+    episode_id: Union[int, str],
+    checkpoint_idx: int,
+    metrics: Dict[str, float],
+    keys_to_include_in_name: Optional[List[str]] = None,
+) -> str:
+    r"""Returns the name of the video of an episode, with the metrics whose
+    name contains one of :p:`keys_to_include_in_name`, or all the metrics.
+    """
+    metric_strs = []
+    if (
+        keys_to_include_in_name is not None
+        and len(keys_to_include_in_name) > 0
+    ):
+        use_metrics_k = [
+            k
+            for k in metrics
+            if any(
+                to_include_k in k for to_include_k in keys_to_include_in_name
+            )
+        ]
+    else:
+        use_metrics_k = list(metrics.keys())
+
+    for k in use_metrics_k:
+        metric_strs.append(f"{k}={metrics[k]:.2f}")
+
+    return f"episode={episode_id}-ckpt={checkpoint_idx}-" + "-".join(
+        metric_strs
+    )
+
+
 def generate_video(
     video_option: List[str],
     video_dir: Optional[str],
@@ -409,26 +556,8 @@ def generate_video(
     if len(images) < 1:
         return ""
 
-    metric_strs = []
-    if (
-        keys_to_include_in_name is not None
-        and len(keys_to_include_in_name) > 0
-    ):
-        use_metrics_k = [
-            k
-            for k in metrics
-            if any(
-                to_include_k in k for to_include_k in keys_to_include_in_name
-            )
-        ]
-    else:
-        use_metrics_k = list(metrics.keys())
-
-    for k in use_metrics_k:
-        metric_strs.append(f"{k}={metrics[k]:.2f}")
-
-    video_name = f"episode={episode_id}-ckpt={checkpoint_idx}-" + "-".join(
-        metric_strs
+    video_name = get_video_name(
+        episode_id, checkpoint_idx, metrics, keys_to_include_in_name
     )
     if "disk" in video_option:
         assert video_dir is not None
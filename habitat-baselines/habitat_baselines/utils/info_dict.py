@@ -1,5 +1,5 @@
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 import numpy as np
 
@@ -68,3 +68,174 @@ def extract_scalars_from_infos(
             results[k].append(v)
 
     return results
+
+
+def _scalar_paths(
+    info: Dict[str, Any], ignore_keys: Set[str]
+) -> Dict[str, Tuple[str, ...]]:
+    r"""The path in :p:`info` of each of the metrics
+    :ref:`extract_scalars_from_info` returns, by flattened name.
+    """
+    paths = {}
+    for k, v in info.items():
+        if not isinstance(k, str) or k in ignore_keys:
+            continue
+
+        if isinstance(v, dict):
+            for subk, subpath in _scalar_paths(v, NON_SCALAR_METRICS).items():
+                if k + "." + subk not in ignore_keys:
+                    paths[k + "." + subk] = (k,) + subpath
+        elif np.size(v) == 1 and not isinstance(v, str):
+            paths[k] = (k,)
+
+    return paths
+
+
+def _add_key_sets(
+    info: Dict[str, Any],
+    ignore_keys: Set[str],
+    key_sets: Dict[Tuple[str, ...], Set[Any]],
+    path: Tuple[str, ...] = (),
+) -> None:
+    r"""Adds the keys of :p:`info` and of the dicts nested in it to
+    :p:`key_sets`, by path of the dict.
+    """
+    key_sets.setdefault(path, set()).update(info.keys())
+    for k, v in info.items():
+        if isinstance(v, dict) and isinstance(k, str) and k not in ignore_keys:
+            _add_key_sets(v, NON_SCALAR_METRICS, key_sets, path + (k,))
+
+
+def _get_path(info: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    v: Any = info
+    for k in path:
+        if not isinstance(v, dict):
+            return None
+        v = v.get(k)
+    return v
+
+
+class ScalarInfoSchema:
+    r"""A fixed layout of the scalar metrics of the env info dicts as the
+    columns of a float array. The schema is negotiated from the first info
+    dicts, after which :ref:`extract` reads each metric by its path instead
+    of flattening the info dicts, and the metrics of all the envs can be
+    accumulated with a single vectorized operation.
+
+    :ref:`extract` also tells which metrics each info dict has, so that the
+    metrics missing from an info dict are not counted in their average.
+
+    :ref:`matches` only compares the keys of the info dicts and of their
+    nested dicts to the keys seen when negotiating the schema, so that it is
+    cheap enough to be called at every step. A known key whose value
+    changes from a scalar to a dict is not detected.
+
+        Args:
+            keys: The flattened name of each column, as returned by
+                :ref:`extract_scalars_from_info`.
+            paths: The path of each column in the info dicts.
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[str] = (),
+        paths: Sequence[Tuple[str, ...]] = (),
+    ):
+        assert len(keys) == len(paths)
+        self.keys: List[str] = list(keys)
+        self.paths: List[Tuple[str, ...]] = list(paths)
+        # The keys of the info dicts and of their nested dicts, by path of
+        # the dict, and the keys of the nested dicts of each dict.
+        self._key_sets: Dict[Tuple[str, ...], Set[Any]] = {}
+        self._nested_keys: Dict[Tuple[str, ...], List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_infos(
+        cls,
+        infos: List[Dict[str, Any]],
+        ignore_keys: Optional[Set[str]] = None,
+        prev_schema: Optional["ScalarInfoSchema"] = None,
+        prev_keys: Sequence[str] = (),
+    ) -> "ScalarInfoSchema":
+        r"""Negotiates the schema of the scalar metrics of :p:`infos`.
+
+        Args:
+            infos: A list of gym.Env info dicts.
+            ignore_keys: The info key names to exclude from the schema.
+            prev_schema: A schema whose columns are kept first, in the
+                same order.
+            prev_keys: More names of columns to keep, for example of
+                metrics accumulated before a restart. Their path is
+                their name split on ".".
+
+        Returns:
+            The schema
+        """
+        ignore_keys = set(NON_SCALAR_METRICS).union(ignore_keys or ())
+        paths: Dict[str, Tuple[str, ...]] = {}
+        key_sets: Dict[Tuple[str, ...], Set[Any]] = {}
+        if prev_schema is not None:
+            paths.update(zip(prev_schema.keys, prev_schema.paths))
+            for dict_path, key_set in prev_schema._key_sets.items():
+                key_sets[dict_path] = set(key_set)
+        for k in prev_keys:
+            paths.setdefault(k, tuple(k.split(".")))
+        for info in infos:
+            for k, path in _scalar_paths(info, ignore_keys).items():
+                paths.setdefault(k, path)
+            _add_key_sets(info, ignore_keys, key_sets)
+
+        schema = cls(list(paths.keys()), list(paths.values()))
+        schema._key_sets = key_sets
+        for dict_path in key_sets:
+            if len(dict_path) > 0:
+                schema._nested_keys.setdefault(dict_path[:-1], []).append(
+                    dict_path[-1]
+                )
+        return schema
+
+    def matches(self, infos: List[Dict[str, Any]]) -> bool:
+        r"""If every metric of :p:`infos` has a column in the schema,
+        including the metrics nested in the info dicts, for example the
+        success of each stage of a task. Metrics of :p:`infos` without a
+        column would otherwise be left out.
+        """
+        return all(self._has_known_keys(info, ()) for info in infos)
+
+    def _has_known_keys(
+        self, info: Dict[str, Any], path: Tuple[str, ...]
+    ) -> bool:
+        key_set = self._key_sets.get(path)
+        if key_set is None or not key_set.issuperset(info.keys()):
+            return False
+        for k in self._nested_keys.get(path, ()):
+            v = info.get(k)
+            if isinstance(v, dict) and not self._has_known_keys(
+                v, path + (k,)
+            ):
+                return False
+        return True
+
+    def extract(
+        self, infos: List[Dict[str, Any]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        r"""Returns the [len(infos), len(self)] array of the metrics of
+        :p:`infos` and the boolean array of the metrics each info dict has.
+        The missing metrics are 0.
+        """
+        values = np.zeros((len(infos), len(self.keys)), dtype=np.float32)
+        present = np.zeros((len(infos), len(self.keys)), dtype=bool)
+        for i, info in enumerate(infos):
+            for j, path in enumerate(self.paths):
+                v = _get_path(info, path)
+                if (
+                    v is not None
+                    and not isinstance(v, (dict, str))
+                    and np.size(v) == 1
+                ):
+                    values[i, j] = float(v)
+                    present[i, j] = True
+        return values, present
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Streaming encoding of the evaluation videos.
+
+Instead of keeping the frames of every episode of every env in memory until
+the episode ends, each env has a :ref:`VideoStream` that hands its
+observations and infos to a background thread. The thread composes the
+frames with :ref:`observations_to_image` and :ref:`overlay_frame` and
+appends them to the video file, which is renamed with the metrics of the
+episode once it ends. The queue to the thread is bounded, so the evaluation
+loop only waits on the encoding when it is too far behind.
+"""
+
+import os
+import os.path as osp
+import queue
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import imageio
+import numpy as np
+import torch
+
+from habitat import logger
+from habitat.utils.visualizations.utils import (
+    observations_to_image,
+    overlay_frame,
+    video_file_name,
+)
+from habitat_baselines.common.tensorboard_utils import TensorboardWriter
+from habitat_baselines.utils.common import get_video_name
+
+
+def _snapshot(value: Any) -> Any:
+    r"""Copies the arrays of the (nested) info :p:`value`, which can be
+    modified in place by the env once the step returns.
+    """
+    if isinstance(value, dict):
+        return {k: _snapshot(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_snapshot(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return value
+
+
+class VideoStreamPool:
+    r"""Encodes the videos of the :ref:`VideoStream` it creates on a
+    background thread.
+
+    :param video_option: "disk", "tensorboard" or both.
+    :param video_dir: The directory of the videos saved to disk.
+    :param tb_writer: The writer of the videos added to tensorboard.
+    :param checkpoint_idx: The checkpoint index, for the video names.
+    :param fps: The frames per second of the videos.
+    :param keys_to_include_in_name: The metrics in the video names, see
+        :ref:`get_video_name`.
+    :param max_queue_size: The maximum number of frames waiting to be
+        encoded before adding a frame blocks.
+    """
+
+    def __init__(
+        self,
+        video_option: List[str],
+        video_dir: Optional[str],
+        tb_writer: TensorboardWriter,
+        checkpoint_idx: int,
+        fps: int = 10,
+        keys_to_include_in_name: Optional[List[str]] = None,
+        max_queue_size: int = 64,
+    ):
+        self.video_option = video_option
+        self.video_dir = video_dir
+        self.tb_writer = tb_writer
+        self.checkpoint_idx = checkpoint_idx
+        self.fps = fps
+        self.keys_to_include_in_name = keys_to_include_in_name
+        if "disk" in video_option:
+            assert video_dir is not None
+            os.makedirs(video_dir, exist_ok=True)
+
+        self._streams: List["VideoStream"] = []
+        self._error: Optional[Exception] = None
+        self._queue: "queue.Queue[Optional[Callable[[], None]]]" = queue.Queue(
+            maxsize=max_queue_size
+        )
+        self._thread = threading.Thread(
+            target=self._worker, name="video_writer", daemon=True
+        )
+        self._thread.start()
+
+    def new_stream(self) -> "VideoStream":
+        stream = VideoStream(self)
+        self._streams.append(stream)
+        return stream
+
+    def _worker(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            # Once a task failed, the rest are dropped and the error is
+            # raised in the evaluation loop.
+            if self._error is None:
+                try:
+                    task()
+                except Exception as e:
+                    self._error = e
+
+    def submit(self, task: Callable[[], None]) -> None:
+        if self._error is not None:
+            raise RuntimeError("Writing a video failed") from self._error
+        self._queue.put(task)
+
+    def close(self) -> None:
+        r"""Waits for the videos of the finished episodes to be written and
+        deletes the videos of the unfinished ones.
+        """
+        for stream in self._streams:
+            self._queue.put(stream._discard)
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError("Writing a video failed") from self._error
+
+    def __enter__(self) -> "VideoStreamPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class VideoStream:
+    r"""The video of the current episode of an env. The methods queue the
+    work for the background thread of the :ref:`VideoStreamPool`, the
+    attributes starting with an underscore are only used by that thread.
+    """
+
+    def __init__(self, pool: VideoStreamPool):
+        self._pool = pool
+        self._writer = None
+        self._tmp_path: Optional[str] = None
+        # The frames for tensorboard, which takes the whole video at once.
+        self._frames: List[np.ndarray] = []
+        self._num_frames = 0
+
+    def add_frame(
+        self,
+        observation: Dict[str, Union[torch.Tensor, np.ndarray]],
+        info: Dict[str, Any],
+        overlay: bool = True,
+        blank: bool = False,
+    ) -> None:
+        r"""Adds the frame of :p:`observation` and :p:`info`.
+
+        :param observation: The observations of the env.
+        :param info: The info of the env.
+        :param overlay: Whether to overlay the metrics of :p:`info`.
+        :param blank: Whether to black out the observations.
+        """
+        # Only the visual observations are drawn.
+        observation = {
+            k: (
+                v.to(device="cpu", copy=True).numpy()
+                if isinstance(v, torch.Tensor)
+                else np.array(v)
+            )
+            for k, v in observation.items()
+            if len(v.shape) > 1
+        }
+        info = _snapshot(info)
+        self._pool.submit(
+            lambda: self._append(observation, info, overlay, blank)
+        )
+
+    def finish(
+        self, episode_id: Union[int, str], metrics: Dict[str, float]
+    ) -> None:
+        r"""Writes the video of the episode :p:`episode_id` with its
+        :p:`metrics` in the name, the next frames start a new video.
+        """
+        self._pool.submit(lambda: self._finish(episode_id, dict(metrics)))
+
+    def _append(
+        self,
+        observation: Dict[str, np.ndarray],
+        info: Dict[str, Any],
+        overlay: bool,
+        blank: bool,
+    ) -> None:
+        if blank:
+            observation = {k: v * 0.0 for k, v in observation.items()}
+        frame = observations_to_image(observation, info)
+        if overlay:
+            frame = overlay_frame(frame, info)
+
+        if "disk" in self._pool.video_option:
+            if self._writer is None:
+                self._tmp_path = osp.join(
+                    self._pool.video_dir, f".tmp-{uuid.uuid4().hex}.mp4"
+                )
+                self._writer = imageio.get_writer(
+                    self._tmp_path, fps=self._pool.fps, quality=5
+                )
+            self._writer.append_data(frame)
+        if "tensorboard" in self._pool.video_option:
+            self._frames.append(frame)
+        self._num_frames += 1
+
+    def _finish(
+        self, episode_id: Union[int, str], metrics: Dict[str, float]
+    ) -> None:
+        if self._num_frames == 0:
+            return
+
+        video_name = get_video_name(
+            episode_id,
+            self._pool.checkpoint_idx,
+            metrics,
+            self._pool.keys_to_include_in_name,
+        )
+        if self._writer is not None:
+            self._writer.close()
+            video_path = osp.join(
+                self._pool.video_dir, video_file_name(video_name)
+            )
+            os.replace(self._tmp_path, video_path)
+            logger.info(f"Video created: {video_path}")
+        if "tensorboard" in self._pool.video_option:
+            self._pool.tb_writer.add_video_from_np_images(
+                f"episode{episode_id}",
+                self._pool.checkpoint_idx,
+                self._frames,
+                fps=self._pool.fps,
+            )
+        self._reset()
+
+    def _discard(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            os.remove(self._tmp_path)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._writer = None
+        self._tmp_path = None
+        self._frames = []
+        self._num_frames = 0
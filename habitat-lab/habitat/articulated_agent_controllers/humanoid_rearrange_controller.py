@@ -4,7 +4,6 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
-import math
 import os
 import pickle as pkl
 
@@ -92,6 +91,21 @@ class HumanoidRearrangeController(HumanoidBaseController):
                 hand_data = walk_data[hand_name]
                 nposes = hand_data["pose_motion"]["transform_array"].shape[0]
                 self.vpose_info = hand_data["coord_info"].item()
+                # Bounds of the reach pose grid. The z coordinate is not
+                # clamped to the grid minimum, see
+                # `_trilinear_interpolate_poses`.
+                self._reach_min = np.array(
+                    self.vpose_info["min"][:3], dtype=np.float64
+                )
+                self._reach_max = np.array(
+                    self.vpose_info["max"][:3], dtype=np.float64
+                )
+                self._reach_num_bins = np.array(
+                    self.vpose_info["num_bins"][:3], dtype=np.int64
+                )
+                self._reach_clamp_min = np.array(
+                    [self._reach_min[0], self._reach_min[1], 0.0]
+                )
                 hand_motion = Motion(
                     hand_data["pose_motion"]["joints_array"].reshape(
                         nposes, -1, 4
@@ -100,9 +114,16 @@ class HumanoidRearrangeController(HumanoidBaseController):
                     None,
                     1,
                 )
-                self.hand_processed_data[hand_name] = self.build_ik_vectors(
+                joints, rotations, translations = self.build_ik_vectors(
                     hand_motion
                 )
+                # Contiguous tables of the poses, indexed by grid bin, with
+                # the stop pose last.
+                self.hand_processed_data[hand_name] = (
+                    np.ascontiguousarray(np.concatenate(joints)),
+                    np.ascontiguousarray(np.concatenate(rotations)),
+                    np.ascontiguousarray(np.concatenate(translations)),
+                )
             else:
                 self.hand_processed_data[hand_name] = None
 
@@ -485,121 +506,155 @@ class HumanoidRearrangeController(HumanoidBaseController):
         Given a 3D coordinate position, computes humanoid's joints, rotations and
         translations to reach that position, doing trilinear interpolation.
         """
+        joints, rotations, translations = self._trilinear_interpolate_poses(
+            np.array([[position.x, position.y, position.z]]), hand_data
+        )
+        quat_rot = mn.Quaternion(
+            mn.Vector3(rotations[0, :3]), rotations[0, -1]
+        )
+        joint_list = list(joints[0].reshape(-1))
+        transform = mn.Matrix4.from_(
+            quat_rot.to_matrix(), mn.Vector3(translations[0])
+        )
+        return joint_list, transform
+
+    def _trilinear_interpolate_poses(self, positions, hand_data):
+        """
+        Batched version of `_trilinear_interpolate_pose`. Given N 3D coordinate
+        positions as an N x 3 array, computes the humanoid joints (N x J x 4),
+        root rotations (N x 4) and root translations (N x 3) to reach each
+        position, interpolating all the positions at once.
+        """
         assert hand_data is not None
 
         joints, rotations, translations = hand_data
-
-        def find_index_quant(minv, maxv, num_bins, value, interp=False):
-            # Find the quantization bins where a given value falls
-            # E.g. if we have 3 points, min=0, max=1, value=0.75, it
-            # will fall between 1 and 2
-            if interp:
-                value = max(min(value, maxv), 0)
-            else:
-                value = max(min(value, maxv), minv)
-            value = min(value, maxv)
-            value_norm = (value - minv) / (maxv - minv)
-
-            index = value_norm * (num_bins - 1)
-
-            lower = min(math.floor(index), num_bins - 1)
-            upper = max(min(math.ceil(index), num_bins - 1), 0)
-            value_norm_t = index - lower
-            if lower < 0:
-                min_poss_val = 0.0
-                lower = (min_poss_val - minv) * (num_bins - 1) / (maxv - minv)
-                value_norm_t = (index - lower) / -lower
-                lower = -1
-
-            return lower, upper, value_norm_t
-
-        def comp_inter(x_i, y_i, z_i):
-            # Given an integer index from 0 to num_bins - 1
-            # on each dimension, compute the final index
-
-            if y_i < 0 or x_i < 0 or z_i < 0:
-                return -1
-            index = (
-                y_i
-                * self.vpose_info["num_bins"][0]
-                * self.vpose_info["num_bins"][2]
-                + x_i * self.vpose_info["num_bins"][2]
-                + z_i
+        num_bins = self._reach_num_bins
+
+        # For every dimension, the lower and upper bins (N x 3) of each
+        # position and the interpolation weight of the upper bin.
+        # Positions are clamped to the grid, except for z where the positions
+        # between 0 and the grid are interpolated with the stop pose, which
+        # is stored at index -1.
+        values = np.maximum(
+            np.minimum(positions, self._reach_max), self._reach_clamp_min
+        )
+        values = np.minimum(values, self._reach_max)
+        index = (
+            (values - self._reach_min)
+            / (self._reach_max - self._reach_min)
+            * (num_bins - 1)
+        )
+        lower = np.minimum(np.floor(index), num_bins - 1)
+        upper = np.maximum(np.minimum(np.ceil(index), num_bins - 1), 0)
+        weight = index - lower
+        below_grid = lower < 0
+        if below_grid.any():
+            # Index of the coordinate 0, below the grid
+            zero_index = np.broadcast_to(
+                -self._reach_min
+                * (num_bins - 1)
+                / (self._reach_max - self._reach_min),
+                index.shape,
+            )
+            weight = np.where(
+                below_grid,
+                (index - zero_index) / np.where(below_grid, -zero_index, 1.0),
+                weight,
             )
-            return index
-
-        def normalize_quat(quat_tens):
-            # The last dimension contains the quaternion
-            return quat_tens / np.linalg.norm(quat_tens, axis=-1)[..., None]
-
-        def inter_data(x_i, y_i, z_i, dat, is_quat=False):
-            """
-            General trilinear interpolation function. Performs trilinear interpolation,
-            normalizing the result if the values are represented as quaternions (is_quat)
-
-            :param x_i, y_i, z_i: For the x,y,z dimensions, specifies the lower, upper, and normalized value
-            so that we can perform interpolation in 3 dimensions
-            :param data: the values we want to interpolate.
-            :param is_quat: used to normalize the value in case we are interpolating quaternions
-
-            """
-            x0, y0, z0 = x_i[0], y_i[0], z_i[0]
-            x1, y1, z1 = x_i[1], y_i[1], z_i[1]
-            xd, yd, zd = x_i[2], y_i[2], z_i[2]
-            c000 = dat[comp_inter(x0, y0, z0)]
-            c001 = dat[comp_inter(x0, y0, z1)]
-            c010 = dat[comp_inter(x0, y1, z0)]
-            c011 = dat[comp_inter(x0, y1, z1)]
-            c100 = dat[comp_inter(x1, y0, z0)]
-            c101 = dat[comp_inter(x1, y0, z1)]
-            c110 = dat[comp_inter(x1, y1, z0)]
-            c111 = dat[comp_inter(x1, y1, z1)]
-
-            c00 = c000 * (1 - xd) + c100 * xd
-            c01 = c001 * (1 - xd) + c101 * xd
-            c10 = c010 * (1 - xd) + c110 * xd
-            c11 = c011 * (1 - xd) + c111 * xd
-
-            c0 = c00 * (1 - yd) + c10 * yd
-            c1 = c01 * (1 - yd) + c11 * yd
-
-            c = c0 * (1 - zd) + c1 * zd
+            lower = np.where(below_grid, -1, lower)
+        lower = lower.astype(np.int64)
+        upper = upper.astype(np.int64)
+
+        # Grid index of the 2 x 2 x 2 corners of each position, indexed by
+        # [x, y, z, position], -1 (the stop pose) if a bin is below the grid.
+        bins = np.stack([lower.T, upper.T])
+        xs, ys, zs = bins[:, 0], bins[:, 1], bins[:, 2]
+        corners = (
+            ys[None, :, None] * (num_bins[0] * num_bins[2])
+            + xs[:, None, None] * num_bins[2]
+            + zs[None, None, :]
+        )
+        corners[
+            (xs < 0)[:, None, None]
+            | (ys < 0)[None, :, None]
+            | (zs < 0)[None, None, :]
+        ] = -1
+
+        def inter_data(dat, is_quat=False):
+            # Linear interpolations along x, y then z, for all the positions
+            # at once.
+            shape = (-1,) + (1,) * (dat.ndim - 1)
+            xd, yd, zd = (w.reshape(shape) for w in weight.T)
+            c = dat[corners]
+            c = c[0] * (1 - xd) + c[1] * xd
+            c = c[0] * (1 - yd) + c[1] * yd
+            c = c[0] * (1 - zd) + c[1] * zd
             if is_quat:
-                c = normalize_quat(c)
-
+                c = c / np.linalg.norm(c, axis=-1)[..., None]
             return c
 
-        relative_pos = position
-        x_diff, y_diff, z_diff = relative_pos.x, relative_pos.y, relative_pos.z
-        coord_diff = [x_diff, y_diff, z_diff]
-        coord_data = [
-            (
-                self.vpose_info["min"][ind_diff],
-                self.vpose_info["max"][ind_diff],
-                self.vpose_info["num_bins"][ind_diff],
-                coord_diff[ind_diff],
-            )
-            for ind_diff in range(3)
-        ]
-        # each value contains the lower, upper index and distance
-        interp = [False, False, True]
-        x_ind, y_ind, z_ind = [
-            find_index_quant(*data, interp)
-            for interp, data in zip(interp, coord_data)
-        ]
+        return (
+            inter_data(joints, is_quat=True),
+            inter_data(rotations, is_quat=True),
+            inter_data(translations),
+        )
 
-        data_trans = np.concatenate(translations)
-        data_rot = np.concatenate(rotations)
-        data_joint = np.concatenate(joints)
-        res_joint = inter_data(x_ind, y_ind, z_ind, data_joint, is_quat=True)
-        res_trans = inter_data(x_ind, y_ind, z_ind, data_trans)
-        res_rot = inter_data(x_ind, y_ind, z_ind, data_rot, is_quat=True)
-        quat_rot = mn.Quaternion(mn.Vector3(res_rot[:3]), res_rot[-1])
-        joint_list = list(res_joint.reshape(-1))
-        transform = mn.Matrix4.from_(
-            quat_rot.to_matrix(), mn.Vector3(res_trans)
+    def _get_reach_inv_transform(self):
+        """
+        Matrix (3 x 3) rotating a world offset from the humanoid root into the
+        frame of the reach pose grid.
+        """
+        inv_T = (
+            mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
+            @ mn.Matrix4.rotation_x(mn.Rad(-np.pi / 2.0))
+            @ self.obj_transform_base.inverted()
         )
-        return joint_list, transform
+        # The columns are the images of the basis vectors.
+        return np.array(
+            [
+                inv_T.transform_vector(mn.Vector3.x_axis()),
+                inv_T.transform_vector(mn.Vector3.y_axis()),
+                inv_T.transform_vector(mn.Vector3.z_axis()),
+            ]
+        ).T
+
+    def calculate_reach_poses(self, obj_positions, index_hand=0):
+        """
+        Computes the poses for the humanoid to reach each of the N positions
+        in obj_positions (N x 3) with the hand, from its current base transform,
+        in a single vectorized pass. Unlike `calculate_reach_pose`, the pose of
+        the humanoid is not updated.
+        index_hand is 0 or 1 corresponding to the left or right hand
+
+        :return: The joint rotations as quaternions (N x 4J), to use as
+            `joint_pose`, and the N corresponding `obj_transform_offset`.
+        """
+        assert index_hand < 2
+        hand_name = self._hand_names[index_hand]
+        hand_data = self.hand_processed_data[hand_name]
+        assert hand_data is not None, f"No reach poses for {hand_name}"
+
+        root_pos = np.array(self.obj_transform_base.translation)
+        relative_pos = (
+            np.asarray(obj_positions, dtype=np.float64).reshape(-1, 3)
+            - root_pos
+        ) @ self._get_reach_inv_transform().T
+        joints, rotations, translations = self._trilinear_interpolate_poses(
+            relative_pos, hand_data
+        )
+
+        offset_rot = mn.Matrix4.rotation_y(
+            mn.Rad(-np.pi / 2.0)
+        ) @ mn.Matrix4.rotation_z(mn.Rad(-np.pi / 2.0))
+        transforms = [
+            offset_rot
+            @ mn.Matrix4.from_(
+                mn.Quaternion(mn.Vector3(rot[:3]), rot[-1]).to_matrix(),
+                mn.Vector3(trans),
+            )
+            for rot, trans in zip(rotations, translations)
+        ]
+        return joints.reshape(len(joints), -1), transforms
 
     def calculate_reach_pose(self, obj_pos: mn.Vector3, index_hand=0):
         """
@@ -610,24 +665,11 @@ class HumanoidRearrangeController(HumanoidBaseController):
         hand_name = self._hand_names[index_hand]
         assert hand_name in self.hand_processed_data
         hand_data = self.hand_processed_data[hand_name]
-        root_pos = self.obj_transform_base.translation
-        inv_T = (
-            mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
-            @ mn.Matrix4.rotation_x(mn.Rad(-np.pi / 2.0))
-            @ self.obj_transform_base.inverted()
-        )
-        relative_pos = inv_T.transform_vector(obj_pos - root_pos)
 
         # TODO
         if hand_data is not None:
-            curr_poses, curr_transform = self._trilinear_interpolate_pose(
-                mn.Vector3(relative_pos), hand_data
+            joints, transforms = self.calculate_reach_poses(
+                [list(obj_pos)], index_hand
             )
-
-            self.obj_transform_offset = (
-                mn.Matrix4.rotation_y(mn.Rad(-np.pi / 2.0))
-                @ mn.Matrix4.rotation_z(mn.Rad(-np.pi / 2.0))
-                @ curr_transform
-            )
-
-            self.joint_pose = curr_poses
+            self.obj_transform_offset = transforms[0]
+            self.joint_pose = list(joints[0])
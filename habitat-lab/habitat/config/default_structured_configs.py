@@ -36,6 +36,7 @@ __all__ = [
     "SPLMeasurementConfig",
     "SoftSPLMeasurementConfig",
     "DistanceToGoalRewardMeasurementConfig",
+    "GeodesicCacheStatsMeasurementConfig",
     # NAVIGATION LAB SENSORS
     "ObjectGoalSensorConfig",
     "InstanceImageGoalSensorConfig",
@@ -110,6 +111,18 @@ class IteratorOptionsConfig(HabitatBaseConfig):
     step_repetition_range: float = 0.2
 
 
+@dataclass
+class StepProfilerConfig(HabitatBaseConfig):
+    r"""
+    Per-step profiler of the environment (see `habitat.utils.step_profiler`).
+
+    :property enabled: If True, the latency of the environment step, of the task step, of each action, measure and sensor is recorded into per-component histograms, which are returned by `Env.get_step_profile` (use `VectorEnv.call` to get them from each worker).
+    :property max_trace_events: Number of most recent profiled ranges kept as Chrome trace events, returned by `Env.get_step_profile_trace`. No trace is kept if 0.
+    """
+    enabled: bool = False
+    max_trace_events: int = 0
+
+
 @dataclass
 class EnvironmentConfig(HabitatBaseConfig):
     r"""
@@ -117,10 +130,12 @@ class EnvironmentConfig(HabitatBaseConfig):
 
     :property max_episode_steps: The maximum number of environment steps before the episode ends.
     :property max_episode_seconds: The maximum number of wall-clock seconds before the episode ends.
+    :property profiler: The per-step profiler of the environment, see `StepProfilerConfig`.
     """
     max_episode_steps: int = 1000
     max_episode_seconds: int = 10000000
     iterator_options: IteratorOptionsConfig = IteratorOptionsConfig()
+    profiler: StepProfilerConfig = StepProfilerConfig()
 
 
 # -----------------------------------------------------------------------------
@@ -727,7 +742,15 @@ class InstructionSensorConfig(LabSensorConfig):
 # -----------------------------------------------------------------------------
 @dataclass
 class MeasurementConfig(HabitatBaseConfig):
+    r"""
+    Base class of the measure configurations.
+
+    :property update_mode: When the measure is updated. `step` updates it at every step. `lazy` only updates it when the metrics are read (`Env.get_metrics`), from the state of the last step. The measures that accumulate over steps (like `top_down_map`, `collisions` or `spl`) can't be lazy, use `periodic` for them. `periodic` updates it every `update_period` steps. The measures that can end the episode and the measures that the reward measure, the success measure, a measure that can end the episode or a `step` measure depend on are always updated at every step. `RLTaskEnv` (used by habitat-baselines) only updates the lazy measures for the info of the last step of each episode.
+    :property update_period: Number of steps between two updates of a `periodic` measure.
+    """
     type: str = MISSING
+    update_mode: str = "step"
+    update_period: int = 1
 
 
 @dataclass
@@ -790,6 +813,11 @@ class TopDownMapMeasurementConfig(MeasurementConfig):
     # axes aligned bounding boxes
     draw_goal_aabbs: bool = True
     fog_of_war: FogOfWarConfig = FogOfWarConfig()
+    # Number of top-down maps (with their border) of the previous episodes
+    # kept by scene, navmesh, floor and resolution to be reused by the next
+    # episodes.
+    # 0 to compute the map of every episode.
+    map_cache_size: int = 8
 
 
 @dataclass
@@ -1366,11 +1394,35 @@ class DistanceToGoalRewardMeasurementConfig(MeasurementConfig):
     type: str = "DistanceToGoalReward"
 
 
+@dataclass
+class GeodesicCacheStatsMeasurementConfig(MeasurementConfig):
+    r"""
+    Hits, misses and hit rate of the geodesic distance cache of the simulator (see `habitat.simulator.geodesic_cache`) since the start of the episode. Empty if the cache is disabled.
+    """
+    type: str = "GeodesicCacheStats"
+
+
 @dataclass
 class AnswerAccuracyMeasurementConfig(MeasurementConfig):
     type: str = "AnswerAccuracy"
 
 
+@dataclass
+class SpawnCacheConfig(HabitatBaseConfig):
+    r"""Configuration of the cache of the articulated agent starts of the rearrange tasks, shared by the workers through a memory-mapped file. It can be filled before training with `habitat/datasets/rearrange/generate_episode_inits.py`.
+
+    :property path: Path of the memory-mapped file of the cache. If empty, the starts are instead cached in a pickle file next to the dataset when `habitat.task.should_save_to_cache` is set.
+    :property capacity: Maximum number of cached starts.
+    :property ways: Number of entries per set of the cache.
+    :property read_only: Only read the cached starts, the starts that are not cached are sampled but not added to the cache.
+    """
+
+    path: str = ""
+    capacity: int = 2**20
+    ways: int = 8
+    read_only: bool = False
+
+
 @dataclass
 class TaskConfig(HabitatBaseConfig):
     r"""
@@ -1386,6 +1438,7 @@ class TaskConfig(HabitatBaseConfig):
     :property spawn_max_dists_to_obj: For `RearrangePickTask-v0` task only. Controls the maximum distance the robot can be spawned from the target object.
     :property base_angle_noise: For Rearrangement tasks only. Controls the standard deviation of the random normal noise applied to the base's rotation angle at the start of an episode.
     :property base_noise: For Rearrangement tasks only. Controls the standard deviation of the random normal noise applied to the base's position at the start of an episode.
+    :property batched_nav_sensors: For Navigation tasks only. If True, the GPS, compass, heading and pointgoal sensors are not computed by each environment but for all the environments of a `VectorEnv` at once in `VectorEnv.post_step`, which must be set up with `VectorEnv.initialize_batched_nav_sensors`. Not supported by the VER trainer.
 
     There are many different Tasks determined by the `habitat.task.type` config:
 
@@ -1410,6 +1463,7 @@ class TaskConfig(HabitatBaseConfig):
     success_reward: float = 2.5
     slack_reward: float = -0.01
     end_on_success: bool = False
+    batched_nav_sensors: bool = False
     # NAVIGATION task
     type: str = "Nav-v0"
     # Temporary structure for sensors
@@ -1432,6 +1486,7 @@ class TaskConfig(HabitatBaseConfig):
     force_regenerate: bool = False
     # Saves the generated starts to a cache if they are not already generated
     should_save_to_cache: bool = False
+    spawn_cache: SpawnCacheConfig = SpawnCacheConfig()
     object_in_hand_sample_prob: float = 0.167
     min_start_distance: float = 3.0
     gfx_replay_dir = "data/replays"
@@ -1707,6 +1762,38 @@ class RendererConfig(HabitatBaseConfig):
     classic_replay_renderer: bool = False
 
 
+@dataclass
+class GeodesicCacheConfig(HabitatBaseConfig):
+    r"""Configuration of the geodesic distance cache of the simulator.
+
+    :property enabled: Whether to cache the geodesic distances.
+    :property capacity: Maximum number of cached distances.
+    :property ways: Number of entries per set of the cache. Entries can only evict the least recently used entry of their set.
+    :property quantization: Size in meters of the grid cells that start positions are snapped to. Starts in the same cell share the cached distance.
+    :property path: If set, the cache is a memory-mapped file at this path, shared by all the simulators on the node that use the same path. Otherwise each simulator has its own cache.
+    """
+
+    enabled: bool = False
+    capacity: int = 65536
+    ways: int = 8
+    quantization: float = 0.01
+    path: str = ""
+
+
+@dataclass
+class ScenePoolConfig(HabitatBaseConfig):
+    r"""Configuration of the pool of recently used scenes of the `RearrangeSim`. For each pooled scene, the navmesh, the receptacles and the object template handles are kept in memory, so switching back to the scene does not read them from disk or recompute them.
+
+    :property enabled: Whether to pool the recently used scenes.
+    :property max_bytes: Memory budget of the pool. The least recently used scenes are evicted when the pooled scenes use more memory.
+    :property max_scenes: Maximum number of pooled scenes.
+    """
+
+    enabled: bool = False
+    max_bytes: int = 512 * 1024 * 1024
+    max_scenes: int = 8
+
+
 @dataclass
 class HabitatSimV0Config(HabitatBaseConfig):
     gpu_device_id: int = 0
@@ -1797,6 +1884,8 @@ class SimulatorConfig(HabitatBaseConfig):
     object_ids_start: int = 100
     # Configuration for rendering
     renderer: RendererConfig = RendererConfig()
+    geodesic_cache: GeodesicCacheConfig = GeodesicCacheConfig()
+    scene_pool: ScenePoolConfig = ScenePoolConfig()
 
 
 @dataclass
@@ -2413,6 +2502,12 @@ cs.store(
     name="distance_to_goal_reward",
     node=DistanceToGoalRewardMeasurementConfig,
 )
+cs.store(
+    package="habitat.task.measurements.geodesic_cache_stats",
+    group="habitat/task/measurements",
+    name="geodesic_cache_stats",
+    node=GeodesicCacheStatsMeasurementConfig,
+)
 cs.store(
     package="habitat.task.measurements.success",
     group="habitat/task/measurements",
@@ -24,12 +24,14 @@ from typing import (
     Sequence,
     TypeVar,
     Union,
+    cast,
 )
 
 import attr
 import numpy as np
 from numpy import ndarray
 
+from habitat.core.episode_store import LazyEpisodeIterator, LazyEpisodeSequence
 from habitat.core.utils import DatasetJSONEncoder, not_none_validator
 
 if TYPE_CHECKING:
@@ -109,8 +111,13 @@ T = TypeVar("T", bound=Episode)
 
 
 class Dataset(Generic[T]):
-    r"""Base class for dataset specification."""
-    episodes: List[T]
+    r"""Base class for dataset specification.
+
+    :py:`episodes` is either a list of episodes or, for datasets loaded
+    from a compact episode file, a :ref:`LazyEpisodeSequence` that only
+    builds an episode when it is accessed.
+    """
+    episodes: Union[List[T], LazyEpisodeSequence[T]]
 
     @staticmethod
     def scene_from_scene_path(scene_path: str) -> str:
@@ -142,12 +149,24 @@ class Dataset(Generic[T]):
         r"""Returns a filter function that takes an episode and returns True if that
         episode is valid under the content_scenes feild of the provided config
         """
-        scenes_to_load = set(config.content_scenes)
+        scene_id_filter = cls.build_content_scene_id_filter(config)
 
         def _filter(ep: T) -> bool:
+            return scene_id_filter(ep.scene_id)
+
+        return _filter
+
+    @classmethod
+    def build_content_scene_id_filter(cls, config) -> Callable[[str], bool]:
+        r"""Same as :ref:`build_content_scenes_filter` but the returned
+        function takes a scene id instead of an episode.
+        """
+        scenes_to_load = set(config.content_scenes)
+
+        def _filter(scene_id: str) -> bool:
             return (
                 ALL_SCENES_MASK in scenes_to_load
-                or cls.scene_from_scene_path(ep.scene_id) in scenes_to_load
+                or cls.scene_from_scene_path(scene_id) in scenes_to_load
             )
 
         return _filter
@@ -160,14 +179,27 @@ class Dataset(Generic[T]):
     @property
     def scene_ids(self) -> List[str]:
         r"""unique scene ids present in the dataset."""
+        if isinstance(self.episodes, LazyEpisodeSequence):
+            return sorted(self.episodes.scene_ids)
         return sorted({episode.scene_id for episode in self.episodes})
 
+    @property
+    def episode_scene_ids(self) -> List[str]:
+        r"""scene id of each episode of the dataset, in order."""
+        if isinstance(self.episodes, LazyEpisodeSequence):
+            return [
+                self.episodes.scene_id(i) for i in range(len(self.episodes))
+            ]
+        return [episode.scene_id for episode in self.episodes]
+
     def get_scene_episodes(self, scene_id: str) -> List[T]:
         r"""..
 
         :param scene_id: id of scene in scene dataset.
         :return: list of episodes for the :p:`scene_id`.
         """
+        if isinstance(self.episodes, LazyEpisodeSequence):
+            return list(self.episodes.filter_by_scene(lambda s: s == scene_id))
         return list(
             filter(lambda x: x.scene_id == scene_id, iter(self.episodes))
         )
@@ -299,15 +331,28 @@ class Dataset(Generic[T]):
         rand_items = np.random.choice(
             self.num_episodes, num_episodes, replace=False
         ).tolist()
+        lazy_episodes = isinstance(self.episodes, LazyEpisodeSequence)
         if collate_scene_ids:
             scene_ids: Dict[str, List[int]] = {}
             for rand_ind in rand_items:
-                scene = self.episodes[rand_ind].scene_id
+                scene = (
+                    self.episodes.scene_id(rand_ind)  # type: ignore[union-attr]
+                    if lazy_episodes
+                    else self.episodes[rand_ind].scene_id
+                )
                 if scene not in scene_ids:
                     scene_ids[scene] = []
                 scene_ids[scene].append(rand_ind)
             rand_items = []
             list(map(rand_items.extend, scene_ids.values()))
+        if lazy_episodes:
+            return self._get_lazy_splits(
+                split_lengths,
+                rand_items,
+                remove_unused_episodes,
+                sort_by_episode_id,
+            )
+
         ep_ind = 0
         new_episodes = []
         for nn in range(num_splits):
@@ -324,6 +369,31 @@ class Dataset(Generic[T]):
             self.episodes = new_episodes
         return new_datasets
 
+    def _get_lazy_splits(
+        self,
+        split_lengths: List[int],
+        rand_items: List[int],
+        remove_unused_episodes: bool,
+        sort_by_episode_id: bool,
+    ) -> List["Dataset"]:
+        r"""Version of :ref:`get_splits` for lazy episodes, the splits are
+        views of the same compact episode files.
+        """
+        episodes = cast(LazyEpisodeSequence[T], self.episodes)
+        new_datasets = []
+        split_start = 0
+        for split_length in split_lengths:
+            indices = rand_items[split_start : split_start + split_length]
+            split_start += split_length
+            if sort_by_episode_id:
+                indices = sorted(indices, key=episodes.episode_id)
+            new_dataset = copy.copy(self)  # Creates a shallow copy
+            new_dataset.episodes = episodes.take(indices)
+            new_datasets.append(new_dataset)
+        if remove_unused_episodes:
+            self.episodes = episodes.take(rand_items[:split_start])
+        return new_datasets
+
 
 class EpisodeIterator(Iterator[T]):
     r"""Episode Iterator class that gives options for how a list of episodes
@@ -392,11 +462,19 @@ class EpisodeIterator(Iterator[T]):
 
         # sample episodes
         if num_episode_sample >= 0:
-            episodes = np.random.choice(  # type: ignore[assignment]
-                episodes, num_episode_sample, replace=False  # type: ignore[arg-type]
-            )
+            if isinstance(episodes, LazyEpisodeSequence):
+                episodes = episodes.take(
+                    np.random.choice(
+                        len(episodes), num_episode_sample, replace=False
+                    )
+                )
+            else:
+                episodes = np.random.choice(  # type: ignore[assignment]
+                    episodes, num_episode_sample, replace=False  # type: ignore[arg-type]
+                )
 
-        if not isinstance(episodes, list):
+        # Lazy episodes are kept lazy, they are only built when yielded
+        if not isinstance(episodes, (list, LazyEpisodeSequence)):
             episodes = list(episodes)
 
         self.episodes = episodes
@@ -405,7 +483,10 @@ class EpisodeIterator(Iterator[T]):
         self.shuffle = shuffle
 
         if shuffle:
-            random.shuffle(self.episodes)
+            if isinstance(self.episodes, LazyEpisodeSequence):
+                self.episodes = self.episodes.shuffled(random)
+            else:
+                random.shuffle(self.episodes)
 
         if group_by_scene:
             self.episodes = self._group_scenes(self.episodes)
@@ -455,6 +536,13 @@ class EpisodeIterator(Iterator[T]):
         return next_episode
 
     def set_next_episode_by_id(self, episode_id):
+        if isinstance(self.episodes, LazyEpisodeSequence):
+            for i in range(len(self.episodes)):
+                if self.episodes.episode_id(i) == episode_id:
+                    self._iterator = iter(self.episodes[i:])
+                    return
+            raise ValueError(f"Episode with ID {episode_id} not found.")
+
         self._iterator = iter(self.episodes)
         for episode in self.episodes:
             if episode.episode_id == episode_id:
@@ -467,6 +555,12 @@ class EpisodeIterator(Iterator[T]):
         r"""Internal method to switch the scene. Moves remaining episodes
         from current scene to the end and switch to next scene episodes.
         """
+        if isinstance(self._iterator, LazyEpisodeIterator):
+            self._iterator = iter(
+                self._iterator.remaining().first_scene_group_last()
+            )
+            return
+
         grouped_episodes = [
             list(g)
             for k, g in groupby(self._iterator, key=lambda x: x.scene_id)
@@ -483,6 +577,13 @@ class EpisodeIterator(Iterator[T]):
         If self.group_by_scene is true, then shuffle groups of scenes.
         """
         assert self.shuffle
+        if isinstance(self._iterator, LazyEpisodeIterator):
+            remaining = self._iterator.remaining().shuffled(random)
+            if self.group_by_scene:
+                remaining = remaining.grouped_by_scene()
+            self._iterator = iter(remaining)
+            return
+
         episodes = list(self._iterator)
 
         random.shuffle(episodes)
@@ -504,6 +605,9 @@ class EpisodeIterator(Iterator[T]):
         """
         assert self.group_by_scene
 
+        if isinstance(episodes, LazyEpisodeSequence):
+            return episodes.grouped_by_scene()  # type: ignore[return-value]
+
         scene_sort_keys: Dict[str, int] = {}
         for e in episodes:
             if e.scene_id not in scene_sort_keys:
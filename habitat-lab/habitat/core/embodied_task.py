@@ -9,7 +9,17 @@ r"""Implements task and measurements needed for training and benchmarking of
 
 import time
 from collections import OrderedDict
-from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 from omegaconf import OmegaConf
@@ -17,6 +27,7 @@ from omegaconf import OmegaConf
 from habitat.core.dataset import Dataset, Episode
 from habitat.core.simulator import Observations, SensorSuite, Simulator
 from habitat.core.spaces import ActionSpace, EmptySpace, Space
+from habitat.utils.step_profiler import StepProfiler
 
 if TYPE_CHECKING:
     from omegaconf import DictConfig
@@ -87,6 +98,13 @@ class Measure:
     :data uuid: universally unique id.
     :data _metric: metric for the :ref:`Measure`, this has to be updated with
         each :ref:`step() <env.Env.step()>` call on :ref:`env.Env`.
+    :data ends_episode: whether the measure can end the episode (for example
+        by setting :py:`task.should_end`), in which case it is updated at
+        every step whatever its update mode.
+    :data accumulates_over_steps: whether the metric builds up over the
+        steps (for example a count, a path length or a drawn trajectory),
+        so it can't be updated lazily from the last step only. It can still
+        be updated periodically, at the cost of a coarser metric.
 
     This can be used for tracking statistics when running experiments. The
     user of this class needs to implement the :ref:`reset_metric()` and
@@ -98,6 +116,8 @@ class Measure:
 
     _metric: Any
     uuid: str
+    ends_episode: bool = False
+    accumulates_over_steps: bool = False
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self.uuid = self._get_uuid(*args, **kwargs)
@@ -126,6 +146,9 @@ class Measure:
         return self._metric
 
 
+MEASURE_UPDATE_MODES = ("step", "lazy", "periodic")
+
+
 class Metrics(dict):
     r"""Dictionary containing measurements."""
 
@@ -144,6 +167,13 @@ class Metrics(dict):
 class Measurements:
     r"""Represents a set of Measures, with each :ref:`Measure` being
     identified through a unique id.
+
+    By default, every measure is updated at every step. A measure can instead
+    be updated lazily or periodically (see :ref:`set_update_mode`). Measures
+    declare the measures they read with :ref:`check_measure_dependencies`,
+    and any measure that a per-step measure (or a measure from
+    :ref:`set_required_measures`) transitively depends on is still updated
+    at every step.
     """
 
     measures: Dict[str, Measure]
@@ -161,23 +191,167 @@ class Measurements:
             ), "'{}' is duplicated measure uuid".format(measure.uuid)
             self.measures[measure.uuid] = measure
 
+        self._update_modes: Dict[str, Tuple[str, int]] = {}
+        self._required_measures: List[str] = []
+        self._dependencies: Dict[str, List[str]] = {}
+        # (measure, update period) of the measures updated in
+        # `update_measures`, in the order of `measures`. None if it needs to
+        # be recomputed.
+        self._update_plan: Optional[List[Tuple[Measure, int]]] = None
+        self._all_updated_every_step = True
+        self._stale_measures: List[Measure] = []
+        self._last_update_args: Optional[Tuple[tuple, Any, dict]] = None
+        self._num_steps = 0
+
+    def set_update_mode(
+        self, measure_name: str, mode: str, period: int = 1
+    ) -> None:
+        r"""Sets when a measure is updated.
+
+        :param measure_name: uuid of the measure.
+        :param mode: :py:`"step"` to update the measure at every step,
+            :py:`"lazy"` to only update it when the metrics are read with
+            :ref:`get_metrics`, from the arguments of the last step, or
+            :py:`"periodic"` to update it every :p:`period` steps. Measures
+            that accumulate over steps (see
+            :ref:`Measure.accumulates_over_steps`) can't be lazy. The
+            measures reading a non-per-step measure must declare it with
+            :ref:`check_measure_dependencies`.
+        :param period: Number of steps between two updates of a periodic
+            measure.
+        """
+        assert (
+            mode in MEASURE_UPDATE_MODES
+        ), f"Unknown update mode {mode} for {measure_name}, must be one of {MEASURE_UPDATE_MODES}"
+        assert period >= 1, f"Update period of {measure_name} must be >= 1"
+        assert not (
+            mode == "lazy"
+            and self.measures[measure_name].accumulates_over_steps
+        ), f"{measure_name} accumulates over steps and can't be lazy, use a periodic update instead"
+        self._update_modes[measure_name] = (mode, period)
+        self._update_plan = None
+
+    def set_required_measures(self, measure_names: Iterable[str]) -> None:
+        r"""Measures that are updated at every step whatever their update
+        mode, together with their dependencies. For example the reward and
+        success measures.
+        """
+        self._required_measures = [
+            name for name in measure_names if name in self.measures
+        ]
+        self._update_plan = None
+
+    def _with_dependencies(self, measure_names: Iterable[str]) -> Set[str]:
+        r"""The measures reachable from :p:`measure_names` in the dependency
+        graph, including them.
+        """
+        to_visit = list(measure_names)
+        reachable = set()
+        while len(to_visit) > 0:
+            name = to_visit.pop()
+            if name in reachable:
+                continue
+            reachable.add(name)
+            to_visit.extend(self._dependencies.get(name, []))
+        return reachable
+
+    def _get_update_plan(self) -> List[Tuple[Measure, int]]:
+        if self._update_plan is not None:
+            return self._update_plan
+
+        # Measures reachable from the per-step measures in the dependency
+        # graph are needed at every step.
+        per_step = self._with_dependencies(
+            [
+                *self._required_measures,
+                *(
+                    name
+                    for name in self.measures
+                    if self._update_modes.get(name, ("step", 1))[0] == "step"
+                ),
+            ]
+        )
+
+        self._update_plan = []
+        for name, measure in self.measures.items():
+            mode, period = self._update_modes.get(name, ("step", 1))
+            if name in per_step:
+                self._update_plan.append((measure, 1))
+            elif mode == "periodic":
+                self._update_plan.append((measure, period))
+        self._all_updated_every_step = len(per_step) == len(self.measures)
+        return self._update_plan
+
+    def _update_measure(
+        self, measure: Measure, args: tuple, task, kwargs: dict
+    ) -> None:
+        t_start = time.time()
+        measure.update_metric(*args, task=task, **kwargs)
+        measure_name = measure._get_uuid(*args, task=task, **kwargs)
+        task.add_perf_timing(f"measures.{measure_name}", t_start)
+
     def reset_measures(self, *args: Any, **kwargs: Any) -> None:
+        self._num_steps = 0
+        self._stale_measures = []
+        self._last_update_args = None
         for measure in self.measures.values():
             measure.reset_metric(*args, **kwargs)
 
     def update_measures(self, *args: Any, task, **kwargs: Any) -> None:
-        for measure in self.measures.values():
-            t_start = time.time()
-            measure.update_metric(*args, task=task, **kwargs)
-            measure_name = measure._get_uuid(*args, task=task, **kwargs)
-            task.add_perf_timing(f"measures.{measure_name}", t_start)
+        self._num_steps += 1
+        update_plan = self._get_update_plan()
+        if self._all_updated_every_step:
+            # Fast path: every measure is updated at every step.
+            for measure, _ in update_plan:
+                self._update_measure(measure, args, task, kwargs)
+            return
+
+        updated = set()
+        for measure, period in update_plan:
+            if self._num_steps % period == 0:
+                self._update_measure(measure, args, task, kwargs)
+            updated.add(measure.uuid)
+
+        self._stale_measures = [
+            measure
+            for name, measure in self.measures.items()
+            if name not in updated
+        ]
+        self._last_update_args = (args, task, kwargs)
 
-    def get_metrics(self) -> Metrics:
+    def get_metrics(self, update_lazy: bool = True) -> Metrics:
         r"""Collects measurement from all :ref:`Measure`\ s and returns it
         packaged inside :ref:`Metrics`.
+
+        :param update_lazy: Whether to first update the lazy measures that
+            weren't updated since the last step. Otherwise they keep the
+            metric of their last update.
         """
+        if update_lazy:
+            self._update_stale_measures(self.measures.keys())
         return Metrics(self.measures)
 
+    def get_metric(self, measure_name: str) -> Any:
+        r"""Returns the metric of the measure :p:`measure_name`. Unlike
+        :ref:`get_metrics`, only that measure and its dependencies are
+        updated if they are lazy.
+        """
+        self._update_stale_measures(self._with_dependencies([measure_name]))
+        return self.measures[measure_name].get_metric()
+
+    def _update_stale_measures(self, measure_names: Iterable[str]) -> None:
+        if len(self._stale_measures) == 0:
+            return
+        measure_names = set(measure_names)
+        args, task, kwargs = self._last_update_args
+        stale_measures = []
+        for measure in self._stale_measures:
+            if measure.uuid in measure_names:
+                self._update_measure(measure, args, task, kwargs)
+            else:
+                stale_measures.append(measure)
+        self._stale_measures = stale_measures
+
     def _get_measure_index(self, measure_name):
         return list(self.measures.keys()).index(measure_name)
 
@@ -203,6 +377,10 @@ class Measurements:
             ), f"""{measure_name} measure requires be listed after {dependency_measure}
                 in the measures list in the config."""
 
+        if self._dependencies.get(measure_name) != list(dependencies):
+            self._dependencies[measure_name] = list(dependencies)
+            self._update_plan = None
+
 
 class EmbodiedTask:
     r"""Base class for embodied task. ``EmbodiedTask`` holds definition of
@@ -221,6 +399,8 @@ class EmbodiedTask:
 
     :data measurements: set of task measures.
     :data sensor_suite: suite of task sensors.
+    :data step_profiler: profiler of the actions, measures and sensors,
+        shared with the ``Env`` of the task.
     """
 
     _config: Any
@@ -229,6 +409,7 @@ class EmbodiedTask:
     _is_episode_active: bool
     measurements: Measurements
     sensor_suite: SensorSuite
+    step_profiler: StepProfiler
 
     def __init__(
         self,
@@ -241,16 +422,42 @@ class EmbodiedTask:
         self._config = config
         self._sim = sim
         self._dataset = dataset
+        # Disabled until the Env of the task sets its own profiler.
+        self.step_profiler = StepProfiler()
         self._physics_target_sps = config.physics_target_sps
         assert (
             self._physics_target_sps > 0
         ), "physics_target_sps must be positive"
 
-        self.measurements = Measurements(
-            self._init_entities(
-                entities_configs=config.measurements,
-                register_func=registry.get_measure,
-            ).values()
+        measures = self._init_entities(
+            entities_configs=config.measurements,
+            register_func=registry.get_measure,
+        )
+        self.measurements = Measurements(measures.values())
+        for measure_name, measure in measures.items():
+            measure_cfg = OmegaConf.create(config.measurements[measure_name])
+            self.measurements.set_update_mode(
+                measure.uuid,
+                measure_cfg.get("update_mode", "step"),
+                measure_cfg.get("update_period", 1),
+            )
+        # The measures the episode end depends on are needed at every step.
+        self.measurements.set_required_measures(
+            [
+                *(
+                    name
+                    for name in (
+                        config.get("reward_measure"),
+                        config.get("success_measure"),
+                    )
+                    if name is not None
+                ),
+                *(
+                    measure.uuid
+                    for measure in measures.values()
+                    if measure.ends_episode
+                ),
+            ]
         )
 
         self.sensor_suite = SensorSuite(
@@ -269,6 +476,8 @@ class EmbodiedTask:
         self._is_episode_active = False
 
     def add_perf_timing(self, *args, **kwargs):
+        if self.step_profiler.enabled:
+            self.step_profiler.record(*args, **kwargs)
         if hasattr(self._sim, "add_perf_timing"):
             self._sim.add_perf_timing(*args, **kwargs)
 
@@ -321,10 +530,12 @@ class EmbodiedTask:
             action_name in self.actions
         ), f"Can't find '{action_name}' action in {self.actions.keys()}."
         task_action = self.actions[action_name]
-        return task_action.step(
-            **action["action_args"],
-            task=self,
-        )
+        with self.step_profiler.scope(f"actions.{action_name}"):
+            observations = task_action.step(
+                **action["action_args"],
+                task=self,
+            )
+        return observations
 
     def step(self, action: Dict[str, Any], episode: Episode):
         action_name = action["action"]
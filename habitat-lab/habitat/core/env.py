@@ -13,6 +13,7 @@ from typing import (
     Iterator,
     List,
     Optional,
+    Sequence,
     Tuple,
     Union,
     cast,
@@ -26,11 +27,13 @@ from gym import spaces
 from habitat.config import read_write
 from habitat.core.dataset import BaseEpisode, Dataset, Episode, EpisodeIterator
 from habitat.core.embodied_task import EmbodiedTask, Metrics
+from habitat.core.episode_store import LazyEpisodeSequence
 from habitat.core.simulator import Observations, Simulator
 from habitat.datasets import make_dataset
 from habitat.sims import make_sim
 from habitat.tasks.registration import make_task
 from habitat.utils import profiling_wrapper
+from habitat.utils.step_profiler import StepProfiler
 
 if TYPE_CHECKING:
     from omegaconf import DictConfig
@@ -66,6 +69,7 @@ class Env:
     _episode_over: bool
     _episode_from_iter_on_reset: bool
     _episode_force_changed: bool
+    _next_episode_index: Optional[int]
 
     def __init__(
         self, config: "DictConfig", dataset: Optional[Dataset[Episode]] = None
@@ -93,6 +97,7 @@ class Env:
         self._episode_iterator = None
         self._episode_from_iter_on_reset = True
         self._episode_force_changed = False
+        self._next_episode_index = None
 
         # load the first scene if dataset is present
         if self._dataset:
@@ -136,6 +141,16 @@ class Env:
         self._episode_start_time: Optional[float] = None
         self._episode_over = False
 
+        # Each env has its own profiler, shared with its task, so the envs
+        # of a process (e.g. of a ThreadedVectorEnv) don't mix their stats.
+        profiler_config = self._config.environment.profiler
+        self._step_profiler = StepProfiler()
+        self._step_profiler.configure(
+            enabled=profiler_config.enabled,
+            max_trace_events=profiler_config.max_trace_events,
+        )
+        self._task.step_profiler = self._step_profiler
+
     def _setup_episode_iterator(self):
         assert self._dataset is not None
         iter_option_dict = {
@@ -190,9 +205,46 @@ class Env:
         self._dataset.episodes = episodes
         self._setup_episode_iterator()
         self._current_episode = None
+        self._next_episode_index = None
         self._episode_force_changed = True
         self._episode_from_iter_on_reset = True
 
+    def set_next_episode_by_index(self, episode_index: int) -> None:
+        r"""Makes the episode at :p:`episode_index` in :ref:`episodes` the
+        episode of the next :ref:`reset` that would otherwise take an episode
+        from the episode iterator. Unlike setting :ref:`current_episode`,
+        this doesn't end the current episode, so an external scheduler can
+        choose the next episode while the current one runs.
+        """
+        assert (
+            0 <= episode_index < len(self.episodes)
+        ), f"Episode index {episode_index} is out of range."
+        self._next_episode_index = episode_index
+
+    def get_episode_scene_ids(self) -> List[str]:
+        r"""Scene id of each episode in :ref:`episodes`, in order."""
+        return self._dataset.episode_scene_ids if self._dataset else []
+
+    def get_episode_ids(self) -> List[str]:
+        r"""Id of each episode in :ref:`episodes`, in order."""
+        episodes = self.episodes
+        if isinstance(episodes, LazyEpisodeSequence):
+            # Doesn't decode the episodes.
+            return [episodes.episode_id(i) for i in range(len(episodes))]
+        return [ep.episode_id for ep in episodes]
+
+    def select_episodes_by_index(self, episode_indices: Sequence[int]) -> None:
+        r"""Keeps only the episodes at :p:`episode_indices` in
+        :ref:`episodes`, for example the episodes of an evaluation shard.
+        The next :ref:`reset` starts an episode of the selection.
+        """
+        episodes = self.episodes
+        if isinstance(episodes, LazyEpisodeSequence):
+            # Doesn't decode the episodes.
+            self.episodes = episodes.take(episode_indices)  # type: ignore
+        else:
+            self.episodes = [episodes[i] for i in episode_indices]
+
     @property
     def sim(self) -> Simulator:
         return self._sim
@@ -216,8 +268,14 @@ class Env:
         ), "Elapsed seconds requested before episode was started."
         return time.time() - self._episode_start_time
 
-    def get_metrics(self) -> Metrics:
-        return self._task.measurements.get_metrics()
+    def get_metrics(self, update_lazy: bool = True) -> Metrics:
+        return self._task.measurements.get_metrics(update_lazy=update_lazy)
+
+    def get_metric(self, measure_name: str) -> Any:
+        r"""The metric of a single measure, without updating the other lazy
+        measures as :ref:`get_metrics` does.
+        """
+        return self._task.measurements.get_metric(measure_name)
 
     def _past_limit(self) -> bool:
         return (
@@ -250,7 +308,11 @@ class Env:
             self._episode_iterator is not None
             and self._episode_from_iter_on_reset
         ):
-            self._current_episode = next(self._episode_iterator)
+            if self._next_episode_index is not None:
+                self._current_episode = self.episodes[self._next_episode_index]
+                self._next_episode_index = None
+            else:
+                self._current_episode = next(self._episode_iterator)
 
         # This is always set to true after a reset that way
         # on the next reset an new episode is taken (if possible)
@@ -303,25 +365,48 @@ class Env:
             not self._episode_force_changed
         ), "Episode was changed either by setting current_episode or changing the episodes list. Call reset before stepping the environment again."
 
-        # Support simpler interface as well
-        if isinstance(action, (str, int, np.integer)):
-            action = {"action": action}
+        with self._step_profiler.scope("env.step"):
+            # Support simpler interface as well
+            if isinstance(action, (str, int, np.integer)):
+                action = {"action": action}
 
-        observations = self.task.step(
-            action=action, episode=self.current_episode
-        )
+            with self._step_profiler.scope("task.step"):
+                observations = self.task.step(
+                    action=action, episode=self.current_episode
+                )
 
-        self._task.measurements.update_measures(
-            episode=self.current_episode,
-            action=action,
-            task=self.task,
-            observations=observations,
-        )
+            self._task.measurements.update_measures(
+                episode=self.current_episode,
+                action=action,
+                task=self.task,
+                observations=observations,
+            )
 
-        self._update_step_stats()
+            self._update_step_stats()
 
         return observations
 
+    def get_step_profile(self) -> Dict[str, Dict[str, float]]:
+        r"""Latency statistics of each profiled component of the step since
+        the last :ref:`reset_step_profile`, see
+        :py:`habitat.environment.profiler`. Empty if the profiler is disabled.
+        """
+        return self._step_profiler.get_stats()
+
+    def get_step_profile_histograms(self) -> Dict[str, Dict[str, Any]]:
+        r"""Latency histogram of each profiled component of the step."""
+        return self._step_profiler.get_histograms()
+
+    def get_step_profile_trace(self) -> Dict[str, Any]:
+        r"""The most recent profiled ranges as a Chrome trace, see
+        :py:`habitat.utils.step_profiler.merge_chrome_traces` to combine the
+        traces of several workers.
+        """
+        return self._step_profiler.get_chrome_trace()
+
+    def reset_step_profile(self) -> None:
+        self._step_profiler.reset()
+
     @staticmethod
     @numba.njit
     def _seed_numba(seed: int):
@@ -481,6 +566,30 @@ class RLEnv(gym.Env):
     def seed(self, seed: Optional[int] = None) -> None:
         self._env.seed(seed)
 
+    def set_next_episode_by_index(self, episode_index: int) -> None:
+        self._env.set_next_episode_by_index(episode_index)
+
+    def get_episode_scene_ids(self) -> List[str]:
+        return self._env.get_episode_scene_ids()
+
+    def get_episode_ids(self) -> List[str]:
+        return self._env.get_episode_ids()
+
+    def select_episodes_by_index(self, episode_indices: Sequence[int]) -> None:
+        self._env.select_episodes_by_index(episode_indices)
+
+    def get_step_profile(self) -> Dict[str, Dict[str, float]]:
+        return self._env.get_step_profile()
+
+    def get_step_profile_histograms(self) -> Dict[str, Dict[str, Any]]:
+        return self._env.get_step_profile_histograms()
+
+    def get_step_profile_trace(self) -> Dict[str, Any]:
+        return self._env.get_step_profile_trace()
+
+    def reset_step_profile(self) -> None:
+        self._env.reset_step_profile()
+
     def render(self, mode: str = "rgb") -> np.ndarray:
         return self._env.render(mode)
 
@@ -64,14 +64,19 @@ class RLTaskEnv(habitat.RLEnv):
     def step(
         self, *args, **kwargs
     ) -> Tuple[RLTaskEnvObsType, float, bool, dict]:
-        return super().step(*args, **kwargs)
+        observations = self._env.step(*args, **kwargs)
+        reward = self.get_reward(observations)
+        done = self.get_done(observations)
+        info = self.get_info(observations, done=done)
+
+        return observations, reward, done, info
 
     def get_reward_range(self):
         # We don't know what the reward measure is bounded by
         return (-np.inf, np.inf)
 
     def get_reward(self, observations):
-        current_measure = self._env.get_metrics()[self._reward_measure_name]
+        current_measure = self._env.get_metric(self._reward_measure_name)
         reward = self._slack_reward
 
         reward += current_measure
@@ -82,7 +87,7 @@ class RLTaskEnv(habitat.RLEnv):
         return reward
 
     def _episode_success(self):
-        return self._env.get_metrics()[self._success_measure_name]
+        return self._env.get_metric(self._success_measure_name)
 
     def get_done(self, observations):
         done = False
@@ -92,8 +97,13 @@ class RLTaskEnv(habitat.RLEnv):
             done = True
         return done
 
-    def get_info(self, observations):
-        return self._env.get_metrics()
+    def get_info(self, observations, done: Optional[bool] = None):
+        # `step` passes the done it already computed.
+        if done is None:
+            done = self.get_done(observations)
+        # The lazy measures are only updated for the info of the last step
+        # of the episode, the other steps keep their last metric.
+        return self._env.get_metrics(update_lazy=done)
 
 
 @habitat.registry.register_env(name="GymRegistryEnv")
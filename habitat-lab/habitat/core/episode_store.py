@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Compact, memory-mapped episode storage.
+
+A compact episode file stores the fields shared by all navigation episodes
+(ids, scenes, start positions/rotations and goal positions/radii) as
+columnar numpy arrays, and every other field as one small JSON record per
+episode. The file is memory-mapped, so loading it is O(number of scenes) and
+an episode object is only built when it is accessed through a
+:ref:`LazyEpisodeSequence`.
+
+File layout::
+
+    magic (8 bytes) | header length (uint64) | JSON header | arrays
+
+Every array is aligned to 64 bytes and described in the header by its
+dtype, shape and byte offset.
+"""
+
+import json
+import mmap
+from itertools import groupby
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    overload,
+)
+
+import numpy as np
+
+COMPACT_EPISODES_EXT = ".episodes.bin"
+
+_MAGIC = b"HABEPS\x00\x01"
+_HEADER_LEN_DTYPE = np.dtype("<u8")
+_ALIGNMENT = 64
+_GOAL_FIELDS = {"position", "radius"}
+
+T = TypeVar("T")
+
+
+def _pack_strings(strings: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in strings])
+    return offsets, np.frombuffer(b"".join(strings), dtype=np.uint8)
+
+
+def write_compact_episodes(
+    fname: str,
+    episodes: Sequence[Dict[str, Any]],
+    attrs: Optional[Dict[str, Any]] = None,
+) -> None:
+    r"""Writes episodes to a compact episode file.
+
+    :param fname: The file to write to. Should end with
+        :ref:`COMPACT_EPISODES_EXT`.
+    :param episodes: The episodes as JSON dicts, i.e. as they appear in the
+        :py:`"episodes"` list of a :py:`.json.gz` dataset file.
+    :param attrs: Dataset-level JSON data (category mappings, ...) stored
+        alongside the episodes.
+    """
+    num_episodes = len(episodes)
+    scenes: Dict[str, int] = {}
+    scene_index = np.empty(num_episodes, dtype=np.int32)
+    start_position = np.zeros((num_episodes, 3), dtype=np.float64)
+    start_rotation = np.zeros((num_episodes, 4), dtype=np.float64)
+
+    # Goals are only stored as columns if they are plain position/radius
+    # goals, otherwise they are kept in the per-episode JSON record.
+    columnar_goals = all(
+        isinstance(ep.get("goals", None), list) for ep in episodes
+    ) and all(
+        isinstance(g, dict) and set(g.keys()) <= _GOAL_FIELDS
+        for ep in episodes
+        for g in ep["goals"]
+    )
+    goal_offsets = np.zeros(num_episodes + 1, dtype=np.int64)
+    goal_position: List[List[float]] = []
+    goal_radius: List[float] = []
+
+    episode_ids: List[bytes] = []
+    records: List[bytes] = []
+    for i, episode in enumerate(episodes):
+        ep = dict(episode)
+        scene_index[i] = scenes.setdefault(ep.pop("scene_id"), len(scenes))
+        episode_ids.append(str(ep.pop("episode_id")).encode("utf-8"))
+        start_position[i] = ep.pop("start_position")
+        start_rotation[i] = ep.pop("start_rotation")
+
+        if columnar_goals:
+            goals = ep.pop("goals")
+            for g in goals:
+                goal_position.append(g["position"])
+                radius = g.get("radius", None)
+                goal_radius.append(np.nan if radius is None else radius)
+            goal_offsets[i + 1] = goal_offsets[i] + len(goals)
+
+        records.append(json.dumps(ep, separators=(",", ":")).encode("utf-8"))
+
+    episode_id_offsets, episode_id_data = _pack_strings(episode_ids)
+    record_offsets, record_data = _pack_strings(records)
+    arrays = {
+        "scene_index": scene_index,
+        "start_position": start_position,
+        "start_rotation": start_rotation,
+        "episode_id_offsets": episode_id_offsets,
+        "episode_id_data": episode_id_data,
+        "record_offsets": record_offsets,
+        "record_data": record_data,
+    }
+    if columnar_goals:
+        arrays["goal_offsets"] = goal_offsets
+        arrays["goal_position"] = np.asarray(
+            goal_position, dtype=np.float64
+        ).reshape(-1, 3)
+        arrays["goal_radius"] = np.asarray(goal_radius, dtype=np.float64)
+
+    header: Dict[str, Any] = {
+        "version": 1,
+        "num_episodes": num_episodes,
+        "scenes": list(scenes.keys()),
+        "columnar_goals": columnar_goals,
+        "attrs": attrs if attrs is not None else {},
+        "arrays": {},
+    }
+    # The offsets depend on the header length, which depends on the
+    # offsets. Iterate until the header is large enough to hold itself.
+    data_start = 0
+    while True:
+        offset = data_start
+        for name, arr in arrays.items():
+            header["arrays"][name] = {
+                "dtype": arr.dtype.str,
+                "shape": list(arr.shape),
+                "offset": offset,
+            }
+            offset += -(-arr.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        min_start = (
+            len(_MAGIC) + _HEADER_LEN_DTYPE.itemsize + len(header_bytes)
+        )
+        if min_start <= data_start:
+            break
+        data_start = -(-min_start // _ALIGNMENT) * _ALIGNMENT
+
+    with open(fname, "wb") as f:
+        f.write(_MAGIC)
+        f.write(np.array(len(header_bytes), dtype=_HEADER_LEN_DTYPE).tobytes())
+        f.write(header_bytes)
+        for name, arr in arrays.items():
+            f.write(b"\x00" * (header["arrays"][name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+
+
+class CompactEpisodeStore:
+    r"""Read-only, memory-mapped view of a compact episode file.
+
+    :param fname: The compact episode file.
+    :param decode_fn: Builds an episode object from its JSON dict. Must be
+        picklable.
+    :param scene_id_fn: Applied to every scene id of the file when it is
+        opened, for instance to prepend the scenes directory. Must be
+        picklable.
+    """
+
+    def __init__(
+        self,
+        fname: str,
+        decode_fn: Callable[[Dict[str, Any]], Any] = dict,
+        scene_id_fn: Optional[Callable[[str], str]] = None,
+    ) -> None:
+        self.fname = fname
+        self._decode_fn = decode_fn
+        self._scene_id_fn = scene_id_fn
+        self._open()
+
+    def _open(self) -> None:
+        with open(self.fname, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{self.fname} is not a compact episode file")
+            header_len = int(
+                np.frombuffer(
+                    f.read(_HEADER_LEN_DTYPE.itemsize),
+                    dtype=_HEADER_LEN_DTYPE,
+                )[0]
+            )
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.num_episodes: int = header["num_episodes"]
+        self.attrs: Dict[str, Any] = header["attrs"]
+        self.columnar_goals: bool = header["columnar_goals"]
+        self.scenes: List[str] = header["scenes"]
+        if self._scene_id_fn is not None:
+            self.scenes = [self._scene_id_fn(s) for s in self.scenes]
+
+        self._arrays: Dict[str, np.ndarray] = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            count = int(np.prod(shape))
+            if count == 0:
+                arr = np.empty(shape, dtype=dtype)
+            else:
+                arr = np.frombuffer(
+                    self._mmap, dtype=dtype, count=count, offset=spec["offset"]
+                ).reshape(shape)
+            self._arrays[name] = arr
+
+    def set_decode_fn(self, decode_fn: Callable[[Dict[str, Any]], Any]):
+        r"""Sets the function building episodes, for when it depends on
+        :ref:`attrs`.
+        """
+        self._decode_fn = decode_fn
+
+    @property
+    def scene_index(self) -> np.ndarray:
+        r"""Index into :ref:`scenes` of every episode."""
+        return self._arrays["scene_index"]
+
+    def _string(self, name: str, index: int) -> bytes:
+        offsets = self._arrays[f"{name}_offsets"]
+        return self._arrays[f"{name}_data"][
+            offsets[index] : offsets[index + 1]
+        ].tobytes()
+
+    def episode_id(self, index: int) -> str:
+        return self._string("episode_id", index).decode("utf-8")
+
+    def scene_id(self, index: int) -> str:
+        return self.scenes[self.scene_index[index]]
+
+    def episode_dict(self, index: int) -> Dict[str, Any]:
+        r"""Returns the JSON dict of episode :p:`index`, with the scene id
+        already transformed by :py:`scene_id_fn`.
+        """
+        ep = json.loads(self._string("record", index).decode("utf-8"))
+        ep["episode_id"] = self.episode_id(index)
+        ep["scene_id"] = self.scene_id(index)
+        ep["start_position"] = self._arrays["start_position"][index].tolist()
+        ep["start_rotation"] = self._arrays["start_rotation"][index].tolist()
+        if self.columnar_goals:
+            start, end = self._arrays["goal_offsets"][index : index + 2]
+            ep["goals"] = [
+                {
+                    "position": position.tolist(),
+                    "radius": None if np.isnan(radius) else float(radius),
+                }
+                for position, radius in zip(
+                    self._arrays["goal_position"][start:end],
+                    self._arrays["goal_radius"][start:end],
+                )
+            ]
+        return ep
+
+    def episode(self, index: int) -> Any:
+        return self._decode_fn(self.episode_dict(index))
+
+    def __len__(self) -> int:
+        return self.num_episodes
+
+    def __getstate__(self):
+        # Only send the file name, the file is re-mapped on unpickling.
+        return {
+            "fname": self.fname,
+            "_decode_fn": self._decode_fn,
+            "_scene_id_fn": self._scene_id_fn,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+
+class LazyEpisodeSequence(Sequence[T]):
+    r"""A sequence of episodes backed by one or more
+    :ref:`CompactEpisodeStore`. Episodes are only built when they are
+    accessed, and each access builds a new episode object.
+
+    Reordering and filtering (:ref:`take`, :ref:`filter_by_scene`) only
+    touch index arrays, so they are cheap and don't build any episode.
+    """
+
+    def __init__(
+        self,
+        stores: Sequence[CompactEpisodeStore],
+        store_index: Optional[np.ndarray] = None,
+        local_index: Optional[np.ndarray] = None,
+    ) -> None:
+        self._stores = list(stores)
+        if store_index is None or local_index is None:
+            store_index = np.concatenate(
+                [
+                    np.full(len(s), i, dtype=np.int32)
+                    for i, s in enumerate(stores)
+                ]
+                + [np.zeros(0, dtype=np.int32)]
+            )
+            local_index = np.concatenate(
+                [np.arange(len(s), dtype=np.int64) for s in stores]
+                + [np.zeros(0, dtype=np.int64)]
+            )
+        self._store_index = store_index
+        self._local_index = local_index
+
+        # A global code per scene id, used to group episodes by scene
+        # without building them.
+        codes: Dict[str, int] = {}
+        store_codes = [
+            np.array(
+                [codes.setdefault(sid, len(codes)) for sid in s.scenes],
+                dtype=np.int64,
+            )
+            for s in self._stores
+        ]
+        self.scene_table: List[str] = list(codes.keys())
+        self.scene_codes = np.zeros(len(self._local_index), dtype=np.int64)
+        if len(self._local_index) > 0:
+            code_offsets = np.cumsum([0] + [len(c) for c in store_codes])
+            episode_offsets = np.cumsum([0] + [len(s) for s in self._stores])
+            all_scene_index = np.concatenate(
+                [s.scene_index for s in self._stores]
+            )
+            self.scene_codes = np.concatenate(store_codes)[
+                code_offsets[self._store_index]
+                + all_scene_index[
+                    episode_offsets[self._store_index] + self._local_index
+                ]
+            ]
+
+    @classmethod
+    def _from_parts(
+        cls,
+        other: "LazyEpisodeSequence[T]",
+        indices: np.ndarray,
+    ) -> "LazyEpisodeSequence[T]":
+        res = cls.__new__(cls)
+        res._stores = other._stores
+        res._store_index = other._store_index[indices]
+        res._local_index = other._local_index[indices]
+        res.scene_table = other.scene_table
+        res.scene_codes = other.scene_codes[indices]
+        return res
+
+    @classmethod
+    def concat(
+        cls, sequences: Sequence["LazyEpisodeSequence[T]"]
+    ) -> "LazyEpisodeSequence[T]":
+        stores: List[CompactEpisodeStore] = []
+        store_index, local_index = [], []
+        for seq in sequences:
+            store_index.append(seq._store_index + len(stores))
+            local_index.append(seq._local_index)
+            stores.extend(seq._stores)
+
+        return cls(
+            stores,
+            np.concatenate(store_index + [np.zeros(0, dtype=np.int32)]),
+            np.concatenate(local_index + [np.zeros(0, dtype=np.int64)]),
+        )
+
+    def __len__(self) -> int:
+        return len(self._local_index)
+
+    @overload
+    def __getitem__(self, index: int) -> T:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "LazyEpisodeSequence[T]":
+        ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[T, "LazyEpisodeSequence[T]"]:
+        if isinstance(index, slice):
+            return self.take(np.arange(len(self))[index])
+
+        return self._stores[self._store_index[index]].episode(
+            int(self._local_index[index])
+        )
+
+    def __iter__(self) -> "LazyEpisodeIterator[T]":
+        return LazyEpisodeIterator(self)
+
+    def take(
+        self, indices: Union[Sequence[int], np.ndarray]
+    ) -> "LazyEpisodeSequence[T]":
+        r"""Returns a new sequence with the episodes at :p:`indices`."""
+        return self._from_parts(self, np.asarray(indices, dtype=np.int64))
+
+    def filter_by_scene(
+        self, filter_fn: Callable[[str], bool]
+    ) -> "LazyEpisodeSequence[T]":
+        r"""Returns a new sequence with only the episodes whose scene id
+        passes :p:`filter_fn`.
+        """
+        keep = np.array([filter_fn(s) for s in self.scene_table], dtype=bool)
+        return self.take(np.nonzero(keep[self.scene_codes])[0])
+
+    def scene_id(self, index: int) -> str:
+        return self.scene_table[self.scene_codes[index]]
+
+    def episode_id(self, index: int) -> str:
+        return self._stores[self._store_index[index]].episode_id(
+            int(self._local_index[index])
+        )
+
+    @property
+    def scene_ids(self) -> List[str]:
+        r"""Unique scene ids of the episodes in this sequence."""
+        return [self.scene_table[c] for c in np.unique(self.scene_codes)]
+
+    def shuffled(self, rng: Any) -> "LazyEpisodeSequence[T]":
+        r"""Returns a shuffled copy. :p:`rng` needs a :py:`shuffle` method
+        (e.g. the :py:`random` module), it is called on the list of indices
+        so the result matches shuffling a list of episodes.
+        """
+        order = list(range(len(self)))
+        rng.shuffle(order)
+        return self.take(order)
+
+    def grouped_by_scene(self) -> "LazyEpisodeSequence[T]":
+        r"""Groups episodes by scene. Groups are ordered by the first
+        occurrence of their scene and the order within a group is kept.
+        """
+        _, first = np.unique(self.scene_codes, return_index=True)
+        rank = np.empty(len(self.scene_table), dtype=np.int64)
+        rank[self.scene_codes[np.sort(first)]] = np.arange(len(first))
+        return self.take(
+            np.argsort(rank[self.scene_codes], kind="stable")
+            if len(self) > 0
+            else []
+        )
+
+    def first_scene_group_last(self) -> "LazyEpisodeSequence[T]":
+        r"""Moves the first run of episodes sharing a scene to the end."""
+        groups = [len(list(g)) for _, g in groupby(self.scene_codes.tolist())]
+        if len(groups) <= 1:
+            return self
+        order = np.concatenate(
+            [np.arange(groups[0], len(self)), np.arange(groups[0])]
+        )
+        return self.take(order)
+
+
+class LazyEpisodeIterator(Iterator[T]):
+    r"""Iterator over a :ref:`LazyEpisodeSequence` that can return the
+    episodes it has yet to yield without building them.
+    """
+
+    def __init__(self, sequence: LazyEpisodeSequence[T]) -> None:
+        self._sequence = sequence
+        self._pos = 0
+
+    def __iter__(self) -> "LazyEpisodeIterator[T]":
+        return self
+
+    def __next__(self) -> T:
+        if self._pos >= len(self._sequence):
+            raise StopIteration
+        episode = self._sequence[self._pos]
+        self._pos += 1
+        return episode
+
+    def remaining(self) -> LazyEpisodeSequence[T]:
+        return self._sequence[self._pos :]
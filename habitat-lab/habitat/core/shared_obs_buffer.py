@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""Shared-memory transport for :ref:`VectorEnv` observations.
+
+Instead of pickling every sensor array through the worker pipe, each worker
+writes its observations into a preallocated shared-memory slab whose layout
+is derived from the observation space. Only a small header (the rank and the
+observations that could not be placed in the slab) goes over the pipe.
+
+The slab is laid out as one contiguous :py:`[num_envs, *sensor_shape]` block
+per sensor, so the observations of consecutive envs are also consecutive in
+memory and can be batched without a copy (see :ref:`shared_batch_view`).
+"""
+
+import weakref
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import attr
+import numpy as np
+from gym import spaces
+
+# Slabs that live in this process. Used by `shared_batch_view` to map an
+# observation array back to the slab it was read from.
+_LIVE_SLABS: "weakref.WeakSet[SharedObservationBuffer]" = weakref.WeakSet()
+
+# Alignment (in bytes) of each per-sensor block inside the slab.
+_BLOCK_ALIGNMENT = 64
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class SharedObservationLayout:
+    r"""Describes where each sensor lives inside the shared-memory slab.
+
+    :property keys: Names of the sensors placed in the slab.
+    :property shapes: Per-env shape of each sensor.
+    :property dtypes: Numpy dtype string of each sensor.
+    :property offsets: Byte offset of each per-sensor block.
+    :property num_envs: Number of env rows in each block.
+    :property nbytes: Total size of the slab in bytes.
+    """
+    keys: Tuple[str, ...]
+    shapes: Tuple[Tuple[int, ...], ...]
+    dtypes: Tuple[str, ...]
+    offsets: Tuple[int, ...]
+    num_envs: int
+    nbytes: int
+
+    @classmethod
+    def from_observation_space(
+        cls, observation_space: spaces.Dict, num_envs: int
+    ) -> "SharedObservationLayout":
+        r"""Builds the layout from a :ref:`spaces.Dict`. Only top-level
+        :ref:`spaces.Box` entries with a fixed shape are placed in the slab,
+        every other entry keeps going through the pipe.
+        """
+        keys, shapes, dtypes, offsets = [], [], [], []
+        offset = 0
+        for k, space in observation_space.spaces.items():
+            if not isinstance(space, spaces.Box) or space.shape is None:
+                continue
+            dtype = np.dtype(space.dtype)
+            if dtype.hasobject:
+                continue
+            shape = tuple(int(s) for s in space.shape)
+            keys.append(k)
+            shapes.append(shape)
+            dtypes.append(dtype.str)
+            offsets.append(offset)
+            block_nbytes = num_envs * int(np.prod(shape)) * dtype.itemsize
+            offset += (
+                (block_nbytes + _BLOCK_ALIGNMENT - 1) // _BLOCK_ALIGNMENT
+            ) * _BLOCK_ALIGNMENT
+
+        return cls(
+            keys=tuple(keys),
+            shapes=tuple(shapes),
+            dtypes=tuple(dtypes),
+            offsets=tuple(offsets),
+            num_envs=num_envs,
+            nbytes=max(offset, 1),
+        )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class SharedObservationHeader:
+    r"""What a worker sends over the pipe in place of its observations.
+
+    :property rank: Row of the slab the observations were written to.
+    :property extra: Observations that are not part of the slab.
+    """
+    rank: int
+    extra: Dict[str, Any]
+
+
+class SharedObservationBuffer:
+    r"""A shared-memory slab holding the latest observation of every env.
+
+    The parent process creates the buffer with :py:`create=True` and sends
+    :ref:`name` and :ref:`layout` to the workers, which attach to it with
+    :py:`create=False`. Only the creating process unlinks the segment.
+    """
+
+    def __init__(
+        self,
+        layout: SharedObservationLayout,
+        name: Optional[str] = None,
+        create: bool = False,
+    ) -> None:
+        self.layout = layout
+        self._owner = create
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=create, size=layout.nbytes
+        )
+        self.blocks: Dict[str, np.ndarray] = {
+            k: np.ndarray(
+                (layout.num_envs, *shape),
+                dtype=np.dtype(dtype),
+                buffer=self._shm.buf,
+                offset=offset,
+            )
+            for k, shape, dtype, offset in zip(
+                layout.keys, layout.shapes, layout.dtypes, layout.offsets
+            )
+        }
+        _LIVE_SLABS.add(self)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(
+        self, rank: int, observations: Dict[str, Any]
+    ) -> SharedObservationHeader:
+        r"""Copies the slab sensors of :p:`observations` into row :p:`rank`
+        and returns the header to send over the pipe instead.
+        """
+        extra = {}
+        for k, v in observations.items():
+            block = self.blocks.get(k, None)
+            # Device tensors (e.g. with gpu2gpu) can't go through the slab
+            if block is None or not isinstance(v, (np.ndarray, np.generic)):
+                extra[k] = v
+            else:
+                block[rank] = v
+        return SharedObservationHeader(rank=rank, extra=extra)
+
+    def read(self, header: SharedObservationHeader) -> Dict[str, Any]:
+        r"""Rebuilds the observation dict for :p:`header`. The slab sensors
+        are returned as views into the slab and are therefore only valid
+        until that env is stepped again.
+        """
+        observations = {
+            k: block[header.rank] for k, block in self.blocks.items()
+        }
+        observations.update(header.extra)
+        return observations
+
+    def batch_view(self, arrays: Sequence[Any]) -> Optional[np.ndarray]:
+        r"""Returns :py:`block[start:start + len(arrays)]` if :p:`arrays` are
+        the rows of consecutive envs in one of the blocks of this slab,
+        otherwise :py:`None`.
+        """
+        first = arrays[0]
+        if not isinstance(first, np.ndarray):
+            return None
+        for block in self.blocks.values():
+            if block.dtype != first.dtype or block.shape[1:] != first.shape:
+                continue
+            row_nbytes = first.nbytes
+            block_addr = block.__array_interface__["data"][0]
+            start_addr = first.__array_interface__["data"][0]
+            start, rem = divmod(start_addr - block_addr, max(row_nbytes, 1))
+            if rem != 0 or start < 0 or start + len(arrays) > len(block):
+                continue
+            for i, arr in enumerate(arrays):
+                if (
+                    not isinstance(arr, np.ndarray)
+                    or arr.__array_interface__["data"][0]
+                    != start_addr + i * row_nbytes
+                    or not arr.flags.c_contiguous
+                ):
+                    return None
+            return block[start : start + len(arrays)]
+
+        return None
+
+    def close(self) -> None:
+        if getattr(self, "_shm", None) is None:
+            return
+        _LIVE_SLABS.discard(self)
+        self.blocks = {}
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __del__(self):
+        self.close()
+
+
+def shared_batch_view(arrays: List[Any]) -> Optional[np.ndarray]:
+    r"""If :p:`arrays` are the observations of consecutive envs for a single
+    sensor read from a :ref:`SharedObservationBuffer`, returns the
+    :py:`[len(arrays), ...]` view of the slab holding them. Returns
+    :py:`None` otherwise (for example when some envs are paused), in which
+    case the caller needs to stack the arrays itself.
+    """
+    for slab in list(_LIVE_SLABS):
+        view = slab.batch_view(arrays)
+        if view is not None:
+            return view
+    return None
@@ -15,6 +15,7 @@ import numpy as np
 import quaternion  # noqa: F401
 from omegaconf import OmegaConf
 
+from habitat.core.episode_store import LazyEpisodeSequence
 from habitat.utils.geometry_utils import quaternion_to_list
 
 # Internals from inner json library needed for patching functionality in
@@ -120,6 +121,8 @@ class DatasetJSONEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, np.ndarray):
             return obj.tolist()
+        if isinstance(obj, LazyEpisodeSequence):
+            return list(obj)
         if isinstance(obj, quaternion.quaternion):
             return quaternion_to_list(obj)
         if OmegaConf.is_config(obj):
@@ -5,7 +5,10 @@
 # LICENSE file in the root directory of this source tree.
 
 import signal
+import time
 import warnings
+from multiprocessing import connection as mp_connection
+from multiprocessing import resource_tracker
 from multiprocessing.connection import Connection
 from multiprocessing.context import BaseContext
 from queue import Queue
@@ -35,6 +38,11 @@ import habitat
 from habitat.core.batch_rendering.env_batch_renderer import EnvBatchRenderer
 from habitat.core.env import Env, RLEnv
 from habitat.core.logging import logger
+from habitat.core.shared_obs_buffer import (
+    SharedObservationBuffer,
+    SharedObservationHeader,
+    SharedObservationLayout,
+)
 from habitat.core.utils import tile_images
 from habitat.gym.gym_env_episode_count_wrapper import EnvCountEpisodeWrapper
 from habitat.gym.gym_env_obs_dict_wrapper import EnvObsDictWrapper
@@ -58,6 +66,8 @@ except ImportError:
 if TYPE_CHECKING:
     from omegaconf import DictConfig
 
+    from habitat.tasks.nav.nav import BatchedNavSensors
+
 
 STEP_COMMAND = "step"
 RESET_COMMAND = "reset"
@@ -65,6 +75,7 @@ RENDER_COMMAND = "render"
 CLOSE_COMMAND = "close"
 CALL_COMMAND = "call"
 COUNT_EPISODES_COMMAND = "count_episodes"
+SHARED_OBS_COMMAND = "shared_obs"
 
 EPISODE_OVER_NAME = "episode_over"
 GET_METRICS_NAME = "get_metrics"
@@ -100,6 +111,9 @@ class _ReadWrapper:
     read_fn: Callable[[], Any]
     rank: int
     is_waiting: bool = False
+    # The underlying connection (or queue), used to check whether
+    # there is something to read without blocking
+    connection: Any = None
 
     def __call__(self) -> Any:
         if not self.is_waiting:
@@ -151,6 +165,9 @@ class VectorEnv:
     _connection_read_fns: List[_ReadWrapper]
     _connection_write_fns: List[_WriteWrapper]
     _batch_renderer: Optional[EnvBatchRenderer] = None
+    _batched_nav_sensors: Optional["BatchedNavSensors"] = None
+    _shared_obs: Optional[SharedObservationBuffer] = None
+    _supports_shared_obs: bool = True
 
     def __init__(
         self,
@@ -159,6 +176,7 @@ class VectorEnv:
         auto_reset_done: bool = True,
         multiprocessing_start_method: str = "forkserver",
         workers_ignore_signals: bool = False,
+        use_shared_memory_obs: bool = False,
     ) -> None:
         """..
 
@@ -176,6 +194,11 @@ class VectorEnv:
             used, the subproccess  must be started before any other GPU usage.
         :param workers_ignore_signals: Whether or not workers will ignore SIGINT and SIGTERM
             and instead will only exit when :ref:`close` is called
+        :param use_shared_memory_obs: Whether workers write their observations
+            into a shared-memory slab instead of pickling them through the
+            pipe. Observations returned by :ref:`step` and :ref:`reset` are
+            then views into the slab and are only valid until the next
+            step of that env. See :ref:`SharedObservationBuffer`.
         """
         self._is_closed = True
 
@@ -190,6 +213,11 @@ class VectorEnv:
         ).format(self._valid_start_methods, multiprocessing_start_method)
         self._auto_reset_done = auto_reset_done
         self._mp_ctx = mp.get_context(multiprocessing_start_method)
+        if use_shared_memory_obs:
+            # Start the resource tracker before spawning the workers so they
+            # share it. Otherwise, each worker would unlink the shared memory
+            # slab it attached to when it exits.
+            resource_tracker.ensure_running()
         self._workers = []
         (
             self._connection_read_fns,
@@ -226,6 +254,43 @@ class VectorEnv:
         ]
         self._paused: List[Tuple] = []
 
+        if use_shared_memory_obs:
+            self._setup_shared_obs()
+
+    def _setup_shared_obs(self) -> None:
+        if not self._supports_shared_obs:
+            logger.warn(
+                f"{type(self).__name__} does not support shared memory "
+                "observations, falling back to sending them through the pipe."
+            )
+            return
+
+        layout = SharedObservationLayout.from_observation_space(
+            self.observation_spaces[0], self._num_envs
+        )
+        if len(layout.keys) == 0:
+            return
+        self._shared_obs = SharedObservationBuffer(layout, create=True)
+        for write_fn in self._connection_write_fns:
+            write_fn(
+                (
+                    SHARED_OBS_COMMAND,
+                    (
+                        self._shared_obs.name,
+                        layout,
+                        write_fn.read_wrapper.rank,
+                    ),
+                )
+            )
+        for read_fn in self._connection_read_fns:
+            read_fn()
+
+    def _read_observations(self, observations: Any) -> Any:
+        if isinstance(observations, SharedObservationHeader):
+            assert self._shared_obs is not None
+            return self._shared_obs.read(observations)
+        return observations
+
     @property
     def num_envs(self):
         r"""number of individual environments."""
@@ -253,6 +318,14 @@ class VectorEnv:
         env = EnvCountEpisodeWrapper(EnvObsDictWrapper(env_fn(*env_fn_args)))
         if parent_pipe is not None:
             parent_pipe.close()
+        shared_obs: Optional[SharedObservationBuffer] = None
+        shared_obs_rank = 0
+
+        def _pack_observations(observations):
+            if shared_obs is None:
+                return observations
+            return shared_obs.write(shared_obs_rank, observations)
+
         try:
             command, data = connection_read_fn()
             while command != CLOSE_COMMAND:
@@ -262,11 +335,18 @@ class VectorEnv:
                     if auto_reset_done and done:
                         observations = env.reset()
 
-                    connection_write_fn((observations, reward, done, info))
+                    connection_write_fn(
+                        (_pack_observations(observations), reward, done, info)
+                    )
 
                 elif command == RESET_COMMAND:
                     observations = env.reset()
-                    connection_write_fn(observations)
+                    connection_write_fn(_pack_observations(observations))
+
+                elif command == SHARED_OBS_COMMAND:
+                    shm_name, layout, shared_obs_rank = data
+                    shared_obs = SharedObservationBuffer(layout, name=shm_name)
+                    connection_write_fn(None)
 
                 elif command == RENDER_COMMAND:
                     connection_write_fn(env.render(*data[0], **data[1]))
@@ -298,6 +378,8 @@ class VectorEnv:
         finally:
             if child_pipe is not None:
                 child_pipe.close()
+            if shared_obs is not None:
+                shared_obs.close()
             env.close()
 
     def _spawn_workers(
@@ -335,7 +417,7 @@ class VectorEnv:
             worker_conn.close()
 
         read_fns = [
-            _ReadWrapper(p.recv, rank)
+            _ReadWrapper(p.recv, rank, connection=p.conn)
             for rank, p in enumerate(parent_connections)
         ]
         write_fns = [
@@ -386,7 +468,7 @@ class VectorEnv:
             write_fn((RESET_COMMAND, None))
         results = []
         for read_fn in self._connection_read_fns:
-            results.append(read_fn())
+            results.append(self._read_observations(read_fn()))
         return results
 
     def reset_at(self, index_env: int):
@@ -396,7 +478,9 @@ class VectorEnv:
         :return: list containing the output of reset method of indexed env.
         """
         self._connection_write_fns[index_env]((RESET_COMMAND, None))
-        results = [self._connection_read_fns[index_env]()]
+        results = [
+            self._read_observations(self._connection_read_fns[index_env]())
+        ]
         return results
 
     def async_step_at(
@@ -407,7 +491,11 @@ class VectorEnv:
 
     @profiling_wrapper.RangeContext("wait_step_at")
     def wait_step_at(self, index_env: int) -> Any:
-        return self._connection_read_fns[index_env]()
+        result = self._connection_read_fns[index_env]()
+        if self._shared_obs is not None:
+            observations, *rest = result
+            result = (self._read_observations(observations), *rest)
+        return result
 
     def step_at(self, index_env: int, action: Union[int, np.ndarray]):
         r"""Step in the index_env environment in the vector.
@@ -448,6 +536,62 @@ class VectorEnv:
         self.async_step(data)
         return self.wait_step()
 
+    def _ready_indices(
+        self, indices: List[int], timeout: Optional[float]
+    ) -> List[int]:
+        conns = {
+            self._connection_read_fns[index_env].connection: index_env
+            for index_env in indices
+        }
+        ready = mp_connection.wait(list(conns.keys()), timeout)
+        return sorted(conns[c] for c in ready)
+
+    def poll(
+        self,
+        indices: Optional[Sequence[int]] = None,
+        timeout: Optional[float] = 0.0,
+    ) -> List[int]:
+        r"""Returns the envs whose result can be read without blocking.
+
+        :param indices: the envs to check, all envs if :py:`None`. Envs
+            without an outstanding :ref:`async_step_at` are ignored.
+        :param timeout: how long to wait for at least one env to be ready.
+            :py:`0.0` returns immediately and :py:`None` waits until one
+            env is ready.
+        :return: the sorted indices of the ready envs.
+        """
+        if indices is None:
+            indices = range(self.num_envs)
+        waiting = [
+            index_env
+            for index_env in indices
+            if self._connection_read_fns[index_env].is_waiting
+        ]
+        if len(waiting) == 0:
+            return []
+
+        return self._ready_indices(waiting, timeout)
+
+    @profiling_wrapper.RangeContext("wait_step_any")
+    def wait_step_any(
+        self,
+        indices: Optional[Sequence[int]] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Tuple[int, Any]]:
+        r"""Waits until at least one of the asynchronously stepped envs is
+        done and returns the results of all the envs that are done, so a
+        slow env doesn't hold back the others.
+
+        :param indices: the envs to wait for, all envs if :py:`None`.
+        :param timeout: see :ref:`poll`.
+        :return: list of :py:`(index_env, step output)` in env order. Empty
+            if the timeout expired.
+        """
+        return [
+            (index_env, self.wait_step_at(index_env))
+            for index_env in self.poll(indices, timeout)
+        ]
+
     def post_step(self, observations) -> List[OrderedDict]:
         r"""Performs batch transformations on step outputs.
 
@@ -456,6 +600,8 @@ class VectorEnv:
         """
         if self._batch_renderer is not None:
             observations = self._batch_renderer.post_step(observations)
+        if self._batched_nav_sensors is not None:
+            observations = self._batched_nav_sensors.post_step(observations)
         return observations
 
     def close(self) -> None:
@@ -480,6 +626,10 @@ class VectorEnv:
 
         self._is_closed = True
 
+        if self._shared_obs is not None:
+            self._shared_obs.close()
+            self._shared_obs = None
+
         if self._batch_renderer != None:
             self._batch_renderer.close()
 
@@ -589,6 +739,18 @@ class VectorEnv:
         assert config.habitat.simulator.renderer.enable_batch_renderer
         self._batch_renderer = EnvBatchRenderer(config, self.num_envs)
 
+    def initialize_batched_nav_sensors(self, config: "DictConfig") -> None:
+        r"""Computes the GPS, compass, heading and pointgoal sensors of all
+        the envs at once in :ref:`post_step`. Refer to the BatchedNavSensors
+        class.
+
+        :param config: Base configuration.
+        """
+        from habitat.tasks.nav.nav import BatchedNavSensors
+
+        assert config.habitat.task.batched_nav_sensors
+        self._batched_nav_sensors = BatchedNavSensors(config.habitat.task)
+
     @property
     def _valid_start_methods(self) -> Set[str]:
         return {"forkserver", "spawn", "fork"}
@@ -631,6 +793,24 @@ class ThreadedVectorEnv(VectorEnv):
     performance.
     """
 
+    _supports_shared_obs: bool = False
+
+    def _ready_indices(
+        self, indices: List[int], timeout: Optional[float]
+    ) -> List[int]:
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            ready = [
+                index_env
+                for index_env in indices
+                if not self._connection_read_fns[index_env].connection.empty()
+            ]
+            if len(ready) > 0 or (
+                deadline is not None and time.time() >= deadline
+            ):
+                return ready
+            time.sleep(1e-4)
+
     def _spawn_workers(
         self,
         env_fn_args: Sequence[Tuple],
@@ -660,7 +840,7 @@ class ThreadedVectorEnv(VectorEnv):
             thread.start()
 
         read_fns = [
-            _ReadWrapper(q.get, rank)
+            _ReadWrapper(q.get, rank, connection=q)
             for rank, q in enumerate(parent_read_queues)
         ]
         write_fns = [
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Script to convert a `.json.gz` navigation dataset to compact episode files
+(`.episodes.bin`), which are memory-mapped and decoded one episode at a time.
+For example:
+```
+python -m habitat.datasets.convert_to_compact --dataset-type ObjectNav-v1 data/datasets/objectnav/hm3d/v1/val/val.json.gz
+```
+The main file and, if present, every per-scene content file are converted
+next to the original files. Then point `habitat.dataset.data_path` to the
+`.episodes.bin` main file.
+"""
+
+import argparse
+import os
+from multiprocessing import Pool
+from typing import List, Tuple
+
+from habitat.core.episode_store import COMPACT_EPISODES_EXT
+from habitat.core.registry import registry
+from habitat.datasets import registration  # noqa: F401
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
+
+JSON_EXT = ".json.gz"
+
+
+def _compact_fname(fname: str) -> str:
+    assert fname.endswith(JSON_EXT), f"{fname} is not a {JSON_EXT} file"
+    return fname[: -len(JSON_EXT)] + COMPACT_EPISODES_EXT
+
+
+def _convert(args: Tuple[str, str, bool]) -> str:
+    dataset_type, json_fname, is_content_file = args
+    dataset_cls = registry.get_dataset(dataset_type)
+    dataset_cls.convert_to_compact(
+        json_fname, _compact_fname(json_fname), is_content_file
+    )
+    return json_fname
+
+
+def convert_dataset(
+    dataset_type: str, data_path: str, num_workers: int = 1
+) -> None:
+    dataset_cls = registry.get_dataset(dataset_type)
+    assert dataset_cls is not None and issubclass(
+        dataset_cls, PointNavDatasetV1
+    ), f"{dataset_type} does not support compact episode files"
+
+    jobs: List[Tuple[str, str, bool]] = [(dataset_type, data_path, False)]
+    content_dir = os.path.join(os.path.dirname(data_path), "content")
+    if os.path.isdir(content_dir):
+        jobs.extend(
+            (dataset_type, os.path.join(content_dir, fname), True)
+            for fname in sorted(os.listdir(content_dir))
+            if fname.endswith(JSON_EXT)
+        )
+
+    with Pool(num_workers) as pool:
+        for i, fname in enumerate(pool.imap_unordered(_convert, jobs)):
+            print(f"[{i + 1}/{len(jobs)}] Converted {fname}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--dataset-type",
+        type=str,
+        default="PointNav-v1",
+        help="Registered name of the dataset class.",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=1,
+        help="Number of files converted in parallel.",
+    )
+    parser.add_argument(
+        "data_path", type=str, help="The main .json.gz file of the split."
+    )
+    args = parser.parse_args()
+    convert_dataset(args.dataset_type, args.data_path, args.num_workers)
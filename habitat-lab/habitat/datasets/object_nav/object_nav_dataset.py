@@ -6,8 +6,10 @@
 
 import json
 import os
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
+from habitat.core.episode_store import LazyEpisodeSequence
 from habitat.core.registry import registry
 from habitat.core.simulator import AgentState, ShortestPathPoint
 from habitat.core.utils import DatasetFloatJSONEncoder
@@ -74,10 +76,11 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
     def __init__(self, config: Optional["DictConfig"] = None) -> None:
         self.goals_by_category = {}
         super().__init__(config)
-        self.episodes = list(self.episodes)
+        if not isinstance(self.episodes, LazyEpisodeSequence):
+            self.episodes = list(self.episodes)
 
     @staticmethod
-    def __deserialize_goal(serialized_goal: Dict[str, Any]) -> ObjectGoal:
+    def _deserialize_goal(serialized_goal: Dict[str, Any]) -> ObjectGoal:
         g = ObjectGoal(**serialized_goal)
 
         for vidx, view in enumerate(g.view_points):
@@ -124,7 +127,7 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
             deserialized = self.dedup_goals(deserialized)
 
         for k, v in deserialized["goals_by_category"].items():
-            self.goals_by_category[k] = [self.__deserialize_goal(g) for g in v]
+            self.goals_by_category[k] = [self._deserialize_goal(g) for g in v]
 
         for i, episode in enumerate(deserialized["episodes"]):
             episode = ObjectGoalNavEpisode(**episode)
@@ -138,18 +141,75 @@ class ObjectNavDatasetV1(PointNavDatasetV1):
 
                 episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
 
-            episode.goals = self.goals_by_category[episode.goals_key]
+            self._finalize_episode(episode, self.goals_by_category)
 
-            if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
-                    for p_index, point in enumerate(path):
-                        if point is None or isinstance(point, (int, str)):
-                            point = {
-                                "action": point,
-                                "rotation": None,
-                                "position": None,
-                            }
+            self.episodes.append(episode)  # type: ignore [attr-defined]
+
+    @staticmethod
+    def _finalize_episode(
+        episode: ObjectGoalNavEpisode,
+        goals_by_category: Dict[str, Sequence[ObjectGoal]],
+    ) -> None:
+        episode.goals = goals_by_category[episode.goals_key]  # type: ignore[assignment]
+
+        if episode.shortest_paths is not None:
+            for path in episode.shortest_paths:
+                for p_index, point in enumerate(path):
+                    if point is None or isinstance(point, (int, str)):
+                        point = {
+                            "action": point,
+                            "rotation": None,
+                            "position": None,
+                        }
+
+                    path[p_index] = ShortestPathPoint(**point)
+
+    @classmethod
+    def _episode_from_compact_dict(
+        cls,
+        episode_dict: Dict[str, Any],
+        goals_by_category: Dict[str, Sequence[ObjectGoal]],
+    ) -> ObjectGoalNavEpisode:
+        episode = ObjectGoalNavEpisode(**episode_dict)
+        cls._finalize_episode(episode, goals_by_category)
+        return episode
+
+    def _set_attrs_from_compact(self, attrs: Dict[str, Any]) -> None:
+        super()._set_attrs_from_compact(attrs)
+        if "category_to_task_category_id" in attrs:
+            self.category_to_task_category_id = attrs[
+                "category_to_task_category_id"
+            ]
 
-                        path[p_index] = ShortestPathPoint(**point)
+        for k in (
+            "category_to_scene_annotation_category_id",
+            "category_to_mp3d_category_id",
+        ):
+            if k in attrs:
+                self.category_to_scene_annotation_category_id = attrs[k]
 
-            self.episodes.append(episode)  # type: ignore [attr-defined]
+        for k, v in attrs.get("goals_by_category", {}).items():
+            self.goals_by_category[k] = [self._deserialize_goal(g) for g in v]
+
+    def _compact_decode_fn(self, attrs: Dict[str, Any]) -> Any:
+        return partial(
+            self._episode_from_compact_dict,
+            goals_by_category=self.goals_by_category,
+        )
+
+    @classmethod
+    def _to_compact_episodes(
+        cls, deserialized: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        if (
+            len(deserialized["episodes"]) > 0
+            and "goals_by_category" not in deserialized
+        ):
+            deserialized = cls.dedup_goals(deserialized)
+
+        episodes, attrs = super()._to_compact_episodes(deserialized)
+        # Episode ids are their index in the file, as in from_json
+        episodes = [
+            {**ep, "episode_id": str(i)} for i, ep in enumerate(episodes)
+        ]
+        return episodes, attrs
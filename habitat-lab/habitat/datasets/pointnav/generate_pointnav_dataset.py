@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Generates a PointNav dataset for a set of scenes. The scenes are split
+between `--num-workers` processes with one simulator each, and the episodes
+of each scene are written as they are generated (see
+`generate_pointnav_episode_batched`) to the content files of the dataset:
+```
+python habitat-lab/habitat/datasets/pointnav/generate_pointnav_dataset.py \
+    --scenes "data/scene_datasets/gibson/*.glb" \
+    --out-dir data/datasets/pointnav/gibson/v2/train_large \
+    --num-episodes-per-scene 10000 --num-workers 8
+```
+The episodes of a scene go to `content/{scene}.json.gz`, or with
+`--episodes-per-shard` to shards `content/{scene}_part{k}.json.gz` of at most
+that many episodes, which the dataset loads as the scene `{scene}`. A content
+file only appears once it is complete, and the scenes whose content files all
+exist are skipped, so an interrupted generation can be restarted with the
+same arguments.
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import math
+import multiprocessing as mp
+import os
+import os.path as osp
+import queue
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+import habitat
+from habitat.config.default import get_agent_config
+from habitat.core.utils import DatasetJSONEncoder
+from habitat.datasets.pointnav.pointnav_generator import (
+    generate_pointnav_episode_batched,
+)
+from habitat.tasks.nav.nav import NavigationEpisode
+
+CONTENT_DIR = "content"
+
+# The state of the generation process, see `_init_worker`.
+_worker_state: Dict[str, Any] = {}
+
+
+class EpisodeShardWriter:
+    r"""Streams episodes to the content file at :p:`path`, in the format
+    of :ref:`Dataset.to_json`. The episodes are written to a temporary file
+    which replaces :p:`path` when the writer is closed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        self._encoder = DatasetJSONEncoder()
+        self._file = gzip.open(self._tmp_path, "wt")
+        self._file.write('{"episodes": [')
+        self.num_episodes = 0
+
+    def write(self, episode: NavigationEpisode) -> None:
+        if self.num_episodes > 0:
+            self._file.write(", ")
+        self._file.write(self._encoder.encode(episode))
+        self.num_episodes += 1
+
+    def close(self) -> None:
+        self._file.write("]}")
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+
+def scene_key(scene: str) -> str:
+    return osp.basename(scene).split(".")[0]
+
+
+def content_paths(
+    out_dir: str, scene: str, num_episodes: int, episodes_per_shard: int
+) -> List[str]:
+    r"""The content files of the :p:`num_episodes` episodes of
+    :p:`scene`.
+    """
+    content_dir = osp.join(out_dir, CONTENT_DIR)
+    key = scene_key(scene)
+    if episodes_per_shard <= 0:
+        return [osp.join(content_dir, f"{key}.json.gz")]
+    return [
+        osp.join(content_dir, f"{key}_part{shard}.json.gz")
+        for shard in range(math.ceil(num_episodes / episodes_per_shard))
+    ]
+
+
+def scene_seed(seed: int, scene: str) -> int:
+    r"""The seed of the generation of :p:`scene`, which doesn't depend on
+    the other scenes or on the process generating it.
+    """
+    h = hashlib.blake2b(f"{seed}\0{scene_key(scene)}".encode(), digest_size=4)
+    return int.from_bytes(h.digest(), "little")
+
+
+def _init_worker(
+    cfg_path: str,
+    opts: List[str],
+    scenes_dir: str,
+    report_progress: Callable[[int], None],
+) -> None:
+    config = habitat.get_config(cfg_path, opts)
+    with habitat.config.read_write(config):
+        # The generation doesn't render.
+        get_agent_config(config.habitat.simulator).sim_sensors.clear()
+    _worker_state.update(
+        config=config,
+        scenes_dir=scenes_dir,
+        report_progress=report_progress,
+        sim=None,
+    )
+
+
+def _get_sim(scene: str):
+    r"""The simulator of the process, with :p:`scene` loaded."""
+    sim_config = _worker_state["config"].habitat.simulator.copy()
+    with habitat.config.read_write(sim_config):
+        sim_config.scene = scene
+    sim = _worker_state["sim"]
+    if sim is None:
+        sim = habitat.sims.make_sim("Sim-v0", config=sim_config)
+        _worker_state["sim"] = sim
+    else:
+        sim.reconfigure(sim_config)
+    return sim
+
+
+def _generate_scene(
+    task: Tuple[str, List[str], int, int, Dict[str, Any]]
+) -> Tuple[str, int, float]:
+    scene, paths, num_episodes, seed, generator_kwargs = task
+    start_time = time.time()
+    sim = _get_sim(scene)
+    sim.seed(seed)
+    random.seed(seed)
+    np.random.seed(seed)
+
+    scenes_dir = _worker_state["scenes_dir"]
+    scene_id = scene
+    if osp.abspath(scene).startswith(osp.abspath(scenes_dir) + os.sep):
+        # Loading the dataset prepends the scenes directory again.
+        scene_id = osp.relpath(scene, scenes_dir)
+
+    episodes_per_shard = math.ceil(num_episodes / len(paths))
+    episodes = generate_pointnav_episode_batched(
+        sim, num_episodes, **generator_kwargs
+    )
+    num_generated = 0
+    for path in paths:
+        writer = EpisodeShardWriter(path)
+        for episode in episodes:
+            episode.scene_id = scene_id
+            writer.write(episode)
+            num_generated += 1
+            _worker_state["report_progress"](1)
+            if writer.num_episodes == episodes_per_shard:
+                break
+        writer.close()
+    return scene, num_generated, time.time() - start_time
+
+
+def generate_pointnav_dataset(
+    scenes: List[str],
+    out_dir: str,
+    cfg_path: str,
+    opts: Optional[List[str]] = None,
+    split: str = "train",
+    num_episodes_per_scene: int = 1000,
+    episodes_per_shard: int = 0,
+    num_workers: int = 1,
+    seed: int = 0,
+    scenes_dir: str = "data/scene_datasets",
+    generator_kwargs: Optional[Dict[str, Any]] = None,
+) -> None:
+    r"""Generates :p:`num_episodes_per_scene` episodes for each scene of
+    :p:`scenes` into the dataset :py:`{out_dir}/{split}.json.gz`.
+
+    :param cfg_path: The config of the simulator.
+    :param opts: Overrides of the config.
+    :param episodes_per_shard: The maximum number of episodes per content
+        file, 0 for one content file per scene.
+    :param num_workers: The number of generation processes.
+    :param seed: The seed of the generation, each scene is generated with
+        its own seed derived from it.
+    :param scenes_dir: The scene ids of the episodes are relative to this
+        directory.
+    :param generator_kwargs: The arguments of
+        :ref:`generate_pointnav_episode_batched`.
+    """
+    opts = opts or []
+    generator_kwargs = generator_kwargs or {}
+    os.makedirs(osp.join(out_dir, CONTENT_DIR), exist_ok=True)
+    with gzip.open(osp.join(out_dir, f"{split}.json.gz"), "wt") as f:
+        f.write('{"episodes": []}')
+
+    tasks = []
+    for scene in sorted(scenes):
+        paths = content_paths(
+            out_dir, scene, num_episodes_per_scene, episodes_per_shard
+        )
+        if all(osp.isfile(path) for path in paths):
+            continue
+        tasks.append(
+            (
+                scene,
+                paths,
+                num_episodes_per_scene,
+                scene_seed(seed, scene),
+                generator_kwargs,
+            )
+        )
+    print(
+        f"Generating {len(tasks)} scenes, {len(scenes) - len(tasks)} are "
+        "already generated."
+    )
+
+    start_time = time.time()
+    num_generated = 0
+    pbar = tqdm(total=len(tasks) * num_episodes_per_scene, unit="episode")
+
+    def _on_scene_done(result: Tuple[str, int, float]) -> None:
+        nonlocal num_generated
+        scene, num_episodes, scene_time = result
+        num_generated += num_episodes
+        pbar.write(
+            f"{scene_key(scene)}: {num_episodes} episodes in "
+            f"{scene_time:.1f}s ({num_episodes / scene_time:.1f} episodes/s)"
+        )
+
+    if num_workers == 1:
+        _init_worker(cfg_path, opts, scenes_dir, pbar.update)
+        for task in tasks:
+            _on_scene_done(_generate_scene(task))
+    else:
+        ctx = mp.get_context("forkserver")
+        progress = ctx.Queue()
+        with ctx.Pool(
+            num_workers,
+            initializer=_init_worker,
+            initargs=(cfg_path, opts, scenes_dir, progress.put),
+        ) as pool:
+            results = pool.imap_unordered(_generate_scene, tasks)
+            num_done = 0
+            while num_done < len(tasks):
+                try:
+                    _on_scene_done(results.next(timeout=1.0))
+                    num_done += 1
+                except mp.TimeoutError:
+                    pass
+                # Episodes generated by the workers since the last update.
+                try:
+                    while True:
+                        pbar.update(progress.get_nowait())
+                except queue.Empty:
+                    pass
+    pbar.close()
+
+    elapsed = time.time() - start_time
+    print(
+        f"Generated {num_generated} episodes in {elapsed:.1f}s "
+        f"({num_generated / max(elapsed, 1e-6):.1f} episodes/s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scenes",
+        type=str,
+        nargs="+",
+        required=True,
+        help="Scene files or glob patterns of scene files.",
+    )
+    parser.add_argument("--out-dir", type=str, required=True)
+    parser.add_argument("--split", type=str, default="train")
+    parser.add_argument(
+        "--cfg-path",
+        type=str,
+        default="benchmark/nav/pointnav/pointnav_habitat_test.yaml",
+    )
+    parser.add_argument(
+        "--scenes-dir", type=str, default="data/scene_datasets"
+    )
+    parser.add_argument("--num-episodes-per-scene", type=int, default=1000)
+    parser.add_argument(
+        "--episodes-per-shard",
+        type=int,
+        default=0,
+        help="Maximum number of episodes per content file, 0 for one file "
+        "per scene.",
+    )
+    parser.add_argument("--num-workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-shortest-path",
+        action="store_true",
+        help="Don't generate the shortest paths of the episodes.",
+    )
+    parser.add_argument("--closest-dist-limit", type=float, default=1.0)
+    parser.add_argument("--furthest-dist-limit", type=float, default=30.0)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=32,
+        help="Number of episode targets sampled at once.",
+    )
+    parser.add_argument(
+        "opts",
+        default=None,
+        nargs=argparse.REMAINDER,
+        help="Modify config options from command line",
+    )
+    args = parser.parse_args()
+
+    scene_files = sorted(
+        {path for pattern in args.scenes for path in glob.glob(pattern)}
+    )
+    if len(scene_files) == 0:
+        parser.error(f"No scene matches {args.scenes}")
+
+    generate_pointnav_dataset(
+        scene_files,
+        args.out_dir,
+        args.cfg_path,
+        opts=args.opts,
+        split=args.split,
+        num_episodes_per_scene=args.num_episodes_per_scene,
+        episodes_per_shard=args.episodes_per_shard,
+        num_workers=args.num_workers,
+        seed=args.seed,
+        scenes_dir=args.scenes_dir,
+        generator_kwargs=dict(
+            is_gen_shortest_path=not args.no_shortest_path,
+            closest_dist_limit=args.closest_dist_limit,
+            furthest_dist_limit=args.furthest_dist_limit,
+            batch_size=args.batch_size,
+        ),
+    )
@@ -4,14 +4,23 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import glob
 import gzip
 import json
 import os
 import pickle
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import re
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from habitat.config import read_write
 from habitat.core.dataset import ALL_SCENES_MASK, Dataset
+from habitat.core.episode_store import (
+    COMPACT_EPISODES_EXT,
+    CompactEpisodeStore,
+    LazyEpisodeSequence,
+    write_compact_episodes,
+)
 from habitat.core.registry import registry
 from habitat.tasks.nav.nav import (
     NavigationEpisode,
@@ -25,6 +34,17 @@ if TYPE_CHECKING:
 
 CONTENT_SCENES_PATH_FIELD = "content_scenes_path"
 DEFAULT_SCENE_PATH_PREFIX = "data/scene_datasets/"
+# Suffix of the shards of the content file of a scene, see
+# `habitat/datasets/pointnav/generate_pointnav_dataset.py`.
+SCENE_SHARD_PATTERN = re.compile(r"^(.*)_part(\d+)$")
+
+
+def resolve_scene_id(scene_id: str, scenes_dir: str) -> str:
+    r"""Makes a scene id from a dataset file relative to :p:`scenes_dir`."""
+    if scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
+        scene_id = scene_id[len(DEFAULT_SCENE_PATH_PREFIX) :]
+
+    return os.path.join(scenes_dir, scene_id)
 
 
 @registry.register_dataset(name="PointNav-v1")
@@ -87,17 +107,54 @@ class PointNavDatasetV1(Dataset):
         for filename in os.listdir(content_dir):
             if filename.endswith(scene_dataset_ext):
                 scene = filename[: -len(scene_dataset_ext)]
-                scenes.append(scene)
+                shard_match = SCENE_SHARD_PATTERN.match(scene)
+                if shard_match is not None:
+                    scene = shard_match.group(1)
+                if scene not in scenes:
+                    scenes.append(scene)
         scenes.sort()
         return scenes
 
+    def _get_scene_filenames(self, scene: str, dataset_dir: str) -> List[str]:
+        r"""The content file of :p:`scene`, or if it doesn't exist its
+        shards `{scene}_part{k}` in order.
+        """
+        scene_filename = self.content_scenes_path.format(
+            data_path=dataset_dir, scene=scene
+        )
+        if os.path.exists(scene_filename):
+            return [scene_filename]
+        shard_filenames = glob.glob(
+            self.content_scenes_path.format(
+                data_path=glob.escape(dataset_dir),
+                scene=glob.escape(scene) + "_part*",
+            )
+        )
+        shards: List[Tuple[int, str]] = []
+        scene_dataset_ext = self.content_scenes_path.split("{scene}")[1]
+        for filename in shard_filenames:
+            shard_match = SCENE_SHARD_PATTERN.match(
+                os.path.basename(filename)[: -len(scene_dataset_ext)]
+            )
+            if (
+                shard_match is not None
+                and shard_match.group(1) == os.path.basename(scene)
+            ):
+                shards.append((int(shard_match.group(2)), filename))
+        if len(shards) == 0:
+            # Fails to load the missing content file.
+            return [scene_filename]
+        return [filename for _, filename in sorted(shards)]
+
     def _load_from_file(self, fname: str, scenes_dir: str) -> None:
         """
-        Load the data from a file into `self.episodes`. This can load `.pickle`
-        or `.json.gz` file formats.
+        Load the data from a file into `self.episodes`. This can load `.pickle`,
+        `.json.gz` or compact episode (`.episodes.bin`) file formats.
         """
 
-        if fname.endswith(".pickle"):
+        if fname.endswith(COMPACT_EPISODES_EXT):
+            self.from_compact(fname, scenes_dir=scenes_dir)
+        elif fname.endswith(".pickle"):
             # NOTE: not implemented for pointnav
             with open(fname, "rb") as f:
                 self.from_binary(pickle.load(f), scenes_dir=scenes_dir)
@@ -131,12 +188,15 @@ class PointNavDatasetV1(Dataset):
                 )
 
             for scene in scenes:
-                scene_filename = self.content_scenes_path.format(
-                    data_path=dataset_dir, scene=scene
-                )
-
-                self._load_from_file(scene_filename, config.scenes_dir)
+                for scene_filename in self._get_scene_filenames(
+                    scene, dataset_dir
+                ):
+                    self._load_from_file(scene_filename, config.scenes_dir)
 
+        elif isinstance(self.episodes, LazyEpisodeSequence):
+            self.episodes = self.episodes.filter_by_scene(
+                self.build_content_scene_id_filter(config)
+            )
         else:
             self.episodes = list(
                 filter(self.build_content_scenes_filter(config), self.episodes)
@@ -158,20 +218,95 @@ class PointNavDatasetV1(Dataset):
             self.content_scenes_path = deserialized[CONTENT_SCENES_PATH_FIELD]
 
         for episode in deserialized["episodes"]:
-            episode = NavigationEpisode(**episode)
+            episode = self.episode_from_dict(episode)
 
             if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
-
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
-
-            for g_index, goal in enumerate(episode.goals):
-                episode.goals[g_index] = NavigationGoal(**goal)
-            if episode.shortest_paths is not None:
-                for path in episode.shortest_paths:
-                    for p_index, point in enumerate(path):
-                        path[p_index] = ShortestPathPoint(**point)
+                episode.scene_id = resolve_scene_id(
+                    episode.scene_id, scenes_dir
+                )
+
             self.episodes.append(episode)
+
+    @staticmethod
+    def episode_from_dict(episode_dict: Dict[str, Any]) -> NavigationEpisode:
+        r"""Builds an episode from its JSON dict."""
+        episode = NavigationEpisode(**episode_dict)
+
+        for g_index, goal in enumerate(episode.goals):
+            episode.goals[g_index] = NavigationGoal(**goal)
+        if episode.shortest_paths is not None:
+            for path in episode.shortest_paths:
+                for p_index, point in enumerate(path):
+                    path[p_index] = ShortestPathPoint(**point)
+        return episode
+
+    def _compact_decode_fn(self, attrs: Dict[str, Any]) -> Any:
+        r"""Returns the (picklable) function that builds an episode of a
+        compact episode file with dataset-level data :p:`attrs`.
+        """
+        return self.episode_from_dict
+
+    def _set_attrs_from_compact(self, attrs: Dict[str, Any]) -> None:
+        if CONTENT_SCENES_PATH_FIELD in attrs:
+            self.content_scenes_path = attrs[CONTENT_SCENES_PATH_FIELD]
+
+    def from_compact(
+        self, fname: str, scenes_dir: Optional[str] = None
+    ) -> None:
+        r"""Adds the episodes of the compact episode file :p:`fname`. The
+        file is memory-mapped and episodes are only built when accessed.
+        """
+        store = CompactEpisodeStore(
+            fname,
+            scene_id_fn=None
+            if scenes_dir is None
+            else partial(resolve_scene_id, scenes_dir=scenes_dir),
+        )
+        self._set_attrs_from_compact(store.attrs)
+        store.set_decode_fn(self._compact_decode_fn(store.attrs))
+        if store.num_episodes == 0:
+            return
+
+        new_episodes = LazyEpisodeSequence([store])
+        if isinstance(self.episodes, LazyEpisodeSequence):
+            self.episodes = LazyEpisodeSequence.concat(
+                [self.episodes, new_episodes]
+            )
+        elif len(self.episodes) == 0:
+            self.episodes = new_episodes
+        else:
+            self.episodes.extend(new_episodes)
+
+    @classmethod
+    def _to_compact_episodes(
+        cls, deserialized: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        r"""Splits a deserialized JSON dataset into the episode dicts and
+        the dataset-level data written to a compact episode file.
+        """
+        attrs = {k: v for k, v in deserialized.items() if k != "episodes"}
+        return deserialized["episodes"], attrs
+
+    @classmethod
+    def convert_to_compact(
+        cls, json_fname: str, compact_fname: str, is_content_file: bool
+    ) -> None:
+        r"""Converts a :py:`.json.gz` dataset file to a compact episode
+        file.
+
+        :param json_fname: The :py:`.json.gz` file to convert.
+        :param compact_fname: The compact episode file to write.
+        :param is_content_file: Whether :p:`json_fname` is a per-scene
+            content file. If not, the path to the content files stored in the
+            compact file points to compact content files.
+        """
+        with gzip.open(json_fname, "rt") as f:
+            deserialized = json.loads(f.read())
+
+        episodes, attrs = cls._to_compact_episodes(deserialized)
+        if not is_content_file:
+            attrs[CONTENT_SCENES_PATH_FIELD] = attrs.get(
+                CONTENT_SCENES_PATH_FIELD, cls.content_scenes_path
+            ).replace(".json.gz", COMPACT_EPISODES_EXT)
+
+        write_compact_episodes(compact_fname, episodes, attrs)
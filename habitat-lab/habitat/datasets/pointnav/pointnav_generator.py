@@ -54,6 +54,10 @@ def is_compatible_episode(
     if np.abs(s[1] - t[1]) > 0.5:  # check height difference to assure s and
         #  t are from same floor
         return False, 0
+    # The geodesic distance is at least the Euclidean distance, so the pair
+    # can be rejected without a path query.
+    if euclid_dist > far_dist:
+        return False, 0
     d_separation = sim.geodesic_distance(s, [t])
     if d_separation == np.inf:
         return False, 0
@@ -92,6 +96,52 @@ def _create_episode(
     )
 
 
+def _create_episode_with_path(
+    sim: "HabitatSim",
+    episode_id: Union[int, str],
+    source_position: List[float],
+    target_position: List[float],
+    geodesic_distance: float,
+    is_gen_shortest_path: bool,
+    shortest_path_success_distance: float,
+    shortest_path_max_steps: int,
+) -> Optional[NavigationEpisode]:
+    r"""Creates the episode from :p:`source_position` to
+    :p:`target_position` with a random start rotation, :py:`None` if the
+    shortest path can't be generated.
+    """
+    angle = np.random.uniform(0, 2 * np.pi)
+    source_rotation = [0.0, np.sin(angle / 2), 0, np.cos(angle / 2)]
+
+    shortest_paths = None
+    if is_gen_shortest_path:
+        try:
+            shortest_paths = [
+                get_action_shortest_path(
+                    sim,
+                    source_position=source_position,
+                    source_rotation=source_rotation,
+                    goal_position=target_position,
+                    success_distance=shortest_path_success_distance,
+                    max_episode_steps=shortest_path_max_steps,
+                )
+            ]
+        # Throws an error when it can't find a path
+        except GreedyFollowerError:
+            return None
+
+    return _create_episode(
+        episode_id=episode_id,
+        scene_id=sim.habitat_config.scene,
+        start_position=source_position,
+        start_rotation=source_rotation,
+        target_position=target_position,
+        shortest_paths=shortest_paths,
+        radius=shortest_path_success_distance,
+        info={"geodesic_distance": geodesic_distance},
+    )
+
+
 def generate_pointnav_episode(
     sim: "HabitatSim",
     num_episodes: int = -1,
@@ -155,36 +205,110 @@ def generate_pointnav_episode(
             if is_compatible:
                 break
         if is_compatible:
-            angle = np.random.uniform(0, 2 * np.pi)
-            source_rotation = [0.0, np.sin(angle / 2), 0, np.cos(angle / 2)]
-
-            shortest_paths = None
-            if is_gen_shortest_path:
-                try:
-                    shortest_paths = [
-                        get_action_shortest_path(
-                            sim,
-                            source_position=source_position,
-                            source_rotation=source_rotation,
-                            goal_position=target_position,
-                            success_distance=shortest_path_success_distance,
-                            max_episode_steps=shortest_path_max_steps,
-                        )
-                    ]
-                # Throws an error when it can't find a path
-                except GreedyFollowerError:
-                    continue
-
-            episode = _create_episode(
+            episode = _create_episode_with_path(
+                sim,
+                episode_id=episode_count,
+                source_position=source_position,
+                target_position=target_position,
+                geodesic_distance=dist,
+                is_gen_shortest_path=is_gen_shortest_path,
+                shortest_path_success_distance=shortest_path_success_distance,
+                shortest_path_max_steps=shortest_path_max_steps,
+            )
+            if episode is None:
+                continue
+
+            episode_count += 1
+            yield episode
+
+
+def _sample_navigable_points(sim: "HabitatSim", num_points: int) -> np.ndarray:
+    return np.array(
+        [sim.sample_navigable_point() for _ in range(num_points)],
+        dtype=np.float32,
+    ).reshape(num_points, 3)
+
+
+def generate_pointnav_episode_batched(
+    sim: "HabitatSim",
+    num_episodes: int = -1,
+    is_gen_shortest_path: bool = True,
+    shortest_path_success_distance: float = 0.2,
+    shortest_path_max_steps: int = 500,
+    closest_dist_limit: float = 1,
+    furthest_dist_limit: float = 30,
+    geodesic_to_euclid_min_ratio: float = 1.1,
+    number_retries_per_target: int = 10,
+    batch_size: int = 32,
+) -> Generator[NavigationEpisode, None, None]:
+    r"""Generator function that generates PointGoal navigation episodes with
+    the same distribution as :ref:`generate_pointnav_episode`, see its
+    parameters.
+
+    The targets of :p:`batch_size` episodes and their
+    :p:`number_retries_per_target` candidate sources are sampled at once.
+    The candidate pairs on different floors or further apart than
+    :p:`furthest_dist_limit` are rejected with vectorized checks, and only
+    the remaining pairs go through the island radius and geodesic distance
+    queries. The simulator samples the points in a different order, so the
+    episodes differ from :ref:`generate_pointnav_episode` with the same seed.
+
+    :param batch_size: number of targets sampled at once.
+    """
+    episode_count = 0
+    while episode_count < num_episodes or num_episodes < 0:
+        targets = _sample_navigable_points(sim, batch_size)
+        sources = _sample_navigable_points(
+            sim, batch_size * number_retries_per_target
+        ).reshape(batch_size, number_retries_per_target, 3)
+
+        # Same checks as the start of `is_compatible_episode`.
+        offsets = sources - targets[:, None]
+        candidates = (
+            np.isfinite(offsets).all(-1)
+            & (np.abs(offsets[..., 1]) <= 0.5)
+            & (np.linalg.norm(offsets, axis=-1) <= furthest_dist_limit)
+        )
+
+        for target_position, target_sources, target_candidates in zip(
+            targets, sources, candidates
+        ):
+            if 0 <= num_episodes <= episode_count:
+                return
+            if not target_candidates.any():
+                continue
+            target_position = target_position.tolist()
+            if sim.island_radius(target_position) < ISLAND_RADIUS_LIMIT:
+                continue
+
+            is_compatible = False
+            for source_position in target_sources[target_candidates]:
+                source_position = source_position.tolist()
+                is_compatible, dist = is_compatible_episode(
+                    source_position,
+                    target_position,
+                    sim,
+                    near_dist=closest_dist_limit,
+                    far_dist=furthest_dist_limit,
+                    geodesic_to_euclid_ratio=geodesic_to_euclid_min_ratio,
+                )
+                if is_compatible:
+                    break
+            if not is_compatible:
+                continue
+
+            episode = _create_episode_with_path(
+                sim,
                 episode_id=episode_count,
-                scene_id=sim.habitat_config.scene,
-                start_position=source_position,
-                start_rotation=source_rotation,
+                source_position=source_position,
                 target_position=target_position,
-                shortest_paths=shortest_paths,
-                radius=shortest_path_success_distance,
-                info={"geodesic_distance": dist},
+                geodesic_distance=dist,
+                is_gen_shortest_path=is_gen_shortest_path,
+                shortest_path_success_distance=shortest_path_success_distance,
+                shortest_path_max_steps=shortest_path_max_steps,
             )
+            if episode is None:
+                continue
 
             episode_count += 1
             yield episode
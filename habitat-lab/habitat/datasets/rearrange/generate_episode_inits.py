@@ -4,34 +4,115 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+"""
+Generates the articulated agent starts of every episode of a rearrange
+dataset ahead of training. With `--spawn-cache`, the starts are written to the
+shared spawn cache (see `habitat.task.spawn_cache`) and the episodes are
+split between `--num-workers` processes:
+```
+python habitat-lab/habitat/datasets/rearrange/generate_episode_inits.py \
+    --cfg-path benchmark/rearrange/skills/pick.yaml \
+    --spawn-cache data/spawn_cache/pick.bin --num-workers 8
+```
+Training then reads the starts with
+`habitat.task.spawn_cache.path=data/spawn_cache/pick.bin`.
+"""
+
 import argparse
+import multiprocessing as mp
+from typing import List
 
 from tqdm import tqdm
 
 import habitat
 
 
-def generate_inits(cfg_path, opts):
+def generate_inits(
+    cfg_path: str,
+    opts: List[str],
+    worker_idx: int = 0,
+    num_workers: int = 1,
+) -> None:
     config = habitat.get_config(cfg_path, opts)
     with habitat.Env(config=config) as env:
-        for i in tqdm(range(env.number_of_episodes)):
-            if i % 100 == 0:
-                # Print the dataset we are generating initializations for. This
-                # is useful when this script runs for a long time and we don't
-                # know which dataset the job is for.
-                print(cfg_path, config.habitat.dataset.data_path)
-            env.reset()
-
-
-parser = argparse.ArgumentParser()
-parser.add_argument("--cfg-path", type=str, required=True)
-parser.add_argument(
-    "opts",
-    default=None,
-    nargs=argparse.REMAINDER,
-    help="Modify config options from command line",
-)
-args = parser.parse_args()
-
-
-generate_inits(args.cfg_path, args.opts)
+        if num_workers == 1:
+            for i in tqdm(range(env.number_of_episodes)):
+                if i % 100 == 0:
+                    # Print the dataset we are generating initializations for. This
+                    # is useful when this script runs for a long time and we don't
+                    # know which dataset the job is for.
+                    print(cfg_path, config.habitat.dataset.data_path)
+                env.reset()
+        else:
+            # Group the episodes of the worker by scene to avoid reloading
+            # scenes.
+            episodes = sorted(
+                env.episodes[worker_idx::num_workers],
+                key=lambda ep: (ep.scene_id, ep.episode_id),
+            )
+            for episode in tqdm(
+                episodes, desc=f"worker {worker_idx}", position=worker_idx
+            ):
+                env.current_episode = episode
+                env.reset()
+        env.task.flush_spawn_cache()
+
+
+def generate_inits_parallel(
+    cfg_path: str, opts: List[str], spawn_cache: str, num_workers: int
+) -> None:
+    opts = opts + [f"habitat.task.spawn_cache.path={spawn_cache}"]
+    if num_workers == 1:
+        generate_inits(cfg_path, opts)
+        return
+
+    ctx = mp.get_context("forkserver")
+    workers = [
+        ctx.Process(
+            target=generate_inits,
+            args=(cfg_path, opts, worker_idx, num_workers),
+        )
+        for worker_idx in range(num_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    failed = [i for i, w in enumerate(workers) if w.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"Workers {failed} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cfg-path", type=str, required=True)
+    parser.add_argument(
+        "--spawn-cache",
+        type=str,
+        default="",
+        help="Path of the shared spawn cache to fill. If empty, the starts "
+        "are saved with `habitat.task.should_save_to_cache`.",
+    )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=1,
+        help="Number of processes, requires --spawn-cache.",
+    )
+    parser.add_argument(
+        "opts",
+        default=None,
+        nargs=argparse.REMAINDER,
+        help="Modify config options from command line",
+    )
+    args = parser.parse_args()
+    opts = args.opts or []
+
+    if args.spawn_cache:
+        generate_inits_parallel(
+            args.cfg_path, opts, args.spawn_cache, args.num_workers
+        )
+    else:
+        if args.num_workers != 1:
+            parser.error("--num-workers requires --spawn-cache")
+        generate_inits(args.cfg_path, opts)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Multi-process generation of rearrange episodes, used by
+`run_episode_generator.py --num-workers N`.
+
+The episodes are first split between the scenes of the scene sampler, then
+into chunks of at most `chunk_size` episodes of one scene. The chunks are
+queued grouped by scene to a pool of processes, each with its own
+`RearrangeEpisodeGenerator`. Each chunk is generated with a seed derived
+from the base seed, its scene and its index, so the episodes don't depend on
+the number of processes or on which process generates the chunk.
+
+Every generated chunk is saved to `{chunks_dir}/{scene}_{index}.json.gz`
+as soon as it is complete. The plan of the chunks (the generation arguments
+and the chunks) is saved to `{chunks_dir}/plan.json` before any chunk is
+generated. An interrupted generation restarted with the same arguments only
+generates the missing chunks, while restarting it with other arguments in
+the same `chunks_dir` is an error, since its chunks would be mixed with
+chunks of the previous plan. The chunks are finally merged into the dataset
+with `combine_datasets`.
+"""
+
+import gzip
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import os.path as osp
+import random
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from omegaconf import OmegaConf
+from tqdm import tqdm
+
+from habitat.config import DictConfig
+from habitat.core.logging import logger
+from habitat.datasets.rearrange.combine_datasets import combine_datasets
+from habitat.datasets.rearrange.rearrange_dataset import RearrangeDatasetV0
+from habitat.datasets.rearrange.rearrange_generator import (
+    RearrangeEpisodeGenerator,
+)
+
+
+class EpisodeChunk(NamedTuple):
+    """
+    The episodes [first_episode_id, first_episode_id + num_episodes) of the dataset, generated in scene with seed and saved to path.
+    """
+
+    scene: str
+    index: int
+    first_episode_id: int
+    num_episodes: int
+    seed: int
+    path: str
+
+
+# The plan of the chunks of chunks_dir, see `check_plan`.
+PLAN_FILE = "plan.json"
+
+# The generator of the process, see `_init_worker`.
+_worker_state: Dict[str, Any] = {}
+
+
+def chunk_seed(seed: int, scene: str, index: int) -> int:
+    """
+    The seed of the chunk index of scene, which doesn't depend on the other chunks.
+    """
+    h = hashlib.blake2b(f"{seed}\0{scene}\0{index}".encode(), digest_size=4)
+    return int.from_bytes(h.digest(), "little")
+
+
+def plan_chunks(
+    scene_episodes: Dict[str, int],
+    chunks_dir: str,
+    chunk_size: int,
+    seed: int,
+) -> List[EpisodeChunk]:
+    """
+    Split the episodes of each scene into chunks, ordered by scene.
+    """
+    chunks: List[EpisodeChunk] = []
+    first_episode_id = 0
+    for scene in sorted(scene_episodes.keys()):
+        scene_key = osp.basename(scene).split(".")[0]
+        num_scene_episodes = scene_episodes[scene]
+        for index, start in enumerate(
+            range(0, num_scene_episodes, chunk_size)
+        ):
+            num_episodes = min(chunk_size, num_scene_episodes - start)
+            chunks.append(
+                EpisodeChunk(
+                    scene=scene,
+                    index=index,
+                    first_episode_id=first_episode_id,
+                    num_episodes=num_episodes,
+                    seed=chunk_seed(seed, scene, index),
+                    path=osp.join(
+                        chunks_dir, f"{scene_key}_{index:04d}.json.gz"
+                    ),
+                )
+            )
+            first_episode_id += num_episodes
+    return chunks
+
+
+def check_plan(chunks_dir: str, plan: Dict[str, Any]) -> None:
+    """
+    Save plan to the plan file of chunks_dir, or check that it is the plan of the chunks already in chunks_dir.
+    """
+    # Compare the plans as saved to JSON, where the tuples are lists.
+    plan = json.loads(json.dumps(plan))
+    plan_path = osp.join(chunks_dir, PLAN_FILE)
+    if osp.isfile(plan_path):
+        with open(plan_path) as f:
+            saved_plan = json.load(f)
+        if saved_plan != plan:
+            raise ValueError(
+                f"The chunks in {chunks_dir} were generated with other "
+                "arguments, delete them or use another chunks_dir."
+            )
+        return
+
+    if any(f.endswith(".json.gz") for f in os.listdir(chunks_dir)):
+        raise ValueError(
+            f"{chunks_dir} has chunks but no {PLAN_FILE}, delete them or use "
+            "another chunks_dir."
+        )
+    tmp_path = f"{plan_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(plan, f, indent=2)
+    os.replace(tmp_path, plan_path)
+
+
+def _init_worker(
+    cfg: DictConfig,
+    limit_scene_set: Optional[str],
+    num_episodes: int,
+) -> None:
+    _worker_state["generator"] = RearrangeEpisodeGenerator(
+        cfg=cfg,
+        debug_visualization=False,
+        limit_scene_set=limit_scene_set,
+        num_episodes=num_episodes,
+    )
+
+
+def _split_episodes_by_scene(num_episodes: int, seed: int) -> Dict[str, int]:
+    return _worker_state["generator"].split_episodes_by_scene(
+        num_episodes, random.Random(seed)
+    )
+
+
+def _generate_chunk(chunk: EpisodeChunk) -> EpisodeChunk:
+    ep_gen: RearrangeEpisodeGenerator = _worker_state["generator"]
+    random.seed(chunk.seed)
+    np.random.seed(chunk.seed)
+    ep_gen.sim.seed(chunk.seed)
+
+    dataset = RearrangeDatasetV0()
+    dataset.episodes = ep_gen.generate_scene_episodes(
+        chunk.scene, chunk.num_episodes
+    )
+    # The generator numbers the episodes of each process from 0.
+    for i, episode in enumerate(dataset.episodes):
+        episode.episode_id = str(chunk.first_episode_id + i)
+
+    tmp_path = f"{chunk.path}.tmp"
+    with gzip.open(tmp_path, "wt") as f:
+        f.write(dataset.to_json())
+    os.replace(tmp_path, chunk.path)
+    return chunk
+
+
+def generate_episodes_parallel(
+    cfg: DictConfig,
+    num_episodes: int,
+    output_path: str,
+    num_workers: int,
+    chunk_size: int = 20,
+    seed: int = 0,
+    limit_scene_set: Optional[str] = None,
+    chunks_dir: Optional[str] = None,
+) -> None:
+    """
+    Generate num_episodes episodes with num_workers processes and save the dataset to output_path.
+
+    :param cfg: The RearrangeEpisodeGeneratorConfig.
+    :param chunk_size: The maximum number of episodes generated and saved at once by a process.
+    :param seed: The seed of the generation.
+    :param limit_scene_set: Option to limit all generation to a single scene set.
+    :param chunks_dir: The directory of the generated chunks, next to output_path by default.
+    """
+    assert chunk_size > 0, "chunk_size must be positive"
+    if chunks_dir is None:
+        chunks_dir = output_path[: -len(".json.gz")] + "_chunks"
+    os.makedirs(chunks_dir, exist_ok=True)
+
+    start_time = time.time()
+    ctx = mp.get_context("forkserver")
+    with ctx.Pool(
+        num_workers,
+        initializer=_init_worker,
+        initargs=(cfg, limit_scene_set, num_episodes),
+    ) as pool:
+        scene_episodes = pool.apply(
+            _split_episodes_by_scene, (num_episodes, seed)
+        )
+        chunks = plan_chunks(scene_episodes, chunks_dir, chunk_size, seed)
+        check_plan(
+            chunks_dir,
+            {
+                "config": OmegaConf.to_yaml(cfg),
+                "limit_scene_set": limit_scene_set,
+                "num_episodes": num_episodes,
+                "chunk_size": chunk_size,
+                "seed": seed,
+                "chunks": [
+                    dict(chunk._asdict(), path=osp.basename(chunk.path))
+                    for chunk in chunks
+                ],
+            },
+        )
+        todo = [chunk for chunk in chunks if not osp.isfile(chunk.path)]
+        logger.info(
+            f"Generating {len(todo)} chunks of {len(scene_episodes)} scenes, "
+            f"{len(chunks) - len(todo)} chunks are already generated."
+        )
+
+        with tqdm(
+            total=sum(chunk.num_episodes for chunk in todo), unit="episode"
+        ) as pbar:
+            for chunk in pool.imap_unordered(_generate_chunk, todo):
+                pbar.update(chunk.num_episodes)
+
+    logger.info(
+        f"Generated {sum(chunk.num_episodes for chunk in todo)} episodes in "
+        f"{time.time() - start_time:.1f} seconds."
+    )
+    combine_datasets([chunk.path for chunk in chunks], output_path)
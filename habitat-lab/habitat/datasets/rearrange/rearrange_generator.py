@@ -482,6 +482,27 @@ class RearrangeEpisodeGenerator:
 
         return generated_episodes
 
+    def split_episodes_by_scene(
+        self, num_episodes: int, rng: random.Random
+    ) -> Dict[str, int]:
+        """
+        Split num_episodes between the scenes of the scene sampler, see SceneSampler.split_episodes.
+        """
+        return self._scene_sampler.split_episodes(num_episodes, rng)
+
+    def generate_scene_episodes(
+        self, scene: str, num_episodes: int, verbose: bool = False
+    ) -> List[RearrangeEpisode]:
+        """
+        Generate a fixed number of episodes in the scene, instead of the scenes of the scene sampler.
+        """
+        scene_sampler = self._scene_sampler
+        self._scene_sampler = samplers.SingleSceneSampler(scene)
+        try:
+            return self.generate_episodes(num_episodes, verbose)
+        finally:
+            self._scene_sampler = scene_sampler
+
     def generate_single_episode(self) -> Optional[RearrangeEpisode]:
         """
         Generate a single episode, sampling the scene.
@@ -533,6 +554,10 @@ class RearrangeEpisodeGenerator:
                 self.sim.pathfinder,
                 navmesh_settings,
             )
+        # A HabitatSim keys its geodesic distance cache on the navmesh hash,
+        # which load_nav_mesh doesn't reset.
+        if hasattr(self.sim, "invalidate_navmesh_hash"):
+            self.sim.invalidate_navmesh_hash()
 
         # prepare target samplers
         self._get_object_target_samplers()
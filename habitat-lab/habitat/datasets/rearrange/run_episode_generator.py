@@ -7,13 +7,17 @@
 import os
 import os.path as osp
 import random
+import sys
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, List
+from typing import TYPE_CHECKING, Any, List, Optional
 
 import numpy as np
 from omegaconf import OmegaConf
 
 from habitat.core.logging import logger
+from habitat.datasets.rearrange.parallel_episode_generator import (
+    generate_episodes_parallel,
+)
 from habitat.datasets.rearrange.rearrange_dataset import RearrangeDatasetV0
 from habitat.datasets.rearrange.rearrange_generator import (
     RearrangeEpisodeGenerator,
@@ -346,9 +350,47 @@ def get_arg_parser():
         help="The number of episodes to generate.",
     )
     parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=1,
+        help="The number of generation processes. With more than one, the episodes are generated by chunks which are saved as they are generated, see parallel_episode_generator.py.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=20,
+        help="The number of episodes of one scene generated and saved at once by a process, with --num-workers.",
+    )
     return parser
 
 
+def get_output_path(out: Optional[str]) -> str:
+    """
+    Resolve the path of the generated RearrangeDatasetV0 from the --out argument.
+    """
+    output_path = out
+    if output_path is None:
+        # default
+        output_path = "rearrange_ep_dataset.json.gz"
+    elif osp.isdir(output_path) or output_path.endswith("/"):
+        # append a default filename
+        output_path = (
+            osp.abspath(output_path) + "/rearrange_ep_dataset.json.gz"
+        )
+    else:
+        # filename
+        if not output_path.endswith(".json.gz"):
+            output_path += ".json.gz"
+
+    if (
+        not osp.exists(osp.dirname(output_path))
+        and len(osp.dirname(output_path)) > 0
+    ):
+        os.makedirs(osp.dirname(output_path))
+    return output_path
+
+
 if __name__ == "__main__":
     parser = get_arg_parser()
     args, _ = parser.parse_known_args()
@@ -369,6 +411,28 @@ if __name__ == "__main__":
 
     logger.info(f"\n\nModified Config:\n{cfg}\n\n")
 
+    if args.num_workers > 1 and not args.list:
+        assert (
+            not args.debug
+        ), "Debug visualization is not supported with --num-workers."
+        import time
+
+        start_time = time.time()
+        output_path = get_output_path(args.out)
+        generate_episodes_parallel(
+            cfg,
+            args.num_episodes,
+            output_path,
+            num_workers=args.num_workers,
+            chunk_size=args.chunk_size,
+            seed=args.seed if args.seed is not None else 0,
+            limit_scene_set=args.limit_scene_set,
+        )
+        logger.info(
+            f"RearrangeEpisodeGenerator generated {args.num_episodes} episodes in {time.time()-start_time} seconds."
+        )
+        sys.exit(0)
+
     dataset = RearrangeDatasetV0()
     with RearrangeEpisodeGenerator(
         cfg=cfg,
@@ -391,25 +455,7 @@ if __name__ == "__main__":
             dataset.episodes += ep_gen.generate_episodes(
                 args.num_episodes, args.verbose
             )
-            output_path = args.out
-            if output_path is None:
-                # default
-                output_path = "rearrange_ep_dataset.json.gz"
-            elif osp.isdir(output_path) or output_path.endswith("/"):
-                # append a default filename
-                output_path = (
-                    osp.abspath(output_path) + "/rearrange_ep_dataset.json.gz"
-                )
-            else:
-                # filename
-                if not output_path.endswith(".json.gz"):
-                    output_path += ".json.gz"
-
-            if (
-                not osp.exists(osp.dirname(output_path))
-                and len(osp.dirname(output_path)) > 0
-            ):
-                os.makedirs(osp.dirname(output_path))
+            output_path = get_output_path(args.out)
             # serialize the dataset
             import gzip
 
@@ -4,7 +4,8 @@
 
 import random
 from abc import ABC, abstractmethod
-from typing import List
+from collections import Counter
+from typing import Dict, List
 
 
 class SceneSampler(ABC):
@@ -30,6 +31,14 @@ class SceneSampler(ABC):
         Set the current episode index. Used by some sampler implementations which pivot on the total number of successful episodes generated thus far.
         """
 
+    @abstractmethod
+    def split_episodes(
+        self, num_episodes: int, rng: random.Random
+    ) -> Dict[str, int]:
+        """
+        Split num_episodes between the scenes as sampling a scene for each episode would, using rng for any randomness. Used to generate the episodes of each scene separately.
+        """
+
 
 class SingleSceneSampler(SceneSampler):
     """
@@ -42,6 +51,11 @@ class SingleSceneSampler(SceneSampler):
     def sample(self) -> str:
         return self.scene
 
+    def split_episodes(
+        self, num_episodes: int, rng: random.Random
+    ) -> Dict[str, int]:
+        return {self.scene: num_episodes}
+
     def num_scenes(self) -> int:
         """
         Get the number of scenes available from this sampler.
@@ -66,6 +80,18 @@ class MultiSceneSampler(SceneSampler):
         """
         return self.scenes[random.randrange(0, len(self.scenes))]
 
+    def split_episodes(
+        self, num_episodes: int, rng: random.Random
+    ) -> Dict[str, int]:
+        # Sorted so that the split only depends on rng.
+        scenes = sorted(self.scenes)
+        return dict(
+            Counter(
+                scenes[rng.randrange(0, len(scenes))]
+                for _ in range(num_episodes)
+            )
+        )
+
     def num_scenes(self) -> int:
         """
         Get the number of scenes available from this sampler.
@@ -102,6 +128,14 @@ class BalancedSceneSampler(SceneSampler):
         """
         return self.scenes[int(self.cur_episode / self.num_ep_per_scene)]
 
+    def split_episodes(
+        self, num_episodes: int, rng: random.Random
+    ) -> Dict[str, int]:
+        assert (
+            num_episodes == self.num_episodes
+        ), f"BalancedSceneSampler was configured for {self.num_episodes} episodes, not {num_episodes}."
+        return {scene: self.num_ep_per_scene for scene in self.scenes}
+
     def num_scenes(self) -> int:
         """
         Get the number of scenes available from this sampler.
@@ -17,6 +17,7 @@ from habitat.core.batch_rendering.env_batch_renderer_constants import (
 )
 from habitat.core.simulator import Observations
 from habitat.core.spaces import EmptySpace
+from habitat.tasks.nav.nav import NAV_POSE_OBSERVATION_KEY
 from habitat.tasks.rearrange.rearrange_sim import add_perf_timing_func
 from habitat.utils.visualizations.utils import observations_to_image
 
@@ -250,6 +251,15 @@ class HabGymWrapper(gym.Wrapper):
         # Store so we can profile functions on this class.
         self._sim = self.env._env._sim
 
+        # With batched nav sensors, these observations are only added by
+        # VectorEnv.post_step, from the poses passed through instead.
+        self._batched_obs_keys = set(
+            getattr(self.env._env.task, "batched_nav_sensors", [])
+        )
+        assert self._batched_obs_keys.isdisjoint(
+            [*self._gym_goal_keys, *self._gym_achieved_goal_keys]
+        ), "The batched nav sensors can't be goal observations"
+
     @add_perf_timing_func()
     def step(
         self, action: Union[np.ndarray, int]
@@ -286,9 +296,18 @@ class HabGymWrapper(gym.Wrapper):
 
         observation = {
             "observation": OrderedDict(
-                [(k, obs[k]) for k in self._gym_obs_keys]
+                [
+                    (k, obs[k])
+                    for k in self._gym_obs_keys
+                    if k not in self._batched_obs_keys
+                ]
             )
         }
+        if NAV_POSE_OBSERVATION_KEY in obs:
+            # Replaced by the batched nav sensors in VectorEnv.post_step.
+            observation["observation"][NAV_POSE_OBSERVATION_KEY] = obs[
+                NAV_POSE_OBSERVATION_KEY
+            ]
 
         if len(self._gym_goal_keys) > 0:
             observation["desired_goal"] = OrderedDict(
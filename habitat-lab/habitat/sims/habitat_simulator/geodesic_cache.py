@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""A geodesic distance cache that can be shared by the simulators of all
+the workers on a node.
+
+Entries are keyed by a hash of the navmesh, of the start position quantized
+to a grid and of the goal positions. The table is a set-associative array of
+fixed capacity with least-recently-used eviction inside each set. When a
+:py:`path` is given, the table is a memory-mapped file, so every process
+opening the same file sees the distances computed by the others.
+
+The table is a :ref:`SharedHashTable`, so concurrent readers and writers
+need no lock.
+"""
+
+import hashlib
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from habitat.utils.shared_table import SharedHashTable
+
+
+def hash_navmesh(vertices: Union[np.ndarray, Sequence]) -> int:
+    r"""Hash of the navmesh vertices, identical in every process that loaded
+    the same navmesh.
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+    return int.from_bytes(
+        hashlib.blake2b(vertices.tobytes(), digest_size=8).digest(), "little"
+    )
+
+
+class GeodesicDistanceCache:
+    r"""Least-recently-used cache of geodesic distances.
+
+    :param capacity: Maximum number of cached distances.
+    :param quantization: Size in meters of the grid cells the start position
+        is snapped to. Starts in the same cell share the cached distance, so
+        a cached distance can be off by up to about :py:`quantization *
+        sqrt(3)`.
+    :param path: If set, the table is the memory-mapped file at this path,
+        which is created if needed and shared by all the caches opened on
+        it with the same :p:`capacity` and :p:`ways`. Otherwise, the table
+        is private to this process.
+    :param ways: Number of entries per set. An entry can only evict the
+        least recently used entry of its own set.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 2**16,
+        quantization: float = 0.01,
+        path: Optional[str] = None,
+        ways: int = 8,
+    ) -> None:
+        assert quantization > 0.0
+        self._quantization = quantization
+        self.path = path
+        self._table = SharedHashTable(
+            capacity,
+            ways,
+            data_words=1,
+            path=path,
+            lru=True,
+            name="geodesic cache",
+        )
+
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self,
+        navmesh_hash: int,
+        start: Union[Sequence[float], np.ndarray],
+        goals: Union[Sequence[Sequence[float]], np.ndarray],
+    ) -> int:
+        r"""Returns the (non-zero) cache key of the distance from :p:`start`
+        to the closest of :p:`goals` on the navmesh with hash
+        :p:`navmesh_hash`.
+        """
+        cell = np.floor(
+            np.asarray(start, dtype=np.float64) / self._quantization
+        ).astype(np.int64)
+        h = hashlib.blake2b(digest_size=8)
+        h.update(np.uint64(navmesh_hash).tobytes())
+        h.update(cell.tobytes())
+        h.update(np.ascontiguousarray(goals, dtype=np.float32).tobytes())
+        return int.from_bytes(h.digest(), "little") or 1
+
+    def get(self, key: int) -> Optional[float]:
+        r"""Returns the cached distance for :p:`key`, :py:`None` on a miss."""
+        data = self._table.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return float(data.view(np.float64)[0])
+
+    def put(self, key: int, distance: float) -> None:
+        r"""Caches :p:`distance` for :p:`key`, evicting the least recently
+        used entry of its set if the set is full.
+        """
+        self._table.put(
+            key, np.array([distance], dtype=np.float64).view(np.uint64)
+        )
@@ -44,6 +44,10 @@ from habitat.core.simulator import (
     VisualObservation,
 )
 from habitat.core.spaces import Space
+from habitat.sims.habitat_simulator.geodesic_cache import (
+    GeodesicDistanceCache,
+    hash_navmesh,
+)
 
 if TYPE_CHECKING:
     from torch import Tensor
@@ -306,6 +310,18 @@ class HabitatSim(habitat_sim.Simulator, Simulator):
         )
         self._prev_sim_obs: Optional[Observations] = None
 
+        self.geodesic_cache: Optional[GeodesicDistanceCache] = None
+        cache_config = self.habitat_config.geodesic_cache
+        if cache_config.enabled:
+            self.geodesic_cache = GeodesicDistanceCache(
+                capacity=cache_config.capacity,
+                quantization=cache_config.quantization,
+                path=cache_config.path if cache_config.path else None,
+                ways=cache_config.ways,
+            )
+        # Hash of the loaded navmesh, see `get_navmesh_hash`.
+        self._navmesh_hash: Optional[int] = None
+
     def create_sim_config(
         self, _sensor_suite: SensorSuite
     ) -> habitat_sim.Configuration:
@@ -519,6 +535,7 @@ class HabitatSim(habitat_sim.Simulator, Simulator):
             if should_close_on_new_scene:
                 self.close(destroy=False)
             super().reconfigure(self.sim_config)
+            self.invalidate_navmesh_hash()
 
         self._update_agents_state()
 
@@ -530,6 +547,15 @@ class HabitatSim(habitat_sim.Simulator, Simulator):
         ],
         episode: Optional[Episode] = None,
     ) -> float:
+        cache_key = None
+        if self.geodesic_cache is not None:
+            cache_key = self.geodesic_cache.key(
+                self.get_navmesh_hash(), position_a, position_b
+            )
+            distance = self.geodesic_cache.get(cache_key)
+            if distance is not None:
+                return distance
+
         if episode is None or episode._shortest_path_cache is None:
             path = habitat_sim.MultiGoalShortestPath()
             if isinstance(position_b[0], (Sequence, np.ndarray)):
@@ -548,8 +574,34 @@ class HabitatSim(habitat_sim.Simulator, Simulator):
         if episode is not None:
             episode._shortest_path_cache = path
 
+        if self.geodesic_cache is not None and cache_key is not None:
+            self.geodesic_cache.put(cache_key, path.geodesic_distance)
+
         return path.geodesic_distance
 
+    def recompute_navmesh(self, *args: Any, **kwargs: Any) -> bool:
+        result = super().recompute_navmesh(*args, **kwargs)
+        self.invalidate_navmesh_hash()
+        return result
+
+    def invalidate_navmesh_hash(self) -> None:
+        r"""Must be called when the navmesh is changed without
+        :ref:`reconfigure` or :ref:`recompute_navmesh`, for example by
+        :py:`pathfinder.load_nav_mesh`, so that the geodesic distance cache
+        and the top-down map cache aren't used with the previous navmesh.
+        """
+        self._navmesh_hash = None
+
+    def get_navmesh_hash(self) -> int:
+        r"""Hash of the vertices of the loaded navmesh, computed once per
+        navmesh on the first call.
+        """
+        if self._navmesh_hash is None:
+            self._navmesh_hash = hash_navmesh(
+                self.pathfinder.build_navmesh_vertices()
+            )
+        return self._navmesh_hash
+
     def action_space_shortest_path(
         self,
         source: AgentState,
@@ -6,7 +6,17 @@
 
 # TODO, lots of typing errors in here
 
-from typing import TYPE_CHECKING, Any, List, Optional, Sequence, Tuple, Union
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import attr
 import numpy as np
@@ -36,8 +46,12 @@ from habitat.core.utils import not_none_validator, try_cv2_import
 from habitat.sims.habitat_simulator.actions import HabitatSimActions
 from habitat.tasks.utils import cartesian_to_polar
 from habitat.utils.geometry_utils import (
+    batch_quaternion_inverse,
+    batch_quaternion_multiply,
+    batch_quaternion_rotate_vector,
     quaternion_from_coeff,
     quaternion_rotate_vector,
+    quaternion_to_list,
 )
 from habitat.utils.visualizations import fog_of_war, maps
 
@@ -59,8 +73,14 @@ if TYPE_CHECKING:
 
 cv2 = try_cv2_import()
 
+# Key of the observation holding the agent and episode poses that the
+# batched nav sensors are computed from, see `BatchedNavSensors`.
+NAV_POSE_OBSERVATION_KEY = "nav_pose"
+
 
 MAP_THICKNESS_SCALAR: int = 128
+# Floor heights within the same bin share their cached top-down map.
+MAP_CACHE_HEIGHT_BIN: float = 0.1
 
 
 @attr.s(auto_attribs=True, kw_only=True)
@@ -106,6 +126,50 @@ class NavigationEpisode(Episode):
     shortest_paths: Optional[List[List[ShortestPathPoint]]] = None
 
 
+@attr.s(auto_attribs=True, slots=True)
+class NavPoseBatch:
+    r"""Agent and episode poses of N envs, from which the batched nav
+    sensors are computed. Rotations are quaternions in [x, y, z, w] format.
+    """
+    agent_position: np.ndarray
+    agent_rotation: np.ndarray
+    start_position: np.ndarray
+    start_rotation: np.ndarray
+    goal_position: np.ndarray
+
+    @staticmethod
+    def pose_vector(
+        agent_state: AgentState, episode: NavigationEpisode
+    ) -> np.ndarray:
+        r"""Packs the poses of one env into the vector sent as the
+        :py:`NAV_POSE_OBSERVATION_KEY` observation.
+        """
+        goal_position = (
+            episode.goals[0].position
+            if episode.goals is not None and len(episode.goals) > 0
+            else [np.nan] * 3
+        )
+        return np.concatenate(
+            [
+                agent_state.position,
+                quaternion_to_list(agent_state.rotation),
+                episode.start_position,
+                episode.start_rotation,
+                goal_position,
+            ]
+        ).astype(np.float64)
+
+    @classmethod
+    def from_pose_vectors(cls, pose_vectors: np.ndarray) -> "NavPoseBatch":
+        return cls(
+            agent_position=pose_vectors[:, 0:3],
+            agent_rotation=pose_vectors[:, 3:7],
+            start_position=pose_vectors[:, 7:10],
+            start_rotation=pose_vectors[:, 10:14],
+            goal_position=pose_vectors[:, 14:17],
+        )
+
+
 @registry.register_sensor
 class PointGoalSensor(Sensor):
     r"""Sensor for PointGoal observations which are used in PointGoal Navigation.
@@ -193,6 +257,34 @@ class PointGoalSensor(Sensor):
             else:
                 return direction_vector_agent
 
+    def _compute_pointgoal_batch(
+        self,
+        source_positions: np.ndarray,
+        source_rotations: np.ndarray,
+        goal_positions: np.ndarray,
+    ) -> np.ndarray:
+        direction_vector_agent = batch_quaternion_rotate_vector(
+            batch_quaternion_inverse(source_rotations),
+            goal_positions - source_positions,
+        )
+        x = -direction_vector_agent[:, 2]
+        y = direction_vector_agent[:, 0]
+
+        if self._goal_format == "POLAR":
+            rho, phi = cartesian_to_polar(x, y)
+            if self._dimensionality == 2:
+                pointgoal = np.stack([rho, -phi], 1)
+            else:
+                rho = np.linalg.norm(direction_vector_agent, axis=1)
+                theta = np.arccos(direction_vector_agent[:, 1] / rho)
+                pointgoal = np.stack([rho, -phi, theta], 1)
+        elif self._dimensionality == 2:
+            pointgoal = np.stack([x, y], 1)
+        else:
+            pointgoal = direction_vector_agent
+
+        return pointgoal.astype(np.float32)
+
     def get_observation(
         self,
         observations,
@@ -208,6 +300,14 @@ class PointGoalSensor(Sensor):
             source_position, rotation_world_start, goal_position
         )
 
+    def get_batched_observation(self, poses: NavPoseBatch) -> np.ndarray:
+        r"""Computes the observations of N envs at once, see
+        :ref:`BatchedNavSensors`.
+        """
+        return self._compute_pointgoal_batch(
+            poses.start_position, poses.start_rotation, poses.goal_position
+        )
+
 
 @registry.register_sensor
 class ImageGoalSensor(Sensor):
@@ -325,6 +425,11 @@ class IntegratedPointGoalGPSAndCompassSensor(PointGoalSensor):
             agent_position, rotation_world_agent, goal_position
         )
 
+    def get_batched_observation(self, poses: NavPoseBatch) -> np.ndarray:
+        return self._compute_pointgoal_batch(
+            poses.agent_position, poses.agent_rotation, poses.goal_position
+        )
+
 
 @registry.register_sensor
 class HeadingSensor(Sensor):
@@ -360,6 +465,20 @@ class HeadingSensor(Sensor):
         phi = cartesian_to_polar(-heading_vector[2], heading_vector[0])[1]
         return np.array([phi], dtype=np.float32)
 
+    def _quat_to_xy_heading_batch(self, quats: np.ndarray) -> np.ndarray:
+        direction_vectors = np.broadcast_to(
+            np.array([0.0, 0.0, -1.0]), (len(quats), 3)
+        )
+
+        heading_vectors = batch_quaternion_rotate_vector(
+            quats, direction_vectors
+        )
+
+        phi = cartesian_to_polar(
+            -heading_vectors[:, 2], heading_vectors[:, 0]
+        )[1]
+        return phi[:, None].astype(np.float32)
+
     def get_observation(
         self, observations, episode, *args: Any, **kwargs: Any
     ):
@@ -371,6 +490,11 @@ class HeadingSensor(Sensor):
         else:
             raise ValueError("Agent's rotation was not a quaternion")
 
+    def get_batched_observation(self, poses: NavPoseBatch) -> np.ndarray:
+        return self._quat_to_xy_heading_batch(
+            batch_quaternion_inverse(poses.agent_rotation)
+        )
+
 
 @registry.register_sensor(name="CompassSensor")
 class EpisodicCompassSensor(HeadingSensor):
@@ -396,6 +520,14 @@ class EpisodicCompassSensor(HeadingSensor):
         else:
             raise ValueError("Agent's rotation was not a quaternion")
 
+    def get_batched_observation(self, poses: NavPoseBatch) -> np.ndarray:
+        return self._quat_to_xy_heading_batch(
+            batch_quaternion_multiply(
+                batch_quaternion_inverse(poses.agent_rotation),
+                poses.start_rotation,
+            )
+        )
+
 
 @registry.register_sensor(name="GPSSensor")
 class EpisodicGPSSensor(Sensor):
@@ -454,6 +586,69 @@ class EpisodicGPSSensor(Sensor):
         else:
             return agent_position.astype(np.float32)
 
+    def get_batched_observation(self, poses: NavPoseBatch) -> np.ndarray:
+        agent_positions = batch_quaternion_rotate_vector(
+            batch_quaternion_inverse(poses.start_rotation),
+            poses.agent_position - poses.start_position,
+        )
+        if self._dimensionality == 2:
+            agent_positions = np.stack(
+                [-agent_positions[:, 2], agent_positions[:, 0]], 1
+            )
+        return agent_positions.astype(np.float32)
+
+
+class BatchedNavSensors:
+    r"""Computes the GPS, compass, heading and pointgoal sensors of N envs at
+    once with array operations, in the process that batches the
+    observations (see :ref:`VectorEnv.initialize_batched_nav_sensors`).
+
+    With :py:`habitat.task.batched_nav_sensors`, the :ref:`NavigationTask`
+    of each env doesn't compute these sensors. It only sends the agent and
+    episode poses as the :py:`NAV_POSE_OBSERVATION_KEY` observation, which
+    :ref:`post_step` replaces by the sensor observations.
+    """
+
+    def __init__(self, task_config: "DictConfig") -> None:
+        self._sensors: List[Sensor] = []
+        for sensor_cfg in task_config.lab_sensors.values():
+            sensor_type = registry.get_sensor(sensor_cfg.type)
+            if not is_batched_nav_sensor(sensor_type):
+                continue
+            # The batched observations only depend on the poses
+            self._sensors.append(sensor_type(sim=None, config=sensor_cfg))
+
+    def post_step(
+        self, observations: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        r"""Replaces the poses of each env by the sensor observations."""
+        if len(self._sensors) == 0 or len(observations) == 0:
+            return observations
+
+        poses = NavPoseBatch.from_pose_vectors(
+            np.stack(
+                [obs.pop(NAV_POSE_OBSERVATION_KEY) for obs in observations], 0
+            )
+        )
+        for sensor in self._sensors:
+            batched_obs = sensor.get_batched_observation(poses)  # type: ignore
+            for obs, sensor_obs in zip(observations, batched_obs):
+                obs[sensor.uuid] = sensor_obs
+        return observations
+
+
+def is_batched_nav_sensor(sensor_type: Optional[type]) -> bool:
+    r"""Whether :ref:`BatchedNavSensors` can compute the sensor."""
+    # Subclasses (e.g. the rearrange sensors) compute other observations,
+    # so only the exact sensor types are batched.
+    return sensor_type in (
+        PointGoalSensor,
+        IntegratedPointGoalGPSAndCompassSensor,
+        HeadingSensor,
+        EpisodicCompassSensor,
+        EpisodicGPSSensor,
+    )
+
 
 @registry.register_sensor
 class ProximitySensor(Sensor):
@@ -556,6 +751,8 @@ class SPL(Measure):
     performance for sophisticated goal areas.
     """
 
+    accumulates_over_steps: bool = True
+
     def __init__(
         self, sim: Simulator, config: "DictConfig", *args: Any, **kwargs: Any
     ):
@@ -659,6 +856,8 @@ class SoftSPL(SPL):
 
 @registry.register_measure
 class Collisions(Measure):
+    accumulates_over_steps: bool = True
+
     def __init__(self, sim, config, *args: Any, **kwargs: Any):
         self._sim = sim
         self._config = config
@@ -681,6 +880,8 @@ class Collisions(Measure):
 class TopDownMap(Measure):
     r"""Top Down Map measure"""
 
+    accumulates_over_steps: bool = True
+
     def __init__(
         self,
         sim: "HabitatSim",
@@ -700,6 +901,13 @@ class TopDownMap(Measure):
         self._previous_xy_location: List[Optional[Tuple[int, int]]] = None
         self._top_down_map: Optional[np.ndarray] = None
         self._shortest_path_points: Optional[List[Tuple[int, int]]] = None
+        # The top-down maps of the previous episodes, by scene, navmesh,
+        # floor and resolution, most recently used last.
+        self._map_cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._meters_per_pixel: Optional[float] = None
+        # The grid position and angle the fog of war was last revealed
+        # from, for each agent.
+        self._last_fog_of_war_pose: List[Optional[Tuple[int, int, float]]] = []
         self.line_thickness = int(
             np.round(self._map_resolution * 2 / MAP_THICKNESS_SCALAR)
         )
@@ -712,10 +920,32 @@ class TopDownMap(Measure):
         return "top_down_map"
 
     def get_original_map(self):
-        top_down_map = maps.get_topdown_map_from_sim(
-            self._sim,
-            map_resolution=self._map_resolution,
-            draw_border=self._config.draw_border,
+        height = self._sim.get_agent(0).state.position[1]
+        key = (
+            self._sim.habitat_config.scene,
+            self._sim.get_navmesh_hash(),
+            int(np.round(height / MAP_CACHE_HEIGHT_BIN)),
+            self._map_resolution,
+            self._config.draw_border,
+        )
+        base_map = self._map_cache.get(key)
+        if base_map is None:
+            base_map = maps.get_topdown_map(
+                self._sim.pathfinder,
+                height,
+                self._map_resolution,
+                self._config.draw_border,
+            )
+            if self._config.map_cache_size > 0:
+                self._map_cache[key] = base_map
+                while len(self._map_cache) > self._config.map_cache_size:
+                    self._map_cache.popitem(last=False)
+        else:
+            self._map_cache.move_to_end(key)
+        # The episode draws on its own copy.
+        top_down_map = base_map.copy()
+        self._meters_per_pixel = maps.calculate_meters_per_pixel(
+            self._map_resolution, sim=self._sim
         )
 
         if self._config.fog_of_war.draw:
@@ -852,6 +1082,9 @@ class TopDownMap(Measure):
         self._previous_xy_location = [
             None for _ in range(len(self._sim.habitat_config.agents))
         ]
+        self._last_fog_of_war_pose = [
+            None for _ in range(len(self._sim.habitat_config.agents))
+        ]
 
         if hasattr(episode, "goals"):
             # draw source and target parts last to avoid overlap
@@ -917,23 +1150,34 @@ class TopDownMap(Measure):
                     thickness=thickness,
                 )
         angle = TopDownMap.get_polar_angle(agent_state)
-        self.update_fog_of_war_mask(np.array([a_x, a_y]), angle)
+        self.update_fog_of_war_mask(np.array([a_x, a_y]), angle, agent_index)
 
         self._previous_xy_location[agent_index] = (a_y, a_x)
         return a_x, a_y
 
-    def update_fog_of_war_mask(self, agent_position, angle):
+    def update_fog_of_war_mask(self, agent_position, angle, agent_index=0):
         if self._config.fog_of_war.draw:
-            self._fog_of_war_mask = fog_of_war.reveal_fog_of_war(
+            # The walls don't move and the mask only grows, so nothing new
+            # is revealed from the pose of the last reveal.
+            pose = (
+                int(agent_position[0]),
+                int(agent_position[1]),
+                float(angle),
+            )
+            if self._last_fog_of_war_pose[agent_index] == pose:
+                return
+            self._last_fog_of_war_pose[agent_index] = pose
+
+            # Like the map, the mask is updated in place.
+            fog_of_war.reveal_fog_of_war(
                 self._top_down_map,
                 self._fog_of_war_mask,
                 agent_position,
                 angle,
                 fov=self._config.fog_of_war.fov,
                 max_line_len=self._config.fog_of_war.visibility_dist
-                / maps.calculate_meters_per_pixel(
-                    self._map_resolution, sim=self._sim
-                ),
+                / self._meters_per_pixel,
+                inplace=True,
             )
 
 
@@ -1000,6 +1244,49 @@ class DistanceToGoal(Measure):
             self._metric = distance_to_target
 
 
+@registry.register_measure
+class GeodesicCacheStats(Measure):
+    r"""Hits, misses and hit rate of the geodesic distance cache of the
+    simulator since the start of the episode. Empty if the simulator has no
+    geodesic distance cache.
+    """
+
+    cls_uuid: str = "geodesic_cache_stats"
+
+    def __init__(
+        self, sim: Simulator, config: "DictConfig", *args: Any, **kwargs: Any
+    ):
+        self._sim = sim
+        self._config = config
+        self._start_hits = 0
+        self._start_misses = 0
+        super().__init__()
+
+    def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
+        return self.cls_uuid
+
+    def reset_metric(self, *args: Any, **kwargs: Any):
+        cache = getattr(self._sim, "geodesic_cache", None)
+        if cache is not None:
+            self._start_hits = cache.hits
+            self._start_misses = cache.misses
+        self.update_metric(*args, **kwargs)
+
+    def update_metric(self, *args: Any, **kwargs: Any):
+        cache = getattr(self._sim, "geodesic_cache", None)
+        if cache is None:
+            self._metric = {}
+            return
+
+        hits = cache.hits - self._start_hits
+        misses = cache.misses - self._start_misses
+        self._metric = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0.0,
+        }
+
+
 @registry.register_measure
 class DistanceToGoalReward(Measure):
     """
@@ -1009,6 +1296,7 @@ class DistanceToGoalReward(Measure):
     """
 
     cls_uuid: str = "distance_to_goal_reward"
+    accumulates_over_steps: bool = True
 
     def __init__(
         self, sim: Simulator, config: "DictConfig", *args: Any, **kwargs: Any
@@ -1324,6 +1612,41 @@ class NavigationTask(EmbodiedTask):
     ) -> None:
         super().__init__(config=config, sim=sim, dataset=dataset)
 
+        # With batched nav sensors, these sensors are computed for all the
+        # envs at once by BatchedNavSensors and only their observation
+        # spaces stay in the sensor suite.
+        self._batched_nav_sensors = [
+            uuid
+            for uuid, sensor in self.sensor_suite.sensors.items()
+            if config.batched_nav_sensors
+            and is_batched_nav_sensor(type(sensor))
+        ]
+        for uuid in self._batched_nav_sensors:
+            del self.sensor_suite.sensors[uuid]
+
+    @property
+    def batched_nav_sensors(self) -> List[str]:
+        r"""The uuids of the sensors computed by :ref:`BatchedNavSensors`,
+        which are only in the observations after :ref:`VectorEnv.post_step`.
+        """
+        return self._batched_nav_sensors
+
+    def reset(self, episode: Episode):
+        observations = super().reset(episode)
+        if len(self._batched_nav_sensors) > 0:
+            observations[NAV_POSE_OBSERVATION_KEY] = NavPoseBatch.pose_vector(
+                self._sim.get_agent_state(), episode
+            )
+        return observations
+
+    def step(self, action: Dict[str, Any], episode: Episode):
+        observations = super().step(action=action, episode=episode)
+        if len(self._batched_nav_sensors) > 0:
+            observations[NAV_POSE_OBSERVATION_KEY] = NavPoseBatch.pose_vector(
+                self._sim.get_agent_state(), episode
+            )
+        return observations
+
     def overwrite_sim_config(self, config: Any, episode: Episode) -> Any:
         with read_write(config):
             config.simulator.scene = episode.scene_id
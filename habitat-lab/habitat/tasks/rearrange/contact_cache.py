@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+The contact points of the last collision detection as arrays, see
+`RearrangeSim.get_contact_arrays`. The collision and force measures of every
+agent query the same arrays with vectorized masks instead of each iterating
+over the contact points.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+
+@dataclass
+class ContactArrays:
+    """
+    One element per contact point.
+
+    :property object_id_a: Object id of the first object of the contact.
+    :property object_id_b: Object id of the second object of the contact.
+    :property link_id_a: Link id of the first object, -1 for the base link.
+    :property link_id_b: Link id of the second object, -1 for the base link.
+    :property normal_force: Normal force of the contact.
+    """
+
+    object_id_a: np.ndarray
+    object_id_b: np.ndarray
+    link_id_a: np.ndarray
+    link_id_b: np.ndarray
+    normal_force: np.ndarray
+
+    @classmethod
+    def from_contact_points(cls, contact_points: Iterable) -> "ContactArrays":
+        """
+        Converts the contact points of `sim.get_physics_contact_points()`.
+        """
+        contact_points = list(contact_points)
+        ids = np.array(
+            [
+                (c.object_id_a, c.object_id_b, c.link_id_a, c.link_id_b)
+                for c in contact_points
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 4)
+        return cls(
+            object_id_a=ids[:, 0],
+            object_id_b=ids[:, 1],
+            link_id_a=ids[:, 2],
+            link_id_b=ids[:, 3],
+            normal_force=np.array(
+                [c.normal_force for c in contact_points], dtype=np.float64
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.object_id_a)
+
+    def involves(self, object_id: Optional[int]) -> np.ndarray:
+        """Mask of the contacts of the object `object_id`."""
+        if object_id is None:
+            return np.zeros(len(self), dtype=bool)
+        return (self.object_id_a == object_id) | (
+            self.object_id_b == object_id
+        )
+
+    def involves_any(self, object_ids: Sequence[int]) -> np.ndarray:
+        """Mask of the contacts of any of the objects `object_ids`."""
+        object_ids = np.asarray(object_ids, dtype=np.int64)
+        return np.isin(self.object_id_a, object_ids) | np.isin(
+            self.object_id_b, object_ids
+        )
+
+    def other_object_id(self, object_id: int) -> np.ndarray:
+        """
+        The object each contact of `object_id` is with. Only meaningful for
+        the contacts of `object_id`.
+        """
+        return np.where(
+            self.object_id_a == object_id, self.object_id_b, self.object_id_a
+        )
+
+    def link_of(self, object_id: int) -> np.ndarray:
+        """
+        The link of `object_id` in each of its contacts. Only meaningful for
+        the contacts of `object_id`.
+        """
+        return np.where(
+            self.object_id_a == object_id, self.link_id_a, self.link_id_b
+        )
+
+    def max_abs_force(self, mask: np.ndarray) -> float:
+        """The largest absolute normal force of the masked contacts, or 0."""
+        if not mask.any():
+            return 0
+        return float(np.abs(self.normal_force[mask]).max())
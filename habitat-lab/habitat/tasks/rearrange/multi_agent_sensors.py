@@ -4,11 +4,11 @@ from gym import spaces
 from habitat.core.embodied_task import Measure
 from habitat.core.registry import registry
 from habitat.core.simulator import Sensor, SensorTypes
-from habitat.tasks.rearrange.multi_task.pddl_sensors import PddlSubgoalReward
-from habitat.tasks.rearrange.utils import (
-    UsesArticulatedAgentInterface,
-    coll_name_matches,
+from habitat.tasks.rearrange.multi_task.pddl_grounding import (
+    PredicateGroundingIndex,
 )
+from habitat.tasks.rearrange.multi_task.pddl_sensors import PddlSubgoalReward
+from habitat.tasks.rearrange.utils import UsesArticulatedAgentInterface
 
 
 @registry.register_measure
@@ -31,8 +31,7 @@ class DidAgentsCollide(Measure):
     def update_metric(self, *args, task, **kwargs):
         sim = task._sim
         sim.perform_discrete_collision_detection()
-        contact_points = sim.get_physics_contact_points()
-        found_contact = False
+        contacts = sim.get_contact_arrays()
 
         agent_ids = [
             articulated_agent.sim_obj.object_id
@@ -43,13 +42,12 @@ class DidAgentsCollide(Measure):
                 f"Sensor only supports 2 agents. Got {agent_ids=}"
             )
 
-        for cp in contact_points:
-            if coll_name_matches(cp, agent_ids[0]) and coll_name_matches(
-                cp, agent_ids[1]
-            ):
-                found_contact = True
-
-        self._metric = found_contact
+        self._metric = bool(
+            (
+                contacts.involves(agent_ids[0])
+                & contacts.involves(agent_ids[1])
+            ).any()
+        )
 
 
 @registry.register_measure
@@ -58,6 +56,8 @@ class NumAgentsCollide(Measure):
     Cumulative number of steps in the episode the agents are in collision.
     """
 
+    accumulates_over_steps: bool = True
+
     @staticmethod
     def _get_uuid(*args, **kwargs):
         return "num_agents_collide"
@@ -125,6 +125,7 @@ class MultiAgentGlobalPredicatesSensor(UsesArticulatedAgentInterface, Sensor):
         self._task = task
         self._sim = sim
         self._predicates_list = None
+        self._predicates_index = None
         super().__init__(config=config)
 
     def _get_uuid(self, *args, **kwargs):
@@ -141,6 +142,14 @@ class MultiAgentGlobalPredicatesSensor(UsesArticulatedAgentInterface, Sensor):
             )
         return self._predicates_list
 
+    @property
+    def predicates_index(self) -> PredicateGroundingIndex:
+        if self._predicates_index is None:
+            self._predicates_index = PredicateGroundingIndex(
+                self.predicates_list
+            )
+        return self._predicates_index
+
     def _get_observation_space(self, *args, config, **kwargs):
         return spaces.Box(
             shape=(len(self.predicates_list),), low=0, high=1, dtype=np.float32
@@ -148,8 +157,8 @@ class MultiAgentGlobalPredicatesSensor(UsesArticulatedAgentInterface, Sensor):
 
     def get_observation(self, observations, episode, *args, **kwargs):
         sim_info = self._task.pddl_problem.sim_info
-        truth_values = [p.is_true(sim_info) for p in self.predicates_list]
-        return np.array(truth_values, dtype=np.float32)
+        truth_values = self.predicates_index.update(sim_info)
+        return truth_values.astype(np.float32)
 
 
 @registry.register_sensor
@@ -208,6 +217,8 @@ class RearrangeCooperateReward(PddlSubgoalReward):
     potentially end the episode on agent collisions.
     """
 
+    ends_episode: bool = True
+
     @staticmethod
     def _get_uuid(*args, **kwargs):
         return "rearrange_cooperate_reward"
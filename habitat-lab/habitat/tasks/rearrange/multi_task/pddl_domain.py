@@ -18,13 +18,15 @@ from typing import (
     Optional,
     Tuple,
     Union,
-    cast,
 )
 
 import yaml  # type: ignore[import]
 
 from habitat.config.default import get_full_habitat_config_path
 from habitat.tasks.rearrange.multi_task.pddl_action import PddlAction
+from habitat.tasks.rearrange.multi_task.pddl_grounding import (
+    PredicateGroundingIndex,
+)
 from habitat.tasks.rearrange.multi_task.pddl_logical_expr import (
     LogicalExpr,
     LogicalExprType,
@@ -80,6 +82,8 @@ class PddlDomain:
 
         self._added_entities: Dict[str, PddlEntity] = {}
         self._added_expr_types: Dict[str, ExprType] = {}
+        self._true_preds_index: Optional[PredicateGroundingIndex] = None
+        self._true_preds_index_entities: Tuple[str, ...] = ()
 
         self._parse_expr_types(domain_def)
         self._parse_constants(domain_def)
@@ -175,6 +179,7 @@ class PddlDomain:
         Add a type to `self.expr_types`. Clears every episode
         """
         self._added_expr_types[expr_type.name] = expr_type
+        self._true_preds_index = None
 
     def register_episode_entity(self, pddl_entity: PddlEntity) -> None:
         """
@@ -326,6 +331,7 @@ class PddlDomain:
 
         self._added_entities = {}
         self._added_expr_types = {}
+        self._true_preds_index = None
 
         id_to_name = {}
         for k, i in sim.handle_to_object_id.items():
@@ -401,21 +407,37 @@ class PddlDomain:
         Get all the predicates that are true in the current simulator state.
         """
 
-        all_entities = self.all_entities.values()
-        true_preds: List[Predicate] = []
-        for pred in self.predicates.values():
-            for entity_input in itertools.permutations(
-                all_entities, pred.n_args
-            ):
-                if not pred.are_args_compatible(list(entity_input)):
-                    continue
-
-                use_pred = pred.clone()
-                use_pred.set_param_values(entity_input)
+        return [
+            pred.clone()
+            for pred in self.get_predicates_index().get_true_predicates(
+                self.sim_info
+            )
+        ]
 
-                if use_pred.is_true(self.sim_info):
-                    true_preds.append(use_pred)
-        return true_preds
+    def get_predicates_index(self) -> PredicateGroundingIndex:
+        """
+        Index of every predicate grounded with every compatible ordered tuple
+        of entities. It is built once per episode and re-evaluates only the
+        predicates of the entities that moved, see `PredicateGroundingIndex`.
+        """
+
+        entity_names = tuple(self.all_entities.keys())
+        if (
+            self._true_preds_index is None
+            or self._true_preds_index_entities != entity_names
+        ):
+            all_entities = list(self.all_entities.values())
+            grounded_preds: List[Predicate] = []
+            for pred in self.predicates.values():
+                for entity_input in _ground_args(
+                    pred.args, all_entities, ordered=True
+                ):
+                    use_pred = pred.clone()
+                    use_pred.set_param_values(entity_input)
+                    grounded_preds.append(use_pred)
+            self._true_preds_index = PredicateGroundingIndex(grounded_preds)
+            self._true_preds_index_entities = entity_names
+        return self._true_preds_index
 
     def get_possible_predicates(self) -> List[Predicate]:
         """
@@ -424,15 +446,12 @@ class PddlDomain:
         arguments. The same ordering of predicates is returned every time.
         """
 
-        all_entities = self.all_entities.values()
+        all_entities = list(self.all_entities.values())
         poss_preds: List[Predicate] = []
         for pred in self.predicates.values():
-            for entity_input in itertools.combinations(
-                all_entities, pred.n_args
+            for entity_input in _ground_args(
+                pred.args, all_entities, ordered=False
             ):
-                if not pred.are_args_compatible(entity_input):
-                    continue
-
                 use_pred = pred.clone()
                 use_pred.set_param_values(entity_input)
                 poss_preds.append(use_pred)
@@ -469,31 +488,27 @@ class PddlDomain:
             if action.name in restricted_action_names:
                 continue
 
-            for entity_input in itertools.combinations(
-                all_entities, action.n_args
+            for entity_inputs in _ground_args(
+                action.params, all_entities, ordered=True, by_combination=True
             ):
                 # Check that all the filter_entities are in entity_input
                 matches_filter = all(
-                    filter_entity in entity_input
+                    filter_entity in entity_inputs
                     for filter_entity in filter_entities
                 )
                 if not matches_filter:
                     continue
 
-                for entity_input_perm in itertools.permutations(entity_input):
-                    entity_inputs = cast(List[PddlEntity], entity_input_perm)
-                    if not action.are_args_compatible(entity_inputs):
-                        continue
-                    new_action = action.clone()
-                    new_action.set_param_values(entity_inputs)
-                    if (
-                        true_preds is not None
-                        and not new_action.is_precond_satisfied_from_predicates(
-                            true_preds
-                        )
-                    ):
-                        continue
-                    matching_actions.append(new_action)
+                new_action = action.clone()
+                new_action.set_param_values(entity_inputs)
+                if (
+                    true_preds is not None
+                    and not new_action.is_precond_satisfied_from_predicates(
+                        true_preds
+                    )
+                ):
+                    continue
+                matching_actions.append(new_action)
         return matching_actions
 
     def get_ordered_actions(self) -> List[PddlAction]:
@@ -679,6 +694,45 @@ class PddlProblem(PddlDomain):
         return {**self._objects, **super().all_entities}
 
 
+def _ground_args(
+    params: List[PddlEntity],
+    entities: List[PddlEntity],
+    ordered: bool,
+    by_combination: bool = False,
+) -> List[List[PddlEntity]]:
+    """
+    Lists the tuples of distinct entities with types compatible with
+    `params`. Only the candidate entities of each parameter type are
+    enumerated instead of every permutation of all the entities.
+
+    :param ordered: If True, every compatible ordering of the entities is
+        returned, in the order of `itertools.permutations(entities)`.
+        Otherwise, only the orderings following the order of `entities` are
+        returned, in the order of `itertools.combinations(entities)`.
+    :param by_combination: If `ordered`, return the tuples in the order of
+        the permutations of each of `itertools.combinations(entities)`
+        instead.
+    """
+
+    candidates = [
+        [
+            i
+            for i, entity in enumerate(entities)
+            if entity.expr_type.is_subtype_of(param.expr_type)
+        ]
+        for param in params
+    ]
+    assigns: List[Tuple[int, ...]] = [
+        idxs
+        for idxs in itertools.product(*candidates)
+        if len(set(idxs)) == len(idxs)
+        and (ordered or all(a < b for a, b in zip(idxs, idxs[1:])))
+    ]
+    if by_combination:
+        assigns.sort(key=lambda idxs: (sorted(idxs), idxs))
+    return [[entities[i] for i in idxs] for idxs in assigns]
+
+
 def _parse_callable(callable_d):
     full_fn_name = callable_d.pop("_target_")
     module_name, _, function_name = full_fn_name.rpartition(".")
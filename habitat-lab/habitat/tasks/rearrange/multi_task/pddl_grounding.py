@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from habitat.tasks.rearrange.multi_task.pddl_predicate import Predicate
+from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
+    PddlEntity,
+    PddlSimInfo,
+)
+
+
+class PredicateGroundingIndex:
+    """
+    Index over a fixed list of grounded predicates (predicates with all
+    their argument values set) that evaluates their truth values as a dense
+    boolean vector.
+
+    The predicates are compiled once per simulator binding into evaluators
+    with their arguments already bound. Between two calls to `update`, only
+    the predicates with an argument entity whose state changed are
+    re-evaluated. The state of an entity is given by
+    `PddlSimInfo.get_entity_state`, so the truth value of a predicate is
+    assumed to only depend on the state of its arguments. Predicates without
+    arguments are re-evaluated on every update.
+    """
+
+    def __init__(
+        self,
+        predicates: Sequence[Predicate],
+        moved_threshold: float = 0.0,
+    ):
+        """
+        :param predicates: The grounded predicates, in the order of the
+            truth vector.
+        :param moved_threshold: An entity is considered moved if a component
+            of its state changed by more than this value.
+        """
+
+        self._predicates = list(predicates)
+        self._moved_threshold = moved_threshold
+        self._key_to_index: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+        entity_to_preds: Dict[str, List[int]] = {}
+        self._entities: List[PddlEntity] = []
+        always_update: List[int] = []
+        for i, pred in enumerate(self._predicates):
+            arg_names = tuple(e.name for e in pred.arg_values)
+            self._key_to_index[(pred.name, arg_names)] = i
+            if len(arg_names) == 0:
+                always_update.append(i)
+            for entity in pred.arg_values:
+                if entity.name not in entity_to_preds:
+                    entity_to_preds[entity.name] = []
+                    self._entities.append(entity)
+                entity_to_preds[entity.name].append(i)
+
+        # Predicates to re-evaluate when each entity of `self._entities`
+        # moves.
+        self._entity_preds = [
+            np.array(entity_to_preds[e.name], dtype=np.int64)
+            for e in self._entities
+        ]
+        self._always_update = np.array(always_update, dtype=np.int64)
+
+        self._sim_info: Optional[PddlSimInfo] = None
+        self._evaluators: List[Callable[[], bool]] = []
+        self._entity_states: List[Optional[np.ndarray]] = []
+        self._truth = np.zeros(len(self._predicates), dtype=bool)
+
+    @property
+    def predicates(self) -> List[Predicate]:
+        return self._predicates
+
+    def __len__(self) -> int:
+        return len(self._predicates)
+
+    def index_of(self, pred_name: str, arg_names: Sequence[str]) -> int:
+        """
+        Position in the truth vector of the predicate `pred_name` grounded
+        with the entities named `arg_names`.
+        """
+
+        return self._key_to_index[(pred_name, tuple(arg_names))]
+
+    def bind(self, sim_info: PddlSimInfo) -> None:
+        """
+        Compiles the evaluators against `sim_info`. The next `update`
+        evaluates every predicate.
+        """
+
+        self._sim_info = sim_info
+        self._evaluators = [
+            pred.compile(sim_info) for pred in self._predicates
+        ]
+        self._entity_states = [None] * len(self._entities)
+
+    def invalidate(self) -> None:
+        """
+        Forces the next `update` to evaluate every predicate, for example
+        after changing state that is not part of the entity states.
+        """
+
+        self._entity_states = [None] * len(self._entities)
+
+    def _get_dirty_predicates(self) -> np.ndarray:
+        dirty = [self._always_update]
+        for i, entity in enumerate(self._entities):
+            state = np.asarray(
+                self._sim_info.get_entity_state(entity), dtype=np.float64
+            )
+            prev_state = self._entity_states[i]
+            if (
+                prev_state is None
+                or prev_state.shape != state.shape
+                or np.abs(state - prev_state).max(initial=0.0)
+                > self._moved_threshold
+            ):
+                self._entity_states[i] = state
+                dirty.append(self._entity_preds[i])
+        return np.unique(np.concatenate(dirty))
+
+    def update(self, sim_info: PddlSimInfo) -> np.ndarray:
+        """
+        Re-evaluates the predicates affected by the entities that moved since
+        the last update and returns the truth value of every predicate. The
+        returned array is owned by the index and is overwritten by the next
+        update.
+        """
+
+        if sim_info is not self._sim_info:
+            self.bind(sim_info)
+
+        truth = self._truth
+        evaluators = self._evaluators
+        for i in self._get_dirty_predicates().tolist():
+            truth[i] = evaluators[i]()
+        return truth
+
+    def get_true_predicates(self, sim_info: PddlSimInfo) -> List[Predicate]:
+        """
+        The predicates that are true in the current simulator state, in the
+        order of the index.
+        """
+
+        return [
+            self._predicates[i]
+            for i in np.flatnonzero(self.update(sim_info)).tolist()
+        ]
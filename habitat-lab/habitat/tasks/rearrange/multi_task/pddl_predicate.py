@@ -3,6 +3,7 @@
 # LICENSE file in the root directory of this source tree.
 
 
+from functools import partial
 from typing import Callable, Dict, List, Optional
 
 from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
@@ -13,6 +14,10 @@ from habitat.tasks.rearrange.multi_task.rearrange_pddl import (
 )
 
 
+def _always_true() -> bool:
+    return True
+
+
 class Predicate:
     _arg_values: List[PddlEntity]
 
@@ -70,6 +75,14 @@ class Predicate:
     def name(self):
         return self._name
 
+    @property
+    def args(self) -> List[PddlEntity]:
+        return self._args
+
+    @property
+    def arg_values(self) -> Optional[List[PddlEntity]]:
+        return self._arg_values
+
     def sub_in(self, sub_dict: Dict[PddlEntity, PddlEntity]) -> "Predicate":
         self._arg_values = [
             sub_dict.get(entity, entity) for entity in self._arg_values
@@ -115,6 +128,18 @@ class Predicate:
             sim_info.pred_truth_cache[self_repr] = result
         return result
 
+    def compile(self, sim_info: PddlSimInfo) -> Callable[[], bool]:
+        """
+        Returns a function without arguments evaluating if the predicate is
+        satisfied in the current simulator state. Unlike `is_true`, it does
+        not use the predicate truth cache of `sim_info`.
+        """
+        if self._is_valid_fn is None:
+            return _always_true
+        return partial(
+            self._is_valid_fn, sim_info=sim_info, **self._create_kwargs()
+        )
+
     def set_state(self, sim_info: PddlSimInfo) -> None:
         """
         Sets the simulator state to satisfy the predicate.
@@ -13,6 +13,9 @@ from gym import spaces
 from habitat.core.embodied_task import Measure
 from habitat.core.registry import registry
 from habitat.core.simulator import Sensor, SensorTypes
+from habitat.tasks.rearrange.multi_task.pddl_grounding import (
+    PredicateGroundingIndex,
+)
 from habitat.tasks.rearrange.multi_task.pddl_task import PddlTask
 from habitat.tasks.rearrange.rearrange_sensors import (
     DoesWantTerminate,
@@ -28,6 +31,7 @@ class GlobalPredicatesSensor(Sensor):
         self._task = task
         self._sim = sim
         self._predicates_list = None
+        self._predicates_index = None
         assert isinstance(task, PddlTask)
         super().__init__(config=config)
 
@@ -45,6 +49,14 @@ class GlobalPredicatesSensor(Sensor):
             )
         return self._predicates_list
 
+    @property
+    def predicates_index(self) -> PredicateGroundingIndex:
+        if self._predicates_index is None:
+            self._predicates_index = PredicateGroundingIndex(
+                self.predicates_list
+            )
+        return self._predicates_index
+
     def _get_observation_space(self, *args, config, **kwargs):
         return spaces.Box(
             shape=(len(self.predicates_list),), low=0, high=1, dtype=np.float32
@@ -52,8 +64,8 @@ class GlobalPredicatesSensor(Sensor):
 
     def get_observation(self, observations, episode, *args, **kwargs):
         sim_info = self._task.pddl_problem.sim_info
-        truth_values = [p.is_true(sim_info) for p in self.predicates_list]
-        return np.array(truth_values, dtype=np.float32)
+        truth_values = self.predicates_index.update(sim_info)
+        return truth_values.astype(np.float32)
 
 
 @registry.register_measure
@@ -189,6 +201,7 @@ class PddlSuccess(Measure):
     """
 
     cls_uuid: str = "pddl_success"
+    ends_episode: bool = True
 
     def __init__(self, sim, config, *args, task, **kwargs):
         super().__init__(**kwargs)
@@ -230,6 +243,7 @@ class PddlStageGoals(Measure):
 
     _stage_succ: List[str]
     cls_uuid: str = "pddl_stage_goals"
+    accumulates_over_steps: bool = True
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
@@ -260,6 +274,7 @@ class PddlSubgoalReward(Measure):
     """
 
     cls_uuid: str = "pddl_subgoal_reward"
+    accumulates_over_steps: bool = True
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
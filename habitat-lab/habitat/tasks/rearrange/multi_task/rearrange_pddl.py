@@ -234,6 +234,36 @@ class PddlSimInfo:
             return cur_pos
         raise ValueError()
 
+    def get_entity_state(self, entity: PddlEntity) -> Tuple[float, ...]:
+        """
+        Gets the simulator state of an entity that the truth values of the
+        predicates involving it depend on. This is the position of the entity,
+        with the base rotation and held object of robots and the joint state
+        of articulated receptacles.
+        """
+
+        ename = entity.name
+        if self.check_type_matches(
+            entity, SimulatorObjectType.ROBOT_ENTITY.value
+        ):
+            agent_data = self.sim.get_agent_data(self.robot_ids[ename])
+            articulated_agent = agent_data.articulated_agent
+            snap_idx = agent_data.grasp_mgr.snap_idx
+            return (
+                *articulated_agent.base_pos,
+                articulated_agent.base_rot,
+                -1 if snap_idx is None else snap_idx,
+            )
+        if self.check_type_matches(
+            entity, SimulatorObjectType.ARTICULATED_RECEPTACLE_ENTITY.value
+        ):
+            marker_info = self.marker_handles[ename]
+            return (
+                *marker_info.get_current_position(),
+                marker_info.get_targ_js(),
+            )
+        return tuple(self.get_entity_pos(entity))
+
     def search_for_entity(
         self, entity: PddlEntity
     ) -> Union[int, str, MarkerInfo, Receptacle]:
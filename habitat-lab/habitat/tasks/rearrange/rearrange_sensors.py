@@ -780,6 +780,7 @@ class RobotCollisions(UsesArticulatedAgentInterface, Measure):
     """
 
     cls_uuid: str = "robot_collisions"
+    accumulates_over_steps: bool = True
 
     def __init__(self, *args, sim, config, task, **kwargs):
         self._sim = sim
@@ -819,6 +820,7 @@ class RobotForce(UsesArticulatedAgentInterface, Measure):
     """
 
     cls_uuid: str = "articulated_agent_force"
+    accumulates_over_steps: bool = True
 
     def __init__(self, *args, sim, config, task, **kwargs):
         self._sim = sim
@@ -885,6 +887,7 @@ class NumStepsMeasure(Measure):
     """
 
     cls_uuid: str = "num_steps"
+    accumulates_over_steps: bool = True
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
@@ -923,6 +926,7 @@ class ForceTerminate(Measure):
     """
 
     cls_uuid: str = "force_terminate"
+    ends_episode: bool = True
 
     def __init__(self, *args, sim, config, task, **kwargs):
         self._sim = sim
@@ -1011,6 +1015,9 @@ class RearrangeReward(UsesArticulatedAgentInterface, Measure):
     reward function in the Habitat 2.0 tasks.
     """
 
+    ends_episode: bool = True
+    accumulates_over_steps: bool = True
+
     def __init__(self, *args, sim, config, task, **kwargs):
         self._sim = sim
         self._config = config
@@ -1171,6 +1178,7 @@ class BadCalledTerminate(Measure):
 @registry.register_measure
 class RuntimePerfStats(Measure):
     cls_uuid: str = "habitat_perf"
+    accumulates_over_steps: bool = True
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
@@ -44,10 +44,13 @@ from habitat.tasks.rearrange.articulated_agent_manager import (
     ArticulatedAgentData,
     ArticulatedAgentManager,
 )
+from habitat.tasks.rearrange.contact_cache import ContactArrays
 from habitat.tasks.rearrange.marker_info import MarkerInfo
 from habitat.tasks.rearrange.rearrange_grasp_manager import (
     RearrangeGraspManager,
 )
+from habitat.tasks.rearrange.rearrange_sim_state import SimStateSnapshot
+from habitat.tasks.rearrange.scene_pool import PooledScene, ScenePool
 from habitat.tasks.rearrange.utils import (
     add_perf_timing_func,
     get_rigid_aabb,
@@ -103,6 +106,9 @@ class RearrangeSim(HabitatSim):
         ] = {}
         self._prev_obj_names: Optional[List[str]] = None
         self._scene_obj_ids: List[int] = []
+        # The rigid objects of `self._scene_obj_ids`, see `_get_scene_objs`.
+        self._scene_objs: List[habitat_sim.physics.ManagedRigidObject] = []
+        self._scene_objs_ids: List[int] = []
         # The receptacle information cached between all scenes.
         self._receptacles_cache: Dict[str, Dict[str, Receptacle]] = {}
         # The per episode receptacle information.
@@ -155,12 +161,39 @@ class RearrangeSim(HabitatSim):
             self.habitat_config.should_setup_semantic_ids
         )
 
+        # Pool of the state of the recently used scenes.
+        self._scene_pool: Optional[ScenePool] = None
+        pool_config = self.habitat_config.scene_pool
+        if pool_config.enabled:
+            self._scene_pool = ScenePool(
+                max_bytes=pool_config.max_bytes,
+                max_scenes=pool_config.max_scenes,
+            )
+        # The pooled state of the current scene, None if the pool is off.
+        self._pooled_scene: Optional[PooledScene] = None
+        # If `self._pooled_scene` was restored from the pool.
+        self._pooled_scene_hit = False
+
+        # Incremented whenever the contact points may change, see
+        # `get_contact_arrays`.
+        self._contacts_version = 0
+        self._contact_arrays: Optional[ContactArrays] = None
+        self._contact_arrays_version = -1
+
     def enable_perf_logging(self):
         """
         Will turn on the performance logging (by default this is off).
         """
         self._perf_logging_enabled = True
 
+    @property
+    def scene_pool(self) -> Optional[ScenePool]:
+        """
+        The pool of recently used scenes, None unless
+        `habitat.simulator.scene_pool.enabled`.
+        """
+        return self._scene_pool
+
     @property
     def receptacles(self) -> Dict[str, Receptacle]:
         return self._receptacles
@@ -283,14 +316,46 @@ class RearrangeSim(HabitatSim):
             self.reset_agent(i)
         return None
 
+    def step_world(self, *args, **kwargs):
+        self._contacts_version += 1
+        return super().step_world(*args, **kwargs)
+
+    def step_physics(self, *args, **kwargs):
+        self._contacts_version += 1
+        return super().step_physics(*args, **kwargs)
+
+    def perform_discrete_collision_detection(self, *args, **kwargs):
+        self._contacts_version += 1
+        return super().perform_discrete_collision_detection(*args, **kwargs)
+
+    def get_contact_arrays(self) -> ContactArrays:
+        """
+        The contact points of the last physics step or collision detection,
+        as arrays. The arrays are only built once per physics step and are
+        shared by all the callers, they should not be modified.
+        """
+        if self._contact_arrays_version != self._contacts_version:
+            self._contact_arrays = ContactArrays.from_contact_points(
+                self.get_physics_contact_points()
+            )
+            self._contact_arrays_version = self._contacts_version
+        return self._contact_arrays
+
     @add_perf_timing_func()
     def reconfigure(self, config: "DictConfig", ep_info: RearrangeEpisode):
         self._handle_to_goal_name = ep_info.info["object_labels"]
+        # Objects are removed and added.
+        self._contacts_version += 1
 
         self.ep_info = ep_info
         new_scene = self.prev_scene_id != ep_info.scene_id
         if new_scene:
             self._prev_obj_names = None
+            if self._scene_pool is not None:
+                self._pooled_scene = self._scene_pool.get(ep_info.scene_id)
+                self._pooled_scene_hit = self._pooled_scene is not None
+                if self._pooled_scene is None:
+                    self._pooled_scene = PooledScene(ep_info.scene_id)
 
         # Only remove and re-add objects if we have a new set of objects.
         ep_info.rigid_objs = sorted(ep_info.rigid_objs, key=lambda x: x[0])
@@ -361,6 +426,12 @@ class RearrangeSim(HabitatSim):
 
         if new_scene:
             self._load_navmesh(ep_info)
+            if self._pooled_scene is not None:
+                # Update the size of the entry with the state added to it.
+                self._scene_pool.put(self._pooled_scene)
+        elif should_add_objects and self._pooled_scene is not None:
+            # New template handles may have been added.
+            self._scene_pool.put(self._pooled_scene)
 
         # Get the starting positions of the target objects.
         scene_pos = self.get_scene_pos()
@@ -464,6 +535,16 @@ class RearrangeSim(HabitatSim):
 
     @add_perf_timing_func()
     def _load_navmesh(self, ep_info: RearrangeEpisode):
+        # The navmesh is loaded in the pathfinder, not through reconfigure.
+        self.invalidate_navmesh_hash()
+        if self._pooled_scene_hit and self._pooled_scene.navmesh is not None:
+            self._pooled_scene.load_navmesh(self.pathfinder)
+            self._largest_indoor_island_idx = (
+                self._pooled_scene.largest_island_idx
+            )
+            logger.info(f"Loaded navmesh of {ep_info.scene_id} from the pool")
+            return
+
         scene_name = ep_info.scene_id.split("/")[-1].split(".")[0]
         base_dir = osp.join(*ep_info.scene_id.split("/")[:2])
 
@@ -499,6 +580,11 @@ class RearrangeSim(HabitatSim):
         self._largest_indoor_island_idx = get_largest_island_index(
             self.pathfinder, self, allow_outdoor=False
         )
+        if self._pooled_scene is not None:
+            self._pooled_scene.save_navmesh(self.pathfinder)
+            self._pooled_scene.largest_island_idx = (
+                self._largest_indoor_island_idx
+            )
 
     @property
     def largest_island_idx(self) -> int:
@@ -520,6 +606,7 @@ class RearrangeSim(HabitatSim):
                     continue
                 rom.remove_object_by_id(scene_obj_id)
             self._scene_obj_ids = []
+            self._clear_scene_objs_cache()
 
         # Reset all marker visualization points
         for obj_id in self.viz_ids.values():
@@ -606,6 +693,7 @@ class RearrangeSim(HabitatSim):
         self._handle_to_object_id = {}
         if should_add_objects:
             self._scene_obj_ids = []
+            self._clear_scene_objs_cache()
 
         # Get Object template manager
         otm = self.get_object_template_manager()
@@ -613,19 +701,7 @@ class RearrangeSim(HabitatSim):
         for i, (obj_handle, transform) in enumerate(ep_info.rigid_objs):
             t_start = time.time()
             if should_add_objects:
-                # Get object path
-                object_template = otm.get_templates_by_handle_substring(
-                    obj_handle
-                )
-
-                # Exit if template is invalid
-                if not object_template:
-                    raise ValueError(
-                        f"Template not found for object with handle {obj_handle}"
-                    )
-
-                # Get object path
-                object_path = list(object_template.keys())[0]
+                object_path = self._get_template_handle(otm, obj_handle)
 
                 # Get rigid object from the path
                 ro = rom.add_object_by_template_handle(object_path)
@@ -689,9 +765,45 @@ class RearrangeSim(HabitatSim):
                     list(self._receptacles.values()),
                 )
 
+    def _get_template_handle(self, otm, obj_handle: str) -> str:
+        """
+        The handle of the object template to add for the rigid object
+        `obj_handle`.
+        """
+        if (
+            self._pooled_scene is not None
+            and obj_handle in self._pooled_scene.template_handles
+        ):
+            return self._pooled_scene.template_handles[obj_handle]
+
+        # Get object path
+        object_template = otm.get_templates_by_handle_substring(obj_handle)
+
+        # Exit if template is invalid
+        if not object_template:
+            raise ValueError(
+                f"Template not found for object with handle {obj_handle}"
+            )
+
+        # Get object path
+        object_path = list(object_template.keys())[0]
+        if self._pooled_scene is not None:
+            self._pooled_scene.template_handles[obj_handle] = object_path
+        return object_path
+
     def _create_recep_info(
         self, scene_id: str, ignore_handles: List[str]
     ) -> Dict[str, Receptacle]:
+        if self._pooled_scene is not None:
+            # The pool bounds the memory used by the receptacles.
+            if self._pooled_scene.receptacles is None:
+                self._pooled_scene.receptacles = {
+                    recep.unique_name: recep
+                    for recep in find_receptacles(
+                        self, ignore_handles=ignore_handles
+                    )
+                }
+            return self._pooled_scene.receptacles
         if scene_id not in self._receptacles_cache:
             all_receps = find_receptacles(
                 self,
@@ -856,6 +968,150 @@ class RearrangeSim(HabitatSim):
                 for grasp_mgr in self.agents_mgr.grasp_iter:
                     grasp_mgr.desnap(True)
 
+    def _clear_scene_objs_cache(self) -> None:
+        """
+        Drops the rigid objects cached by `_get_scene_objs`. Must be called
+        whenever the scene objects are removed, since the ids of removed
+        objects are reused by the objects added next.
+        """
+        self._scene_objs = []
+        self._scene_objs_ids = []
+
+    def _get_scene_objs(self) -> List[habitat_sim.physics.ManagedRigidObject]:
+        """
+        The rigid objects of `self._scene_obj_ids`, only looked up in the
+        rigid object manager when the objects change.
+        """
+        if self._scene_objs_ids != self._scene_obj_ids:
+            rom = self.get_rigid_object_manager()
+            self._scene_objs = [
+                rom.get_object_by_id(i) for i in self._scene_obj_ids
+            ]
+            self._scene_objs_ids = list(self._scene_obj_ids)
+        return self._scene_objs
+
+    def capture_state_snapshot(
+        self, with_articulated_agent_js: bool = False
+    ) -> SimStateSnapshot:
+        """
+        Same as `capture_state`, but returns the state as a compact
+        `SimStateSnapshot` of arrays, which can be serialized and diffed
+        against another snapshot.
+        """
+        articulated_agents = list(self.agents_mgr.articulated_agents_iter)
+        scene_objs = self._get_scene_objs()
+
+        art_pos, art_pos_offsets = SimStateSnapshot.pack_ragged(
+            [ao.joint_positions for ao in self.art_objs]
+        )
+        if with_articulated_agent_js:
+            (
+                articulated_agent_js,
+                articulated_agent_js_offsets,
+            ) = SimStateSnapshot.pack_ragged(
+                [
+                    articulated_agent.sim_obj.joint_positions
+                    for articulated_agent in articulated_agents
+                ]
+            )
+        else:
+            articulated_agent_js, articulated_agent_js_offsets = None, None
+
+        return SimStateSnapshot(
+            articulated_agent_T=np.array(
+                [
+                    articulated_agent.sim_obj.transformation
+                    for articulated_agent in articulated_agents
+                ],
+                dtype=np.float32,
+            ).reshape(-1, 4, 4),
+            art_T=np.array(
+                [ao.transformation for ao in self.art_objs], dtype=np.float32
+            ).reshape(-1, 4, 4),
+            art_pos=art_pos,
+            art_pos_offsets=art_pos_offsets,
+            rigid_ids=np.array(self._scene_obj_ids, dtype=np.int64),
+            rigid_T=np.array(
+                [obj.transformation for obj in scene_objs], dtype=np.float32
+            ).reshape(-1, 4, 4),
+            rigid_V=np.array(
+                [
+                    (obj.linear_velocity, obj.angular_velocity)
+                    for obj in scene_objs
+                ],
+                dtype=np.float32,
+            ).reshape(-1, 2, 3),
+            obj_hold=np.array(
+                [
+                    -1 if grasp_mgr.snap_idx is None else grasp_mgr.snap_idx
+                    for grasp_mgr in self.agents_mgr.grasp_iter
+                ],
+                dtype=np.int64,
+            ),
+            articulated_agent_js=articulated_agent_js,
+            articulated_agent_js_offsets=articulated_agent_js_offsets,
+        )
+
+    def set_state_snapshot(
+        self, snapshot: SimStateSnapshot, set_hold: bool = False
+    ) -> None:
+        """
+        Same as `set_state` for a snapshot from `capture_state_snapshot`.
+        The snapshot must be of the objects currently in the scene.
+        """
+        if not np.array_equal(snapshot.rigid_ids, self._scene_obj_ids):
+            raise ValueError(
+                "The snapshot is not of the rigid objects in the scene"
+            )
+
+        def to_matrix(T: np.ndarray) -> mn.Matrix4:
+            # Magnum matrices are constructed from their columns.
+            return mn.Matrix4(T.T.tolist())
+
+        articulated_agents = list(self.agents_mgr.articulated_agents_iter)
+        for T, robot in zip(snapshot.articulated_agent_T, articulated_agents):
+            robot.sim_obj.transformation = to_matrix(T)
+            n_dof = len(robot.sim_obj.joint_forces)
+            robot.sim_obj.joint_forces = np.zeros(n_dof)
+            robot.sim_obj.joint_velocities = np.zeros(n_dof)
+
+        if snapshot.articulated_agent_js is not None:
+            for articulated_agent_js, robot in zip(
+                SimStateSnapshot.unpack_ragged(
+                    snapshot.articulated_agent_js,
+                    snapshot.articulated_agent_js_offsets,
+                ),
+                articulated_agents,
+            ):
+                robot.sim_obj.joint_positions = articulated_agent_js
+
+        for T, ao in zip(snapshot.art_T, self.art_objs):
+            ao.transformation = to_matrix(T)
+
+        for T, V, obj in zip(
+            snapshot.rigid_T, snapshot.rigid_V.tolist(), self._get_scene_objs()
+        ):
+            obj.transformation = to_matrix(T)
+            obj.linear_velocity = mn.Vector3(V[0])
+            obj.angular_velocity = mn.Vector3(V[1])
+
+        for p, ao in zip(
+            SimStateSnapshot.unpack_ragged(
+                snapshot.art_pos, snapshot.art_pos_offsets
+            ),
+            self.art_objs,
+        ):
+            ao.joint_positions = p
+
+        if set_hold:
+            for obj_hold_state, grasp_mgr in zip(
+                snapshot.obj_hold.tolist(), self.agents_mgr.grasp_iter
+            ):
+                self.internal_step(-1)
+                grasp_mgr.snap_to_obj(
+                    None if obj_hold_state == -1 else obj_hold_state
+                )
+
     def get_agent_state(self, agent_id: int = 0) -> habitat_sim.AgentState:
         articulated_agent = self.get_agent_data(agent_id).articulated_agent
         rotation = mn.Quaternion.rotation(
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Compact snapshots of the `RearrangeSim` state, see
+`RearrangeSim.capture_state_snapshot` and
+`RearrangeSim.set_state_snapshot`.
+
+The state is stored as contiguous arrays (struct-of-arrays) instead of lists
+of per-object magnum values. Transforms are stored as row-major 4 x 4
+matrices (as returned by `np.array(mn.Matrix4)`) and, like velocities and
+joint positions, as float32 which is the precision of the simulator, so a
+snapshot round-trips exactly. Variable length joint positions are
+concatenated, with the start offset of each object.
+"""
+
+import json
+import struct
+from dataclasses import dataclass, fields
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Arrays describing which objects a snapshot is of. Two snapshots with
+# different structure arrays are of different scenes.
+_STRUCTURE_FIELDS = (
+    "rigid_ids",
+    "art_pos_offsets",
+    "articulated_agent_js_offsets",
+)
+
+_SNAPSHOT_MAGIC = b"RSS1"
+_DELTA_MAGIC = b"RSD1"
+
+
+def _pack_arrays(magic: bytes, arrays: Dict[str, np.ndarray]) -> bytes:
+    header = json.dumps(
+        [
+            [name, arr.dtype.str, list(arr.shape)]
+            for name, arr in arrays.items()
+        ]
+    ).encode()
+    return b"".join(
+        [magic, struct.pack("<I", len(header)), header]
+        + [np.ascontiguousarray(arr).tobytes() for arr in arrays.values()]
+    )
+
+
+def _unpack_arrays(magic: bytes, data: bytes) -> Dict[str, np.ndarray]:
+    if data[: len(magic)] != magic:
+        raise ValueError(
+            f"Not a serialized sim state, expected header {magic!r}"
+        )
+    offset = len(magic)
+    (header_len,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    header = json.loads(data[offset : offset + header_len])
+    offset += header_len
+
+    arrays = {}
+    for name, dtype_str, shape in header:
+        dtype = np.dtype(dtype_str)
+        count = int(np.prod(shape))
+        arrays[name] = (
+            np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+            .reshape(shape)
+            .copy()
+        )
+        offset += count * dtype.itemsize
+    return arrays
+
+
+def _as_rows(arr: np.ndarray) -> np.ndarray:
+    """View of an array as one row per element of its first axis."""
+    return arr.reshape(len(arr), -1)
+
+
+@dataclass
+class SimStateDelta:
+    """
+    Difference between a `SimStateSnapshot` and a base snapshot of the same
+    objects. For each array of the snapshot, holds the indices (along the
+    first axis) of the elements that differ from the base and their new
+    values.
+    """
+
+    changed: Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+    @property
+    def num_changed(self) -> int:
+        return sum(len(idxs) for idxs, _ in self.changed.values())
+
+    def to_bytes(self) -> bytes:
+        arrays = {}
+        for name, (idxs, values) in self.changed.items():
+            arrays[f"{name}.idxs"] = idxs
+            arrays[f"{name}.values"] = values
+        return _pack_arrays(_DELTA_MAGIC, arrays)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SimStateDelta":
+        arrays = _unpack_arrays(_DELTA_MAGIC, data)
+        names = [k[: -len(".idxs")] for k in arrays if k.endswith(".idxs")]
+        return cls(
+            {
+                name: (arrays[f"{name}.idxs"], arrays[f"{name}.values"])
+                for name in names
+            }
+        )
+
+
+@dataclass
+class SimStateSnapshot:
+    """
+    State of a `RearrangeSim`, with the same content as the dict of
+    `RearrangeSim.capture_state`.
+
+    :property articulated_agent_T: Base transform of each agent, (A, 4, 4).
+    :property articulated_agent_js: Concatenated joint positions of the
+        agents, or None if not captured.
+    :property articulated_agent_js_offsets: Start of the joint positions of
+        each agent in `articulated_agent_js` and the total length, (A + 1,).
+    :property art_T: Transform of each articulated object, (N_ao, 4, 4).
+    :property art_pos: Concatenated joint positions of the articulated
+        objects.
+    :property art_pos_offsets: Start of the joint positions of each
+        articulated object in `art_pos` and the total length, (N_ao + 1,).
+    :property rigid_ids: Object id of each rigid object, (N,).
+    :property rigid_T: Transform of each rigid object, (N, 4, 4).
+    :property rigid_V: Linear and angular velocity of each rigid object,
+        (N, 2, 3).
+    :property obj_hold: Object id held by each agent, -1 if none, (A,).
+    """
+
+    articulated_agent_T: np.ndarray
+    art_T: np.ndarray
+    art_pos: np.ndarray
+    art_pos_offsets: np.ndarray
+    rigid_ids: np.ndarray
+    rigid_T: np.ndarray
+    rigid_V: np.ndarray
+    obj_hold: np.ndarray
+    articulated_agent_js: Optional[np.ndarray] = None
+    articulated_agent_js_offsets: Optional[np.ndarray] = None
+
+    @staticmethod
+    def pack_ragged(
+        values: list, dtype=np.float32
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Concatenates a list of variable length sequences, returning the
+        concatenated array and the start offset of each sequence followed by
+        the total length.
+        """
+        lengths = [len(v) for v in values]
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        if offsets[-1] == 0:
+            return np.zeros(0, dtype=dtype), offsets
+        return np.concatenate(values).astype(dtype, copy=False), offsets
+
+    @staticmethod
+    def unpack_ragged(
+        values: np.ndarray, offsets: np.ndarray
+    ) -> Tuple[np.ndarray, ...]:
+        """Inverse of `pack_ragged`, returns views of `values`."""
+        return tuple(
+            values[start:end]
+            for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        )
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            f.name: getattr(self, f.name)
+            for f in fields(self)
+            if getattr(self, f.name) is not None
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self._arrays().values())
+
+    def copy(self) -> "SimStateSnapshot":
+        return SimStateSnapshot(
+            **{name: arr.copy() for name, arr in self._arrays().items()}
+        )
+
+    def to_bytes(self) -> bytes:
+        return _pack_arrays(_SNAPSHOT_MAGIC, self._arrays())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SimStateSnapshot":
+        return cls(**_unpack_arrays(_SNAPSHOT_MAGIC, data))
+
+    def is_same_structure(self, other: "SimStateSnapshot") -> bool:
+        """If both snapshots are of the same objects and agents."""
+        for name in _STRUCTURE_FIELDS:
+            mine, theirs = getattr(self, name), getattr(other, name)
+            if (mine is None) != (theirs is None):
+                return False
+            if mine is not None and not np.array_equal(mine, theirs):
+                return False
+        return len(self.articulated_agent_T) == len(
+            other.articulated_agent_T
+        ) and len(self.art_T) == len(other.art_T)
+
+    def delta_from(self, base: "SimStateSnapshot") -> SimStateDelta:
+        """
+        Returns the difference of this snapshot from `base`, such that
+        `base.apply_delta(self.delta_from(base))` equals this snapshot.
+        """
+        if not self.is_same_structure(base):
+            raise ValueError(
+                "Cannot compute a delta between snapshots of different objects"
+            )
+        changed = {}
+        for name, arr in self._arrays().items():
+            if name in _STRUCTURE_FIELDS:
+                continue
+            if arr.size == 0:
+                continue
+            rows = _as_rows(arr)
+            idxs = np.flatnonzero(
+                (rows != _as_rows(getattr(base, name))).any(axis=1)
+            )
+            if len(idxs) > 0:
+                changed[name] = (idxs, arr[idxs])
+        return SimStateDelta(changed)
+
+    def apply_delta(self, delta: SimStateDelta) -> "SimStateSnapshot":
+        """
+        Returns a new snapshot with `delta` applied to this base snapshot.
+        """
+        snapshot = self.copy()
+        for name, (idxs, values) in delta.changed.items():
+            arr = getattr(snapshot, name)
+            if arr is None:
+                raise ValueError(f"The base snapshot has no {name}")
+            arr[idxs] = values
+        return snapshot
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SimStateSnapshot):
+            return False
+        mine, theirs = self._arrays(), other._arrays()
+        return mine.keys() == theirs.keys() and all(
+            np.array_equal(mine[k], theirs[k]) for k in mine
+        )
@@ -20,6 +20,7 @@ from habitat.tasks.rearrange.rearrange_sim import (
     RearrangeSim,
     add_perf_timing_func,
 )
+from habitat.tasks.rearrange.spawn_cache import SpawnCache, hash_dataset
 from habitat.tasks.rearrange.utils import (
     CacheHelper,
     CollisionDetails,
@@ -115,7 +116,20 @@ class RearrangeTask(NavigationTask):
             f"{fname}_{self._config.type}_robot_start.pickle",
         )
 
-        if self._config.should_save_to_cache or osp.exists(cache_path):
+        self._spawn_cache = None
+        spawn_cache_config = self._config.spawn_cache
+        if spawn_cache_config.path:
+            self._spawn_cache = SpawnCache(
+                spawn_cache_config.path,
+                capacity=spawn_cache_config.capacity,
+                ways=spawn_cache_config.ways,
+                read_only=spawn_cache_config.read_only,
+            )
+            self._dataset_hash = hash_dataset(
+                data_path, [ep.episode_id for ep in dataset.episodes]
+            )
+            self._articulated_agent_pos_start = None
+        elif self._config.should_save_to_cache or osp.exists(cache_path):
             self._articulated_agent_init_cache = CacheHelper(
                 cache_path,
                 def_val={},
@@ -154,7 +168,25 @@ class RearrangeTask(NavigationTask):
     def set_sim_reset(self, sim_reset):
         self._sim_reset = sim_reset
 
+    def flush_spawn_cache(self) -> None:
+        """
+        Writes the articulated agent starts cached so far to the spawn cache
+        file, if `habitat.task.spawn_cache` is set.
+        """
+        if self._spawn_cache is not None:
+            self._spawn_cache.flush()
+
+    def _get_spawn_cache_key(self, agent_idx: int) -> int:
+        return SpawnCache.key(
+            self._dataset_hash, self._config.type, self._episode_id, agent_idx
+        )
+
     def _get_cached_articulated_agent_start(self, agent_idx: int = 0):
+        if self._spawn_cache is not None:
+            if self._force_regenerate:
+                return None
+            return self._spawn_cache.get(self._get_spawn_cache_key(agent_idx))
+
         start_ident = self._get_ep_init_ident(agent_idx)
         if (
             self._articulated_agent_pos_start is None
@@ -169,6 +201,12 @@ class RearrangeTask(NavigationTask):
         return f"{self._episode_id}_{agent_idx}"
 
     def _cache_articulated_agent_start(self, cache_data, agent_idx: int = 0):
+        if self._spawn_cache is not None:
+            if not self._spawn_cache.read_only:
+                self._spawn_cache.put(
+                    self._get_spawn_cache_key(agent_idx), *cache_data
+                )
+            return
         if (
             self._articulated_agent_pos_start is not None
             and self._should_save_to_cache
@@ -347,35 +385,17 @@ class RearrangeTask(NavigationTask):
         ).articulated_agent
         snapped_obj = grasp_mgr.snap_idx
         articulated_agent_id = articulated_agent.sim_obj.object_id
-        contact_points = self._sim.get_physics_contact_points()
+        contacts = self._sim.get_contact_arrays()
+        not_self_contact = contacts.object_id_a != contacts.object_id_b
 
-        def get_max_force(contact_points, check_id):
-            match_contacts = [
-                x
-                for x in contact_points
-                if (check_id in [x.object_id_a, x.object_id_b])
-                and (x.object_id_a != x.object_id_b)
-            ]
-
-            max_force = 0
-            if len(match_contacts) > 0:
-                max_force = max([abs(x.normal_force) for x in match_contacts])
-
-            return max_force
-
-        forces = [
-            abs(x.normal_force)
-            for x in contact_points
-            if (
-                x.object_id_a not in self._ignore_collisions
-                and x.object_id_b not in self._ignore_collisions
-            )
-        ]
-        max_force = max(forces) if len(forces) > 0 else 0
-
-        max_obj_force = get_max_force(contact_points, snapped_obj)
-        max_articulated_agent_force = get_max_force(
-            contact_points, articulated_agent_id
+        max_force = contacts.max_abs_force(
+            ~contacts.involves_any(self._ignore_collisions)
+        )
+        max_obj_force = contacts.max_abs_force(
+            contacts.involves(snapped_obj) & not_self_contact
+        )
+        max_articulated_agent_force = contacts.max_abs_force(
+            contacts.involves(articulated_agent_id) & not_self_contact
         )
         return max_articulated_agent_force, max_obj_force, max_force
 
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Bounded pool of the per-scene state that `RearrangeSim` derives when it
+switches to a new scene, see `habitat.simulator.scene_pool`. Switching back
+to a pooled scene restores this state instead of reading it from disk and
+recomputing it.
+"""
+
+import os
+import os.path as osp
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from habitat.datasets.rearrange.samplers.receptacle import Receptacle
+
+# Rough size of the Python objects of a pooled entry, in bytes.
+_ENTRY_OVERHEAD = 1024
+_RECEPTACLE_OVERHEAD = 512
+
+# Memory-backed directory used to hand serialized navmeshes to the
+# pathfinder, which can only load them from a file.
+_SHM_DIR = "/dev/shm"
+
+
+@dataclass
+class PooledScene:
+    """
+    The state of a scene kept in a `ScenePool`.
+
+    :property scene_id: The scene this state is of.
+    :property navmesh: The serialized navmesh, as written by
+        `PathFinder.save_nav_mesh`. None until the navmesh is loaded.
+    :property largest_island_idx: The index of the largest indoor navmesh
+        island.
+    :property receptacles: The receptacles of the scene, by unique name.
+    :property template_handles: The object template handle of each rigid
+        object handle added in the scene.
+    """
+
+    scene_id: str
+    navmesh: Optional[bytes] = None
+    largest_island_idx: int = -1
+    receptacles: Optional[Dict[str, "Receptacle"]] = None
+    template_handles: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        """An estimate of the memory used by this entry."""
+        nbytes = _ENTRY_OVERHEAD
+        if self.navmesh is not None:
+            nbytes += len(self.navmesh)
+        for recep in (self.receptacles or {}).values():
+            nbytes += _RECEPTACLE_OVERHEAD
+            mesh_data = getattr(recep, "mesh_data", None)
+            if mesh_data is not None:
+                nbytes += (
+                    4 * mesh_data.index_count + 12 * mesh_data.vertex_count
+                )
+        for handle, template_handle in self.template_handles.items():
+            nbytes += len(handle) + len(template_handle)
+        return nbytes
+
+    def save_navmesh(self, pathfinder) -> None:
+        """Serializes the navmesh loaded in `pathfinder`."""
+        with _navmesh_file() as path:
+            if not pathfinder.save_nav_mesh(path):
+                raise RuntimeError(
+                    f"Could not save the navmesh of scene {self.scene_id}"
+                )
+            with open(path, "rb") as f:
+                self.navmesh = f.read()
+
+    def load_navmesh(self, pathfinder) -> None:
+        """Loads the serialized navmesh in `pathfinder`."""
+        assert self.navmesh is not None
+        with _navmesh_file() as path:
+            with open(path, "wb") as f:
+                f.write(self.navmesh)
+            pathfinder.load_nav_mesh(path)
+
+
+class _navmesh_file:
+    """
+    Context manager giving the path of a temporary navmesh file, in memory
+    if possible, that is deleted on exit.
+    """
+
+    def __enter__(self) -> str:
+        fd, self._path = tempfile.mkstemp(
+            suffix=".navmesh",
+            dir=_SHM_DIR if osp.isdir(_SHM_DIR) else None,
+        )
+        os.close(fd)
+        return self._path
+
+    def __exit__(self, *args) -> None:
+        if osp.exists(self._path):
+            os.remove(self._path)
+
+
+class ScenePool:
+    """
+    Least recently used pool of `PooledScene`. The least recently used
+    scenes are evicted when the pool holds more than `max_scenes` scenes or
+    when their estimated size is over `max_bytes`. The most recently used
+    scene is never evicted.
+
+    :param max_bytes: Memory budget of the pool.
+    :param max_scenes: Maximum number of pooled scenes.
+    """
+
+    def __init__(self, max_bytes: int, max_scenes: int):
+        assert max_scenes > 0, "The pool must hold at least one scene"
+        self._max_bytes = max_bytes
+        self._max_scenes = max_scenes
+        self._scenes: "OrderedDict[str, PooledScene]" = OrderedDict()
+        self._nbytes: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._scenes)
+
+    def __contains__(self, scene_id: str) -> bool:
+        return scene_id in self._scenes
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated size of the pooled scenes, as of their last `put`."""
+        return sum(self._nbytes.values())
+
+    def get(self, scene_id: str) -> Optional[PooledScene]:
+        """
+        Returns the pooled state of `scene_id` and marks it as the most
+        recently used, or None if the scene is not pooled.
+        """
+        scene = self._scenes.get(scene_id)
+        if scene is None:
+            self.misses += 1
+            return None
+        self._scenes.move_to_end(scene_id)
+        self.hits += 1
+        return scene
+
+    def put(self, scene: PooledScene) -> None:
+        """
+        Adds or updates `scene` as the most recently used scene and evicts
+        the least recently used scenes over budget.
+        """
+        self._scenes[scene.scene_id] = scene
+        self._scenes.move_to_end(scene.scene_id)
+        self._nbytes[scene.scene_id] = scene.nbytes
+        while len(self._scenes) > 1 and (
+            len(self._scenes) > self._max_scenes
+            or self.nbytes > self._max_bytes
+        ):
+            evicted_id, _ = self._scenes.popitem(last=False)
+            del self._nbytes[evicted_id]
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._scenes.clear()
+        self._nbytes.clear()
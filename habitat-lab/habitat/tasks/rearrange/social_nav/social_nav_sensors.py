@@ -189,6 +189,7 @@ class SocialNavStats(UsesArticulatedAgentInterface, Measure):
     """
 
     cls_uuid: str = "social_nav_stats"
+    accumulates_over_steps: bool = True
 
     def __init__(self, sim, config, *args, **kwargs):
         super().__init__(**kwargs)
@@ -470,6 +471,7 @@ class SocialNavSeekSuccess(Measure):
     """Social nav seek success meassurement"""
 
     cls_uuid: str = "nav_seek_success"
+    accumulates_over_steps: bool = True
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""A cache of the start positions and rotations of the articulated agents
+of rearrange episodes, shared by the workers through a memory-mapped file.
+
+Entries are keyed by a hash of the dataset, the task type, the episode id and
+the agent index. The table is a set-associative array of fixed capacity.
+Every process that maps the same file sees the starts sampled by the others,
+so the rejection sampling of a start is done once for all the workers. The
+cache can also be filled before training with
+`habitat/datasets/rearrange/generate_episode_inits.py`.
+
+The table is a :ref:`SharedHashTable`, so concurrent readers and writers
+need no lock. Processes on different nodes only share the entries written by
+others if the file system keeps memory maps coherent, which is not the case
+of most network file systems. The file can instead be filled once and then
+read by every node.
+"""
+
+import hashlib
+import os.path as osp
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from habitat.utils.shared_table import SharedHashTable
+
+# Data words of an entry: x and y, z and rotation.
+_DATA_WORDS = 2
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_dataset(data_path: str, episode_ids: Sequence[str] = ()) -> int:
+    r"""Hash of the content of the dataset file at :p:`data_path`, identical
+    on every node with a copy of the file. If the file doesn't exist, hash of
+    the :p:`episode_ids` instead.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    if osp.isfile(data_path):
+        with open(data_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                h.update(chunk)
+    else:
+        h.update("\0".join(episode_ids).encode())
+    return int.from_bytes(h.digest(), "little")
+
+
+class SpawnCache:
+    r"""Cache of articulated agent starts.
+
+    :param path: The memory-mapped file of the table, created if needed and
+        shared by all the caches opened on it with the same :p:`capacity`
+        and :p:`ways`.
+    :param capacity: Maximum number of cached starts.
+    :param ways: Number of entries per set. When a set is full, a new start
+        replaces one of the starts of its set.
+    :param read_only: If the cache should only be read, for example when it
+        was filled before training.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = 2**20,
+        ways: int = 8,
+        read_only: bool = False,
+    ) -> None:
+        self.path = path
+        self.read_only = read_only
+        self._table = SharedHashTable(
+            capacity,
+            ways,
+            data_words=_DATA_WORDS,
+            path=path,
+            read_only=read_only,
+            name="spawn cache",
+        )
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(
+        dataset_hash: int, task_type: str, episode_id: str, agent_idx: int
+    ) -> int:
+        r"""Returns the (non-zero) cache key of the start of the agent
+        :p:`agent_idx` in the episode :p:`episode_id` of the task
+        :p:`task_type` on the dataset with hash :p:`dataset_hash`.
+        """
+        h = hashlib.blake2b(digest_size=8)
+        h.update(np.uint64(dataset_hash).tobytes())
+        h.update(f"{task_type}\0{episode_id}\0{agent_idx}".encode())
+        return int.from_bytes(h.digest(), "little") or 1
+
+    def get(self, key: int) -> Optional[Tuple[np.ndarray, float]]:
+        r"""Returns the cached start position and rotation for :p:`key`,
+        :py:`None` on a miss.
+        """
+        data = self._table.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        data = data.view(np.float32)
+        return data[:3].copy(), float(data[3])
+
+    def put(
+        self,
+        key: int,
+        pos: Union[Sequence[float], np.ndarray],
+        rot: float,
+    ) -> None:
+        r"""Caches the start position :p:`pos` and rotation :p:`rot` for
+        :p:`key`.
+        """
+        assert not self.read_only, "Cannot write to a read-only spawn cache"
+        data = np.zeros(2 * _DATA_WORDS, dtype=np.float32)
+        data[:3] = np.asarray(pos, dtype=np.float32).reshape(3)
+        data[3] = rot
+        self._table.put(key, data.view(np.uint64))
+
+    def flush(self) -> None:
+        r"""Writes the table to the file."""
+        self._table.flush()
@@ -189,6 +189,7 @@ class ArtObjSuccess(Measure):
     """
 
     cls_uuid: str = "art_obj_success"
+    ends_episode: bool = True
 
     def __init__(self, *args, sim, config, task, **kwargs):
         self._config = config
@@ -268,6 +268,7 @@ class NavToPosSucc(Measure):
 @registry.register_measure
 class NavToObjSuccess(Measure):
     cls_uuid: str = "nav_to_obj_success"
+    ends_episode: bool = True
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
@@ -12,6 +12,7 @@ from habitat.tasks.rearrange.rearrange_sensors import EndEffectorToRestDistance
 @registry.register_measure
 class RearrangeReachReward(Measure):
     cls_uuid: str = "rearrange_reach_reward"
+    accumulates_over_steps: bool = True
 
     @staticmethod
     def _get_uuid(*args, **kwargs):
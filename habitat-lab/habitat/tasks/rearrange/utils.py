@@ -93,72 +93,69 @@ def rearrange_collision(
     sim,
     count_obj_colls: bool,
     verbose: bool = False,
-    ignore_names: Optional[List[str]] = None,
+    ignore_obj_ids: Optional[List[int]] = None,
     ignore_base: bool = True,
     get_extra_coll_data: bool = False,
     agent_idx: Optional[int] = None,
 ):
-    """Defines what counts as a collision for the Rearrange environment execution"""
+    """
+    Defines what counts as a collision for the Rearrange environment execution
+
+    :param ignore_obj_ids: The object ids whose contacts are ignored.
+    """
     agent_model = sim.get_agent_data(agent_idx).articulated_agent
     grasp_mgr = sim.get_agent_data(agent_idx).grasp_mgr
-    colls = sim.get_physics_contact_points()
+    contacts = sim.get_contact_arrays()
     agent_id = agent_model.get_robot_sim_id()
     added_objs = sim.scene_obj_ids
     snapped_obj_id = grasp_mgr.snap_idx
 
-    def should_keep(x):
-        if ignore_base:
-            match_link = get_match_link(x, agent_id)
-            if match_link is not None and agent_model.is_base_link(match_link):
-                return False
-
-        if ignore_names is not None:
-            should_ignore = any(
-                coll_name_matches(x, ignore_name)
-                for ignore_name in ignore_names
-            )
-            if should_ignore:
-                return False
-        return True
+    robot_matches = contacts.involves(agent_id)
 
     # Filter out any collisions with the ignore objects
-    colls = list(filter(should_keep, colls))
-    robot_coll_ids = []
+    keep = np.ones(len(contacts), dtype=bool)
+    if ignore_base and robot_matches.any():
+        match_links = contacts.link_of(agent_id)
+        base_links = [
+            link
+            for link in np.unique(match_links[robot_matches]).tolist()
+            if agent_model.is_base_link(link)
+        ]
+        keep &= ~(robot_matches & np.isin(match_links, base_links))
+    if ignore_obj_ids is not None:
+        keep &= ~contacts.involves_any(ignore_obj_ids)
 
     # Check for robot collision
-    robot_obj_colls = 0
-    robot_scene_colls = 0
-    robot_scene_matches = [c for c in colls if coll_name_matches(c, agent_id)]
-    for match in robot_scene_matches:
-        reg_obj_coll = any(
-            coll_name_matches(match, obj_id) for obj_id in added_objs
-        )
-        if reg_obj_coll:
-            robot_obj_colls += 1
-        else:
-            robot_scene_colls += 1
-
-        if match.object_id_a == agent_id:
-            robot_coll_ids.append(match.object_id_b)
-        else:
-            robot_coll_ids.append(match.object_id_a)
+    robot_matches &= keep
+    reg_obj_coll = contacts.involves_any(added_objs)
+    robot_obj_colls = int(np.count_nonzero(robot_matches & reg_obj_coll))
+    robot_scene_colls = int(np.count_nonzero(robot_matches & ~reg_obj_coll))
 
     # Checking for holding object collision
     obj_scene_colls = 0
     if count_obj_colls and snapped_obj_id is not None:
-        matches = [c for c in colls if coll_name_matches(c, snapped_obj_id)]
-        for match in matches:
-            if coll_name_matches(match, agent_id):
-                continue
-            obj_scene_colls += 1
+        obj_scene_colls = int(
+            np.count_nonzero(
+                keep
+                & contacts.involves(snapped_obj_id)
+                & ~contacts.involves(agent_id)
+            )
+        )
 
     if get_extra_coll_data:
         coll_details = CollisionDetails(
             obj_scene_colls=min(obj_scene_colls, 1),
             robot_obj_colls=min(robot_obj_colls, 1),
             robot_scene_colls=min(robot_scene_colls, 1),
-            robot_coll_ids=robot_coll_ids,
-            all_colls=[(x.object_id_a, x.object_id_b) for x in colls],
+            robot_coll_ids=contacts.other_object_id(agent_id)[
+                robot_matches
+            ].tolist(),
+            all_colls=list(
+                zip(
+                    contacts.object_id_a[keep].tolist(),
+                    contacts.object_id_b[keep].tolist(),
+                )
+            ),
         )
     else:
         coll_details = CollisionDetails(
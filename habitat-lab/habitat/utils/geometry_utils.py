@@ -75,6 +75,47 @@ def quaternion_rotate_vector(
     return (quat * vq * quat.inverse()).imag
 
 
+def batch_quaternion_multiply(q1: np.ndarray, q2: np.ndarray) -> np.ndarray:
+    r"""Hamilton product of two arrays of quaternions in [..., x, y, z, w]
+    format.
+    """
+    x1, y1, z1, w1 = np.moveaxis(q1, -1, 0)
+    x2, y2, z2, w2 = np.moveaxis(q2, -1, 0)
+    return np.stack(
+        [
+            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+            w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+        ],
+        -1,
+    )
+
+
+def batch_quaternion_inverse(quats: np.ndarray) -> np.ndarray:
+    r"""Inverses of an array of quaternions in [..., x, y, z, w] format."""
+    conjugates = quats * np.array([-1.0, -1.0, -1.0, 1.0])
+    return conjugates / np.sum(quats * quats, axis=-1, keepdims=True)
+
+
+def batch_quaternion_rotate_vector(
+    quats: np.ndarray, v: np.ndarray
+) -> np.ndarray:
+    r"""Rotates each vector of :p:`v` by the matching quaternion of
+    :p:`quats`, like :ref:`quaternion_rotate_vector` does for one vector.
+
+    Args:
+        quats: [..., 4] quaternions in [x, y, z, w] format
+        v: [..., 3] vectors to rotate
+    Returns:
+        np.ndarray: The [..., 3] rotated vectors
+    """
+    quats = quats / np.linalg.norm(quats, axis=-1, keepdims=True)
+    u = quats[..., :3]
+    t = 2.0 * np.cross(u, v)
+    return v + quats[..., 3:] * t + np.cross(u, t)
+
+
 def agent_state_target2ref(
     ref_agent_state: Union[List, Tuple], target_agent_state: Union[List, Tuple]
 ) -> Tuple[quaternion.quaternion, np.ndarray]:
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+r"""A fixed-capacity hash table of 8-byte words that can be shared without
+a lock by all the processes of a node through a memory-mapped file. It backs
+the geodesic distance cache
+(:py:`habitat.sims.habitat_simulator.geodesic_cache`) and the spawn cache
+(:py:`habitat.tasks.rearrange.spawn_cache`).
+
+The table is set-associative: a key can only be stored in one of the
+:py:`ways` entries of its set. Each entry is written as aligned 8-byte words
+(key, data words, checksum). Aligned 8-byte writes are atomic, so a reader
+that races with a writer sees a checksum mismatch and treats the entry as a
+miss instead of returning the data of another key.
+"""
+
+import os
+import os.path as osp
+import time
+from typing import Optional
+
+import numpy as np
+
+
+class SharedHashTable:
+    r"""Set-associative table of :p:`data_words` words per key.
+
+    :param capacity: Maximum number of entries.
+    :param ways: Number of entries per set.
+    :param data_words: Number of 8-byte data words of an entry.
+    :param path: If set, the table is the memory-mapped file at this path,
+        which is created if needed and shared by all the tables opened on it
+        with the same layout. Otherwise, the table is private to this
+        process.
+    :param read_only: If the table should only be read. Requires
+        :p:`path`.
+    :param lru: If a full set evicts its least recently used entry, which
+        costs a timestamp write on every hit. Otherwise, it replaces an
+        entry chosen from the key.
+    :param name: Name of the table in error messages.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        ways: int,
+        data_words: int,
+        path: Optional[str] = None,
+        read_only: bool = False,
+        lru: bool = False,
+        name: str = "table",
+    ) -> None:
+        assert capacity >= ways > 0, "capacity must be at least ways"
+        assert path is not None or not read_only
+        self.num_sets = capacity // ways
+        self.ways = ways
+        self.path = path
+        self.read_only = read_only
+        self._checksum_word = 1 + data_words
+
+        shape = (self.num_sets, ways, data_words + 2 + int(lru))
+        if path is None:
+            self._table = np.zeros(shape, dtype=np.uint64)
+        else:
+            self._table = _open_table(
+                path, shape, read_only, name, capacity, ways
+            )
+        self._entries = self._table[..., : self._checksum_word + 1]
+        # Last use of each entry. CLOCK_MONOTONIC is shared by the processes
+        # of a node, so the entries of all the processes can be compared.
+        self._last_used = (
+            self._table[..., self._checksum_word + 1] if lru else None
+        )
+
+    def get(self, key: int) -> Optional[np.ndarray]:
+        r"""Returns a copy of the data words of the (non-zero) :p:`key`,
+        :py:`None` if it isn't in the table.
+        """
+        set_index = key % self.num_sets
+        entries = self._entries[set_index]
+        key_word = np.uint64(key)
+        for way in range(self.ways):
+            entry = entries[way].copy()
+            if entry[0] != key_word or entry[-1] != np.bitwise_xor.reduce(
+                entry[:-1]
+            ):
+                continue
+
+            if self._last_used is not None:
+                self._last_used[set_index, way] = time.monotonic_ns()
+            return entry[1:-1]
+        return None
+
+    def put(self, key: int, data: np.ndarray) -> None:
+        r"""Stores the data words :p:`data` (:py:`np.uint64`) of the
+        (non-zero) :p:`key`.
+        """
+        assert not self.read_only, "Cannot write to a read-only table"
+        set_index = key % self.num_sets
+        key_word = np.uint64(key)
+        entries = self._entries[set_index]
+        matches = np.flatnonzero(entries[:, 0] == key_word)
+        if len(matches) > 0:
+            way = int(matches[0])
+        elif self._last_used is not None:
+            way = int(np.argmin(self._last_used[set_index]))
+        else:
+            empty = np.flatnonzero(entries[:, 0] == 0)
+            if len(empty) > 0:
+                way = int(empty[0])
+            else:
+                # The set is full, replace an entry chosen from the key.
+                way = (key >> 32) % self.ways
+
+        entry = entries[way]
+        # Invalidate the entry before rewriting it so that a concurrent
+        # reader never matches a key with the data of another key.
+        entry[-1] = ~np.bitwise_xor.reduce(entry[:-1])
+        entry[0] = key_word
+        entry[1:-1] = data
+        entry[-1] = key_word ^ np.bitwise_xor.reduce(data)
+        if self._last_used is not None:
+            self._last_used[set_index, way] = time.monotonic_ns()
+
+    def flush(self) -> None:
+        r"""Writes the table to its file."""
+        if isinstance(self._table, np.memmap) and not self.read_only:
+            self._table.flush()
+
+
+def _open_table(
+    path: str,
+    shape: tuple,
+    read_only: bool,
+    name: str,
+    capacity: int,
+    ways: int,
+) -> np.memmap:
+    nbytes = int(np.prod(shape)) * np.dtype(np.uint64).itemsize
+    if read_only:
+        size = osp.getsize(path)
+    else:
+        if osp.dirname(path):
+            os.makedirs(osp.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size == 0:
+                # Growing the file is idempotent, so it doesn't matter if
+                # several processes create the table at the same time.
+                os.ftruncate(fd, nbytes)
+                size = nbytes
+        finally:
+            os.close(fd)
+    if size != nbytes:
+        raise ValueError(
+            f"The {name} at {path} has {size} bytes, expected {nbytes} for "
+            f"capacity={capacity} and ways={ways}."
+        )
+    return np.memmap(
+        path, dtype=np.uint64, mode="r" if read_only else "r+", shape=shape
+    )
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+r"""Low-overhead per-step profiler of the environment hot path.
+
+When enabled (see :py:`habitat.environment.profiler`), :ref:`Env` records
+the latency of :py:`env.step`, :py:`task.step`, of every action, every
+:ref:`Measure` update and every :ref:`Sensor` observation into per-component
+latency histograms. Each :ref:`Env` has its own profiler, shared with its
+task, so with a :ref:`VectorEnv` (including a :ref:`ThreadedVectorEnv`) each
+environment aggregates its own statistics, which are fetched with
+:py:`envs.call(["get_step_profile"] * envs.num_envs)`.
+
+Optionally, the last profiled ranges are also kept as Chrome trace events
+(:py:`get_step_profile_trace`), which can be merged with
+:ref:`merge_chrome_traces` and opened in chrome://tracing or Perfetto.
+
+When disabled, a profiled range only costs an attribute check and an empty
+with statement.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, ContextManager, Deque, Dict, List, Optional, Tuple
+
+# Histogram buckets: bucket 0 is [0, 1us) and bucket k > 0 is
+# [2^(k-1)us, 2^k us). The last bucket also holds everything slower.
+NUM_BUCKETS = 26
+
+
+class LatencyHistogram:
+    r"""Latency histogram of a single profiled component."""
+
+    __slots__ = ("count", "total", "min", "max", "counts")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.counts = [0] * NUM_BUCKETS
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+        micros = duration * 1e6
+        bucket = math.frexp(micros)[1] if micros >= 1.0 else 0
+        self.counts[min(bucket, NUM_BUCKETS - 1)] += 1
+
+    def percentile(self, q: float) -> float:
+        r"""Upper bound (in seconds) of the :p:`q` quantile, at the
+        resolution of the histogram buckets.
+        """
+        threshold = q * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold and count > 0:
+                return min(2.0**bucket * 1e-6, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        r"""Statistics of the histogram, times are in milliseconds."""
+        if self.count == 0:
+            return {"count": 0.0}
+        return {
+            "count": float(self.count),
+            "total_ms": self.total * 1e3,
+            "mean_ms": self.total / self.count * 1e3,
+            "min_ms": self.min * 1e3,
+            "p50_ms": self.percentile(0.5) * 1e3,
+            "p90_ms": self.percentile(0.9) * 1e3,
+            "p99_ms": self.percentile(0.99) * 1e3,
+            "max_ms": self.max * 1e3,
+        }
+
+
+class _ProfilerRange:
+    def __init__(self, profiler: "StepProfiler", name: str) -> None:
+        self._profiler = profiler
+        self._name = name
+        self._t_start = 0.0
+
+    def __enter__(self):
+        self._t_start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler.enabled:
+            self._profiler.record(self._name, self._t_start)
+        return False
+
+
+# Range of a disabled profiler.
+_NULL_RANGE = nullcontext()
+
+
+class StepProfiler:
+    r"""Aggregates the latency of named components into
+    :ref:`LatencyHistogram`\ s and optionally keeps the last
+    :p:`max_trace_events` ranges as Chrome trace events.
+
+    Timestamps come from :py:`time.time()`, like the ones given to
+    :py:`add_perf_timing`, so the traces of several processes line up.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._trace_events: Optional[Deque[Tuple[str, float, float]]] = None
+
+    def configure(self, enabled: bool, max_trace_events: int = 0) -> None:
+        r"""Enables or disables the profiler.
+
+        :param enabled: Whether to record anything.
+        :param max_trace_events: Number of most recent ranges kept for the
+            Chrome trace, no trace is kept if 0.
+        """
+        self.enabled = enabled
+        self._trace_events = (
+            deque(maxlen=max_trace_events) if max_trace_events > 0 else None
+        )
+
+    def record(
+        self, name: str, t_start: float, t_end: Optional[float] = None
+    ) -> None:
+        r"""Records a range of :p:`name` from :p:`t_start` to :p:`t_end`
+        (now if :py:`None`), both from :py:`time.time()`.
+        """
+        if t_end is None:
+            t_end = time.time()
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = LatencyHistogram()
+        histogram.add(t_end - t_start)
+        if self._trace_events is not None:
+            self._trace_events.append((name, t_start, t_end - t_start))
+
+    def scope(self, name: str) -> ContextManager:
+        r"""Profiles the range of a with statement. Nothing is timed if the
+        profiler is disabled when the range starts.
+        """
+        if not self.enabled:
+            return _NULL_RANGE
+        return _ProfilerRange(self, name)
+
+    def reset(self) -> None:
+        self._histograms = {}
+        if self._trace_events is not None:
+            self._trace_events.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        r"""Per component statistics, see :ref:`LatencyHistogram.summary`."""
+        return {
+            name: histogram.summary()
+            for name, histogram in sorted(self._histograms.items())
+        }
+
+    def get_histograms(self) -> Dict[str, Dict[str, Any]]:
+        r"""Raw per component histograms. :py:`bucket_upper_us[k]` is the
+        upper bound of bucket :py:`k` in microseconds.
+        """
+        bucket_upper_us = [2.0**k for k in range(NUM_BUCKETS - 1)] + [
+            math.inf
+        ]
+        return {
+            name: {
+                "bucket_upper_us": bucket_upper_us,
+                "counts": list(histogram.counts),
+            }
+            for name, histogram in sorted(self._histograms.items())
+        }
+
+    def get_chrome_trace(self) -> Dict[str, Any]:
+        r"""The kept ranges in the Chrome trace event format."""
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events: List[Dict[str, Any]] = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": t_start * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, t_start, duration in (self._trace_events or ())
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def merge_chrome_traces(traces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    r"""Merges the Chrome traces of several processes (for example of all
+    the workers of a :ref:`VectorEnv`) into one trace.
+    """
+    events: List[Dict[str, Any]] = []
+    for trace in traces:
+        events.extend(trace["traceEvents"])
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(trace: Dict[str, Any], path: str) -> None:
+    r"""Writes a Chrome trace as JSON, to be opened in chrome://tracing or
+    https://ui.perfetto.dev.
+    """
+    with open(path, "w") as f:
+        json.dump(trace, f)
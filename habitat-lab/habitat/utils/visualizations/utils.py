@@ -98,6 +98,19 @@ def paste_overlapping_image(
     return background
 
 
+def video_file_name(video_name: str) -> str:
+    r"""Returns the file name :ref:`images_to_video` saves the video
+    :p:`video_name` to.
+    """
+    video_name = video_name.replace(" ", "_").replace("\n", "_")
+
+    # File names are not allowed to be over 255 characters
+    video_name_split = video_name.split("/")
+    return "/".join(
+        video_name_split[:-1] + [video_name_split[-1][:251] + ".mp4"]
+    )
+
+
 def images_to_video(
     images: List[np.ndarray],
     output_dir: str,
@@ -124,13 +137,7 @@ def images_to_video(
     assert 0 <= quality <= 10
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    video_name = video_name.replace(" ", "_").replace("\n", "_")
-
-    # File names are not allowed to be over 255 characters
-    video_name_split = video_name.split("/")
-    video_name = "/".join(
-        video_name_split[:-1] + [video_name_split[-1][:251] + ".mp4"]
-    )
+    video_name = video_file_name(video_name)
 
     writer = imageio.get_writer(
         os.path.join(output_dir, video_name),
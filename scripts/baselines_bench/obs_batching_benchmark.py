@@ -0,0 +1,103 @@
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Measures the throughput of stacking the observations of the envs into a batch
+with `batch_obs` and with `ObservationBatcher`, for several numbers of envs
+and image sizes. Runs on the CPU by default:
+```
+python scripts/baselines_bench/obs_batching_benchmark.py --num-envs 1 4 16 64 --image-sizes 64 128 256
+```
+"""
+
+import argparse
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+
+from habitat_baselines.utils.common import ObservationBatcher, batch_obs
+
+
+def make_observations(num_envs: int, image_size: int) -> List[Dict]:
+    return [
+        {
+            "rgb": np.random.randint(
+                0, 255, (image_size, image_size, 3), dtype=np.uint8
+            ),
+            "depth": np.random.rand(image_size, image_size, 1).astype(
+                np.float32
+            ),
+            "pointgoal_with_gps_compass": np.random.rand(2).astype(np.float32),
+        }
+        for _ in range(num_envs)
+    ]
+
+
+def time_batching(
+    fn: Callable[[], object],
+    num_iters: int,
+    device: Optional[torch.device],
+) -> float:
+    # Warm up the buffers
+    for _ in range(3):
+        fn()
+    if device is not None and device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+    t_start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    if device is not None and device.type == "cuda":
+        torch.cuda.synchronize(device)
+    return (time.perf_counter() - t_start) / num_iters
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--num-envs", type=int, nargs="+", default=[1, 4, 16, 64]
+    )
+    parser.add_argument(
+        "--image-sizes", type=int, nargs="+", default=[64, 128, 256]
+    )
+    parser.add_argument("--num-iters", type=int, default=50)
+    parser.add_argument("--num-slots", type=int, default=2)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    print(
+        f"{'envs':>6} {'size':>6} {'batch_obs ms':>14} "
+        f"{'batcher ms':>12} {'batcher MB/s':>14}"
+    )
+    for image_size in args.image_sizes:
+        for num_envs in args.num_envs:
+            observations = make_observations(num_envs, image_size)
+            nbytes = sum(
+                v.nbytes for obs in observations for v in obs.values()
+            )
+            batcher = ObservationBatcher(args.num_slots, device=device)
+
+            batch_obs_time = time_batching(
+                partial(batch_obs, observations, device=device),
+                args.num_iters,
+                device,
+            )
+            batcher_time = time_batching(
+                partial(batcher.batch_obs, observations),
+                args.num_iters,
+                device,
+            )
+            print(
+                f"{num_envs:>6} {image_size:>6} {batch_obs_time * 1e3:>14.3f} "
+                f"{batcher_time * 1e3:>12.3f} "
+                f"{nbytes / batcher_time / 1e6:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Measures the time to compute the GAE returns of a rollout with each of the
+methods of `habitat_baselines.common.returns`, and their largest difference
+with the loop:
+```
+python scripts/baselines_bench/returns_benchmark.py --num-steps 128 256 --num-envs 32 128
+```
+"""
+
+import argparse
+import time
+
+import torch
+
+from habitat_baselines.common.returns import (
+    RETURNS_METHODS,
+    compute_gae_returns,
+)
+
+
+def time_returns(
+    method: str,
+    rewards: torch.Tensor,
+    value_preds: torch.Tensor,
+    masks: torch.Tensor,
+    num_iters: int,
+) -> float:
+    def fn():
+        return compute_gae_returns(
+            rewards, value_preds, masks, 0.99, 0.95, method
+        )
+
+    # Warm up, which also compiles the jit method
+    for _ in range(3):
+        fn()
+    if rewards.device.type == "cuda":
+        torch.cuda.synchronize(rewards.device)
+
+    t_start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    if rewards.device.type == "cuda":
+        torch.cuda.synchronize(rewards.device)
+    return (time.perf_counter() - t_start) / num_iters
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-steps", type=int, nargs="+", default=[256])
+    parser.add_argument("--num-envs", type=int, nargs="+", default=[128])
+    parser.add_argument("--num-iters", type=int, default=50)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    print(
+        f"{'steps':>6} {'envs':>6} "
+        + " ".join(f"{m + ' ms':>10}" for m in RETURNS_METHODS)
+        + f" {'max diff':>10}"
+    )
+    for num_steps in args.num_steps:
+        for num_envs in args.num_envs:
+            rewards = torch.randn(num_steps, num_envs, 1, device=device)
+            value_preds = torch.randn(
+                num_steps + 1, num_envs, 1, device=device
+            )
+            masks = (
+                torch.rand(num_steps + 1, num_envs, 1, device=device) > 0.01
+            )
+
+            times = [
+                time_returns(m, rewards, value_preds, masks, args.num_iters)
+                for m in RETURNS_METHODS
+            ]
+            max_diff = max(
+                (
+                    compute_gae_returns(
+                        rewards, value_preds, masks, 0.99, 0.95, m
+                    )
+                    - compute_gae_returns(
+                        rewards, value_preds, masks, 0.99, 0.95, "loop"
+                    )
+                )
+                .abs()
+                .max()
+                .item()
+                for m in RETURNS_METHODS
+            )
+            print(
+                f"{num_steps:>6} {num_envs:>6} "
+                + " ".join(f"{1e3 * t:>10.3f}" for t in times)
+                + f" {max_diff:>10.2e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
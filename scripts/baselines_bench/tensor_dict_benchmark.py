@@ -0,0 +1,116 @@
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Measures the per-call overhead of the `TensorDict` operations done at every
+rollout step (flatten, from_flattened, map, indexed get and set, slice_keys)
+with the cached `TreeSpec` and with the recursive implementations, on a
+tree shaped like the observations and recurrent states of a policy:
+```
+python scripts/baselines_bench/tensor_dict_benchmark.py --num-leaves 4 16 64
+```
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+
+import torch
+
+from habitat_baselines.common.tensor_dict import TensorDict
+
+
+def make_tree(num_leaves: int, num_envs: int) -> TensorDict:
+    observations = {
+        f"sensor_{i}": torch.zeros(num_envs, 4)
+        for i in range(max(num_leaves - 3, 1))
+    }
+    return TensorDict.from_tree(
+        {
+            "observations": observations,
+            "recurrent_hidden_states": torch.zeros(num_envs, 2, 512),
+            "actions": torch.zeros(num_envs, 1),
+            "masks": {"not_done": torch.ones(num_envs, 1, dtype=torch.bool)},
+        }
+    )
+
+
+def time_op(fn: Callable[[], object], num_iters: int) -> float:
+    for _ in range(10):
+        fn()
+    t_start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    return (time.perf_counter() - t_start) / num_iters
+
+
+def recursive_from_flattened(
+    spec: List[Tuple[str, ...]], leaves: List[torch.Tensor]
+) -> TensorDict:
+    sort_ordering = sorted(range(len(spec)), key=lambda i: spec[i])
+    return TensorDict._from_flattened_helper(
+        [spec[i] for i in sort_ordering], [leaves[i] for i in sort_ordering]
+    )
+
+
+def make_ops(
+    tree: TensorDict, num_envs: int
+) -> Dict[str, Tuple[Callable[[], object], Callable[[], object]]]:
+    spec, leaves = tree.flatten()
+    step = tree[0:num_envs]
+    first_keys = list(tree.keys())[:2]
+    return {
+        "flatten": (tree.flatten, tree._flatten_recursive),
+        "from_flattened": (
+            lambda: TensorDict.from_flattened(spec, leaves),
+            lambda: recursive_from_flattened(spec, leaves),
+        ),
+        "map": (
+            lambda: tree.map(lambda v: v),
+            lambda: TensorDict._map_apply_func(lambda v: v, tree),
+        ),
+        "get[index]": (
+            lambda: tree[0],
+            lambda: TensorDict._map_apply_func(lambda v: v[0], tree),
+        ),
+        "set[index]": (
+            lambda: tree.set(slice(0, num_envs), step),
+            lambda: tree._set_recursive(slice(0, num_envs), step),
+        ),
+        "slice_keys": (
+            lambda: tree.slice_keys(first_keys),
+            lambda: TensorDict(
+                (k, tree[k]) for k in first_keys  # type: ignore
+            ),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--num-leaves", type=int, nargs="+", default=[4, 16, 64]
+    )
+    parser.add_argument("--num-envs", type=int, default=16)
+    parser.add_argument("--num-iters", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(
+        f"{'leaves':>6} {'op':>16} {'treespec us':>12} "
+        f"{'recursive us':>13} {'speedup':>8}"
+    )
+    for num_leaves in args.num_leaves:
+        tree = make_tree(num_leaves, args.num_envs)
+        for name, (fast, reference) in make_ops(tree, args.num_envs).items():
+            fast_time = time_op(fast, args.num_iters)
+            reference_time = time_op(reference, args.num_iters)
+            print(
+                f"{num_leaves:>6} {name:>16} {fast_time * 1e6:>12.2f} "
+                f"{reference_time * 1e6:>13.2f} "
+                f"{reference_time / fast_time:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
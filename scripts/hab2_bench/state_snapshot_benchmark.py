@@ -0,0 +1,96 @@
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Compares the latency of saving and restoring the RearrangeSim state with the
+state dict (`capture_state` / `set_state`) and with the array snapshots
+(`capture_state_snapshot` / `set_state_snapshot`), including serialization
+and delta snapshots:
+```
+python scripts/hab2_bench/state_snapshot_benchmark.py --cfg benchmark/rearrange/skills/pick.yaml
+```
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import habitat
+
+
+def time_op(fn: Callable[[], object], num_iters: int) -> float:
+    fn()
+    t_start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    return (time.perf_counter() - t_start) / num_iters
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cfg", type=str, default="benchmark/rearrange/skills/pick.yaml"
+    )
+    parser.add_argument("--num-iters", type=int, default=200)
+    parser.add_argument("--with-agent-js", action="store_true")
+    parser.add_argument(
+        "opts",
+        default=None,
+        nargs=argparse.REMAINDER,
+        help="Modify config options from command line",
+    )
+    args = parser.parse_args()
+
+    config = habitat.get_config(args.cfg, args.opts)
+    with habitat.Env(config=config) as env:
+        env.reset()
+        sim = env.sim
+        print(
+            f"{len(sim.scene_obj_ids)} rigid objects, "
+            f"{len(sim.art_objs)} articulated objects"
+        )
+
+        state = sim.capture_state(args.with_agent_js)
+        snapshot = sim.capture_state_snapshot(args.with_agent_js)
+        env.step(env.action_space.sample())
+        next_snapshot = sim.capture_state_snapshot(args.with_agent_js)
+        delta = next_snapshot.delta_from(snapshot)
+        data = snapshot.to_bytes()
+
+        results = {
+            "dict capture": time_op(
+                lambda: sim.capture_state(args.with_agent_js), args.num_iters
+            ),
+            "dict restore": time_op(
+                lambda: sim.set_state(state), args.num_iters
+            ),
+            "snapshot capture": time_op(
+                lambda: sim.capture_state_snapshot(args.with_agent_js),
+                args.num_iters,
+            ),
+            "snapshot restore": time_op(
+                lambda: sim.set_state_snapshot(snapshot), args.num_iters
+            ),
+            "snapshot to_bytes": time_op(snapshot.to_bytes, args.num_iters),
+            "snapshot from_bytes": time_op(
+                lambda: type(snapshot).from_bytes(data), args.num_iters
+            ),
+            "delta_from": time_op(
+                lambda: next_snapshot.delta_from(snapshot), args.num_iters
+            ),
+            "apply_delta": time_op(
+                lambda: snapshot.apply_delta(delta), args.num_iters
+            ),
+        }
+
+    for name, duration in results.items():
+        print(f"{name:>20}: {duration * 1e6:10.1f} us")
+    print(
+        f"snapshot: {len(data)} bytes, delta after one step: "
+        f"{len(delta.to_bytes())} bytes ({delta.num_changed} changed rows)"
+    )
+
+
+if __name__ == "__main__":
+    main()
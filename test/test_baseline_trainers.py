@@ -4,6 +4,7 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import collections
 import gc
 import itertools
 import math
@@ -11,9 +12,16 @@ import os
 import random
 from copy import deepcopy
 
+import numpy as np
 import pytest
+from gym import spaces
+from omegaconf import OmegaConf
 
 from habitat.config.default import get_agent_config
+from habitat.core.shared_obs_buffer import (
+    SharedObservationBuffer,
+    SharedObservationLayout,
+)
 from habitat.core.vector_env import VectorEnv
 
 try:
@@ -23,10 +31,12 @@ try:
     import habitat_sim.utils.datasets_download as data_downloader
     from habitat_baselines.common.base_trainer import BaseRLTrainer
     from habitat_baselines.common.baseline_registry import baseline_registry
+    from habitat_baselines.common.scene_scheduler import SceneAffinityScheduler
     from habitat_baselines.config.default import get_config
     from habitat_baselines.rl.ddppo.ddp_utils import find_free_port
+    from habitat_baselines.rl.ppo.ppo_trainer import PPOTrainer
     from habitat_baselines.run import execute_exp
-    from habitat_baselines.utils.common import batch_obs
+    from habitat_baselines.utils.common import ObservationBatcher, batch_obs
 
     baseline_installed = True
 except ImportError:
@@ -456,3 +466,240 @@ def test_batch_obs(sensor_device, batched_device):
     ]
 
     _ = batch_obs(sensors, device=batched_device)
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+@pytest.mark.parametrize("num_slots", [1, 2, 3])
+def test_observation_batcher(num_slots):
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    batcher = ObservationBatcher(num_slots, device=device)
+    all_sensors = [
+        [
+            {"rgb": np.random.rand(8, 8, 3), "gps": np.random.rand(2)}
+            for _ in range(4)
+        ]
+        for _ in range(5)
+    ]
+
+    batches = []
+    for step, sensors in enumerate(all_sensors):
+        batches.append(batcher.batch_obs(sensors))
+        # The batches of the last num_slots steps are still valid
+        for prev_step in range(max(0, step + 1 - num_slots), step + 1):
+            expected = batch_obs(all_sensors[prev_step], device=device)
+            for k in expected:
+                assert torch.equal(batches[prev_step][k], expected[k])
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_observation_batcher_shared_obs():
+    num_envs = 3
+    rgb_space = spaces.Box(0, 255, (4, 5, 3), dtype=np.uint8)
+    layout = SharedObservationLayout.from_observation_space(
+        spaces.Dict({"rgb": rgb_space}), num_envs
+    )
+    buffer = SharedObservationBuffer(layout, create=True)
+    try:
+        batcher = ObservationBatcher(2)
+        batches, expected = [], []
+        for _ in range(2):
+            all_obs = [
+                buffer.read(
+                    buffer.write(
+                        rank,
+                        {"rgb": rgb_space.sample()},
+                    )
+                )
+                for rank in range(num_envs)
+            ]
+            expected.append(np.stack([o["rgb"] for o in all_obs]))
+            batches.append(batcher.batch_obs(all_obs))
+
+        # The first batch was copied out of the slab, which the second step
+        # overwrote.
+        for batch, rgb in zip(batches, expected):
+            assert not np.shares_memory(
+                batch["rgb"].numpy(), buffer.blocks["rgb"]
+            )
+            assert np.array_equal(batch["rgb"].numpy(), rgb)
+    finally:
+        buffer.close()
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_scene_affinity_scheduler():
+    num_scenes, episodes_per_scene, num_envs = 4, 10, 2
+    episode_scene_ids = [
+        f"scene_{i % num_scenes}"
+        for i in range(num_scenes * episodes_per_scene)
+    ]
+    episodes = [
+        (scene_id, str(i)) for i, scene_id in enumerate(episode_scene_ids)
+    ]
+    scheduler = SceneAffinityScheduler(
+        [episodes] * num_envs,
+        max_scene_repeat_episodes=3,
+        max_envs_per_scene=1,
+        seed=0,
+    )
+    scheduler.set_loaded_scene(0, "scene_0")
+    scheduler.set_loaded_scene(1, "scene_0")
+
+    num_rounds = 2 * episodes_per_scene
+    env_episodes = [[] for _ in range(num_envs)]
+    for _ in range(num_rounds):
+        for env_index in range(num_envs):
+            env_episodes[env_index].append(scheduler.next_episode(env_index))
+        # The envs never run the same scene at the same time
+        scenes = [episode_scene_ids[e[-1]] for e in env_episodes]
+        assert len(set(scenes)) == num_envs
+
+    # One of the envs keeps the loaded scene
+    assert "scene_0" in [episode_scene_ids[e[0]] for e in env_episodes]
+    for episodes in env_episodes:
+        scenes = [episode_scene_ids[e] for e in episodes]
+        run_lengths = [len(list(g)) for _, g in itertools.groupby(scenes)]
+        assert max(run_lengths) <= 3
+        # Scenes are reused instead of switching at every episode
+        assert len(run_lengths) < len(scenes) / 2
+
+    # The scenes are covered evenly and the episodes of a scene are only
+    # repeated after all of them were scheduled
+    scene_episodes = collections.defaultdict(list)
+    for episode in itertools.chain(*zip(*env_episodes)):
+        scene_episodes[episode_scene_ids[episode]].append(episode)
+    assert len(scene_episodes) == num_scenes
+    counts = [len(episodes) for episodes in scene_episodes.values()]
+    assert max(counts) - min(counts) <= 3
+    for episodes in scene_episodes.values():
+        first_pass = episodes[:episodes_per_scene]
+        assert len(set(first_pass)) == len(first_pass)
+    assert scheduler.num_scene_switches <= num_envs * num_rounds / 3 + 1
+
+
+class _FakeSchedulerEnvs:
+    def __init__(self, env_episodes):
+        self.env_episodes = env_episodes
+        self.next_episodes = [None] * len(env_episodes)
+
+    @property
+    def num_envs(self):
+        return len(self.env_episodes)
+
+    def call_at(self, index, function_name, function_args=None):
+        assert function_name == "set_next_episode_by_index"
+        self.next_episodes[index] = self.env_episodes[index][
+            function_args["episode_index"]
+        ]
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_scene_affinity_scheduler_env_orders():
+    # Every env has its own order of the episodes, as after the shuffle of
+    # its episode iterator, and the last env only has some of the scenes.
+    episodes = [(f"scene_{i % 4}", str(i)) for i in range(40)]
+    rng = random.Random(0)
+    env_episodes = []
+    for _ in range(2):
+        env_episodes.append(rng.sample(episodes, len(episodes)))
+    env_episodes.append(
+        [ep for ep in reversed(episodes) if ep[0] in ("scene_2", "scene_3")]
+    )
+    envs = _FakeSchedulerEnvs(env_episodes)
+    scheduler = SceneAffinityScheduler(
+        env_episodes,
+        max_scene_repeat_episodes=2,
+        max_envs_per_scene=1,
+        seed=0,
+    )
+
+    scheduled = []
+    for _ in range(len(episodes)):
+        scheduler.schedule(envs, range(envs.num_envs))
+        scenes = [
+            scheduler._env_scenes[env_index]
+            for env_index in range(envs.num_envs)
+        ]
+        # Each env gets an episode of the scene the scheduler chose for it.
+        assert [ep[0] for ep in envs.next_episodes] == scenes
+        assert envs.next_episodes[-1][0] in ("scene_2", "scene_3")
+        scheduled.extend(envs.next_episodes)
+    # The episodes of a scene are only repeated after all of them were
+    # scheduled.
+    for scene_id in ("scene_0", "scene_1", "scene_2", "scene_3"):
+        first_pass = [ep for ep in scheduled if ep[0] == scene_id][:10]
+        assert len(set(first_pass)) == len(first_pass)
+
+
+class _ScalarWriter:
+    def __init__(self):
+        self.scalars = {}
+
+    def add_scalar(self, tag, value, step):
+        self.scalars[tag] = value
+
+
+@pytest.mark.skipif(
+    not baseline_installed, reason="baseline sub-module not installed"
+)
+def test_trainer_info_stats_log():
+    num_envs = 2
+    trainer = PPOTrainer.__new__(PPOTrainer)
+    trainer.config = OmegaConf.create(
+        {"habitat_baselines": {"log_interval": 10}}
+    )
+    trainer._rank0_keys = set()
+    trainer._info_schema = None
+    trainer._single_proc_infos = {}
+    trainer.num_steps_done = 0
+    trainer.num_updates_done = 1
+    trainer.t_start = 0.0
+    trainer.running_episode_stats = dict(
+        count=torch.zeros(num_envs, 1), reward=torch.zeros(num_envs, 1)
+    )
+    trainer.window_episode_stats = collections.defaultdict(
+        lambda: collections.deque(maxlen=10)
+    )
+
+    def step(infos, dones):
+        done_masks = torch.tensor([[done] for done in dones])
+        trainer.running_episode_stats["count"] += done_masks.float()
+        trainer._accumulate_info_stats(
+            infos, done_masks, list(range(num_envs))
+        )
+        for k, v in trainer.running_episode_stats.items():
+            trainer.window_episode_stats[k].append(v.clone())
+
+    step([{"success": 0.0, "stages": {"stage_1": 0.0}}] * 2, [False, False])
+    step(
+        [
+            {"success": 1.0, "stages": {"stage_1": 1.0}},
+            {"success": 0.0, "stages": {"stage_1": 0.0}},
+        ],
+        [True, False],
+    )
+    # The second episode ends without stage_1 but with a new stage_2.
+    step(
+        [
+            {"success": 0.0, "stages": {"stage_1": 0.0}},
+            {"success": 0.0, "stages": {"stage_2": 1.0}},
+        ],
+        [False, True],
+    )
+
+    writer = _ScalarWriter()
+    trainer._training_log(writer, {})
+    # Each metric is averaged over the episodes that reported it, the
+    # metrics missing from an episode don't count as 0.
+    assert writer.scalars["metrics/success"] == pytest.approx(0.5)
+    assert writer.scalars["metrics/stages.stage_1"] == pytest.approx(1.0)
+    assert writer.scalars["metrics/stages.stage_2"] == pytest.approx(1.0)
+    assert not any(k.startswith("metrics/count") for k in writer.scalars)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from habitat.tasks.rearrange.contact_cache import ContactArrays
+from habitat.tasks.rearrange.utils import (
+    coll_name_matches,
+    get_match_link,
+    rearrange_collision,
+)
+
+AGENT_ID = 1
+SCENE_OBJ_IDS = [10, 11, 12]
+BASE_LINKS = {-1, 0}
+
+
+def _random_contacts(rng, n):
+    object_ids = [0, AGENT_ID, 2, *SCENE_OBJ_IDS]
+    return [
+        SimpleNamespace(
+            object_id_a=int(rng.choice(object_ids)),
+            object_id_b=int(rng.choice(object_ids)),
+            link_id_a=int(rng.integers(-1, 4)),
+            link_id_b=int(rng.integers(-1, 4)),
+            normal_force=float(rng.normal()),
+        )
+        for _ in range(n)
+    ]
+
+
+def _make_sim(contacts, snap_idx):
+    agent = SimpleNamespace(
+        get_robot_sim_id=lambda: AGENT_ID,
+        is_base_link=lambda link: link in BASE_LINKS,
+    )
+    agent_data = SimpleNamespace(
+        articulated_agent=agent,
+        grasp_mgr=SimpleNamespace(snap_idx=snap_idx),
+    )
+    return SimpleNamespace(
+        get_agent_data=lambda agent_idx: agent_data,
+        get_contact_arrays=lambda: ContactArrays.from_contact_points(contacts),
+        scene_obj_ids=SCENE_OBJ_IDS,
+    )
+
+
+def _reference_collision(
+    colls, snapped_obj_id, count_obj_colls, ignore_obj_ids, ignore_base
+):
+    """Per contact point implementation of `rearrange_collision`."""
+
+    def should_keep(x):
+        if ignore_base:
+            match_link = get_match_link(x, AGENT_ID)
+            if match_link is not None and match_link in BASE_LINKS:
+                return False
+        if ignore_obj_ids is not None and any(
+            coll_name_matches(x, obj_id) for obj_id in ignore_obj_ids
+        ):
+            return False
+        return True
+
+    colls = list(filter(should_keep, colls))
+    robot_coll_ids = []
+    robot_obj_colls = 0
+    robot_scene_colls = 0
+    for match in [c for c in colls if coll_name_matches(c, AGENT_ID)]:
+        if any(coll_name_matches(match, i) for i in SCENE_OBJ_IDS):
+            robot_obj_colls += 1
+        else:
+            robot_scene_colls += 1
+        if match.object_id_a == AGENT_ID:
+            robot_coll_ids.append(match.object_id_b)
+        else:
+            robot_coll_ids.append(match.object_id_a)
+
+    obj_scene_colls = 0
+    if count_obj_colls and snapped_obj_id is not None:
+        for match in [
+            c for c in colls if coll_name_matches(c, snapped_obj_id)
+        ]:
+            if not coll_name_matches(match, AGENT_ID):
+                obj_scene_colls += 1
+    return (
+        min(obj_scene_colls, 1),
+        min(robot_obj_colls, 1),
+        min(robot_scene_colls, 1),
+        robot_coll_ids,
+        [(x.object_id_a, x.object_id_b) for x in colls],
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("ignore_base", [True, False])
+def test_rearrange_collision_vectorized(seed, ignore_base):
+    rng = np.random.default_rng(seed)
+    contacts = _random_contacts(rng, int(rng.integers(0, 12)))
+    snap_idx = [None, 10, 11][seed % 3]
+    ignore_obj_ids = [None, [2], [10, 0]][seed % 3]
+    sim = _make_sim(contacts, snap_idx)
+
+    for count_obj_colls in [True, False]:
+        did_collide, details = rearrange_collision(
+            sim,
+            count_obj_colls,
+            ignore_obj_ids=ignore_obj_ids,
+            ignore_base=ignore_base,
+            get_extra_coll_data=True,
+        )
+        expected = _reference_collision(
+            contacts, snap_idx, count_obj_colls, ignore_obj_ids, ignore_base
+        )
+        assert (
+            details.obj_scene_colls,
+            details.robot_obj_colls,
+            details.robot_scene_colls,
+            details.robot_coll_ids,
+            details.all_colls,
+        ) == expected
+        assert did_collide == (sum(expected[:3]) > 0)
+
+
+def test_contact_arrays_forces():
+    contacts = ContactArrays.from_contact_points(
+        [
+            SimpleNamespace(
+                object_id_a=a,
+                object_id_b=b,
+                link_id_a=-1,
+                link_id_b=-1,
+                normal_force=f,
+            )
+            for a, b, f in [(1, 2, -3.0), (2, 2, 5.0), (3, 1, 1.0)]
+        ]
+    )
+    not_self = contacts.object_id_a != contacts.object_id_b
+    assert contacts.max_abs_force(contacts.involves(1) & not_self) == 3.0
+    assert contacts.max_abs_force(contacts.involves(2) & not_self) == 3.0
+    assert contacts.max_abs_force(contacts.involves(None)) == 0
+    assert contacts.max_abs_force(~contacts.involves_any([2])) == 1.0
+    assert contacts.other_object_id(1)[contacts.involves(1)].tolist() == [
+        2,
+        3,
+    ]
+
+    empty = ContactArrays.from_contact_points([])
+    assert len(empty) == 0 and empty.max_abs_force(empty.involves(1)) == 0
@@ -4,11 +4,19 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import random
 from itertools import groupby, islice
 
 import pytest
 
 from habitat.core.dataset import Dataset, Episode
+from habitat.core.env import Env
+from habitat.core.episode_store import (
+    CompactEpisodeStore,
+    LazyEpisodeSequence,
+    write_compact_episodes,
+)
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
 from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
 
 
@@ -27,6 +35,89 @@ def _construct_dataset(num_episodes, num_groups=10):
     return dataset
 
 
+def _construct_lazy_dataset(tmp_path, num_episodes, num_groups=10):
+    episodes = [
+        dict(
+            episode_id=str(i),
+            scene_id="scene_id_" + str(i % num_groups),
+            start_position=[0.5 * i, 0, 0],
+            start_rotation=[0, 0, 0, 1],
+            goals=[{"position": [1.0, 0.0, float(i)], "radius": 0.2}],
+            info={"geodesic_distance": float(i)},
+        )
+        for i in range(num_episodes)
+    ]
+    fname = str(tmp_path / "episodes.episodes.bin")
+    write_compact_episodes(fname, episodes)
+    dataset: Dataset = Dataset()
+    dataset.episodes = LazyEpisodeSequence(
+        [
+            CompactEpisodeStore(
+                fname, decode_fn=PointNavDatasetV1.episode_from_dict
+            )
+        ]
+    )
+    return dataset
+
+
+def test_compact_episodes_round_trip(tmp_path):
+    dataset = _construct_lazy_dataset(tmp_path, 100)
+    assert len(dataset.episodes) == 100
+    assert dataset.scene_ids == ["scene_id_" + str(ii) for ii in range(10)]
+
+    episode = dataset.episodes[42]
+    assert isinstance(episode, NavigationEpisode)
+    assert episode.episode_id == "42"
+    assert episode.scene_id == "scene_id_2"
+    assert episode.start_position == [21.0, 0.0, 0.0]
+    assert episode.goals == [
+        NavigationGoal(position=[1.0, 0.0, 42.0], radius=0.2)
+    ]
+    assert episode.info == {"geodesic_distance": 42.0}
+
+    scene_episodes = dataset.get_scene_episodes("scene_id_3")
+    assert len(scene_episodes) == 10
+    assert all(ep.scene_id == "scene_id_3" for ep in scene_episodes)
+
+
+@pytest.mark.parametrize(
+    "iterator_kwargs",
+    [
+        dict(cycle=True, shuffle=False, group_by_scene=False),
+        dict(cycle=True, shuffle=True, group_by_scene=True),
+        dict(
+            cycle=True,
+            shuffle=True,
+            max_scene_repeat_episodes=3,
+            num_episode_sample=50,
+        ),
+    ],
+)
+def test_lazy_iterator_matches_list_iterator(tmp_path, iterator_kwargs):
+    lazy_dataset = _construct_lazy_dataset(tmp_path, 100)
+    dataset: Dataset = Dataset()
+    dataset.episodes = list(lazy_dataset.episodes)
+
+    episode_ids = []
+    for ds in (dataset, lazy_dataset):
+        random.seed(0)
+        ep_iter = ds.get_episode_iterator(seed=1, **iterator_kwargs)
+        episode_ids.append([ep.episode_id for ep in islice(ep_iter, 250)])
+
+    assert episode_ids[0] == episode_ids[1]
+
+
+def test_select_episodes_by_index_stays_lazy(tmp_path, monkeypatch):
+    env = Env.__new__(Env)
+    env._dataset = _construct_lazy_dataset(tmp_path, 100)
+    monkeypatch.setattr(env, "_setup_episode_iterator", lambda: None)
+
+    env.select_episodes_by_index([7, 3, 42])
+    assert isinstance(env.episodes, LazyEpisodeSequence)
+    assert env.get_episode_ids() == ["7", "3", "42"]
+    assert env.episodes[2].start_position == [21.0, 0.0, 0.0]
+
+
 def test_scene_ids():
     dataset = _construct_dataset(100)
     assert dataset.scene_ids == ["scene_id_" + str(ii) for ii in range(10)]
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import pytest
+
+from habitat_baselines.common.eval_shards import (
+    EvalShard,
+    aggregate_episode_stats,
+    episode_shard,
+    merge_shards,
+)
+
+
+class _FakeEnvs:
+    def __init__(self, env_episodes):
+        self.env_episodes = [list(eps) for eps in env_episodes]
+
+    @property
+    def num_envs(self):
+        return len(self.env_episodes)
+
+    def call_at(self, index, function_name, function_args=None):
+        episodes = self.env_episodes[index]
+        if function_name == "get_episode_scene_ids":
+            return [scene_id for scene_id, _ in episodes]
+        if function_name == "get_episode_ids":
+            return [episode_id for _, episode_id in episodes]
+        assert function_name == "select_episodes_by_index"
+        self.env_episodes[index] = [
+            episodes[i] for i in function_args["episode_indices"]
+        ]
+        return None
+
+
+def _episodes(num_scenes=3, num_episodes=20):
+    return [
+        (f"scene{s}", str(e))
+        for s in range(num_scenes)
+        for e in range(num_episodes)
+    ]
+
+
+@pytest.mark.parametrize("num_shards", [1, 2, 5])
+def test_episode_shards_partition(num_shards):
+    episodes = _episodes()
+    shards = [episode_shard(s, e, num_shards) for s, e in episodes]
+    assert shards == [episode_shard(s, e, num_shards) for s, e in episodes]
+    assert set(shards) == set(range(num_shards))
+
+
+def test_shard_resume_and_merge(tmp_path):
+    num_shards = 2
+    episodes = _episodes()
+    envs_episodes = [
+        episodes[: len(episodes) // 2],
+        episodes[len(episodes) // 2 :],
+    ]
+
+    shard = EvalShard(str(tmp_path), 3, num_shards=num_shards, shard_index=0)
+    envs = _FakeEnvs(envs_episodes)
+    paused, num_episodes = shard.select_episodes(envs, evals_per_ep=1)
+    assert paused == []
+    selected = [ep for eps in envs.env_episodes for ep in eps]
+    assert num_episodes == len(selected)
+    assert all(episode_shard(s, e, num_shards) == 0 for s, e in selected)
+
+    # Record half of the episodes and get interrupted in the middle of a
+    # record.
+    done = selected[: len(selected) // 2]
+    for i, key in enumerate(done):
+        shard.add(key, 1, {"reward": float(i), "success": 1.0})
+    with open(shard.path, "ab") as f:
+        f.write(b'{"scene_id": "scene0", "episode_id"')
+
+    shard = EvalShard(str(tmp_path), 3, num_shards=num_shards, shard_index=0)
+    assert len(shard.stats_episodes) == len(done)
+    envs = _FakeEnvs(envs_episodes)
+    _, num_episodes = shard.select_episodes(envs, evals_per_ep=1)
+    assert num_episodes == len(selected)
+    remaining = [ep for eps in envs.env_episodes for ep in eps]
+    assert sorted(remaining) == sorted(set(selected) - set(done))
+
+    for key in remaining:
+        shard.add(key, 1, {"reward": 1.0, "success": 0.0})
+    shard.mark_complete()
+    # The other shard is not complete.
+    assert shard.merge() is None
+
+    other = EvalShard(str(tmp_path), 3, num_shards=num_shards, shard_index=1)
+    envs = _FakeEnvs(envs_episodes)
+    other.select_episodes(envs, evals_per_ep=1)
+    for key in [ep for eps in envs.env_episodes for ep in eps]:
+        other.add(key, 1, {"reward": 2.0, "success": 1.0})
+    other.mark_complete()
+    merged = other.merge()
+
+    assert merged is not None
+    assert sorted(k for k, _ in merged.keys()) == sorted(episodes)
+    merged_again, incomplete = merge_shards(str(tmp_path), 3, num_shards)
+    assert incomplete == []
+    assert merged_again == merged
+    assert aggregate_episode_stats(merged)["success"] == pytest.approx(
+        sum(v["success"] for v in merged.values()) / len(episodes)
+    )
+
+    # Every episode is recorded, the envs are left without episodes.
+    shard = EvalShard(str(tmp_path), 3, num_shards=num_shards, shard_index=0)
+    assert shard.complete
+    envs = _FakeEnvs(envs_episodes)
+    paused, _ = shard.select_episodes(envs, evals_per_ep=1)
+    assert paused == [0, 1]
+
+
+def test_shard_evals_per_episode(tmp_path):
+    episodes = _episodes(num_scenes=1, num_episodes=4)
+    shard = EvalShard(str(tmp_path), 0)
+    shard.add(episodes[0], 1, {"reward": 1.0})
+    shard.add(episodes[0], 2, {"reward": 1.0})
+    shard.add(episodes[1], 1, {"reward": 1.0})
+
+    shard = EvalShard(str(tmp_path), 0)
+    assert shard.eval_counts()[episodes[1]] == 1
+    envs = _FakeEnvs([episodes])
+    paused, num_episodes = shard.select_episodes(envs, evals_per_ep=2)
+    assert paused == []
+    assert num_episodes == len(episodes)
+    assert envs.env_episodes[0] == episodes[1:]
@@ -11,18 +11,24 @@ from typing import List
 
 import numpy as np
 import pytest
-from gym import Wrapper
+from gym import Wrapper, spaces
 
 import habitat
 from habitat.config.default import get_agent_config, get_config
 from habitat.core.batch_rendering.env_batch_renderer_constants import (
     KEYFRAME_OBSERVATION_KEY,
 )
+from habitat.core.shared_obs_buffer import (
+    SharedObservationBuffer,
+    SharedObservationLayout,
+    shared_batch_view,
+)
 from habitat.core.simulator import AgentState
 from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
 from habitat.gym.gym_definitions import make_gym_from_config
 from habitat.gym.gym_wrapper import HabGymWrapper
 from habitat.tasks.nav.nav import NavigationEpisode, NavigationGoal
+from habitat.utils.step_profiler import StepProfiler, merge_chrome_traces
 from habitat.utils.test_utils import (
     sample_non_stop_action,
     sample_non_stop_action_gym,
@@ -147,6 +153,107 @@ def test_vectorized_envs(multiprocessing_start_method, gpu2gpu):
         )
 
 
+def test_vectorized_envs_shared_memory_obs():
+    configs, datasets = _load_test_data()
+    num_envs = len(configs)
+    env_fn_args = tuple(zip(configs, datasets, range(num_envs)))
+    with habitat.VectorEnv(
+        make_env_fn=_make_dummy_env_func,
+        env_fn_args=env_fn_args,
+        multiprocessing_start_method="forkserver",
+    ) as envs, habitat.VectorEnv(
+        make_env_fn=_make_dummy_env_func,
+        env_fn_args=env_fn_args,
+        multiprocessing_start_method="forkserver",
+        use_shared_memory_obs=True,
+    ) as shm_envs:
+        assert shm_envs._shared_obs is not None
+        for obs, shm_obs in zip(envs.reset(), shm_envs.reset()):
+            assert obs.keys() == shm_obs.keys()
+            for k in obs.keys():
+                assert np.allclose(obs[k], shm_obs[k])
+
+        for _ in range(configs[0].habitat.environment.max_episode_steps):
+            actions = sample_non_stop_action_gym(
+                envs.action_spaces[0], num_envs
+            )
+            outputs = envs.step(actions)
+            shm_outputs = shm_envs.step(actions)
+            for (obs, *_), (shm_obs, *_) in zip(outputs, shm_outputs):
+                for k in obs.keys():
+                    assert np.allclose(obs[k], shm_obs[k])
+
+
+@pytest.mark.parametrize("vector_env_cls", ["VectorEnv", "ThreadedVectorEnv"])
+def test_vectorized_envs_wait_step_any(vector_env_cls):
+    configs, datasets = _load_test_data()
+    num_envs = len(configs)
+    env_fn_args = tuple(zip(configs, datasets, range(num_envs)))
+    with getattr(habitat, vector_env_cls)(
+        make_env_fn=_make_dummy_env_func,
+        env_fn_args=env_fn_args,
+    ) as envs:
+        envs.reset()
+        assert envs.poll() == []
+
+        actions = sample_non_stop_action_gym(envs.action_spaces[0], num_envs)
+        for index_env, act in enumerate(actions):
+            envs.async_step_at(index_env, act)
+        results = dict(envs.wait_step_any())
+        assert len(results) > 0
+        while len(results) < num_envs:
+            ready = envs.wait_step_any(timeout=10.0)
+            assert len(ready) > 0
+            results.update(ready)
+
+        assert sorted(results.keys()) == list(range(num_envs))
+        assert envs.poll() == []
+        assert envs.wait_step_any(timeout=0.0) == []
+
+        envs.async_step_at(0, actions[0])
+        assert envs.poll([1, 2]) == []
+        assert envs.poll([0], timeout=10.0) == [0]
+        assert envs.wait_step_any([0])[0][0] == 0
+
+
+def test_shared_observation_buffer():
+    obs_space = spaces.Dict(
+        {
+            "rgb": spaces.Box(0, 255, (4, 5, 3), dtype=np.uint8),
+            "gps": spaces.Box(-1.0, 1.0, (2,), dtype=np.float32),
+            "discrete": spaces.Discrete(3),
+        }
+    )
+    num_envs = 3
+    layout = SharedObservationLayout.from_observation_space(
+        obs_space, num_envs
+    )
+    assert set(layout.keys) == {"rgb", "gps"}
+
+    parent = SharedObservationBuffer(layout, create=True)
+    worker = SharedObservationBuffer(layout, name=parent.name)
+    try:
+        all_obs = []
+        for rank in range(num_envs):
+            obs = {k: space.sample() for k, space in obs_space.spaces.items()}
+            header = worker.write(rank, obs)
+            assert set(header.extra.keys()) == {"discrete"}
+            all_obs.append(parent.read(header))
+            for k, v in obs.items():
+                assert np.array_equal(all_obs[-1][k], v)
+
+        batched = shared_batch_view([o["rgb"] for o in all_obs])
+        assert batched is not None
+        assert np.shares_memory(batched, parent.blocks["rgb"])
+        assert np.array_equal(batched, np.stack([o["rgb"] for o in all_obs]))
+
+        assert shared_batch_view([o["rgb"] for o in all_obs[::2]]) is None
+        assert shared_batch_view([o["rgb"].copy() for o in all_obs]) is None
+    finally:
+        worker.close()
+        parent.close()
+
+
 def test_with_scope():
     configs, _ = _load_test_data()
     env_fn_args = tuple((c,) for c in configs)
@@ -504,6 +611,104 @@ def test_vec_env_call_func():
         assert env_ids == list(range(num_envs))
 
 
+def test_step_profiler():
+    profiler = StepProfiler()
+    profiler.configure(enabled=True, max_trace_events=3)
+    for duration in [1e-5, 2e-5, 4e-5, 1e-3]:
+        profiler.record("a", 100.0, 100.0 + duration)
+    with profiler.scope("b"):
+        pass
+
+    stats = profiler.get_stats()
+    assert list(stats.keys()) == ["a", "b"]
+    assert stats["a"]["count"] == 4
+    assert np.isclose(stats["a"]["max_ms"], 1.0)
+    assert np.isclose(stats["a"]["mean_ms"], 1.07 / 4)
+    assert stats["a"]["p50_ms"] <= stats["a"]["p99_ms"] <= stats["a"]["max_ms"]
+    assert sum(profiler.get_histograms()["a"]["counts"]) == 4
+
+    trace = profiler.get_chrome_trace()
+    assert len(trace["traceEvents"]) == 3
+    assert trace["traceEvents"][-1]["name"] == "b"
+    assert trace["traceEvents"][0]["ph"] == "X"
+    assert len(merge_chrome_traces([trace, trace])["traceEvents"]) == 6
+
+    profiler.reset()
+    assert profiler.get_stats() == {}
+
+    profiler.configure(enabled=False)
+    with profiler.scope("c"):
+        pass
+    assert profiler.get_stats() == {}
+
+
+def test_env_step_profile_config():
+    configs, datasets = _load_test_data()
+    config = configs[0]
+    with habitat.config.read_write(config):
+        config.habitat.environment.profiler.enabled = True
+        config.habitat.environment.profiler.max_trace_events = 100
+
+    with habitat.Env(config=config, dataset=datasets[0]) as env:
+        env.reset_step_profile()
+        env.reset()
+        for _ in range(3):
+            env.step(sample_non_stop_action(env.action_space))
+
+        profile = env.get_step_profile()
+        assert profile["env.step"]["count"] == 3
+        assert profile["task.step"]["count"] == 3
+        trace = env.get_step_profile_trace()
+        assert len(trace["traceEvents"]) > 0
+        assert "env.step" in {e["name"] for e in trace["traceEvents"]}
+
+    # The profiler of the next env is disabled.
+    with habitat.Env(config=configs[1], dataset=datasets[1]) as env:
+        env.reset_step_profile()
+        env.reset()
+        env.step(sample_non_stop_action(env.action_space))
+        assert env.get_step_profile() == {}
+
+
+@pytest.mark.parametrize("vector_env_cls", ["VectorEnv", "ThreadedVectorEnv"])
+def test_vec_env_step_profile(vector_env_cls):
+    configs, datasets = _load_test_data()
+    num_envs = len(configs)
+    for cfg in configs:
+        with habitat.config.read_write(cfg):
+            cfg.habitat.environment.profiler.enabled = True
+            cfg.habitat.environment.profiler.max_trace_events = 100
+    # The envs of a process don't share their profiler.
+    with habitat.config.read_write(configs[-1]):
+        configs[-1].habitat.environment.profiler.enabled = False
+
+    env_fn_args = tuple(zip(configs, datasets, range(num_envs)))
+    with getattr(habitat, vector_env_cls)(
+        make_env_fn=_make_dummy_env_func,
+        env_fn_args=env_fn_args,
+    ) as envs:
+        envs.reset()
+        for _ in range(5):
+            envs.step(
+                sample_non_stop_action_gym(envs.action_spaces[0], num_envs)
+            )
+
+        profiles = envs.call(["get_step_profile"] * num_envs)
+        assert profiles[-1] == {}
+        for profile in profiles[:-1]:
+            assert profile["env.step"]["count"] == 5
+            assert profile["task.step"]["count"] == 5
+            assert any(k.startswith("actions.") for k in profile)
+            assert any(k.startswith("measures.") for k in profile)
+            assert any(k.startswith("sensors.") for k in profile)
+
+        traces = envs.call(["get_step_profile_trace"] * num_envs)
+        assert len(merge_chrome_traces(traces)["traceEvents"]) > 0
+
+        envs.call(["reset_step_profile"] * num_envs)
+        assert envs.call(["get_step_profile"] * num_envs) == [{}] * num_envs
+
+
 def test_close_with_paused():
     configs, _ = _load_test_data()
     env_fn_args = tuple((c,) for c in configs)
@@ -14,6 +14,7 @@ from habitat.config import read_write
 from habitat.config.default import get_agent_config, get_config
 from habitat.sims import make_sim
 from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.sims.habitat_simulator.geodesic_cache import GeodesicDistanceCache
 
 
 def init_sim():
@@ -126,3 +127,75 @@ def test_sim_geodesic_distance():
                     ]
                 ),
             ), "Geodesic distance for multi target setup isn't equal to separate single target calls."
+
+
+def test_sim_geodesic_distance_cache(tmp_path):
+    config = get_config("benchmark/nav/pointnav/pointnav_habitat_test.yaml")
+    if not os.path.exists(config.habitat.simulator.scene):
+        pytest.skip("Please download Habitat test data to data folder.")
+    with read_write(config):
+        config.habitat.simulator.geodesic_cache.enabled = True
+        config.habitat.simulator.geodesic_cache.path = str(
+            tmp_path / "geodesic_cache.bin"
+        )
+    with make_sim(
+        config.habitat.simulator.type, config=config.habitat.simulator
+    ) as sim:
+        sim.reset()
+
+        with open(
+            os.path.join(
+                os.path.dirname(__file__),
+                "data",
+                "test-sim-geodesic-distance-test-golden.json",
+            ),
+            "r",
+        ) as f:
+            test_data = json.load(f)
+
+        for _ in range(2):
+            for test_case in test_data["multi_end"]:
+                assert np.isclose(
+                    sim.geodesic_distance(
+                        test_case["start"], test_case["ends"]
+                    ),
+                    test_case["expected"],
+                )
+
+        num_cases = len(test_data["multi_end"])
+        assert sim.geodesic_cache.misses == num_cases
+        assert sim.geodesic_cache.hits == num_cases
+
+
+def test_geodesic_distance_cache(tmp_path):
+    path = str(tmp_path / "geodesic_cache.bin")
+    cache = GeodesicDistanceCache(capacity=4, ways=2, path=path)
+    goals = [[1.0, 0.0, 1.0], [2.0, 0.0, 2.0]]
+
+    key = cache.key(7, [0.001, 0.0, 0.002], goals)
+    assert cache.key(7, [0.002, 0.0, 0.003], goals) == key
+    assert cache.key(8, [0.001, 0.0, 0.002], goals) != key
+    assert cache.key(7, [0.5, 0.0, 0.002], goals) != key
+    assert cache.key(7, [0.001, 0.0, 0.002], goals[:1]) != key
+
+    assert cache.get(key) is None
+    cache.put(key, 3.5)
+    assert cache.get(key) == 3.5
+    cache.put(key, np.inf)
+    assert cache.get(key) == np.inf
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # Distances are visible from another cache opened on the same file
+    other = GeodesicDistanceCache(capacity=4, ways=2, path=path)
+    assert other.get(key) == np.inf
+    with pytest.raises(ValueError):
+        GeodesicDistanceCache(capacity=8, ways=2, path=path)
+
+    # Filling the set of the key evicts the least recently used entry
+    same_set = [k for k in range(2, 100) if k % 2 == key % 2][:2]
+    cache.put(same_set[0], 1.0)
+    cache.get(key)
+    cache.put(same_set[1], 2.0)
+    assert cache.get(key) == np.inf
+    assert cache.get(same_set[0]) is None
+    assert cache.get(same_set[1]) == 2.0
@@ -11,6 +11,8 @@ import pytest
 
 import habitat
 from habitat.config.default_structured_configs import TeleportActionConfig
+from habitat.core.embodied_task import Measure, Measurements
+from habitat.core.environments import RLTaskEnv
 from habitat.utils.test_utils import sample_non_stop_action
 
 CFG_TEST = "test/config/habitat/habitat_all_sensors_test.yaml"
@@ -100,3 +102,172 @@ def test_task_actions_sampling(config_file):
             env.step(action)
             agent_state = env.sim.get_agent_state()
             habitat.logger.info(agent_state)
+
+
+class _CountingMeasure(Measure):
+    def __init__(self, uuid, dependencies=()):
+        self._uuid = uuid
+        self._dependencies = list(dependencies)
+        super().__init__()
+
+    def _get_uuid(self, *args, **kwargs):
+        return self._uuid
+
+    def reset_metric(self, *args, task, **kwargs):
+        task.measurements.check_measure_dependencies(
+            self.uuid, self._dependencies
+        )
+        self._metric = 0
+
+    def update_metric(self, *args, **kwargs):
+        self._metric += 1
+
+
+class _DummyTask:
+    def add_perf_timing(self, *args, **kwargs):
+        pass
+
+
+def test_measurements_update_modes():
+    measurements = Measurements(
+        [
+            _CountingMeasure("reward_dep"),
+            _CountingMeasure("reward", ["reward_dep"]),
+            _CountingMeasure("lazy"),
+            _CountingMeasure("periodic"),
+            _CountingMeasure("step_dep"),
+            _CountingMeasure("step", ["step_dep"]),
+        ]
+    )
+    measurements.set_update_mode("reward_dep", "lazy")
+    measurements.set_update_mode("reward", "lazy")
+    measurements.set_update_mode("lazy", "lazy")
+    measurements.set_update_mode("periodic", "periodic", 3)
+    measurements.set_update_mode("step_dep", "periodic", 10)
+    measurements.set_required_measures(["reward"])
+
+    task = _DummyTask()
+    task.measurements = measurements
+    measurements.reset_measures(task=task)
+    for _ in range(7):
+        measurements.update_measures(task=task)
+
+    def metric(name):
+        return measurements.measures[name].get_metric()
+
+    # Reachable from the required and the per-step measures
+    assert metric("reward_dep") == metric("reward") == 7
+    assert metric("step_dep") == metric("step") == 7
+    assert metric("periodic") == 2
+    # Only updated when the metrics are read
+    assert metric("lazy") == 0
+    metrics = measurements.get_metrics()
+    assert metrics["lazy"] == 1
+    assert measurements.get_metrics()["lazy"] == 1
+    measurements.update_measures(task=task)
+    assert measurements.get_metrics()["lazy"] == 2
+
+
+class _AccumulatingMeasure(_CountingMeasure):
+    accumulates_over_steps = True
+
+
+def test_measurements_accumulating_measure_not_lazy():
+    measurements = Measurements([_AccumulatingMeasure("accumulating")])
+    with pytest.raises(AssertionError):
+        measurements.set_update_mode("accumulating", "lazy")
+    measurements.set_update_mode("accumulating", "periodic", 2)
+
+
+def test_measurements_get_metric():
+    measurements = Measurements(
+        [
+            _CountingMeasure("lazy_dep"),
+            _CountingMeasure("lazy", ["lazy_dep"]),
+            _CountingMeasure("other_lazy"),
+        ]
+    )
+    for name in measurements.measures:
+        measurements.set_update_mode(name, "lazy")
+
+    task = _DummyTask()
+    task.measurements = measurements
+    measurements.reset_measures(task=task)
+    measurements.update_measures(task=task)
+
+    def metric(name):
+        return measurements.measures[name].get_metric()
+
+    # Only the measure and its dependencies are updated
+    assert measurements.get_metric("lazy") == 1
+    assert metric("lazy_dep") == 1
+    assert metric("other_lazy") == 0
+    assert measurements.get_metrics(update_lazy=False)["other_lazy"] == 0
+    assert measurements.get_metrics()["other_lazy"] == 1
+    assert metric("lazy") == metric("lazy_dep") == 1
+
+
+class _MeasurementsEnv:
+    def __init__(self, measurements):
+        self.measurements = measurements
+        self.episode_over = False
+
+    def get_metrics(self, update_lazy=True):
+        return self.measurements.get_metrics(update_lazy=update_lazy)
+
+    def get_metric(self, measure_name):
+        return self.measurements.get_metric(measure_name)
+
+
+def test_rl_task_env_lazy_measures():
+    measurements = Measurements(
+        [
+            _CountingMeasure("reward"),
+            _CountingMeasure("success"),
+            _CountingMeasure("lazy"),
+        ]
+    )
+    measurements.set_update_mode("lazy", "lazy")
+    measurements.set_required_measures(["reward", "success"])
+    task = _DummyTask()
+    task.measurements = measurements
+    measurements.reset_measures(task=task)
+
+    env = RLTaskEnv.__new__(RLTaskEnv)
+    env._env = _MeasurementsEnv(measurements)
+    env._reward_measure_name = "reward"
+    env._success_measure_name = "success"
+    env._slack_reward = 0.0
+    env._success_reward = 0.0
+    env._end_on_success = False
+
+    # The reward, success and info of the steps before the last step of the
+    # episode don't update the lazy measures.
+    for step in range(1, 4):
+        measurements.update_measures(task=task)
+        assert env.get_reward(None) == step
+        assert not env.get_done(None)
+        assert env.get_info(None)["lazy"] == 0
+
+    env._env.episode_over = True
+    assert env.get_info(None)["lazy"] == 1
+
+    # step checks if the episode is done once.
+    num_get_done = 0
+
+    def get_done(observations):
+        nonlocal num_get_done
+        num_get_done += 1
+        return RLTaskEnv.get_done(env, observations)
+
+    env.get_done = get_done
+    env._env.step = lambda *args, **kwargs: measurements.update_measures(
+        task=task
+    )
+    _, _, done, info = env.step(action=0)
+    assert done and info["lazy"] == 2
+    assert num_get_done == 1
+
+    # step goes through get_info, which subclasses can override.
+    env.get_info = lambda observations, done=None: {"done": done}
+    assert env.step(action=0)[3] == {"done": True}
@@ -441,3 +441,40 @@ def test_humanoid_seqpose_controller(humanoid_name):
                 "test_humanoid_wrapper",
                 open_vid=True,
             )
+
+
+@pytest.mark.skipif(
+    not osp.exists(
+        "data/humanoids/humanoid_data/female_2/female_2_motion_data_smplx.pkl"
+    ),
+    reason="Test requires motion files.",
+)
+def test_humanoid_controller_reach_poses():
+    """Test the batched reach poses match the single reach pose"""
+    walk_pose_path = (
+        "data/humanoids/humanoid_data/female_2/female_2_motion_data_smplx.pkl"
+    )
+    humanoid_controller = HumanoidRearrangeController(walk_pose_path)
+    if humanoid_controller.hand_processed_data["left_hand"] is None:
+        pytest.skip("The motion file has no reach poses.")
+    humanoid_controller.reset(
+        mn.Matrix4.translation(mn.Vector3(1.0, 0.0, -2.0))
+    )
+
+    rng = np.random.default_rng(0)
+    obj_positions = np.array(
+        humanoid_controller.obj_transform_base.translation
+    ) + rng.uniform(-1.0, 1.0, size=(16, 3))
+    joints, transforms = humanoid_controller.calculate_reach_poses(
+        obj_positions
+    )
+    assert joints.shape == (16, len(humanoid_controller.stop_pose.joints))
+    for obj_pos, pose_joints, transform in zip(
+        obj_positions, joints, transforms
+    ):
+        humanoid_controller.calculate_reach_pose(mn.Vector3(obj_pos))
+        assert np.allclose(humanoid_controller.joint_pose, pose_joints)
+        assert np.allclose(
+            np.array(humanoid_controller.obj_transform_offset),
+            np.array(transform),
+        )
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+import pytest
+
+habitat_baselines = pytest.importorskip("habitat_baselines")
+
+from habitat_baselines.utils.info_dict import (
+    ScalarInfoSchema,
+    extract_scalars_from_info,
+    extract_scalars_from_infos,
+)
+
+
+def _make_info(i):
+    return {
+        "distance_to_goal": float(i),
+        "success": np.float32(i % 2),
+        "spl": np.array([0.5 * i]),
+        "top_down_map": {"map": np.zeros((4, 4))},
+        "collisions": {"count": i, "is_collision": True},
+        "scene": "apartment_1",
+        "pose": np.zeros(3),
+        "rank0_measure": 3.0,
+        1: 2.0,
+    }
+
+
+def test_scalar_info_schema():
+    infos = [_make_info(i) for i in range(4)]
+    schema = ScalarInfoSchema.from_infos(infos, ignore_keys={"rank0_measure"})
+
+    expected = extract_scalars_from_infos(infos, ignore_keys={"rank0_measure"})
+    assert schema.keys == list(expected.keys())
+    assert schema.matches(infos)
+    values, present = schema.extract(infos)
+    assert values.shape == (len(infos), len(schema))
+    assert present.all()
+    for j, k in enumerate(schema.keys):
+        assert np.allclose(values[:, j], expected[k])
+
+    # Metrics missing from an info are 0 and not present.
+    del infos[1]["collisions"]["count"]
+    assert schema.matches(infos)
+    values, present = schema.extract(infos)
+    col = schema.keys.index("collisions.count")
+    assert values[1, col] == 0 and not present[1, col]
+    assert values[2, col] == 2 and present[2, col]
+    assert present.sum() == present.size - 1
+
+    # New nested keys are detected, as the success of a new stage.
+    infos = [_make_info(i) for i in range(4)]
+    infos[2]["collisions"]["stage_1_success"] = 1.0
+    assert not schema.matches(infos)
+    new_schema = ScalarInfoSchema.from_infos(
+        infos, ignore_keys={"rank0_measure"}, prev_schema=schema
+    )
+    assert new_schema.keys[-1] == "collisions.stage_1_success"
+    assert new_schema.matches(infos)
+    values, present = new_schema.extract(infos)
+    assert present[:, -1].tolist() == [False, False, True, False]
+    assert values[2, -1] == 1.0
+
+    # New top level keys are detected, and the previous columns kept first.
+    infos = [dict(_make_info(i), new_measure={"a": i}) for i in range(4)]
+    assert not schema.matches(infos)
+    new_schema = ScalarInfoSchema.from_infos(
+        infos, ignore_keys={"rank0_measure"}, prev_schema=schema
+    )
+    assert new_schema.keys[: len(schema)] == schema.keys
+    assert new_schema.keys[len(schema) :] == ["new_measure.a"]
+    assert np.allclose(
+        new_schema.extract(infos)[0][:, -1],
+        [extract_scalars_from_info(info)["new_measure.a"] for info in infos],
+    )
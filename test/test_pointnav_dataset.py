@@ -7,6 +7,7 @@
 import os
 import random
 import time
+from types import SimpleNamespace
 
 import numpy as np
 import pytest
@@ -14,6 +15,7 @@ import pytest
 import habitat
 from habitat.config.default import get_config
 from habitat.core.embodied_task import Episode
+from habitat.core.episode_store import LazyEpisodeSequence
 from habitat.core.logging import logger
 from habitat.datasets import make_dataset
 from habitat.datasets.pointnav import pointnav_generator as pointnav_generator
@@ -66,6 +68,41 @@ def test_single_pointnav_dataset():
     check_json_serialization(dataset)
 
 
+def test_compact_pointnav_dataset(tmp_path):
+    dataset_config = get_config(
+        "benchmark/nav/pointnav/pointnav_habitat_test.yaml"
+    ).habitat.dataset
+    if not PointNavDatasetV1.check_config_paths_exist(dataset_config):
+        pytest.skip("Test skipped as dataset files are missing.")
+    dataset = PointNavDatasetV1(config=dataset_config)
+
+    data_path = dataset_config.data_path.format(split=dataset_config.split)
+    compact_data_path = str(tmp_path / "data.episodes.bin")
+    PointNavDatasetV1.convert_to_compact(data_path, compact_data_path, False)
+    content_dir = os.path.join(os.path.dirname(data_path), "content")
+    os.makedirs(tmp_path / "content")
+    for fname in os.listdir(content_dir):
+        PointNavDatasetV1.convert_to_compact(
+            os.path.join(content_dir, fname),
+            str(
+                tmp_path
+                / "content"
+                / fname.replace(".json.gz", ".episodes.bin")
+            ),
+            True,
+        )
+
+    with habitat.config.read_write(dataset_config):
+        dataset_config.data_path = compact_data_path
+    compact_dataset = PointNavDatasetV1(config=dataset_config)
+    assert isinstance(compact_dataset.episodes, LazyEpisodeSequence)
+    assert compact_dataset.scene_ids == dataset.scene_ids
+    assert sorted(
+        compact_dataset.episodes, key=lambda ep: ep.episode_id
+    ) == sorted(dataset.episodes, key=lambda ep: ep.episode_id)
+    assert compact_dataset.to_json() == dataset.to_json()
+
+
 def test_multiple_files_scene_path():
     dataset_config = get_config(CFG_MULTI_TEST).habitat.dataset
     if not PointNavDatasetV1.check_config_paths_exist(dataset_config):
@@ -229,3 +266,119 @@ def test_pointnav_episode_generator():
         assert (
             dataset.to_json()
         ), "Generated episodes aren't json serializable."
+
+
+class _BoxNavSim:
+    r"""A simulator whose navigable area is two floors of a box, with a
+    geodesic distance proportional to the Euclidean distance.
+    """
+
+    def __init__(self, seed):
+        self._rng = np.random.default_rng(seed)
+        self.habitat_config = SimpleNamespace(scene="box.glb")
+        self.num_geodesic_queries = 0
+
+    def sample_navigable_point(self):
+        return [
+            float(self._rng.uniform(0, 40)),
+            float(self._rng.choice([0.0, 3.0])),
+            float(self._rng.uniform(0, 40)),
+        ]
+
+    def island_radius(self, position):
+        return 10.0
+
+    def geodesic_distance(self, position_a, position_b):
+        self.num_geodesic_queries += 1
+        return 1.3 * float(
+            np.linalg.norm(np.array(position_a) - np.array(position_b[0]))
+        )
+
+
+def test_pointnav_episode_generator_batched(tmp_path):
+    from habitat.datasets.pointnav.generate_pointnav_dataset import (
+        EpisodeShardWriter,
+    )
+
+    sim = _BoxNavSim(seed=0)
+    episodes = list(
+        pointnav_generator.generate_pointnav_episode_batched(
+            sim,
+            num_episodes=NUM_EPISODES,
+            is_gen_shortest_path=False,
+            closest_dist_limit=1,
+            furthest_dist_limit=10,
+            batch_size=4,
+        )
+    )
+    assert len(episodes) == NUM_EPISODES
+    assert [ep.episode_id for ep in episodes] == [
+        str(i) for i in range(NUM_EPISODES)
+    ]
+    for episode in episodes:
+        start = np.array(episode.start_position)
+        goal = np.array(episode.goals[0].position)
+        assert start[1] == goal[1]
+        assert 1 <= episode.info["geodesic_distance"] <= 10
+        assert np.linalg.norm(start - goal) <= 10 / 1.3 + 1e-5
+    # Most of the pairs are rejected before the geodesic distance query.
+    assert sim.num_geodesic_queries < 4 * NUM_EPISODES
+
+    path = str(tmp_path / "box.json.gz")
+    writer = EpisodeShardWriter(path)
+    for episode in episodes:
+        writer.write(episode)
+    assert not os.path.exists(path)
+    writer.close()
+
+    dataset = PointNavDatasetV1()
+    dataset._load_from_file(path, scenes_dir="")
+    assert [ep.episode_id for ep in dataset.episodes] == [
+        ep.episode_id for ep in episodes
+    ]
+    assert np.allclose(
+        dataset.episodes[-1].start_position, episodes[-1].start_position
+    )
+
+
+def test_pointnav_dataset_scene_shards(tmp_path):
+    from habitat.datasets.pointnav.generate_pointnav_dataset import (
+        EpisodeShardWriter,
+        content_paths,
+    )
+
+    sim = _BoxNavSim(seed=0)
+    episodes = list(
+        pointnav_generator.generate_pointnav_episode_batched(
+            sim,
+            num_episodes=NUM_EPISODES,
+            is_gen_shortest_path=False,
+            closest_dist_limit=1,
+            furthest_dist_limit=10,
+        )
+    )
+    os.makedirs(tmp_path / "content")
+    shard_paths = content_paths(str(tmp_path), "box", NUM_EPISODES, 4)
+    assert len(shard_paths) == 3
+    for shard, path in enumerate(shard_paths):
+        writer = EpisodeShardWriter(path)
+        for episode in episodes[4 * shard : 4 * (shard + 1)]:
+            writer.write(episode)
+        writer.close()
+    writer = EpisodeShardWriter(str(tmp_path / "train.json.gz"))
+    writer.close()
+
+    for content_scenes in (["box"], ["*"]):
+        config = SimpleNamespace(
+            data_path=str(tmp_path / "{split}.json.gz"),
+            split="train",
+            scenes_dir="",
+            content_scenes=content_scenes,
+        )
+        dataset = PointNavDatasetV1(config)
+        assert [ep.episode_id for ep in dataset.episodes] == [
+            ep.episode_id for ep in episodes
+        ]
+    assert PointNavDatasetV1._get_scenes_from_folder(
+        PointNavDatasetV1.content_scenes_path, str(tmp_path)
+    ) == ["box"]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import numpy as np
+import pytest
+
+from habitat.tasks.rearrange.rearrange_sim_state import (
+    SimStateDelta,
+    SimStateSnapshot,
+)
+
+
+def _random_snapshot(rng, num_objs=5, with_js=True):
+    art_pos, art_pos_offsets = SimStateSnapshot.pack_ragged(
+        [rng.normal(size=n) for n in [3, 0, 2]]
+    )
+    if with_js:
+        js, js_offsets = SimStateSnapshot.pack_ragged(
+            [rng.normal(size=7), rng.normal(size=4)]
+        )
+    else:
+        js, js_offsets = None, None
+    return SimStateSnapshot(
+        articulated_agent_T=rng.normal(size=(2, 4, 4)).astype(np.float32),
+        art_T=rng.normal(size=(3, 4, 4)).astype(np.float32),
+        art_pos=art_pos,
+        art_pos_offsets=art_pos_offsets,
+        rigid_ids=np.arange(10, 10 + num_objs, dtype=np.int64),
+        rigid_T=rng.normal(size=(num_objs, 4, 4)).astype(np.float32),
+        rigid_V=rng.normal(size=(num_objs, 2, 3)).astype(np.float32),
+        obj_hold=np.array([12, -1], dtype=np.int64),
+        articulated_agent_js=js,
+        articulated_agent_js_offsets=js_offsets,
+    )
+
+
+@pytest.mark.parametrize("with_js", [True, False])
+def test_sim_state_snapshot_bytes(with_js):
+    rng = np.random.default_rng(0)
+    snapshot = _random_snapshot(rng, with_js=with_js)
+
+    data = snapshot.to_bytes()
+    restored = SimStateSnapshot.from_bytes(data)
+    assert restored == snapshot
+    assert (restored.articulated_agent_js is None) == (not with_js)
+    assert len(data) < snapshot.nbytes + 1024
+
+    art_pos = SimStateSnapshot.unpack_ragged(
+        restored.art_pos, restored.art_pos_offsets
+    )
+    assert [len(p) for p in art_pos] == [3, 0, 2]
+
+    with pytest.raises(ValueError):
+        SimStateDelta.from_bytes(data)
+
+
+def test_sim_state_snapshot_delta():
+    rng = np.random.default_rng(0)
+    base = _random_snapshot(rng)
+
+    state = base.copy()
+    state.rigid_T[3, :3, 3] += 1.0
+    state.rigid_V[3] = 0.0
+    state.art_pos[1] = 0.5
+    state.obj_hold[0] = -1
+
+    delta = state.delta_from(base)
+    assert set(delta.changed.keys()) == {
+        "rigid_T",
+        "rigid_V",
+        "art_pos",
+        "obj_hold",
+    }
+    assert delta.changed["rigid_T"][0].tolist() == [3]
+    assert delta.num_changed == 4
+    assert base.apply_delta(delta) == state
+    # The base is unchanged
+    assert base.apply_delta(SimStateDelta({})) == base
+    assert base != state
+
+    delta = SimStateDelta.from_bytes(delta.to_bytes())
+    assert base.apply_delta(delta) == state
+    assert len(delta.to_bytes()) < len(state.to_bytes())
+
+    with pytest.raises(ValueError):
+        _random_snapshot(rng, num_objs=6).delta_from(base)
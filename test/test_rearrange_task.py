@@ -27,7 +27,17 @@ from habitat.config.default import get_config
 from habitat.core.embodied_task import Episode
 from habitat.core.environments import get_env_class
 from habitat.core.logging import logger
+from habitat.datasets.rearrange.parallel_episode_generator import (
+    check_plan,
+    plan_chunks,
+)
 from habitat.datasets.rearrange.rearrange_dataset import RearrangeDatasetV0
+from habitat.datasets.rearrange.samplers.scene_sampler import (
+    BalancedSceneSampler,
+    MultiSceneSampler,
+    SingleSceneSampler,
+)
+from habitat.tasks.rearrange.rearrange_sim_state import SimStateSnapshot
 from habitat.utils.geometry_utils import is_point_in_triangle
 
 CFG_TEST = "benchmark/rearrange/skills/pick.yaml"
@@ -177,6 +187,107 @@ def test_pddl_action_postconds():
     sim_info.sim.close()
 
 
+def test_pddl_predicates_index():
+    """
+    Checks the incremental predicate index matches evaluating every grounded
+    predicate as the simulator state changes.
+    """
+
+    pddl = _get_test_pddl()
+    sim_info = pddl.sim_info
+    index = pddl.get_predicates_index()
+
+    def check_index():
+        truth = index.update(sim_info)
+        assert truth.shape == (len(index),)
+        expected = [pred.is_true(sim_info) for pred in index.predicates]
+        assert truth.tolist() == expected
+        assert [x.compact_str for x in pddl.get_true_predicates()] == [
+            pred.compact_str
+            for pred, is_true in zip(index.predicates, expected)
+            if is_true
+        ]
+
+    check_index()
+    poss_actions = pddl.get_possible_actions()
+    ac_strs = [x.compact_str for x in poss_actions]
+    for ac_str in [
+        "nav(goal0|0,robot_0)",
+        "pick(goal0|0,robot_0)",
+        "nav(TARGET_goal0|0,robot_0)",
+        "place(goal0|0,TARGET_goal0|0,robot_0)",
+    ]:
+        assert poss_actions[ac_strs.index(ac_str)].apply_if_true(sim_info)
+        check_index()
+
+    held_idx = index.index_of("holding", ["goal0|0", "robot_0"])
+    assert not index.update(sim_info)[held_idx]
+    sim_info.sim.close()
+
+
+def test_rearrange_sim_state_snapshot():
+    """
+    Checks restoring a state snapshot matches restoring the state dict.
+    """
+
+    pddl = _get_test_pddl()
+    sim = pddl.sim_info.sim
+
+    state = sim.capture_state(with_articulated_agent_js=True)
+    snapshot = sim.capture_state_snapshot(with_articulated_agent_js=True)
+    assert len(snapshot.rigid_T) == len(state["rigid_T"])
+    for T, snapshot_T in zip(state["rigid_T"], snapshot.rigid_T):
+        assert np.array_equal(np.array(T, dtype=np.float32), snapshot_T)
+
+    # Move the objects and restore the snapshot.
+    for action in pddl.get_possible_actions():
+        action.apply_if_true(pddl.sim_info)
+    moved = sim.capture_state_snapshot(with_articulated_agent_js=True)
+    assert moved != snapshot
+
+    sim.set_state_snapshot(SimStateSnapshot.from_bytes(snapshot.to_bytes()))
+    restored = sim.capture_state_snapshot(with_articulated_agent_js=True)
+    for name in ["articulated_agent_T", "art_T", "art_pos", "rigid_T"]:
+        assert np.array_equal(getattr(restored, name), getattr(snapshot, name))
+
+    sim.set_state_snapshot(snapshot.apply_delta(moved.delta_from(snapshot)))
+    assert np.array_equal(sim.capture_state_snapshot().rigid_T, moved.rigid_T)
+    sim.close()
+
+
+def test_rearrange_scene_pool():
+    """
+    Checks switching back to a pooled scene restores the same scene state.
+    """
+
+    config = get_config(
+        "habitat-lab/habitat/config/benchmark/rearrange/skills/pick.yaml",
+        [
+            # Concurrent rendering can cause problems on CI.
+            "habitat.simulator.concur_render=False",
+            "habitat.dataset.split=val",
+            "habitat.simulator.scene_pool.enabled=True",
+        ],
+    )
+    with habitat.Env(config=config) as env:
+        env.reset()
+        sim = env.sim
+        pool = sim.scene_pool
+        assert len(pool) == 1 and pool.misses == 1 and pool.hits == 0
+        assert pool.nbytes > 0
+        island_idx = sim.largest_island_idx
+        navigable_area = sim.pathfinder.navigable_area
+        recep_names = sorted(sim.receptacles.keys())
+
+        # Switch to the same scene as if coming from another scene.
+        sim.prev_scene_id = None
+        env.reset()
+        assert pool.hits == 1 and len(pool) == 1
+        assert sim.largest_island_idx == island_idx
+        assert np.isclose(sim.pathfinder.navigable_area, navigable_area)
+        assert sorted(sim.receptacles.keys()) == recep_names
+
+
 TEST_CFG_PATHS = list(
     glob(
         "habitat-lab/habitat/config/benchmark/rearrange/**/*.yaml",
@@ -272,6 +383,56 @@ def test_rearrange_episode_generator(
     )
 
 
+def test_rearrange_episode_generator_chunks(tmp_path):
+    scenes = [f"scene_{i}.scene_instance.json" for i in range(4)]
+
+    split = MultiSceneSampler(scenes).split_episodes(50, random.Random(3))
+    assert sum(split.values()) == 50
+    assert set(split.keys()) <= set(scenes)
+    assert split == MultiSceneSampler(scenes[::-1]).split_episodes(
+        50, random.Random(3)
+    )
+    assert BalancedSceneSampler(scenes, 20).split_episodes(
+        20, random.Random(3)
+    ) == {scene: 5 for scene in scenes}
+    assert SingleSceneSampler(scenes[0]).split_episodes(
+        7, random.Random(3)
+    ) == {scenes[0]: 7}
+
+    chunks = plan_chunks(split, str(tmp_path), chunk_size=4, seed=1)
+    assert [c.scene for c in chunks] == sorted(c.scene for c in chunks)
+    assert all(0 < c.num_episodes <= 4 for c in chunks)
+    for scene, num_episodes in split.items():
+        assert (
+            sum(c.num_episodes for c in chunks if c.scene == scene)
+            == num_episodes
+        )
+    # The chunks cover the episode ids once, in order.
+    episode_ids = [
+        c.first_episode_id + i for c in chunks for i in range(c.num_episodes)
+    ]
+    assert episode_ids == list(range(50))
+    assert len({c.path for c in chunks}) == len(chunks)
+    assert len({c.seed for c in chunks}) == len(chunks)
+    assert chunks == plan_chunks(split, str(tmp_path), chunk_size=4, seed=1)
+
+    # Resuming checks the chunks were planned with the same arguments.
+    plan = {"seed": 1, "chunks": [c._asdict() for c in chunks]}
+    check_plan(str(tmp_path), plan)
+    check_plan(str(tmp_path), plan)
+    other_chunks = plan_chunks(split, str(tmp_path), chunk_size=5, seed=1)
+    with pytest.raises(ValueError):
+        check_plan(
+            str(tmp_path),
+            {"seed": 1, "chunks": [c._asdict() for c in other_chunks]},
+        )
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    (other_dir / osp.basename(chunks[0].path)).touch()
+    with pytest.raises(ValueError):
+        check_plan(str(other_dir), plan)
+
+
 @pytest.mark.skipif(
     not osp.exists("data/test_assets/"),
     reason="This test requires habitat-sim test assets.",
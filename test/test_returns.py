@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+habitat_baselines = pytest.importorskip("habitat_baselines")
+
+import gym
+
+from habitat_baselines.common.returns import (
+    RETURNS_METHODS,
+    reverse_discounted_cumsum,
+)
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.rl.models.rnn_state_encoder import (
+    _np_invert_permutation,
+)
+from habitat_baselines.rl.ver.ver_rollout_storage import VERRolloutStorage
+
+GAMMA, TAU = 0.99, 0.95
+
+
+def _make_storage(storage_cls, num_steps, num_envs, method, **kwargs):
+    return storage_cls(
+        numsteps=num_steps,
+        num_envs=num_envs,
+        observation_space=gym.spaces.Dict(
+            {"x": gym.spaces.Box(low=0.0, high=1.0, shape=(1,))}
+        ),
+        action_space=gym.spaces.Discrete(2),
+        actor_critic=SimpleNamespace(
+            num_recurrent_layers=1, recurrent_hidden_size=4
+        ),
+        returns_method=method,
+        **kwargs,
+    )
+
+
+def _fill_rollout(storage, num_steps, num_envs, seed):
+    rng = torch.Generator().manual_seed(seed)
+    storage.buffers["rewards"].copy_(
+        torch.randn(num_steps + 1, num_envs, 1, generator=rng)
+    )
+    storage.buffers["value_preds"].copy_(
+        torch.randn(num_steps + 1, num_envs, 1, generator=rng)
+    )
+    storage.buffers["masks"].copy_(
+        torch.rand(num_steps + 1, num_envs, 1, generator=rng) > 0.1
+    )
+
+
+def _loop_returns(buffers, num_steps, next_value, use_gae):
+    """The per step loop `RolloutStorage.compute_returns` used to run."""
+    rewards, masks = buffers["rewards"], buffers["masks"]
+    value_preds = buffers["value_preds"].clone()
+    returns = torch.zeros_like(rewards)
+    if use_gae:
+        value_preds[num_steps] = next_value
+        gae = 0.0
+        for step in reversed(range(num_steps)):
+            delta = (
+                rewards[step]
+                + GAMMA * value_preds[step + 1] * masks[step + 1]
+                - value_preds[step]
+            )
+            gae = delta + GAMMA * TAU * gae * masks[step + 1]
+            returns[step] = gae + value_preds[step]
+    else:
+        returns[num_steps] = next_value
+        for step in reversed(range(num_steps)):
+            returns[step] = (
+                GAMMA * returns[step + 1] * masks[step + 1] + rewards[step]
+            )
+    return returns[:num_steps]
+
+
+@pytest.mark.parametrize("method", RETURNS_METHODS)
+def test_reverse_discounted_cumsum(method):
+    rng = torch.Generator().manual_seed(0)
+    for num_steps in [0, 1, 2, 7, 64, 100]:
+        x = torch.randn(num_steps, 3, 1, generator=rng, dtype=torch.float64)
+        discounts = torch.rand(num_steps, 3, 1, generator=rng).double()
+        expected = torch.zeros_like(x)
+        acc = torch.zeros_like(x[0]) if num_steps > 0 else None
+        for t in reversed(range(num_steps)):
+            acc = x[t] + discounts[t] * acc
+            expected[t] = acc
+        assert torch.allclose(
+            reverse_discounted_cumsum(x, discounts, method), expected
+        )
+
+    with pytest.raises(ValueError):
+        reverse_discounted_cumsum(x, discounts, "unknown")
+
+
+@pytest.mark.parametrize("method", RETURNS_METHODS)
+@pytest.mark.parametrize("use_gae", [True, False])
+@pytest.mark.parametrize("num_steps", [1, 16, 128])
+def test_rollout_storage_returns(method, use_gae, num_steps):
+    num_envs = 8
+    storage = _make_storage(RolloutStorage, num_steps, num_envs, method)
+    _fill_rollout(storage, num_steps, num_envs, seed=num_steps)
+    storage.current_rollout_step_idxs[0] = num_steps
+    next_value = torch.randn(num_envs, 1)
+
+    expected = _loop_returns(storage.buffers, num_steps, next_value, use_gae)
+    storage.compute_returns(next_value, use_gae, GAMMA, TAU)
+    assert torch.allclose(
+        storage.buffers["returns"][:num_steps], expected, atol=1e-5
+    )
+    if method != "scan":
+        # The loops sum the terms in the same order.
+        assert torch.equal(storage.buffers["returns"][:num_steps], expected)
+
+
+def _ver_loop_returns(storage, rewards_t, values_t, returns_t, not_stale_t):
+    """The per step loop `VERRolloutStorage.compute_returns` used to run."""
+    rewards, values, is_not_stale = map(
+        lambda t: t.view(-1, 1).numpy()[storage.select_inds],
+        (rewards_t, values_t, not_stale_t),
+    )
+    returns = returns_t.view(-1, 1).numpy().copy()[storage.select_inds]
+
+    gae = np.zeros((storage.num_seqs_at_step[0], 1))
+    last_values = gae.copy()
+    ptr = returns.size
+    for len_minus_1, n_seqs in reversed(
+        list(enumerate(storage.num_seqs_at_step))
+    ):
+        curr_slice = slice(ptr - n_seqs, ptr)
+        q_est = rewards[curr_slice] + GAMMA * last_values[:n_seqs]
+        delta = q_est - values[curr_slice]
+        gae[:n_seqs] = delta + (TAU * GAMMA) * gae[:n_seqs]
+        is_last_step_for_env = (
+            storage.sequence_lengths == (len_minus_1 + 1)
+        ) & storage.last_sequence_in_batch_mask
+        gae[is_last_step_for_env] = 0.0
+        use_new_value = is_not_stale[curr_slice] | np.logical_not(
+            np.isfinite(returns[curr_slice])
+        )
+        returns[curr_slice][use_new_value] = (
+            gae[:n_seqs] + values[curr_slice]
+        )[use_new_value]
+        returns[curr_slice][is_last_step_for_env[:n_seqs]] = float("nan")
+        last_values[:n_seqs] = values[curr_slice]
+        ptr -= n_seqs
+
+    return returns[_np_invert_permutation(storage.select_inds)]
+
+
+@pytest.mark.parametrize("method", RETURNS_METHODS)
+def test_ver_rollout_storage_returns(method):
+    num_steps, num_envs = 32, 6
+    storage = _make_storage(
+        VERRolloutStorage,
+        num_steps,
+        num_envs,
+        method,
+        variable_experience=False,
+    )
+    _fill_rollout(storage, num_steps, num_envs, seed=1)
+    # Each environment starts a new episode where its mask is False.
+    dones = torch.logical_not(storage.buffers["masks"][..., 0])
+    storage.buffers["episode_ids"][..., 0] = torch.cumsum(dones.long(), 0)
+    storage.buffers["environment_ids"][..., 0] = torch.arange(num_envs)
+    storage.buffers["step_ids"][..., 0] = torch.arange(num_steps + 1)[:, None]
+    storage.buffers["is_stale"].fill_(False)
+    storage.buffers["returns"].fill_(float("nan"))
+
+    inputs = [
+        storage.buffers[k].clone()
+        for k in ["rewards", "value_preds", "returns"]
+    ] + [torch.logical_not(storage.buffers["is_stale"])]
+    storage.compute_returns(True, GAMMA, TAU)
+    expected = _ver_loop_returns(storage, *inputs)
+
+    returns = storage.buffers["returns"].view(-1, 1).numpy()
+    assert np.array_equal(np.isnan(returns), np.isnan(expected))
+    assert np.allclose(returns, expected, atol=1e-5, equal_nan=True)
@@ -4,6 +4,7 @@
 # This source code is licensed under the MIT license found in the
 # LICENSE file in the root directory of this source tree.
 
+import numpy as np
 import pytest
 
 torch = pytest.importorskip("torch")
@@ -92,3 +93,64 @@ def test_rnn_state_encoder():
                 assert (
                     torch.linalg.norm(reference_hiddens - out_hiddens) < 0.001
                 ), "Failed on (T={}, N={})".format(T, N)
+
+
+def test_pack_info_cache():
+    dones = np.random.rand(16, 4) < 0.2
+    pack_info = build_pack_info_from_dones(dones)
+    # The same layout gives the same plan, and the same tensors.
+    assert build_pack_info_from_dones(dones.copy()) is pack_info
+    seq_info = build_rnn_build_seq_info(torch.device("cpu"), pack_info)
+    assert build_rnn_build_seq_info(torch.device("cpu"), pack_info) is seq_info
+
+    other_dones = dones.copy()
+    other_dones[3, 1] = not other_dones[3, 1]
+    other_pack_info = build_pack_info_from_dones(other_dones)
+    assert other_pack_info is not pack_info
+
+    # A plan that isn't memoized is converted every time.
+    copied_pack_info = dict(pack_info)
+    assert (
+        build_rnn_build_seq_info(torch.device("cpu"), copied_pack_info)
+        is not seq_info
+    )
+
+
+@pytest.mark.parametrize("rnn_type", ["GRU", "LSTM"])
+def test_rnn_state_encoder_no_episode_boundaries(rnn_type):
+    rnn_state_encoder = build_rnn_state_encoder(
+        8, 8, rnn_type=rnn_type, num_layers=2
+    )
+    T, N = 12, 5
+    with torch.no_grad():
+        not_done_masks = torch.ones(T, N, 1, dtype=torch.bool)
+        # Episodes can start on the first step.
+        not_done_masks[0, 1] = False
+        pack_info = build_pack_info_from_dones(
+            torch.logical_not(not_done_masks).view(T, N).numpy()
+        )
+        assert bool(pack_info["no_episode_boundaries"])
+
+        inputs = torch.randn(T * N, 8)
+        hidden_states = torch.randn(
+            N, rnn_state_encoder.num_recurrent_layers, 8
+        )
+        outputs, out_hiddens = rnn_state_encoder(
+            inputs,
+            hidden_states,
+            not_done_masks.flatten(0, 1),
+            build_rnn_build_seq_info(torch.device("cpu"), pack_info),
+        )
+
+        packed_pack_info = {
+            k: v for k, v in pack_info.items() if k != "no_episode_boundaries"
+        }
+        packed_outputs, packed_hiddens = rnn_state_encoder(
+            inputs,
+            hidden_states,
+            not_done_masks.flatten(0, 1),
+            build_rnn_build_seq_info(torch.device("cpu"), packed_pack_info),
+        )
+
+    assert torch.allclose(outputs, packed_outputs, atol=1e-5)
+    assert torch.allclose(out_hiddens, packed_hiddens, atol=1e-5)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+habitat_baselines = pytest.importorskip("habitat_baselines")
+
+import gym
+
+from habitat_baselines.common.rollout_storage import RolloutStorage
+from habitat_baselines.common.tensor_dict import TensorDict
+
+
+def _make_storage(num_steps, num_envs, use_minibatch_views):
+    storage = RolloutStorage(
+        numsteps=num_steps,
+        num_envs=num_envs,
+        observation_space=gym.spaces.Dict(
+            {"rgb": gym.spaces.Box(low=0, high=255, shape=(4, 4, 3))}
+        ),
+        action_space=gym.spaces.Discrete(2),
+        actor_critic=SimpleNamespace(
+            num_recurrent_layers=1, recurrent_hidden_size=4
+        ),
+        use_minibatch_views=use_minibatch_views,
+    )
+    rng = torch.Generator().manual_seed(0)
+    storage.buffers.map_in_place(
+        lambda t: torch.randint(0, 2, t.size(), generator=rng).to(t.dtype)
+    )
+    storage.buffers["observations"]["rgb"].copy_(
+        torch.rand(
+            storage.buffers["observations"]["rgb"].size(), generator=rng
+        )
+    )
+    storage.current_rollout_step_idxs[0] = num_steps
+    return storage
+
+
+def _by_env(batches, num_steps):
+    """The flattened mini batches as a dict from the first observation of
+    each environment to its steps."""
+    by_env = {}
+    for batch in batches:
+        rgb = batch["observations"]["rgb"]
+        envs = rgb.view(num_steps, -1, *rgb.shape[1:])
+        for i in range(envs.size(1)):
+            by_env[envs[0, i].sum().item()] = (
+                envs[:, i],
+                batch["advantages"].view(num_steps, -1)[:, i],
+            )
+    return by_env
+
+
+@pytest.mark.parametrize("num_mini_batch", [1, 2, 3])
+def test_minibatch_views(num_mini_batch):
+    num_steps, num_envs = 8, 6
+    storage = _make_storage(num_steps, num_envs, use_minibatch_views=True)
+    reference = _make_storage(num_steps, num_envs, use_minibatch_views=False)
+    advantages = torch.randn(num_steps + 1, num_envs, 1)
+
+    epochs = [
+        list(storage.data_generator(advantages, num_mini_batch))
+        for _ in range(3)
+    ]
+    assert len(epochs[0]) == num_mini_batch
+
+    # Every epoch reuses the tensors gathered by the first one.
+    ptrs = [
+        sorted(b["observations"]["rgb"].data_ptr() for b in batches)
+        for batches in epochs
+    ]
+    assert ptrs[0] == ptrs[1] == ptrs[2]
+    for batch in epochs[0]:
+        assert batch["observations"]["rgb"].is_contiguous()
+        # Only the hidden states of the first step.
+        assert batch["recurrent_hidden_states"].size(0) * num_steps == batch[
+            "observations"
+        ]["rgb"].size(0)
+
+    # The mini batches hold the same data as the default generator.
+    expected = _by_env(
+        reference.data_generator(advantages, num_mini_batch), num_steps
+    )
+    actual = _by_env(epochs[0], num_steps)
+    assert expected.keys() == actual.keys()
+    for k, (rgb, adv) in expected.items():
+        assert torch.equal(actual[k][0], rgb)
+        assert torch.equal(actual[k][1], adv)
+
+    # A new update gathers new mini batches.
+    storage.after_update()
+    storage.current_rollout_step_idxs[0] = num_steps
+    new_batches = list(storage.data_generator(advantages, num_mini_batch))
+    assert all(
+        all(b is not nb for b in epochs[0])
+        and nb["observations"]["rgb"].data_ptr() not in ptrs[0]
+        for nb in new_batches
+    )
+
+    # So does computing the returns again.
+    new_ptrs = {b["observations"]["rgb"].data_ptr() for b in new_batches}
+    storage.compute_returns(torch.zeros(num_envs, 1), True, 0.99, 0.95)
+    assert all(
+        b["observations"]["rgb"].data_ptr() not in new_ptrs
+        for b in storage.data_generator(advantages, num_mini_batch)
+    )
+
+
+
+def test_insert_at_envs():
+    num_steps, num_envs = 3, 4
+    storage = _make_storage(num_steps, num_envs, use_minibatch_views=False)
+    reference = _make_storage(num_steps, num_envs, use_minibatch_views=False)
+    storage.current_rollout_step_idxs[0] = 0
+    reference.current_rollout_step_idxs[0] = 0
+
+    rng = torch.Generator().manual_seed(1)
+    steps = TensorDict.from_tree(
+        dict(
+            next_observations=dict(
+                rgb=torch.rand(num_steps, num_envs, 4, 4, 3, generator=rng)
+            ),
+            actions=torch.randint(
+                0, 2, (num_steps, num_envs, 1), generator=rng
+            ),
+            rewards=torch.rand(num_steps, num_envs, 1, generator=rng),
+            next_masks=torch.rand(num_steps, num_envs, 1, generator=rng) > 0.5,
+        )
+    )
+    for step in range(num_steps):
+        reference.insert(**steps[step])
+        reference.advance_rollout()
+
+    # The envs are done stepping in a different order at every step, and
+    # some envs get ahead of the others.
+    for env_order in ([0, 1], [0], [2, 3], [1, 3], [0, 2, 3], [1], [2]):
+        env_indices = torch.tensor(env_order)
+        step_idxs = storage.current_env_step_idxs[env_indices]
+        storage.insert_at_envs(env_indices, **steps[step_idxs, env_indices])
+        storage.advance_envs(env_indices)
+
+    storage.sync_env_steps()
+    assert storage.current_rollout_step_idx == num_steps
+    keys, leaves = storage.buffers.flatten()
+    ref_keys, ref_leaves = reference.buffers.flatten()
+    assert keys == ref_keys
+    for k, a, b in zip(keys, leaves, ref_leaves):
+        assert torch.equal(a, b), k
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+from habitat.tasks.rearrange.scene_pool import PooledScene, ScenePool
+
+
+class _FilePathFinder:
+    """Stands for a pathfinder that saves and loads navmesh files."""
+
+    def __init__(self, navmesh: bytes = b""):
+        self.navmesh = navmesh
+
+    def save_nav_mesh(self, path: str) -> bool:
+        with open(path, "wb") as f:
+            f.write(self.navmesh)
+        return True
+
+    def load_nav_mesh(self, path: str) -> bool:
+        with open(path, "rb") as f:
+            self.navmesh = f.read()
+        return True
+
+
+def _scene(scene_id: str, navmesh_size: int = 0) -> PooledScene:
+    scene = PooledScene(scene_id)
+    scene.save_navmesh(_FilePathFinder(b"\x01" * navmesh_size))
+    return scene
+
+
+def test_scene_pool_lru_eviction():
+    pool = ScenePool(max_bytes=1 << 30, max_scenes=2)
+    pool.put(_scene("a"))
+    pool.put(_scene("b"))
+    # "a" becomes the most recently used, so "b" is evicted.
+    assert pool.get("a") is not None
+    pool.put(_scene("c"))
+    assert "a" in pool and "b" not in pool and "c" in pool
+    assert pool.get("b") is None
+    assert (pool.hits, pool.misses, pool.evictions) == (1, 1, 1)
+
+    pool.clear()
+    assert len(pool) == 0 and pool.nbytes == 0
+
+
+def test_scene_pool_memory_budget():
+    navmesh_size = 100_000
+    entry_nbytes = _scene("a", navmesh_size).nbytes
+    assert entry_nbytes >= navmesh_size
+
+    pool = ScenePool(max_bytes=2 * entry_nbytes, max_scenes=8)
+    for scene_id in ["a", "b", "c"]:
+        pool.put(_scene(scene_id, navmesh_size))
+    assert len(pool) == 2 and "a" not in pool
+    assert pool.nbytes == 2 * entry_nbytes
+
+    # The most recently used scene is kept even if it is over budget.
+    pool.put(_scene("d", 3 * entry_nbytes))
+    assert len(pool) == 1 and "d" in pool
+
+
+def test_scene_pool_navmesh_roundtrip():
+    navmesh = bytes(range(256)) * 10
+    scene = _scene("a")
+    scene.save_navmesh(_FilePathFinder(navmesh))
+    assert scene.navmesh == navmesh
+
+    pathfinder = _FilePathFinder()
+    scene.load_navmesh(pathfinder)
+    assert pathfinder.navmesh == navmesh
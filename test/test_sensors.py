@@ -10,6 +10,7 @@ import random
 import numpy as np
 import pytest
 import quaternion
+from omegaconf import OmegaConf
 
 import habitat
 from habitat.config.default import get_agent_config, get_config
@@ -32,10 +33,17 @@ from habitat.config.default_structured_configs import (
     ProximitySensorConfig,
     SimulatorFisheyeDepthSensorConfig,
 )
+from habitat.core.registry import registry
+from habitat.core.simulator import AgentState
+from habitat.datasets.pointnav.pointnav_dataset import PointNavDatasetV1
+from habitat.gym.gym_definitions import make_gym_from_config
 from habitat.tasks.nav.nav import (
+    NAV_POSE_OBSERVATION_KEY,
+    BatchedNavSensors,
     MoveForwardAction,
     NavigationEpisode,
     NavigationGoal,
+    NavPoseBatch,
 )
 from habitat.utils.geometry_utils import quaternion_rotate_vector
 from habitat.utils.test_utils import sample_non_stop_action
@@ -600,3 +608,122 @@ def test_noise_models_rgbd():
         ) > 1.5e-2 * np.linalg.norm(
             no_noise_obs[0]["depth"].astype(np.float32)
         ), "No Depth noise detected."
+
+
+class _AgentStateSim:
+    def __init__(self):
+        self.agent_state = None
+
+    def get_agent_state(self):
+        return self.agent_state
+
+
+@pytest.mark.parametrize("goal_format", ["CARTESIAN", "POLAR"])
+@pytest.mark.parametrize("dimensionality", [2, 3])
+def test_batched_nav_sensors(goal_format, dimensionality):
+    task_config = OmegaConf.create(
+        {
+            "lab_sensors": {
+                "pointgoal_sensor": PointGoalSensorConfig(
+                    goal_format=goal_format, dimensionality=dimensionality
+                ),
+                "pointgoal_with_gps_compass_sensor": PointGoalWithGPSCompassSensorConfig(
+                    goal_format=goal_format, dimensionality=dimensionality
+                ),
+                "gps_sensor": GPSSensorConfig(dimensionality=dimensionality),
+                "compass_sensor": CompassSensorConfig(),
+                "heading_sensor": HeadingSensorConfig(),
+            }
+        }
+    )
+    batched_sensors = BatchedNavSensors(task_config)
+    sim = _AgentStateSim()
+    sensors = [
+        registry.get_sensor(sensor_cfg.type)(sim=sim, config=sensor_cfg)
+        for sensor_cfg in task_config.lab_sensors.values()
+    ]
+
+    rng = np.random.RandomState(0)
+    expected, observations = [], []
+    for _ in range(8):
+        episode = NavigationEpisode(
+            episode_id="0",
+            scene_id="",
+            start_position=rng.uniform(-5, 5, 3).tolist(),
+            start_rotation=quaternion.as_float_array(
+                quaternion.from_rotation_vector(rng.uniform(-np.pi, np.pi, 3))
+            )[[1, 2, 3, 0]].tolist(),
+            goals=[NavigationGoal(position=rng.uniform(-5, 5, 3).tolist())],
+        )
+        sim.agent_state = AgentState(
+            position=rng.uniform(-5, 5, 3),
+            rotation=quaternion.from_rotation_vector(
+                [0.0, rng.uniform(-np.pi, np.pi), 0.0]
+            ),
+        )
+        expected.append(
+            {
+                sensor.uuid: sensor.get_observation(
+                    observations=None, episode=episode
+                )
+                for sensor in sensors
+            }
+        )
+        observations.append(
+            {
+                NAV_POSE_OBSERVATION_KEY: NavPoseBatch.pose_vector(
+                    sim.agent_state, episode
+                )
+            }
+        )
+
+    observations = batched_sensors.post_step(observations)
+    for obs, expected_obs in zip(observations, expected):
+        assert obs.keys() == expected_obs.keys()
+        for uuid, sensor_obs in expected_obs.items():
+            assert obs[uuid].dtype == np.float32
+            assert np.allclose(obs[uuid], sensor_obs, atol=1e-4), uuid
+
+
+def test_batched_nav_sensors_vector_env():
+    r"""
+    Checks the batched nav sensors of gym envs stepped by a VectorEnv match
+    the sensors computed by each env.
+    """
+    num_envs = 2
+    vector_envs = []
+    for batched in [False, True]:
+        config = get_config(
+            "benchmark/nav/pointnav/pointnav_habitat_test.yaml",
+            [f"habitat.task.batched_nav_sensors={batched}"],
+        )
+        if not PointNavDatasetV1.check_config_paths_exist(
+            config.habitat.dataset
+        ):
+            pytest.skip("Please download Habitat test data to data folder.")
+        envs = habitat.VectorEnv(
+            make_env_fn=make_gym_from_config,
+            env_fn_args=tuple((config,) for _ in range(num_envs)),
+        )
+        if batched:
+            envs.initialize_batched_nav_sensors(config)
+        vector_envs.append(envs)
+
+    try:
+        observations = [envs.post_step(envs.reset()) for envs in vector_envs]
+        for step in range(20):
+            for expected_obs, obs in zip(*observations):
+                assert NAV_POSE_OBSERVATION_KEY not in obs
+                assert obs.keys() == expected_obs.keys()
+                for uuid, sensor_obs in expected_obs.items():
+                    assert np.allclose(obs[uuid], sensor_obs, atol=1e-4), uuid
+
+            # Turn and move forward, but never stop.
+            actions = [1 + (step + i) % 3 for i in range(num_envs)]
+            observations = [
+                envs.post_step([output[0] for output in envs.step(actions)])
+                for envs in vector_envs
+            ]
+    finally:
+        for envs in vector_envs:
+            envs.close()
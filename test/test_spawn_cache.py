@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import multiprocessing as mp
+import os.path as osp
+
+import numpy as np
+import pytest
+
+from habitat.tasks.rearrange.spawn_cache import SpawnCache, hash_dataset
+
+
+def _fill_cache(path: str, worker_idx: int, num_workers: int, n: int):
+    cache = SpawnCache(path, capacity=1024)
+    for i in range(worker_idx, n, num_workers):
+        cache.put(SpawnCache.key(1, "Pick-v0", str(i), 0), [i, 0.0, -i], i)
+    cache.flush()
+
+
+def test_spawn_cache_roundtrip(tmp_path):
+    path = str(tmp_path / "spawn_cache.bin")
+    cache = SpawnCache(path, capacity=64, ways=4)
+    key = SpawnCache.key(hash_dataset("missing.json.gz", ["0"]), "t", "0", 1)
+    assert key != SpawnCache.key(
+        hash_dataset("missing.json.gz", ["0"]), "t", "0", 0
+    )
+    assert cache.get(key) is None
+
+    cache.put(key, np.array([1.5, 0.1, -2.0]), 0.25)
+    pos, rot = cache.get(key)
+    assert np.allclose(pos, [1.5, 0.1, -2.0]) and np.isclose(rot, 0.25)
+    cache.put(key, [0.0, 0.0, 1.0], -1.0)
+    assert cache.get(key)[1] == -1.0
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # Another cache on the same file sees the starts.
+    cache.flush()
+    reader = SpawnCache(path, capacity=64, ways=4, read_only=True)
+    assert np.allclose(reader.get(key)[0], [0.0, 0.0, 1.0])
+    with pytest.raises(AssertionError):
+        reader.put(key, [0.0, 0.0, 0.0], 0.0)
+    with pytest.raises(ValueError):
+        SpawnCache(path, capacity=128, ways=4)
+
+
+def test_spawn_cache_dataset_hash(tmp_path):
+    data_path = tmp_path / "dataset.json.gz"
+    data_path.write_bytes(b"episodes")
+    h = hash_dataset(str(data_path))
+    assert h == hash_dataset(str(data_path))
+    data_path.write_bytes(b"other episodes")
+    assert h != hash_dataset(str(data_path))
+
+
+def test_spawn_cache_multiprocess(tmp_path):
+    path = str(tmp_path / "spawn_cache.bin")
+    n, num_workers = 200, 4
+    ctx = mp.get_context("spawn")
+    workers = [
+        ctx.Process(target=_fill_cache, args=(path, i, num_workers, n))
+        for i in range(num_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    assert osp.getsize(path) == 1024 * 4 * 8
+    cache = SpawnCache(path, capacity=1024, read_only=True)
+    for i in range(n):
+        pos, rot = cache.get(SpawnCache.key(1, "Pick-v0", str(i), 0))
+        assert np.allclose(pos, [i, 0.0, -i]) and rot == i
@@ -88,3 +88,65 @@ def test_tensor_dict_map():
     tensor_dict.map_in_place(lambda x: x + 1)
 
     assert res == tensor_dict
+
+
+@pytest.mark.skipif(torch is None, reason="Test requires pytorch")
+def test_tensor_dict_treespec():
+    dict_tree = dict(
+        z=torch.randn(4, 2),
+        b=dict(c=dict(d=torch.randn(4, 3)), a=torch.randn(4)),
+        a=torch.randn(4, 1),
+    )
+    tensor_dict = TensorDict.from_tree(dict_tree)
+
+    spec, leaves = tensor_dict.flatten()
+    assert (spec, leaves) == tensor_dict._flatten_recursive()
+    assert spec == [("z",), ("b", "c", "d"), ("b", "a"), ("a",)]
+    assert tensor_dict.treespec() is tensor_dict.treespec()
+
+    # from_flattened sorts the keys, whatever the order of the leaves
+    rebuilt = TensorDict.from_flattened(spec, leaves)
+    assert list(rebuilt.keys()) == ["a", "b", "z"]
+    assert list(rebuilt["b"].keys()) == ["a", "c"]
+    assert torch.equal(rebuilt["b"]["c"]["d"], dict_tree["b"]["c"]["d"])
+    assert (
+        rebuilt.flatten() == TensorDict.from_flattened(spec, leaves).flatten()
+    )
+
+    # Changing the structure of a subtree is seen by the root
+    tensor_dict["b"]["c"]["e"] = torch.randn(4, 5)
+    assert ("b", "c", "e") in tensor_dict.flatten()[0]
+    del tensor_dict["b"]["a"]
+    assert ("b", "a") not in tensor_dict.flatten()[0]
+    tensor_dict["a"] = TensorDict(x=torch.randn(4))
+    assert tensor_dict.flatten() == tensor_dict._flatten_recursive()
+    # Replacing a leaf keeps the structure
+    treespec = tensor_dict.treespec()
+    tensor_dict["z"] = torch.zeros(4, 2)
+    assert tensor_dict.treespec() is treespec
+    assert torch.equal(tensor_dict.flatten()[1][0], torch.zeros(4, 2))
+
+    row = tensor_dict[1]
+    assert row.flatten()[0] == tensor_dict.flatten()[0]
+    assert torch.equal(row["b"]["c"]["e"], tensor_dict["b"]["c"]["e"][1])
+
+    # Indexed set of a subset of the keys
+    tensor_dict.set(
+        slice(0, 2),
+        TensorDict(b=TensorDict(c=TensorDict(d=torch.ones(2, 3)))),
+        strict=False,
+    )
+    assert (tensor_dict["b"]["c"]["d"][:2] == 1).all()
+    assert not (tensor_dict["b"]["c"]["d"][2:] == 1).all()
+
+    # In-place union changes the structure like update
+    tensor_dict |= dict(y=torch.randn(4))
+    assert ("y",) in tensor_dict.flatten()[0]
+    assert tensor_dict.flatten() == tensor_dict._flatten_recursive()
+    union = tensor_dict | dict(w=torch.randn(4))
+    assert isinstance(union, TensorDict)
+    assert ("w",) in union.flatten()[0]
+    assert ("w",) not in tensor_dict.flatten()[0]
+
+    with pytest.raises(RuntimeError):
+        TensorDict.from_flattened([("a",), ("a",)], [torch.zeros(1)] * 2)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Copyright (c) Meta Platforms, Inc. and its affiliates.
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+habitat_baselines = pytest.importorskip("habitat_baselines")
+
+from habitat.utils.visualizations.utils import (
+    observations_to_image,
+    overlay_frame,
+)
+from habitat_baselines.utils.video_writer import VideoStreamPool
+
+
+def _observation(value):
+    return {
+        "rgb": torch.full((16, 16, 3), value, dtype=torch.uint8),
+        "gps": torch.zeros(2),
+    }
+
+
+def test_video_stream_tensorboard():
+    videos = []
+    tb_writer = SimpleNamespace(
+        add_video_from_np_images=lambda name, step, images, fps: videos.append(
+            (name, step, images)
+        )
+    )
+    info = {"distance_to_goal": 1.0}
+
+    with VideoStreamPool(
+        ["tensorboard"], None, tb_writer, checkpoint_idx=3, max_queue_size=2
+    ) as pool:
+        stream = pool.new_stream()
+        observation = _observation(10)
+        stream.add_frame(observation, {}, overlay=False)
+        stream.add_frame(observation, info)
+        # The frames are copies, later changes are not recorded.
+        observation["rgb"].fill_(0)
+        info["distance_to_goal"] = 2.0
+        stream.add_frame(_observation(20), info, blank=True)
+        stream.finish("ep0", {"distance_to_goal": 2.0})
+        # An unfinished video is dropped.
+        stream.add_frame(_observation(30), {}, overlay=False)
+
+    assert len(videos) == 1
+    name, step, images = videos[0]
+    assert (name, step) == ("episodeep0", 3)
+    expected_info = {"distance_to_goal": 1.0}
+    final_info = {"distance_to_goal": 2.0}
+    expected = [
+        observations_to_image(_observation(10), {}),
+        overlay_frame(
+            observations_to_image(_observation(10), expected_info),
+            expected_info,
+        ),
+        overlay_frame(
+            observations_to_image(_observation(0), final_info), final_info
+        ),
+    ]
+    assert len(images) == len(expected)
+    for image, expected_image in zip(images, expected):
+        assert np.array_equal(image, expected_image)
+
+
+def test_video_stream_disk(tmp_path):
+    pytest.importorskip("imageio_ffmpeg")
+    with VideoStreamPool(["disk"], str(tmp_path), None, 0, fps=5) as pool:
+        streams = [pool.new_stream() for _ in range(2)]
+        for i in range(4):
+            for stream in streams:
+                stream.add_frame(_observation(16 * i), {}, overlay=False)
+        streams[0].finish("ep0", {"success": 1.0})
+        streams[1].add_frame(_observation(0), {}, overlay=False)
+
+    assert os.listdir(tmp_path) == ["episode=ep0-ckpt=0-success=1.00.mp4"]
@@ -6,6 +6,7 @@
 
 import numpy as np
 
+from habitat.utils.visualizations import fog_of_war, maps
 from habitat.utils.visualizations.utils import observations_to_image
 
 
@@ -57,3 +58,29 @@ def test_different_dim_observations_to_image():
         1570,
         3,
     ), "Resulted image resolution doesn't match."
+
+
+def test_reveal_fog_of_war_inplace():
+    top_down_map = np.full((64, 64), maps.MAP_VALID_POINT, dtype=np.uint8)
+    # A wall in front of the agent.
+    top_down_map[40, :] = maps.MAP_INVALID_POINT
+    mask = np.zeros_like(top_down_map)
+    args = dict(
+        top_down_map=top_down_map,
+        current_point=np.array([32, 32]),
+        current_angle=0.0,
+        fov=90,
+        max_line_len=30,
+    )
+
+    revealed = fog_of_war.reveal_fog_of_war(
+        current_fog_of_war_mask=mask, **args
+    )
+    assert not mask.any()
+    assert revealed.any() and not revealed[40:].any()
+
+    result = fog_of_war.reveal_fog_of_war(
+        current_fog_of_war_mask=mask, inplace=True, **args
+    )
+    assert result is mask
+    assert np.array_equal(mask, revealed)